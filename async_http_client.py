@@ -0,0 +1,367 @@
+"""
+Unity Asset Manager - 共有HTTPクライアント（asyncio版）
+
+aiohttp の ClientSession をイベントループごとに1つ保持し、
+services.api.unity.com や Azure Blob Storage への接続を使い回します。
+async_webapi.py の各 *_via_api 関数はこのモジュールの共有クライアント経由で通信します。
+
+レスポンスは requests.Response と同じ属性（status_code, headers, text, json()）で参照でき、
+通信エラーは requests.exceptions の例外に変換されるため、
+同期版と同じエラー処理（log_error_response など）をそのまま使用できます。
+再試行・レート制限・サーキットブレーカーは同期版と同じ http_retry.py の共有ポリシーを使います。
+実行中のジョブの期限（job_deadline.py）も同期版と同じく、期限を過ぎたリクエストを送らず、
+リクエスト全体のタイムアウトを残り時間までに抑えます。
+"""
+
+import os
+import json
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+
+from http_retry import (
+    before_request,
+    record_response,
+    record_error,
+    get_retry_policy,
+    body_position,
+    rewind,
+    describe_retry,
+)
+from tracing import http_span, record_http_response
+from job_deadline import current_deadline
+
+# 同時に保持するコネクション数の上限（0 の場合は無制限）
+DEFAULT_CONNECTION_LIMIT = int(os.getenv("UNITY_HTTP_ASYNC_LIMIT", "100"))
+
+# 1ホストあたりのコネクション数の上限（0 の場合は DEFAULT_CONNECTION_LIMIT のみで制限）
+DEFAULT_CONNECTION_LIMIT_PER_HOST = int(os.getenv("UNITY_HTTP_ASYNC_LIMIT_PER_HOST", "0"))
+
+
+class AsyncResponse:
+    """
+    本文まで読み込んだレスポンス
+
+    requests.Response と同じ名前の属性・メソッドで参照できる。
+
+    Parameters
+    ----------
+    method : str
+        HTTPメソッド
+    url : str
+        リクエスト先のURL
+    status_code : int
+        ステータスコード
+    reason : str
+        ステータスの説明
+    headers : Mapping
+        レスポンスヘッダー
+    content : bytes
+        レスポンス本文
+    """
+
+    def __init__(self, method, url, status_code, reason, headers, content):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        """ステータスコードが4xx/5xxの場合は requests.exceptions.HTTPError を送出する"""
+        if 400 <= self.status_code < 600:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}",
+                response=self
+            )
+
+
+def _encode_params(params):
+    # requests と同様に、リスト値は同じキーを繰り返すクエリにする
+    if not params:
+        return None
+    encoded = []
+    for key, value in params.items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for item in values:
+            if item is not None:
+                encoded.append((key, str(item)))
+    return encoded
+
+
+def _convert_error(error):
+    """aiohttp の例外を対応する requests.exceptions の例外に変換する"""
+    if isinstance(error, getattr(aiohttp, "ConnectionTimeoutError", ())):
+        # 接続前のタイムアウト（リクエストは送信されていない）
+        return requests.exceptions.ConnectTimeout(str(error) or "接続がタイムアウトしました")
+    if isinstance(error, asyncio.TimeoutError):
+        return requests.exceptions.Timeout(str(error) or "リクエストがタイムアウトしました")
+    if isinstance(error, aiohttp.ClientPayloadError):
+        return requests.exceptions.ChunkedEncodingError(str(error))
+    return requests.exceptions.ConnectionError(str(error))
+
+
+class AsyncUnityHttpClient:
+    """
+    1つのイベントループで共有する keep-alive のHTTPクライアント
+
+    Parameters
+    ----------
+    limit : int
+        同時に保持するコネクション数の上限
+    limit_per_host : int
+        1ホストあたりのコネクション数の上限
+    """
+
+    def __init__(self, limit=DEFAULT_CONNECTION_LIMIT, limit_per_host=DEFAULT_CONNECTION_LIMIT_PER_HOST):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.request_count = 0
+        self._session = None
+        self._host_requests = {}
+        self._host_connections = {}
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            # 新規接続の数をホストごとに数え、コネクションの再利用状況を出力できるようにする
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_created)
+            # タイムアウトは呼び出し側（ポーリングのタイムアウトなど）で管理する
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=None),
+                                                  trace_configs=[trace_config])
+        return self._session
+
+    async def _on_connection_created(self, session, context, params):
+        host = context.trace_request_ctx
+        self._host_connections[host] = self._host_connections.get(host, 0) + 1
+
+    async def _send(self, method, url, idempotent=None, **kwargs):
+        """
+        再試行ポリシーに従ってリクエストを送信し、本文を読み込む前のレスポンスを返す
+
+        再試行しても解消しない場合は最後のレスポンスを返す（または例外を送出する）。
+        実行中のジョブの期限を過ぎている場合は、送信せずに DeadlineExceeded を送出する。
+        呼び出し側は返されたレスポンスを release() すること。
+        """
+        policy = get_retry_policy()
+        idempotent = policy.is_idempotent(method, idempotent)
+        position = body_position(kwargs.get("data"))
+        deadline = current_deadline()
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+
+        with http_span(method, url, kwargs.get("data")) as span:
+            attempt = 0
+            while True:
+                wait = before_request(url)
+                if wait > 0:
+                    await asyncio.sleep(wait if deadline is None else deadline.cap(wait))
+                if deadline is not None:
+                    deadline.check(f"{method} {parts.path}")
+                    remaining = deadline.remaining()
+                    if remaining is not None:
+                        # 本文の受信（ダウンロード）も含めて、ジョブの期限までに打ち切る
+                        kwargs["timeout"] = aiohttp.ClientTimeout(total=remaining)
+
+                self.request_count += 1
+                self._host_requests[host] = self._host_requests.get(host, 0) + 1
+                try:
+                    response = await self.session.request(method, url, trace_request_ctx=host, **kwargs)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = _convert_error(e)
+                    record_error(url, error)
+                    span.set_attribute("http.retry_count", attempt)
+                    if not (policy.should_retry_error(error, attempt, idempotent)
+                            and rewind(kwargs.get("data"), position)):
+                        raise error from e
+                    wait = policy.backoff(attempt)
+                    describe_retry(method, url, type(error).__name__, wait, attempt, policy.max_retries)
+                else:
+                    record_response(url, response.status, response.headers)
+                    record_http_response(span, response.status, response.headers, attempt)
+                    if not (policy.should_retry_status(response.status, attempt, idempotent)
+                            and rewind(kwargs.get("data"), position)):
+                        return response
+                    wait = policy.backoff(attempt, response.headers)
+                    describe_retry(method, url, response.status, wait, attempt, policy.max_retries)
+                    response.release()
+
+                await asyncio.sleep(wait if deadline is None else deadline.cap(wait))
+                attempt += 1
+
+    async def request(self, method, url, params=None, idempotent=None, **kwargs):
+        """
+        リクエストを送信し、本文まで読み込んだレスポンスを返す
+
+        Parameters
+        ----------
+        method : str
+            HTTPメソッド
+        url : str
+            リクエスト先のURL
+        params : dict
+            クエリパラメータ（リスト値は同じキーを繰り返す）
+        idempotent : bool
+            再送しても安全なリクエストかどうか（None の場合はメソッドで判断する）
+        **kwargs
+            aiohttp.ClientSession.request に渡す引数（headers, json, data など）
+
+        Returns
+        -------
+        AsyncResponse
+            レスポンス
+        """
+        response = await self._send(method, url, idempotent=idempotent, params=_encode_params(params), **kwargs)
+        try:
+            content = await response.read()
+            return AsyncResponse(method, str(response.url), response.status, response.reason,
+                                 response.headers, content)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise _convert_error(e) from e
+        finally:
+            response.release()
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url, **kwargs):
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request("DELETE", url, **kwargs)
+
+    async def head(self, url, **kwargs):
+        return await self.request("HEAD", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method, url, **kwargs):
+        """
+        本文を読み込まずにレスポンスを返す（ダウンロード用）
+
+        ステータスコードが4xx/5xxの場合は requests.exceptions.HTTPError を送出する。
+        本文の受信中に接続が切れた場合は requests.exceptions の例外に変換される。
+
+        Yields
+        ------
+        aiohttp.ClientResponse
+            レスポンス
+        """
+        response = await self._send(method, url, **kwargs)
+        try:
+            if response.status >= 400:
+                content = await response.read()
+                AsyncResponse(method, str(response.url), response.status, response.reason,
+                              response.headers, content).raise_for_status()
+            yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise _convert_error(e) from e
+        finally:
+            response.release()
+
+    def connection_stats(self):
+        """
+        ホストごとのコネクション再利用状況を取得する（セッションを閉じた後も参照できる）
+
+        Returns
+        -------
+        dict
+            ホスト → {"requests": 送信リクエスト数, "connections": 新規接続数,
+            "reused": 既存接続を再利用したリクエスト数}
+        """
+        stats = {}
+        for host, num_requests in self._host_requests.items():
+            num_connections = self._host_connections.get(host, 0)
+            stats[host] = {
+                "requests": num_requests,
+                "connections": num_connections,
+                "reused": max(num_requests - num_connections, 0)
+            }
+        return stats
+
+    def print_connection_stats(self):
+        """
+        コネクション再利用状況を出力する
+        """
+        print("  コネクション再利用状況（aiohttp）:")
+        for host, stats in self.connection_stats().items():
+            print(f"    {host}: リクエスト {stats['requests']} 件 / "
+                  f"新規接続 {stats['connections']} 件 / 再利用 {stats['reused']} 件")
+
+    async def close(self):
+        """
+        セッションを閉じる
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# aiohttp のセッションは作成したイベントループでしか使えないため、ループごとに保持する
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client():
+    """
+    実行中のイベントループで共有するHTTPクライアントを取得する
+
+    Returns
+    -------
+    AsyncUnityHttpClient
+        共有クライアント
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = AsyncUnityHttpClient()
+        _clients[loop] = client
+    return client
+
+
+def configure_async_http_client(limit=DEFAULT_CONNECTION_LIMIT, limit_per_host=DEFAULT_CONNECTION_LIMIT_PER_HOST):
+    """
+    実行中のイベントループの共有HTTPクライアントを指定した設定で作り直す
+
+    最初のリクエストを送信する前に呼び出すこと。
+
+    Parameters
+    ----------
+    limit : int
+        同時に保持するコネクション数の上限
+    limit_per_host : int
+        1ホストあたりのコネクション数の上限
+
+    Returns
+    -------
+    AsyncUnityHttpClient
+        新しい共有クライアント
+    """
+    client = AsyncUnityHttpClient(limit=limit, limit_per_host=limit_per_host)
+    _clients[asyncio.get_running_loop()] = client
+    return client
+
+
+async def close_async_http_client():
+    """
+    実行中のイベントループの共有HTTPクライアントを閉じる
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
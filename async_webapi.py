@@ -0,0 +1,1791 @@
+"""
+Unity Asset Manager - Web API実装版（asyncio版）
+
+main_webapi.py の各 *_via_api 関数と同じ引数・戻り値・エラー処理を持つ非同期版です。
+待ち時間の大半がポーリングやアップロード・ダウンロードの通信待ちであるため、
+1つのイベントループで数千件の変換ジョブを同時に扱えます。
+
+既存のエントリーポイント（main_webapi.py, batch_webapi.py）は同期版のまま使用でき、
+同期コードから呼び出す場合は run_sync() または AsyncBatchConverter.run() を使用します。
+"""
+
+import os
+import math
+import mmap
+import time
+import queue
+import asyncio
+import threading
+
+import requests
+from xml.sax.saxutils import escape
+
+from auth_provider import authorization_header
+from http_client import get_http_client
+from async_http_client import get_async_http_client, close_async_http_client, configure_async_http_client
+from blob_transfer import (
+    DEFAULT_BLOCK_SIZE,
+    DEFAULT_UPLOAD_WORKERS,
+    BLOCK_UPLOAD_THRESHOLD,
+    MAX_BLOCK_COUNT,
+    DEFAULT_DOWNLOAD_CHUNK_SIZE,
+    DEFAULT_RANGE_SIZE,
+    DEFAULT_DOWNLOAD_WORKERS,
+    RANGED_DOWNLOAD_THRESHOLD,
+    DEFAULT_DOWNLOAD_RETRIES,
+    _with_query,
+    _block_id,
+    _load_download_state,
+    _save_download_state,
+    remove_partial_downloads,
+)
+from main_webapi import (
+    UNITY_API_BASE,
+    OUTPUT_FOLDER,
+    WORKFLOW_TYPE,
+    OUTPUT_DATASET_NAME,
+    CONTENT_HASH_METADATA_FIELD,
+    DEFAULT_FILE_DOWNLOAD_WORKERS,
+    DEFAULT_FILE_UPLOAD_WORKERS,
+    DATASET_FILE_FIELDS,
+    DATASET_FILE_PAGE_SIZE,
+    TRANSFORMATION_SUCCEEDED_STATUS,
+    TRANSFORMATION_FAILED_STATUSES,
+    EXPORT_FORMATS,
+    log_error_response,
+    needs_output_folder,
+    check_export_files,
+    find_dataset_file,
+    local_path_for,
+    _file_index_cache,
+)
+from batch_webapi import (
+    DEFAULT_STAGE_CONCURRENCY,
+    STAGE_DONE,
+    create_jobs,
+    plan_transformation,
+    assign_cache_keys,
+    resume_job,
+    end_job_span,
+)
+from transformation_poller import TransformationPoller, TransformationFailedError
+from bulk_finalizer import (
+    SUBMIT_ON_COMPLETION,
+    BULK_RESOURCE_TYPE,
+    BULK_RESULTS_PAGE_SIZE,
+    AsyncBulkFinalizer,
+    DEFAULT_BATCH_SIZE as DEFAULT_FINALIZE_BATCH_SIZE,
+)
+from poll_schedule import AdaptivePollSchedule, get_transformation_history
+from conversion_cache import ConversionCache
+from job_store import (
+    JOB_CREATED,
+    JOB_UPLOADED,
+    JOB_TRANSFORMING,
+    JOB_SUCCEEDED,
+    JOB_DOWNLOADED,
+    JOB_FINALIZED,
+    JobStore,
+)
+from file_index import DatasetFileIndex
+from obj_dependencies import total_size
+from glb_validator import results_to_json, validate_output
+from tracing import TransformationTrace, current_span, start_span, traced
+from job_deadline import JOB_DEADLINE, Deadline, check_deadline, current_deadline, use_deadline
+from cpu_pool import get_cpu_pool
+
+# 接続が切れた場合に再開を試みる例外
+_RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                     requests.exceptions.Timeout)
+
+
+def _log_request_error(message, e):
+    print(f"  ✗ {message}: {e}")
+    if hasattr(e, 'response') and e.response is not None:
+        log_error_response(e.response)
+
+
+@traced()
+async def create_metadata_field_via_api(auth_credentials, org_id, field_name, display_name, field_type="Text"):
+    """
+    main_webapi.create_metadata_field_via_api の非同期版
+
+    Returns
+    -------
+    bool
+        フィールドが作成された、または定義済みの場合は True
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/organizations/{org_id}/templates/fields"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    body = {
+        "name": field_name,
+        "displayName": display_name,
+        "type": field_type
+    }
+
+    try:
+        # 定義済みの場合は409が返るため、再送しても重複しない
+        response = await get_async_http_client().post(url, headers=headers, json=body, idempotent=True)
+        if response.status_code == 409:
+            # 定義済み
+            return True
+        response.raise_for_status()
+
+        print(f"  ✓ メタデータフィールド '{field_name}' を作成しました")
+        return True
+    except requests.exceptions.RequestException as e:
+        _log_request_error("メタデータフィールドの作成に失敗", e)
+        return False
+
+
+@traced()
+async def search_assets_via_api(auth_credentials, project_id, include_query, include_fields=None, limit=100,
+                                token=None, sorting_field="name"):
+    """
+    main_webapi.search_assets_via_api の非同期版
+
+    Returns
+    -------
+    dict
+        検索結果（"assets" と次ページのトークン "next" を含む）
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/search"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    pagination = {
+        "limit": limit,
+        "sortingField": sorting_field
+    }
+    if token:
+        pagination["token"] = token
+
+    body = {
+        "filter": {"includeQuery": include_query},
+        "pagination": pagination
+    }
+    if include_fields:
+        body["includeFields"] = include_fields
+
+    try:
+        # 検索は副作用が無いため再試行してよい
+        response = await get_async_http_client().post(url, headers=headers, json=body, idempotent=True)
+        response.raise_for_status()
+
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        _log_request_error("アセット検索に失敗", e)
+        raise
+
+
+@traced()
+async def trash_assets_via_api(auth_credentials, project_id, asset_ids):
+    """
+    main_webapi.trash_assets_via_api の非同期版
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/unlink"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    try:
+        # ゴミ箱への移動は同じアセットに繰り返しても結果が変わらない
+        response = await get_async_http_client().post(url, headers=headers, params={"trash": "true"},
+                                                      json={"assetIds": list(asset_ids)}, idempotent=True)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        _log_request_error("アセットのゴミ箱への移動に失敗", e)
+        raise
+
+
+@traced()
+async def delete_assets_from_trash_via_api(auth_credentials, project_id, asset_ids):
+    """
+    main_webapi.delete_assets_from_trash_via_api の非同期版（元に戻せない）
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/trash/assets"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    try:
+        response = await get_async_http_client().delete(url, headers=headers, params={"assetIds": list(asset_ids)})
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        _log_request_error("ゴミ箱内のアセットの削除に失敗", e)
+        raise
+
+
+@traced()
+async def find_converted_asset_via_api(auth_credentials, project_id, conversion_key, output_name, export_formats,
+                                        dataset_name=OUTPUT_DATASET_NAME):
+    """
+    main_webapi.find_converted_asset_via_api の非同期版
+
+    Returns
+    -------
+    dict or None
+        変換結果のデータセットを持つアセット情報。見つからない場合や検索に失敗した場合は None
+    """
+    try:
+        result = await search_assets_via_api(
+            auth_credentials=auth_credentials,
+            project_id=project_id,
+            include_query={f"metadata.{CONTENT_HASH_METADATA_FIELD}": conversion_key},
+            include_fields=["*", "metadata", "datasets.*"],
+            limit=10
+        )
+    except requests.exceptions.RequestException:
+        # 検索できなくても通常の変換は続行できる
+        return None
+
+    expected = {f"{output_name}.{fmt}".lower() for fmt in export_formats}
+    for asset in result.get("assets") or []:
+        for ds in asset.get("datasets") or []:
+            if ds.get("name") != dataset_name:
+                continue
+            try:
+                index = await get_dataset_file_index_via_api(
+                    auth_credentials, project_id, asset.get("assetId"), asset.get("assetVersion"), ds.get("datasetId"))
+            except requests.exceptions.RequestException:
+                continue
+            # 変換が途中で失敗したアセットなど、出力ファイルが揃っていないアセットは再利用しない
+            names = {os.path.basename(file_path).lower() for file_path in index.files_in(ds.get("datasetId"))}
+            if expected <= names:
+                return asset
+            print(f"    警告: 変換済みのアセット {asset.get('assetId')} には出力ファイル"
+                  f"（{', '.join(sorted(expected - names))}）が無いため、再利用しません")
+    return None
+
+
+@traced()
+async def create_asset_via_api(auth_credentials, project_id, asset_name, primary_type="3D Model", description="",
+                               metadata=None):
+    """
+    main_webapi.create_asset_via_api の非同期版
+
+    Returns
+    -------
+    dict
+        作成されたアセット情報
+    """
+    print(f"  アセット '{asset_name}' を作成中...")
+
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    body = {
+        "name": asset_name,
+        "primaryType": primary_type
+    }
+
+    if description:
+        body["description"] = description
+    if metadata:
+        body["metadata"] = metadata
+
+    try:
+        response = await get_async_http_client().post(url, headers=headers, json=body)
+        response.raise_for_status()
+
+        asset_data = response.json()
+
+        print(f"  ✓ アセット作成成功")
+        print(f"    Asset ID: {asset_data.get('assetId')}")
+        print(f"    Version: {asset_data.get('assetVersion')}")
+
+        return asset_data
+    except requests.exceptions.RequestException as e:
+        _log_request_error("アセット作成に失敗", e)
+        raise
+
+
+@traced()
+async def create_asset_version_via_api(auth_credentials, project_id, asset_id, parent_version=None):
+    """
+    main_webapi.create_asset_version_via_api の非同期版
+
+    Returns
+    -------
+    dict
+        作成されたバージョン情報（assetVersion, parentAssetVersion など）
+    """
+    print(f"  アセット {asset_id} の新しいバージョンを作成中...")
+
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    body = {}
+    if parent_version:
+        body["parentAssetVersion"] = parent_version
+
+    try:
+        response = await get_async_http_client().post(url, headers=headers, json=body)
+        response.raise_for_status()
+
+        version_data = response.json()
+
+        print(f"  ✓ バージョン作成成功")
+        print(f"    Version: {version_data.get('assetVersion')} (親: {version_data.get('parentAssetVersion')})")
+
+        return version_data
+    except requests.exceptions.RequestException as e:
+        _log_request_error("バージョン作成に失敗", e)
+        raise
+
+
+@traced()
+async def update_asset_version_via_api(auth_credentials, project_id, asset_id, version_id, metadata):
+    """
+    main_webapi.update_asset_version_via_api の非同期版
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    try:
+        response = await get_async_http_client().request("PATCH", url, headers=headers, json={"metadata": metadata},
+                                                         idempotent=True)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        _log_request_error("アセットバージョンの更新に失敗", e)
+        raise
+
+
+@traced()
+async def create_dataset_via_api(auth_credentials, project_id, asset_id, version_id, dataset_name):
+    """
+    main_webapi.create_dataset_via_api の非同期版
+
+    Returns
+    -------
+    dict
+        作成されたデータセット情報
+    """
+    print(f"  データセット '{dataset_name}' を作成中...")
+
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    body = {
+        "name": dataset_name
+    }
+
+    try:
+        response = await get_async_http_client().post(url, headers=headers, json=body)
+        response.raise_for_status()
+
+        dataset_data = response.json()
+
+        print(f"  ✓ データセット作成成功")
+        print(f"    Dataset ID: {dataset_data.get('datasetId')}")
+
+        return dataset_data
+    except requests.exceptions.RequestException as e:
+        _log_request_error("データセット作成に失敗", e)
+        raise
+
+
+async def get_or_create_source_dataset_id(auth_credentials, project_id, asset, dataset_name="source_obj"):
+    """
+    main_webapi.get_or_create_source_dataset_id の非同期版
+
+    Returns
+    -------
+    str
+        データセットID
+    """
+    for ds in asset.get("datasets", []):
+        # デフォルトで作成されるSourceデータセットを探す
+        if ds.get("name") == "Source" or "Source" in ds.get("systemTags", []):
+            dataset_id = ds.get("datasetId")
+            print(f"  ✓ デフォルトのSourceデータセットを使用: {dataset_id}")
+            return dataset_id
+
+    # データセットが見つからない場合は作成
+    dataset = await create_dataset_via_api(
+        auth_credentials=auth_credentials,
+        project_id=project_id,
+        asset_id=asset.get("assetId"),
+        version_id=asset.get("assetVersion"),
+        dataset_name=dataset_name
+    )
+    dataset_id = dataset.get("datasetId")
+
+    if not dataset_id:
+        raise ValueError("データセット作成に失敗: IDが取得できませんでした")
+
+    return dataset_id
+
+
+@traced()
+async def upload_blob_in_blocks(upload_url, file_path, block_size=DEFAULT_BLOCK_SIZE,
+                                max_workers=DEFAULT_UPLOAD_WORKERS):
+    """
+    blob_transfer.upload_blob_in_blocks の非同期版
+
+    Returns
+    -------
+    int
+        アップロードしたブロック数
+    """
+    client = get_async_http_client()
+    file_size = os.path.getsize(file_path)
+
+    # ブロック数の上限を超える場合はブロックサイズを広げる
+    block_size = max(block_size, math.ceil(file_size / MAX_BLOCK_COUNT))
+    block_count = max(math.ceil(file_size / block_size), 1)
+    block_ids = [_block_id(i) for i in range(block_count)]
+
+    block_headers = {
+        'Content-Type': 'application/octet-stream',
+        'x-ms-blob-type': 'BlockBlob'
+    }
+
+    # 同時に送信中のブロックを max_workers 個までに制限する
+    semaphore = asyncio.Semaphore(max_workers)
+
+    with open(file_path, 'rb') as f:
+        # 空ファイルはメモリマップできないため、空のブロックを1つだけ送る
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if file_size else None
+        try:
+            async def put_block(index):
+                async with semaphore:
+                    offset = index * block_size
+                    view = memoryview(mapped)[offset:offset + block_size] if mapped else b""
+                    try:
+                        response = await client.put(
+                            _with_query(upload_url, comp="block", blockid=block_ids[index]),
+                            data=view,
+                            headers=block_headers
+                        )
+                        response.raise_for_status()
+                    finally:
+                        if isinstance(view, memoryview):
+                            view.release()
+
+            await asyncio.gather(*(put_block(i) for i in range(block_count)))
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+    # Put Block List: 送信済みブロックを順番どおりにコミットして BlockBlob を作成する
+    block_list = "".join(f"<Latest>{escape(block_id)}</Latest>" for block_id in block_ids)
+    body = f'<?xml version="1.0" encoding="utf-8"?><BlockList>{block_list}</BlockList>'
+    commit_headers = {
+        'Content-Type': 'application/xml',
+        'x-ms-blob-content-type': 'application/octet-stream'
+    }
+    response = await client.put(
+        _with_query(upload_url, comp="blocklist"),
+        data=body.encode("utf-8"),
+        headers=commit_headers
+    )
+    response.raise_for_status()
+
+    return block_count
+
+
+@traced()
+async def upload_file_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id, file_path,
+                              block_size=DEFAULT_BLOCK_SIZE, max_workers=DEFAULT_UPLOAD_WORKERS,
+                              block_upload_threshold=BLOCK_UPLOAD_THRESHOLD, dataset_file_path=None):
+    """
+    main_webapi.upload_file_via_api の非同期版
+
+    Returns
+    -------
+    dict
+        アップロード結果情報
+    """
+    file_name = dataset_file_path or os.path.basename(file_path)
+    print(f"  ファイル '{file_name}' をアップロード中...")
+
+    url_request = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets/{dataset_id}/files"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    file_size = os.path.getsize(file_path)
+
+    body = {
+        "filePath": file_name
+    }
+
+    client = get_async_http_client()
+    try:
+        print(f"    署名付きURLを取得中...")
+        response = await client.post(url_request, headers=headers, json=body)
+        response.raise_for_status()
+
+        upload_info = response.json()
+        print(f"    ✓ 署名付きURL取得成功")
+
+        upload_url = upload_info.get("uploadUrl")
+
+        if not upload_url:
+            print(f"    警告: アップロードURLが見つかりません。レスポンス: {upload_info}")
+            raise ValueError("アップロードURLがレスポンスに含まれていません")
+
+        if file_size > block_upload_threshold:
+            print(f"    ファイルをブロック単位でアップロード中... (サイズ: {file_size} bytes, "
+                  f"ブロックサイズ: {block_size} bytes, 並列数: {max_workers})")
+            block_count = await upload_blob_in_blocks(
+                upload_url,
+                file_path,
+                block_size=block_size,
+                max_workers=max_workers
+            )
+            print(f"    ✓ {block_count} ブロックをコミットしました")
+        else:
+            print(f"    ファイルをアップロード中... (サイズ: {file_size} bytes)")
+
+            upload_headers = {
+                'Content-Type': 'application/octet-stream',
+                'x-ms-blob-type': 'BlockBlob'  # Azure Blob Storage必須ヘッダー
+            }
+            # ファイルオブジェクトを渡すと、本文を読み込みながら送信される
+            with open(file_path, 'rb') as f:
+                upload_response = await client.put(upload_url, data=f, headers=upload_headers)
+            upload_response.raise_for_status()
+
+        print(f"  ✓ ファイルアップロード成功")
+
+        complete_url = upload_info.get("completeUrl")
+        if complete_url:
+            print(f"    アップロード完了を通知中...")
+            complete_headers = {
+                "Authorization": authorization_header(auth_credentials)
+            }
+            complete_response = await client.post(complete_url, headers=complete_headers, idempotent=True)
+            complete_response.raise_for_status()
+            print(f"    ✓ アップロード完了通知成功")
+
+        return upload_info
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("ファイルアップロードに失敗", e)
+        raise
+
+
+@traced()
+async def upload_source_files_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id, source_files,
+                                      max_workers=DEFAULT_FILE_UPLOAD_WORKERS):
+    """
+    main_webapi.upload_source_files_via_api の非同期版
+
+    Returns
+    -------
+    list of dict
+        ファイルごとのアップロード結果情報（source_files と同じ順）
+    """
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def upload(source_file):
+        local_path, file_path = source_file
+        async with semaphore:
+            return await upload_file_via_api(
+                auth_credentials=auth_credentials,
+                project_id=project_id,
+                asset_id=asset_id,
+                version_id=version_id,
+                dataset_id=dataset_id,
+                file_path=local_path,
+                dataset_file_path=file_path
+            )
+
+    if len(source_files) == 1:
+        return [await upload(source_files[0])]
+
+    print(f"  {len(source_files)} ファイル（依存ファイル {len(source_files) - 1} 件を含む）を並列にアップロード中...")
+    results = await asyncio.gather(*(upload(source_file) for source_file in source_files))
+    print(f"  ✓ {len(source_files)} ファイルのアップロードが完了しました")
+    return list(results)
+
+
+@traced()
+async def start_transformation_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id, workflow_type,
+                                       parameters):
+    """
+    main_webapi.start_transformation_via_api の非同期版
+
+    Returns
+    -------
+    dict
+        変換情報（transformation IDを含む）
+    """
+    print(f"  変換処理を開始中... (ワークフロー: {workflow_type})")
+
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets/{dataset_id}/transformations/start/{workflow_type}"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    body = {
+        "extraParameters": parameters
+    }
+
+    try:
+        response = await get_async_http_client().post(url, headers=headers, json=body)
+        response.raise_for_status()
+
+        transformation_data = response.json()
+
+        print(f"  ✓ 変換処理開始成功")
+        print(f"    Transformation ID: {transformation_data.get('transformationId')}")
+
+        return transformation_data
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("変換処理の開始に失敗", e)
+        raise
+
+
+@traced()
+async def terminate_transformation_via_api(auth_credentials, project_id, transformation_id):
+    """
+    main_webapi.terminate_transformation_via_api の非同期版
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/transformations/{transformation_id}/termination"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    try:
+        response = await get_async_http_client().post(url, headers=headers, idempotent=True)
+        response.raise_for_status()
+
+        print(f"  ✓ 変換処理を停止しました: {transformation_id}")
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("変換処理の停止に失敗", e)
+        raise
+
+
+@traced()
+async def get_transformation_status_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id,
+                                            transformation_id):
+    """
+    main_webapi.get_transformation_status_via_api の非同期版
+
+    Returns
+    -------
+    dict
+        変換ステータス情報
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets/{dataset_id}/transformations/{transformation_id}"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    try:
+        response = await get_async_http_client().get(url, headers=headers)
+        response.raise_for_status()
+
+        return response.json()
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("変換ステータスの取得に失敗", e)
+        raise
+
+
+@traced()
+async def list_transformations_via_api(auth_credentials, project_id, offset=0, limit=100, **filters):
+    """
+    main_webapi.list_transformations_via_api の非同期版
+
+    Returns
+    -------
+    list of dict
+        変換ステータス情報のリスト
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/transformations"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    params = {"offset": offset, "limit": limit}
+    params.update({k: v for k, v in filters.items() if v is not None})
+
+    try:
+        response = await get_async_http_client().get(url, headers=headers, params=params)
+        response.raise_for_status()
+
+        return response.json()
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("変換一覧の取得に失敗", e)
+        raise
+
+
+@traced()
+async def wait_for_transformation_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id,
+                                          transformation_id, workflow_type=WORKFLOW_TYPE, input_size=None,
+                                          timeout=None, started_at=None):
+    """
+    main_webapi.wait_for_transformation_via_api の非同期版
+
+    待機中はイベントループを占有しないため、多数の変換を同時に待機できる。
+
+    Returns
+    -------
+    dict
+        完了時の変換ステータス情報
+
+    Raises
+    ------
+    RuntimeError
+        変換が失敗した場合
+    TimeoutError
+        タイムアウト（またはジョブの期限）までに変換が完了しなかった場合
+    """
+    history = get_transformation_history()
+    expected_duration = history.predict(workflow_type, input_size)
+    if timeout is None:
+        timeout = history.timeout_for(workflow_type, input_size)
+    start_time = started_at or time.time()
+    deadline = current_deadline()
+    if deadline is not None and deadline.expires_at is not None:
+        # 変換の開始から数えたタイムアウトを、ジョブ全体の期限より後にしない
+        timeout = min(timeout, deadline.expires_at - start_time)
+
+    schedule = AdaptivePollSchedule(expected_duration)
+    # ステータスの変化とキュー待ち・実行時間をスパンに記録する
+    trace = TransformationTrace(current_span(), start_time)
+
+    while time.time() - start_time < timeout:
+        transformation_status = await get_transformation_status_via_api(
+            auth_credentials=auth_credentials,
+            project_id=project_id,
+            asset_id=asset_id,
+            version_id=version_id,
+            dataset_id=dataset_id,
+            transformation_id=transformation_id
+        )
+
+        status = transformation_status.get("status")
+        trace.observe(status)
+
+        if status and status.upper() == TRANSFORMATION_SUCCEEDED_STATUS:
+            print(f"  ✓ 変換が成功しました: {transformation_id}")
+            history.record(workflow_type, input_size, time.time() - start_time)
+            return transformation_status
+        elif status and status.upper() in TRANSFORMATION_FAILED_STATUSES:
+            error_msg = transformation_status.get("errorMessage") or transformation_status.get("error", "不明なエラー")
+            print(f"  ✗ 変換が失敗しました: {error_msg}")
+            raise RuntimeError(f"変換が失敗しました: {error_msg}")
+
+        elapsed = time.time() - start_time
+        await asyncio.sleep(min(schedule.next_delay(elapsed), max(timeout - elapsed, 0)))
+
+    print(f"  ✗ 変換がタイムアウトしました（{timeout:.0f}秒経過）")
+    raise TimeoutError(f"変換がタイムアウトしました: {transformation_id}")
+
+
+@traced()
+async def get_asset_details_via_api(auth_credentials, project_id, asset_id, version_id):
+    """
+    main_webapi.get_asset_details_via_api の非同期版
+
+    Returns
+    -------
+    dict
+        アセットの詳細情報
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    params = {
+        "IncludeFields": ["datasets.*", "datasets.files.*", "datasets.files.downloadURL"]
+    }
+
+    try:
+        response = await get_async_http_client().get(url, headers=headers, params=params)
+        response.raise_for_status()
+
+        return response.json()
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("アセット詳細の取得に失敗", e)
+        raise
+
+
+async def _probe_blob(download_url):
+    try:
+        response = await get_async_http_client().head(download_url, allow_redirects=True)
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        return None, None, False
+
+    content_length = response.headers.get("Content-Length")
+    total_size = int(content_length) if content_length and content_length.isdigit() else None
+    accepts_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+    return total_size, response.headers.get("ETag"), accepts_ranges
+
+
+async def _stream_range(download_url, fd, start, end, chunk_size, retries):
+    # [start, end] の範囲を一時ファイルの同じ位置へ書き込む（切断時は書き込み済みの位置から再開）
+    client = get_async_http_client()
+    position = start
+
+    for attempt in range(retries + 1):
+        try:
+            headers = {"Range": f"bytes={position}-{end}"}
+            async with client.stream("GET", download_url, headers=headers) as response:
+                if response.status != 206:
+                    raise ValueError("サーバーがRangeリクエストに対応していません")
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    os.pwrite(fd, chunk, position)
+                    position += len(chunk)
+                    check_deadline("ダウンロード")
+
+            if position > end:
+                return
+            raise requests.exceptions.ChunkedEncodingError(
+                f"範囲 {start}-{end} の受信が途中で終了しました（{position - start} bytes）")
+        except _RETRYABLE_ERRORS as e:
+            if attempt == retries:
+                raise
+            print(f"    警告: ダウンロードが中断されました。{position} bytes 目から再開します: {e}")
+
+
+async def _download_in_ranges(download_url, part_path, state_path, total_size, etag,
+                              chunk_size, range_size, max_workers, retries):
+    range_count = math.ceil(total_size / range_size)
+    completed = _load_download_state(state_path, total_size, etag, range_size)
+
+    if completed and os.path.exists(part_path) and os.path.getsize(part_path) == total_size:
+        print(f"    前回の続きから再開します（完了済み: {len(completed)}/{range_count} 範囲）")
+    else:
+        completed = set()
+        with open(part_path, "wb") as f:
+            f.truncate(total_size)
+
+    semaphore = asyncio.Semaphore(max_workers)
+    fd = os.open(part_path, os.O_WRONLY)
+    try:
+        async def fetch(index):
+            async with semaphore:
+                start = index * range_size
+                end = min(start + range_size, total_size) - 1
+                await _stream_range(download_url, fd, start, end, chunk_size, retries)
+                completed.add(index)
+                _save_download_state(state_path, total_size, etag, range_size, completed)
+
+        await asyncio.gather(*(fetch(i) for i in range(range_count) if i not in completed))
+    finally:
+        os.close(fd)
+
+
+async def _download_stream(download_url, part_path, chunk_size, accepts_ranges, retries):
+    client = get_async_http_client()
+    position = 0
+
+    with open(part_path, "wb") as f:
+        for attempt in range(retries + 1):
+            try:
+                headers = {"Range": f"bytes={position}-"} if position else {}
+                async with client.stream("GET", download_url, headers=headers) as response:
+                    if position and response.status != 206:
+                        # Rangeが無視された場合は先頭から受信し直す
+                        position = 0
+                        f.seek(0)
+                        f.truncate()
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        f.write(chunk)
+                        position += len(chunk)
+                        check_deadline("ダウンロード")
+                return position
+            except _RETRYABLE_ERRORS as e:
+                if attempt == retries or not accepts_ranges:
+                    raise
+                print(f"    警告: ダウンロードが中断されました。{position} bytes 目から再開します: {e}")
+                f.seek(position)
+                f.truncate()
+
+
+@traced()
+async def download_blob(download_url, output_path, chunk_size=DEFAULT_DOWNLOAD_CHUNK_SIZE,
+                        range_size=DEFAULT_RANGE_SIZE, max_workers=DEFAULT_DOWNLOAD_WORKERS,
+                        ranged_threshold=RANGED_DOWNLOAD_THRESHOLD, retries=DEFAULT_DOWNLOAD_RETRIES):
+    """
+    blob_transfer.download_blob の非同期版
+
+    一時ファイル・状態ファイルの形式は同期版と同じため、どちらで中断しても再開できる。
+
+    Returns
+    -------
+    int
+        ダウンロードしたファイルのバイト数
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    part_path = f"{output_path}.part"
+    state_path = f"{part_path}.json"
+
+    total_size, etag, accepts_ranges = await _probe_blob(download_url)
+
+    if accepts_ranges and total_size is not None and total_size > ranged_threshold:
+        print(f"    Rangeリクエストで並列ダウンロード中... (サイズ: {total_size} bytes, "
+              f"範囲サイズ: {range_size} bytes, 並列数: {max_workers})")
+        await _download_in_ranges(download_url, part_path, state_path, total_size, etag,
+                                  chunk_size, range_size, max_workers, retries)
+        downloaded_size = total_size
+    else:
+        downloaded_size = await _download_stream(download_url, part_path, chunk_size, accepts_ranges, retries)
+
+    os.replace(part_path, output_path)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+    return downloaded_size
+
+
+@traced()
+async def download_file_via_api(auth_credentials, project_id, asset_id, version_id, dataset_name, file_name,
+                                output_path):
+    """
+    main_webapi.download_file_via_api の非同期版
+
+    Returns
+    -------
+    str
+        保存されたファイルのパス
+    """
+    print(f"  ファイル '{file_name}' をダウンロード中...")
+
+    client = get_async_http_client()
+    try:
+        headers = {"Authorization": authorization_header(auth_credentials)}
+
+        dataset_id = await find_dataset_id_via_api(auth_credentials, project_id, asset_id, version_id, dataset_name)
+        index = await get_dataset_file_index_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id)
+        target_file = index.find(file_name, dataset_id)
+
+        if not target_file:
+            # 変換直後はファイル一覧が空の場合があるため、アセット詳細のfilesフィールドから検索
+            _file_index_cache.invalidate(("files", project_id, asset_id, version_id, dataset_id))
+
+            asset_url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}"
+            params = {
+                "IncludeFields": ["datasets.*", "files.*"]
+            }
+
+            asset_response = await client.get(asset_url, headers=headers, params=params)
+            asset_response.raise_for_status()
+            target_file, dataset_id = find_dataset_file(asset_response.json(), dataset_name, file_name)
+
+        file_path_encoded = requests.utils.quote(target_file.get("filePath"), safe='')
+        download_url_endpoint = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets/{dataset_id}/files/{file_path_encoded}/download-url"
+
+        url_response = await client.get(download_url_endpoint, headers=headers)
+        url_response.raise_for_status()
+
+        url_data = url_response.json()
+        download_url = url_data.get("url") or url_data.get("downloadUrl")
+
+        if not download_url:
+            raise ValueError("ダウンロードURLが取得できませんでした")
+
+        downloaded_size = await download_blob(download_url, output_path)
+
+        print(f"  ✓ ファイルダウンロード成功: {output_path} ({downloaded_size} bytes)")
+
+        return output_path
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("ファイルダウンロードに失敗", e)
+        raise
+    except Exception as e:
+        print(f"  ✗ ファイルダウンロードに失敗: {e}")
+        raise
+
+
+@traced()
+async def iter_dataset_files_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id,
+                                     include_fields=DATASET_FILE_FIELDS, page_size=DATASET_FILE_PAGE_SIZE):
+    """
+    main_webapi.iter_dataset_files_via_api の非同期版（async for で使用する）
+
+    Yields
+    ------
+    dict
+        ファイル情報
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets/{dataset_id}/files"
+
+    token = None
+    while True:
+        headers = {
+            "Authorization": authorization_header(auth_credentials)
+        }
+        params = {
+            "includeFields": list(include_fields),
+            "limit": page_size,
+            "token": token
+        }
+
+        try:
+            response = await get_async_http_client().get(url, headers=headers, params=params)
+            response.raise_for_status()
+            page = response.json()
+
+        except requests.exceptions.RequestException as e:
+            _log_request_error("ファイル一覧の取得に失敗", e)
+            raise
+
+        for file_info in page.get("results") or []:
+            yield file_info
+
+        token = page.get("next")
+        if not token:
+            return
+
+
+@traced()
+async def get_dataset_file_index_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id,
+                                         refresh=False):
+    """
+    main_webapi.get_dataset_file_index_via_api の非同期版（キャッシュは同期版と共有する）
+
+    Returns
+    -------
+    DatasetFileIndex
+        ファイルの索引
+    """
+    key = ("files", project_id, asset_id, version_id, dataset_id)
+    index = None if refresh else _file_index_cache.get(key)
+    if index is None:
+        index = DatasetFileIndex()
+        async for file_info in iter_dataset_files_via_api(auth_credentials, project_id, asset_id, version_id,
+                                                          dataset_id):
+            index.add(file_info, [dataset_id])
+        _file_index_cache.set(key, index)
+    return index
+
+
+@traced()
+async def get_download_urls_via_api(auth_credentials, project_id, asset_id, version_id, dataset_ids=None):
+    """
+    main_webapi.get_download_urls_via_api の非同期版
+
+    Returns
+    -------
+    list of dict
+        datasetId, filePath, url を含むファイル情報のリスト
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/download-urls"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    params = {}
+    if dataset_ids:
+        params["datasets"] = list(dataset_ids)
+
+    try:
+        response = await get_async_http_client().get(url, headers=headers, params=params)
+        response.raise_for_status()
+
+        return response.json().get("files") or []
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("ダウンロードURLの一括取得に失敗", e)
+        raise
+
+
+@traced()
+async def find_dataset_id_via_api(auth_credentials, project_id, asset_id, version_id, dataset_name):
+    """
+    main_webapi.find_dataset_id_via_api の非同期版
+
+    Returns
+    -------
+    str
+        データセットID
+    """
+    key = ("dataset", project_id, asset_id, version_id, dataset_name)
+    dataset_id = _file_index_cache.get(key)
+    if dataset_id:
+        return dataset_id
+
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    params = {
+        "IncludeFields": ["datasets.*"]
+    }
+
+    try:
+        response = await get_async_http_client().get(url, headers=headers, params=params)
+        response.raise_for_status()
+
+        for ds in response.json().get("datasets", []):
+            if ds.get("name") == dataset_name:
+                _file_index_cache.set(key, ds.get("datasetId"))
+                return ds.get("datasetId")
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("データセット情報の取得に失敗", e)
+        raise
+
+    raise ValueError(f"データセット '{dataset_name}' が見つかりません")
+
+
+@traced()
+async def download_dataset_files_via_api(auth_credentials, project_id, asset_id, version_id, output_dir,
+                                         dataset_name=OUTPUT_DATASET_NAME, dataset_id=None,
+                                         max_workers=DEFAULT_FILE_DOWNLOAD_WORKERS):
+    """
+    main_webapi.download_dataset_files_via_api の非同期版
+
+    Returns
+    -------
+    dict
+        データセット内のファイルパス → 保存先のパス
+    """
+    print(f"  データセット '{dataset_name}' の全ファイルをダウンロード中...")
+
+    if not dataset_id:
+        dataset_id = await find_dataset_id_via_api(auth_credentials, project_id, asset_id, version_id, dataset_name)
+
+    files = [
+        file_info for file_info in await get_download_urls_via_api(
+            auth_credentials, project_id, asset_id, version_id, dataset_ids=[dataset_id])
+        if file_info.get("datasetId") in (None, dataset_id) and file_info.get("url")
+    ]
+    if not files:
+        raise ValueError(f"データセット '{dataset_name}' にダウンロードできるファイルがありません")
+
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def fetch(file_info):
+        async with semaphore:
+            local_path = local_path_for(output_dir, file_info["filePath"])
+            await download_blob(file_info["url"], local_path)
+            return file_info["filePath"], local_path
+
+    downloaded = dict(await asyncio.gather(*(fetch(file_info) for file_info in files)))
+
+    print(f"  ✓ {len(downloaded)} ファイルをダウンロードしました: {output_dir}")
+    return downloaded
+
+
+async def download_outputs_via_api(auth_credentials, project_id, asset_id, version_id, output_path,
+                                   export_formats=None, all_outputs=False):
+    """
+    main_webapi.download_outputs_via_api の非同期版
+
+    Returns
+    -------
+    list of str
+        保存されたファイルのパス
+    """
+    export_formats = export_formats or EXPORT_FORMATS
+    if not (all_outputs or needs_output_folder(export_formats)):
+        await download_file_via_api(
+            auth_credentials=auth_credentials,
+            project_id=project_id,
+            asset_id=asset_id,
+            version_id=version_id,
+            dataset_name=OUTPUT_DATASET_NAME,
+            file_name=os.path.basename(output_path),
+            output_path=output_path
+        )
+        return [output_path]
+
+    downloaded = await download_dataset_files_via_api(
+        auth_credentials=auth_credentials,
+        project_id=project_id,
+        asset_id=asset_id,
+        version_id=version_id,
+        output_dir=output_path
+    )
+    check_export_files(downloaded, os.path.basename(output_path), export_formats)
+    return list(downloaded.values())
+
+
+@traced()
+async def get_bulk_operation_definitions_via_api(auth_credentials, org_id, resource_type=BULK_RESOURCE_TYPE):
+    """
+    main_webapi.get_bulk_operation_definitions_via_api の非同期版
+
+    Returns
+    -------
+    list of dict
+        操作の定義（type, description, operationArguments など）
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/organizations/{org_id}/bulk/definitions"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    try:
+        response = await get_async_http_client().get(url, headers=headers, params={"resourceType": resource_type})
+        response.raise_for_status()
+
+        return response.json().get("operationDefinitions") or []
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("一括操作の定義の取得に失敗", e)
+        raise
+
+
+@traced()
+async def create_bulk_operation_via_api(auth_credentials, project_id, asset_versions, operations,
+                                        submit_on_completion=True):
+    """
+    main_webapi.create_bulk_operation_via_api の非同期版
+
+    Returns
+    -------
+    str
+        一括操作のID（bulkId）
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/versions/bulk"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    body = {
+        "assetVersions": [{"assetId": asset_id, "assetVersion": version_id} for asset_id, version_id in asset_versions],
+        "operations": operations,
+        "submitOnCompletion": submit_on_completion
+    }
+
+    try:
+        response = await get_async_http_client().post(url, headers=headers, json=body)
+        response.raise_for_status()
+
+        bulk_id = response.json().get("bulkId")
+        if not bulk_id:
+            raise ValueError("一括操作の作成に失敗: bulkId が取得できませんでした")
+        print(f"  ✓ 一括操作を作成しました: {bulk_id}（アセットバージョン {len(asset_versions)} 件）")
+        return bulk_id
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("一括操作の作成に失敗", e)
+        raise
+
+
+@traced()
+async def get_bulk_operation_via_api(auth_credentials, org_id, bulk_id, offset=0, limit=BULK_RESULTS_PAGE_SIZE):
+    """
+    main_webapi.get_bulk_operation_via_api の非同期版
+
+    Returns
+    -------
+    dict
+        一括操作の情報（status, failReasons, results, total）
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/organizations/{org_id}/bulk/{bulk_id}"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    try:
+        response = await get_async_http_client().get(url, headers=headers, params={"offset": offset, "limit": limit})
+        response.raise_for_status()
+
+        return response.json()
+
+    except requests.exceptions.RequestException as e:
+        _log_request_error("一括操作のステータス取得に失敗", e)
+        raise
+
+
+def run_sync(coroutine):
+    """
+    コルーチンを新しいイベントループで実行し、共有HTTPクライアントを閉じてから結果を返す
+
+    同期コードから非同期版の関数を呼び出すためのファサード。
+
+    Parameters
+    ----------
+    coroutine : coroutine
+        実行するコルーチン
+
+    Returns
+    -------
+    object
+        コルーチンの戻り値
+    """
+    async def runner():
+        try:
+            return await coroutine
+        finally:
+            await close_async_http_client()
+
+    return asyncio.run(runner())
+
+
+class AsyncBatchConverter:
+    """
+    batch_webapi.BatchConverter の asyncio版
+
+    ジョブごとに1つのコルーチンで各ステップを順に実行し、ステージごとの同時実行数は
+    セマフォで制限する。スレッドを消費しないため、max_in_flight を数千まで大きくできる。
+    変換待ちは BatchConverter と同じ TransformationPoller を共有する。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    org_id : str
+        組織ID
+    project_id : str
+        プロジェクトID
+    output_folder : str
+        出力フォルダ
+    workflow_type : str
+        ワークフロータイプ
+    stage_concurrency : dict
+        ステージ名 → 同時実行数（省略したステージはデフォルト値）
+    max_in_flight : int
+        同時に処理中にできるジョブ数の上限
+    poll_timeout : float
+        1ジョブあたりの変換待ちタイムアウト秒数（None の場合は過去の変換所要時間から求める）
+    all_outputs : bool
+        True の場合、.glb だけでなく変換結果の全ファイルをアセットごとのディレクトリへ保存する
+    connection_limit : int
+        同時に保持するコネクション数の上限
+    export_formats : list of str
+        1回の変換で出力する形式（glb 以外を含む場合は all_outputs と同じくディレクトリへ保存する）
+    labels : list of str
+        ファイナライズで付与するラベル名（None の場合は UNITY_FINALIZE_LABELS）
+    metadata : dict
+        ファイナライズで付与するメタデータ（None の場合は UNITY_FINALIZE_METADATA）
+    submit : bool
+        ファイナライズでアセットバージョンを Submit するかどうか
+    finalize_batch_size : int
+        1回の一括操作にまとめるアセットバージョンの最大数
+    new_versions : bool
+        True の場合、以前に変換した入力ファイル（JobStore に記録したアセット）は
+        新しいアセットを作らず、同じアセットの新しいバージョンとして変換する
+    job_deadline : float
+        1ジョブ全体（アップロードからダウンロードまで）の期限秒数（0 の場合は期限を設けない）
+    """
+
+    def __init__(self, auth_credentials, org_id, project_id, output_folder=OUTPUT_FOLDER,
+                 workflow_type=WORKFLOW_TYPE, stage_concurrency=None, max_in_flight=1000,
+                 poll_timeout=None, all_outputs=False, connection_limit=None, export_formats=None,
+                 labels=None, metadata=None, submit=SUBMIT_ON_COMPLETION,
+                 finalize_batch_size=DEFAULT_FINALIZE_BATCH_SIZE, new_versions=False, job_deadline=JOB_DEADLINE):
+        self.auth_credentials = auth_credentials
+        self.org_id = org_id
+        self.project_id = project_id
+        self.output_folder = output_folder
+        self.workflow_type = workflow_type
+        self.poll_timeout = poll_timeout
+        self.export_formats = export_formats or EXPORT_FORMATS
+        self.all_outputs = all_outputs or needs_output_folder(self.export_formats)
+        self.new_versions = new_versions
+        self.poller = None
+        self.http_client = None
+        self.cache = ConversionCache()
+        self.jobs = JobStore()
+        self.finalizer = AsyncBulkFinalizer(
+            auth_credentials, org_id, project_id,
+            get_definitions=get_bulk_operation_definitions_via_api,
+            create_operation=create_bulk_operation_via_api,
+            get_operation=get_bulk_operation_via_api,
+            labels=labels, metadata=metadata, submit=submit, batch_size=finalize_batch_size, jobs=self.jobs
+        )
+        self.dedupe_enabled = False
+        self.stage_concurrency = dict(DEFAULT_STAGE_CONCURRENCY)
+        self.stage_concurrency.update(stage_concurrency or {})
+        self.max_in_flight = max_in_flight
+        self.connection_limit = connection_limit or sum(self.stage_concurrency.values())
+        self.job_deadline = job_deadline
+        self._loop = None
+        self._main_task = None
+        self._cancel_requested = threading.Event()
+
+    async def run_async(self, input_paths, on_done):
+        """
+        入力ファイル群を変換し、完了したジョブごとに on_done を呼ぶ
+
+        Parameters
+        ----------
+        input_paths : list of str
+            入力ファイルのパス
+        on_done : callable
+            完了したジョブ（BatchJob）を受け取る関数
+        """
+        os.makedirs(self.output_folder, exist_ok=True)
+        self.http_client = configure_async_http_client(limit=self.connection_limit)
+        self._loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        if self._cancel_requested.is_set():
+            self._main_task.cancel()
+
+        try:
+            self.dedupe_enabled = await create_metadata_field_via_api(
+                auth_credentials=self.auth_credentials,
+                org_id=self.org_id,
+                field_name=CONTENT_HASH_METADATA_FIELD,
+                display_name="Conversion Key"
+            )
+
+            self._semaphores = {stage: asyncio.Semaphore(n) for stage, n in self.stage_concurrency.items()}
+            in_flight = asyncio.Semaphore(self.max_in_flight)
+
+            async def run_job(job):
+                async with in_flight:
+                    await self._run_job(job)
+                on_done(job)
+
+            self.poller = TransformationPoller(self.auth_credentials, self.project_id)
+            with self.poller:
+                await asyncio.gather(*(run_job(job) for job in create_jobs(input_paths, self.output_folder, all_outputs=self.all_outputs)))
+
+            # 残りのアセットバージョンを送信し、すべての一括操作の完了を待つ
+            await self.finalizer.close()
+        finally:
+            await close_async_http_client()
+
+    def print_connection_stats(self):
+        """
+        コネクション再利用状況を出力する
+
+        各ステージの通信は aiohttp のセッション、変換ステータスの確認（TransformationPoller）は
+        同期版の共有クライアントを使うため、両方を出力する。
+        """
+        if self.http_client is not None:
+            self.http_client.print_connection_stats()
+        get_http_client().print_connection_stats()
+
+    def cancel(self):
+        """
+        実行中の run_async をキャンセルする（別スレッドから呼び出せる）
+
+        処理中のジョブは変換を停止し、途中までダウンロードしたファイルを削除してから終了する。
+        """
+        self._cancel_requested.set()
+        if self._loop is not None and self._main_task is not None:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+
+    def run(self, input_paths):
+        """
+        同期コードから呼び出すためのファサード
+
+        別スレッドでイベントループを実行し、完了した順にジョブを返す。
+        途中で終了した場合（Ctrl+C など）は処理中のジョブをキャンセルし、後片付けが終わるまで待つ。
+
+        Yields
+        ------
+        BatchJob
+            完了したジョブ
+        """
+        results = queue.Queue()
+        errors = []
+
+        def runner():
+            try:
+                asyncio.run(self.run_async(input_paths, results.put))
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                results.put(None)
+
+        thread = threading.Thread(target=runner, name="async-batch", daemon=True)
+        thread.start()
+        try:
+            while True:
+                job = results.get()
+                if job is None:
+                    break
+                yield job
+        except BaseException:
+            self.cancel()
+            thread.join()
+            raise
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    async def _stage(self, job, name, func):
+        stage_start = time.time()
+        try:
+            with start_span(f"stage.{name}", parent=job.span):
+                async with self._semaphores[name]:
+                    return await func(job)
+        except BaseException as e:
+            job.failed_stage = name
+            job.error = e
+            raise
+        finally:
+            job.stage_durations[name] = time.time() - stage_start
+
+    async def _run_job(self, job):
+        job.started_at = time.time()
+        job.deadline = Deadline(self.job_deadline, started_at=job.started_at)
+        job.span = start_span("batch.job", **{"unity.input.path": job.input_path})
+        stages = [
+            ("preflight", self._preflight_stage),
+            ("cache", self._cache_stage),
+            ("create", self._create_stage),
+            ("upload", self._upload_stage),
+            ("transform", self._transform_stage),
+            ("poll", self._poll_stage),
+            ("download", self._download_stage),
+        ]
+        try:
+            with use_deadline(job.deadline):
+                for name, func in stages:
+                    # skip_to が設定されていれば、そのステージまでを省略する（STAGE_DONE は残りすべて）
+                    if job.skip_to is not None:
+                        if job.skip_to != name:
+                            continue
+                        job.skip_to = None
+                    await self._stage(job, name, func)
+        except asyncio.CancelledError:
+            job.deadline.cancel()
+            await self._abort_job(job, "中断されました")
+            raise
+        except Exception:
+            # エラーは job.error に記録済み
+            if isinstance(job.error, TimeoutError):
+                await self._abort_job(job, str(job.error))
+        finally:
+            job.finished_at = time.time()
+            end_job_span(job)
+
+    async def _abort_job(self, job, reason):
+        # BatchConverter.abort_job の非同期版（ジョブの期限の外で実行する）
+        record = await asyncio.to_thread(self.jobs.get, job.job_key) if job.job_key else None
+        if record and record["state"] == JOB_TRANSFORMING and record["transformation_id"]:
+            try:
+                await terminate_transformation_via_api(self.auth_credentials, self.project_id,
+                                                       record["transformation_id"])
+                await asyncio.to_thread(self.jobs.rewind, job.job_key, JOB_UPLOADED, error=reason)
+            except requests.exceptions.RequestException:
+                # 停止できなかった変換には、次回の実行で再接続する
+                pass
+        await asyncio.to_thread(remove_partial_downloads, job.output_path)
+
+    async def _preflight_stage(self, job):
+        # OBJファイルの解析はCPUプールで行い、スレッドでは結果を待つだけにする（イベントループを止めない）
+        await asyncio.to_thread(plan_transformation, job, self.workflow_type, self.export_formats)
+
+    async def _cache_stage(self, job):
+        # ハッシュ計算はCPUプール、キャッシュの読み書きはディスクI/Oのためスレッドで行う
+        await asyncio.to_thread(assign_cache_keys, job, self.all_outputs)
+        record = await asyncio.to_thread(self.jobs.get, job.job_key)
+        job.cache_hit = await asyncio.to_thread(self.cache.materialize, job.cache_key, job.output_path)
+        if job.cache_hit:
+            if record and record["state"] == JOB_DOWNLOADED:
+                # ファイナライズが終わっていないジョブは、キャッシュから出力したうえでファイナライズだけをやり直す
+                resume_job(job, record)
+            else:
+                job.skip_to = STAGE_DONE
+            return
+
+        # 前回の実行が途中で終了していれば、続きのステージから再開する
+        if record:
+            resume_job(job, record)
+
+    async def _create_stage(self, job):
+        if job.resumed:
+            # アセットは作成済みのため、アセット詳細からSourceデータセットを探す
+            asset = await get_asset_details_via_api(self.auth_credentials, self.project_id, job.asset_id,
+                                                    job.version_id)
+            asset.update(assetId=job.asset_id, assetVersion=job.version_id)
+            job.dataset_id = await get_or_create_source_dataset_id(
+                auth_credentials=self.auth_credentials,
+                project_id=self.project_id,
+                asset=asset
+            )
+            await asyncio.to_thread(self.jobs.advance, job.job_key, JOB_CREATED, dataset_id=job.dataset_id)
+            return
+
+        if self.dedupe_enabled:
+            existing_asset = await find_converted_asset_via_api(
+                auth_credentials=self.auth_credentials,
+                project_id=self.project_id,
+                conversion_key=job.conversion_key,
+                output_name=job.transformation_params["outputFileName"],
+                export_formats=job.transformation_params["exportFormats"]
+            )
+            if existing_asset:
+                job.asset_id = existing_asset.get("assetId")
+                job.version_id = existing_asset.get("assetVersion")
+                job.reused_asset = True
+                job.skip_to = "download"
+                # 再実行時はダウンロードから再開できるよう、変換済みのジョブとして記録する
+                await asyncio.to_thread(
+                    self.jobs.advance, job.job_key, JOB_SUCCEEDED, input_path=job.input_path,
+                    output_path=job.output_path, workflow_type=job.workflow_type, asset_id=job.asset_id,
+                    version_id=job.version_id)
+                return
+
+        previous = await asyncio.to_thread(self.jobs.get_asset, job.input_path) if self.new_versions else None
+        if previous and previous["asset_id"]:
+            # 以前に変換したファイルは、同じアセットの新しいバージョンとして変換する
+            asset = await self._create_version(job, previous["asset_id"])
+        else:
+            asset = await create_asset_via_api(
+                auth_credentials=self.auth_credentials,
+                project_id=self.project_id,
+                asset_name=f"Web API - {os.path.basename(job.input_path)}",
+                description="REST API経由でアップロードされた3Dモデル",
+                metadata={CONTENT_HASH_METADATA_FIELD: job.conversion_key} if self.dedupe_enabled else None
+            )
+        job.asset_id = asset.get("assetId")
+        job.version_id = asset.get("assetVersion")
+
+        if not job.asset_id or not job.version_id:
+            raise ValueError("アセット作成に失敗: IDまたはバージョンが取得できませんでした")
+        if self.new_versions:
+            await asyncio.to_thread(self.jobs.record_asset, job.input_path, asset_id=job.asset_id,
+                                    version_id=job.version_id)
+        await asyncio.to_thread(
+            self.jobs.advance, job.job_key, JOB_CREATED, input_path=job.input_path, output_path=job.output_path,
+            workflow_type=job.workflow_type, asset_id=job.asset_id, version_id=job.version_id)
+
+        job.dataset_id = await get_or_create_source_dataset_id(
+            auth_credentials=self.auth_credentials,
+            project_id=self.project_id,
+            asset=asset
+        )
+        await asyncio.to_thread(self.jobs.advance, job.job_key, JOB_CREATED, dataset_id=job.dataset_id)
+
+    async def _create_version(self, job, asset_id):
+        version = await create_asset_version_via_api(self.auth_credentials, self.project_id, asset_id)
+        version_id = version.get("assetVersion")
+        if not version_id:
+            raise ValueError("バージョン作成に失敗: バージョンが取得できませんでした")
+
+        if self.dedupe_enabled:
+            # 親バージョンの変換キーを引き継がないよう、新しい内容の変換キーに置き換える
+            await update_asset_version_via_api(self.auth_credentials, self.project_id, asset_id, version_id,
+                                               metadata={CONTENT_HASH_METADATA_FIELD: job.conversion_key})
+
+        # 新しいバージョンは親バージョンのSourceデータセットを参照している
+        asset = await get_asset_details_via_api(self.auth_credentials, self.project_id, asset_id, version_id)
+        asset.update(assetId=asset_id, assetVersion=version_id)
+        return asset
+
+    async def _upload_stage(self, job):
+        await upload_source_files_via_api(
+            auth_credentials=self.auth_credentials,
+            project_id=self.project_id,
+            asset_id=job.asset_id,
+            version_id=job.version_id,
+            dataset_id=job.dataset_id,
+            source_files=job.source_files
+        )
+        job.bytes_uploaded = total_size(job.source_files)
+        await asyncio.to_thread(self.jobs.advance, job.job_key, JOB_UPLOADED)
+
+    async def _transform_stage(self, job):
+        job.transformation_started_at = time.time()
+        transformation = await start_transformation_via_api(
+            auth_credentials=self.auth_credentials,
+            project_id=self.project_id,
+            asset_id=job.asset_id,
+            version_id=job.version_id,
+            dataset_id=job.dataset_id,
+            workflow_type=job.workflow_type,
+            parameters=job.transformation_params
+        )
+        job.transformation_id = transformation.get("transformationId")
+
+        if not job.transformation_id:
+            raise ValueError("変換処理の開始に失敗: Transformation IDが取得できませんでした")
+        await asyncio.to_thread(self.jobs.advance, job.job_key, JOB_TRANSFORMING,
+                                transformation_id=job.transformation_id,
+                                transformation_started_at=job.transformation_started_at)
+
+    async def _poll_stage(self, job):
+        # ステータスの変化とキュー待ち・実行時間をステージのスパンに記録する
+        trace = TransformationTrace(current_span(), job.transformation_started_at)
+        future = self.poller.watch(
+            transformation_id=job.transformation_id,
+            asset_id=job.asset_id,
+            version_id=job.version_id,
+            dataset_id=job.dataset_id,
+            workflow_type=job.workflow_type,
+            input_size=total_size(job.source_files),
+            timeout=self.poll_timeout,
+            started_at=job.transformation_started_at,
+            deadline=job.deadline,
+            callback=lambda transformation_id, status: trace.observe(status.get("status"))
+        )
+        try:
+            await asyncio.wrap_future(future)
+        except TransformationFailedError as e:
+            # 次回はアップロード済みのファイルで変換だけをやり直す
+            await asyncio.to_thread(self.jobs.rewind, job.job_key, JOB_UPLOADED, error=str(e))
+            raise
+        await asyncio.to_thread(self.jobs.advance, job.job_key, JOB_SUCCEEDED)
+
+    async def _download_stage(self, job):
+        if job.resumed_state in (JOB_DOWNLOADED, JOB_FINALIZED) and os.path.exists(job.output_path):
+            # 前回の実行でダウンロード・検証済みの出力はそのまま使う
+            print(f"  {os.path.basename(job.input_path)}: ダウンロード済みの出力を使います: {job.output_path}")
+        else:
+            downloaded = await download_outputs_via_api(
+                auth_credentials=self.auth_credentials,
+                project_id=self.project_id,
+                asset_id=job.asset_id,
+                version_id=job.version_id,
+                output_path=job.output_path,
+                export_formats=self.export_formats,
+                all_outputs=self.all_outputs
+            )
+            job.bytes_downloaded = sum(os.path.getsize(path) for path in downloaded)
+
+            # 壊れたGLBファイルはキャッシュにも後続の処理にも渡さない（ジョブは再実行でダウンロードからやり直す）
+            job.validation = await asyncio.to_thread(get_cpu_pool().run, validate_output, job.output_path)
+            await asyncio.to_thread(self.jobs.advance, job.job_key, JOB_DOWNLOADED,
+                                    validation=results_to_json(job.validation))
+
+        if job.resumed_state != JOB_FINALIZED:
+            # 一括操作は他のジョブのアセットバージョンもまとめて送るため、このジョブの期限を適用しない
+            with use_deadline(None):
+                await self.finalizer.add(job.asset_id, job.version_id, job_key=job.job_key)
+        await asyncio.to_thread(self.cache.store, job.cache_key, job.output_path)
@@ -0,0 +1,345 @@
+"""
+Unity Asset Manager - 認証プロバイダー
+
+サービスアカウントのKey ID / Secret Keyを Token Exchange API
+（POST /auth/v1/token-exchange）で一度だけアクセストークンに交換してキャッシュし、
+有効期限が近づくとバックグラウンドで更新します。各 *_via_api 関数は
+Basic認証情報の代わりにこのプロバイダーを auth_credentials として受け取れます。
+
+トークンはオプションでファイルに保存でき、短時間に何度も起動するCLIでも
+起動のたびにトークンを交換せずに済みます。
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+
+import requests
+
+from http_client import get_http_client
+
+# トークン交換APIのベースURL
+DEFAULT_AUTH_API_BASE = os.getenv("UNITY_API_BASE", "https://services.api.unity.com")
+
+# 有効期限の何秒前にトークンを更新するか
+DEFAULT_REFRESH_MARGIN = 300
+
+# レスポンスから有効期限が分からない場合のトークンの有効秒数
+DEFAULT_TOKEN_LIFETIME = 3600
+
+# トークン交換に失敗した場合に再試行するまでの秒数（その間はBasic認証を使う）
+REFRESH_RETRY_INTERVAL = 30
+
+# トークンの保存先（None の場合は保存しない）
+TOKEN_CACHE_PATH = os.getenv("UNITY_TOKEN_CACHE")
+
+
+def create_basic_auth_credentials(key_id, secret_key):
+    """
+    Basic認証用の認証情報を作成する
+
+    Parameters
+    ----------
+    key_id : str
+        サービスアカウントのKey ID
+    secret_key : str
+        サービスアカウントのSecret Key
+
+    Returns
+    -------
+    str
+        Base64エンコードされた認証情報
+    """
+    credentials = f"{key_id}:{secret_key}"
+    return base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
+
+
+def _token_expiry(token, token_data):
+    """
+    トークンの有効期限（UNIX時刻）を求める
+
+    レスポンスの expiresIn、JWT の exp クレームの順に参照し、どちらも無ければ
+    DEFAULT_TOKEN_LIFETIME 後とみなす。
+    """
+    expires_in = token_data.get("expiresIn") or token_data.get("expires_in")
+    if expires_in:
+        return time.time() + float(expires_in)
+
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        if "exp" in claims:
+            return float(claims["exp"])
+    except (IndexError, ValueError):
+        pass
+    return time.time() + DEFAULT_TOKEN_LIFETIME
+
+
+class AuthProvider:
+    """
+    アクセストークンをキャッシュし、期限前に更新する認証プロバイダー
+
+    複数のスレッド・タスクから共有して使用できる。start() を呼ぶと
+    バックグラウンドスレッドが有効期限の refresh_margin 秒前にトークンを更新するため、
+    各リクエストはトークン交換を待たずにキャッシュ済みのトークンを使用できる。
+    トークン交換に失敗した場合は、再試行できるまでBasic認証にフォールバックする。
+
+    Parameters
+    ----------
+    key_id : str
+        サービスアカウントのKey ID
+    secret_key : str
+        サービスアカウントのSecret Key
+    project_id : str
+        プロジェクトID
+    api_base : str
+        トークン交換APIのベースURL
+    token_cache_path : str
+        トークンの保存先（None の場合は保存しない）
+    refresh_margin : float
+        有効期限の何秒前にトークンを更新するか
+    """
+
+    def __init__(self, key_id, secret_key, project_id, api_base=DEFAULT_AUTH_API_BASE,
+                 token_cache_path=TOKEN_CACHE_PATH, refresh_margin=DEFAULT_REFRESH_MARGIN):
+        self.key_id = key_id
+        self.project_id = project_id
+        self.api_base = api_base
+        self.token_cache_path = token_cache_path
+        self.refresh_margin = refresh_margin
+        self.exchange_count = 0
+        self._basic_credentials = create_basic_auth_credentials(key_id, secret_key)
+        self._token = None
+        self._expires_at = 0
+        self._fallback_until = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._load_cached_token()
+
+    @property
+    def _cache_key(self):
+        # Secret Keyはファイルに残さず、Key ID・プロジェクト・APIの組み合わせだけで照合する
+        material = f"{self.key_id}:{self.project_id}:{self.api_base}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _load_cached_token(self):
+        if not self.token_cache_path or not os.path.exists(self.token_cache_path):
+            return
+        try:
+            with open(self.token_cache_path, encoding="utf-8") as f:
+                cached = json.load(f).get(self._cache_key)
+        except (OSError, ValueError):
+            return
+        if cached and cached.get("expiresAt", 0) - self.refresh_margin > time.time():
+            self._token = cached["token"]
+            self._expires_at = cached["expiresAt"]
+
+    def _save_cached_token(self):
+        if not self.token_cache_path:
+            return
+        try:
+            with open(self.token_cache_path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        now = time.time()
+        entries = {key: value for key, value in entries.items() if value.get("expiresAt", 0) > now}
+        entries[self._cache_key] = {"token": self._token, "expiresAt": self._expires_at}
+
+        # トークンは本人以外が読めない権限で保存する
+        tmp_path = f"{self.token_cache_path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.token_cache_path)
+
+    def _exchange(self):
+        """
+        Token Exchange APIでアクセストークンを取得し、キャッシュを更新する
+        """
+        url = f"{self.api_base}/auth/v1/token-exchange"
+        headers = {
+            "Authorization": f"Basic {self._basic_credentials}"
+        }
+        params = {
+            "projectId": self.project_id
+        }
+
+        # トークン交換は何度行っても副作用が無いため再試行してよい
+        response = get_http_client().post(url, headers=headers, params=params, idempotent=True)
+        response.raise_for_status()
+        self.exchange_count += 1
+
+        token_data = response.json()
+        token = token_data.get("token") or token_data.get("accessToken") or token_data.get("access_token")
+        if not token:
+            raise ValueError("アクセストークンがレスポンスに含まれていません")
+
+        self._token = token
+        self._expires_at = _token_expiry(token, token_data)
+        self._fallback_until = 0
+        self._save_cached_token()
+
+    def _is_valid(self):
+        return self._token is not None and time.time() < self._expires_at
+
+    def _needs_refresh(self):
+        return self._token is None or time.time() >= self._expires_at - self.refresh_margin
+
+    def refresh(self, force=False):
+        """
+        トークンを更新する（更新が不要な場合は何もしない）
+
+        Parameters
+        ----------
+        force : bool
+            True の場合は有効期限に関係なく更新する
+
+        Returns
+        -------
+        bool
+            有効なトークンを保持している場合は True
+        """
+        if not force and not self._needs_refresh():
+            return True
+
+        if self._is_valid() and not force:
+            # まだ使えるトークンがあれば、他のスレッドが更新中でも待たずにそれを使う
+            if not self._lock.acquire(blocking=False):
+                return True
+        else:
+            self._lock.acquire()
+        try:
+            if not force and not self._needs_refresh():
+                return True
+            if not force and time.time() < self._fallback_until:
+                return self._is_valid()
+            try:
+                self._exchange()
+                return True
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"  警告: アクセストークンの取得に失敗しました。Basic認証を使用します: {e}")
+                self._fallback_until = time.time() + REFRESH_RETRY_INTERVAL
+                return self._is_valid()
+        finally:
+            self._lock.release()
+
+    def access_token(self):
+        """
+        有効なアクセストークンを取得する（必要な場合のみトークンを交換する）
+
+        Returns
+        -------
+        str
+            アクセストークン
+
+        Raises
+        ------
+        RuntimeError
+            トークンを取得できなかった場合
+        """
+        if not self.refresh():
+            raise RuntimeError("アクセストークンを取得できませんでした")
+        return self._token
+
+    def authorization_header(self):
+        """
+        Authorizationヘッダーの値を取得する
+
+        Returns
+        -------
+        str
+            "Bearer <token>"（トークンを取得できない間は "Basic <credentials>"）
+        """
+        if self.refresh():
+            return f"Bearer {self._token}"
+        return f"Basic {self._basic_credentials}"
+
+    def start(self):
+        """
+        トークンを取得し、期限前に更新するバックグラウンドスレッドを開始する
+        """
+        self.refresh()
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="auth-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        バックグラウンドでの更新を停止する
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if self.refresh():
+                wait = self._expires_at - self.refresh_margin - time.time()
+            else:
+                wait = REFRESH_RETRY_INTERVAL
+            self._stopped.wait(max(wait, 1))
+
+
+def authorization_header(auth_credentials):
+    """
+    auth_credentials から Authorization ヘッダーの値を作成する
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされたBasic認証情報、または認証プロバイダー
+
+    Returns
+    -------
+    str
+        Authorizationヘッダーの値
+    """
+    if isinstance(auth_credentials, AuthProvider):
+        return auth_credentials.authorization_header()
+    return f"Basic {auth_credentials}"
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_auth_provider(key_id, secret_key, project_id, api_base=DEFAULT_AUTH_API_BASE,
+                      token_cache_path=TOKEN_CACHE_PATH):
+    """
+    プロセス共有の認証プロバイダーを取得する（バックグラウンドでの更新も開始する）
+
+    Parameters
+    ----------
+    key_id : str
+        サービスアカウントのKey ID
+    secret_key : str
+        サービスアカウントのSecret Key
+    project_id : str
+        プロジェクトID
+    api_base : str
+        トークン交換APIのベースURL
+    token_cache_path : str
+        トークンの保存先（None の場合は保存しない）
+
+    Returns
+    -------
+    AuthProvider
+        共有の認証プロバイダー
+    """
+    key = (key_id, project_id, api_base)
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = AuthProvider(key_id, secret_key, project_id, api_base=api_base,
+                                    token_cache_path=token_cache_path)
+            _providers[key] = provider
+    return provider.start()
@@ -0,0 +1,1038 @@
+"""
+Unity Asset Manager - バッチ変換版
+
+ディレクトリまたはマニフェストで指定された複数のOBJファイルを、
+ステージごとに同時実行数を制限したパイプラインで変換します。
+
+各ステップ（アセット作成 → アップロード → 変換開始 → ポーリング → ダウンロード）は
+それぞれ独立したワーカープールで実行されるため、ファイルN+1のアップロードと
+ファイルNのクラウド側変換処理が並行して進みます。
+
+各ジョブはパイプラインに入った時点から1つの期限（--job-deadline）を持ち、すべてのステージがそこから時間を使います。
+期限切れ・Ctrl+C・SIGTERM で終了したジョブは、実行中の変換を停止して途中までのダウンロードを削除します。
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
+
+import requests
+
+from http_client import configure_http_client, get_http_client
+from auth_provider import TOKEN_CACHE_PATH, get_auth_provider
+from main_webapi import (
+    ORG_ID,
+    PROJECT_ID,
+    KEY_ID,
+    SECRET_KEY,
+    OUTPUT_FOLDER,
+    WORKFLOW_TYPE,
+    CONTENT_HASH_METADATA_FIELD,
+    UNITY_API_BASE,
+    create_metadata_field_via_api,
+    find_converted_asset_via_api,
+    create_asset_via_api,
+    create_asset_version_via_api,
+    update_asset_version_via_api,
+    get_or_create_source_dataset_id,
+    get_asset_details_via_api,
+    upload_source_files_via_api,
+    build_transformation_params,
+    start_transformation_via_api,
+    terminate_transformation_via_api,
+    EXPORT_FORMATS,
+    parse_export_formats,
+    needs_output_folder,
+    download_outputs_via_api,
+    get_bulk_operation_definitions_via_api,
+    create_bulk_operation_via_api,
+    get_bulk_operation_via_api,
+)
+from transformation_poller import TransformationPoller, TransformationFailedError
+from bulk_finalizer import SUBMIT_ON_COMPLETION, BulkFinalizer, DEFAULT_BATCH_SIZE as DEFAULT_FINALIZE_BATCH_SIZE
+from conversion_cache import ConversionCache, cache_key
+from obj_dependencies import find_source_files, hash_source_files, total_size
+from obj_preflight import preflight_input, route_transformation
+from glb_validator import results_to_json, validate_output
+from blob_transfer import remove_partial_downloads
+from cpu_pool import CPU_POOL_SIZE, configure_cpu_pool, get_cpu_pool
+from tracing import NOOP_SPAN, TransformationTrace, configure_tracing, current_span, start_span, use_span
+from job_deadline import JOB_DEADLINE, Deadline, handle_termination_signal, use_deadline
+from job_store import (
+    JOB_CREATED,
+    JOB_UPLOADED,
+    JOB_TRANSFORMING,
+    JOB_SUCCEEDED,
+    JOB_DOWNLOADED,
+    JOB_FINALIZED,
+    RESUME_STEPS,
+    JobStore,
+    job_key,
+)
+
+# ステージごとのデフォルト同時実行数（preflight・cache はCPUプールのワーカーをすべて使えるようにする）
+DEFAULT_STAGE_CONCURRENCY = {
+    "preflight": max(2, CPU_POOL_SIZE),
+    "cache": max(2, CPU_POOL_SIZE),
+    "create": 4,
+    "upload": 4,
+    "transform": 4,
+    "poll": 8,
+    "download": 4,
+}
+
+# BatchJob.skip_to に設定すると残りのステージをすべて省略する
+STAGE_DONE = "done"
+
+# 全出力ファイルをディレクトリとして保存する場合のキャッシュの区別
+ALL_OUTPUTS_CACHE_VARIANT = "all-outputs"
+
+# パイプライン全体で同時に処理中にできるジョブ数の上限
+DEFAULT_MAX_IN_FLIGHT = 64
+
+
+@dataclass
+class BatchJob:
+    """
+    バッチ内の1ファイル分の変換ジョブ
+
+    各ステージは自分が担当するフィールドを埋めて次のステージに渡す。
+    skip_to にステージ名を設定したジョブは、そのステージまでのステージを省略する
+    （STAGE_DONE の場合は残りのステージをすべて省略して完了する）。
+    """
+    input_path: str
+    output_path: str
+    source_files: list = None
+    preflight: object = None
+    workflow_type: str = None
+    transformation_params: dict = None
+    asset_id: str = None
+    version_id: str = None
+    dataset_id: str = None
+    transformation_id: str = None
+    transformation_started_at: float = None
+    conversion_key: str = None
+    cache_key: str = None
+    job_key: str = None
+    cache_hit: bool = False
+    reused_asset: bool = False
+    resumed: bool = False
+    resumed_state: str = None
+    skip_to: str = None
+    failed_stage: str = None
+    error: Exception = None
+    bytes_uploaded: int = 0
+    bytes_downloaded: int = 0
+    validation: list = None
+    started_at: float = None
+    finished_at: float = None
+    stage_durations: dict = field(default_factory=dict)
+    span: object = NOOP_SPAN
+    deadline: Deadline = None
+
+    @property
+    def succeeded(self):
+        return self.error is None
+
+    @property
+    def elapsed(self):
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+
+def create_jobs(input_paths, output_folder=OUTPUT_FOLDER, all_outputs=False):
+    """
+    入力ファイルのリストからジョブを作成する
+
+    Parameters
+    ----------
+    input_paths : list of str
+        入力ファイルのパス
+    output_folder : str
+        出力フォルダ
+    all_outputs : bool
+        True の場合、出力先は変換結果の全ファイルを保存するアセットごとのディレクトリになる
+
+    Returns
+    -------
+    list of BatchJob
+        作成されたジョブ
+    """
+    jobs = []
+    for input_path in input_paths:
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        jobs.append(BatchJob(
+            input_path=input_path,
+            output_path=os.path.join(output_folder, stem if all_outputs else f"{stem}.glb")
+        ))
+    return jobs
+
+
+def plan_transformation(job, workflow_type, export_formats=None):
+    """
+    入力ファイルを事前チェックし、ジョブのワークフロータイプと変換パラメータを決める
+
+    Parameters
+    ----------
+    job : BatchJob
+        ジョブ
+    workflow_type : str
+        指定されたワークフロータイプ（"auto" の場合は事前チェックの結果から選ぶ）
+    export_formats : list of str
+        出力形式（省略時は EXPORT_FORMATS）
+
+    Raises
+    ------
+    PreflightError
+        変換できない入力の場合
+    """
+    # OBJファイルの解析はCPUプールで行う（ワーカーにはパスだけを渡す）
+    job.preflight = get_cpu_pool().run(preflight_input, job.input_path)
+    job.workflow_type, job.transformation_params = route_transformation(
+        job.preflight, workflow_type, build_transformation_params(job.input_path, export_formats))
+
+
+def assign_cache_keys(job, all_outputs=False):
+    """
+    ジョブの変換キー（リモートの重複検出用）とローカルキャッシュのキーを設定する
+
+    ワークフロータイプと変換パラメータは plan_transformation で設定済みのものを使う。
+
+    Parameters
+    ----------
+    job : BatchJob
+        ジョブ
+    all_outputs : bool
+        変換結果の全ファイルを保存するかどうか（ローカルキャッシュのキーだけを区別する）
+    """
+    # OBJファイルが参照するマテリアル・テクスチャも変換キーに含め、一緒にアップロードする
+    job.source_files = find_source_files(job.input_path)
+    content_hash = get_cpu_pool().run(hash_source_files, job.source_files)
+    workflow_type, parameters = job.workflow_type, job.transformation_params
+    job.conversion_key = cache_key(content_hash, workflow_type, parameters)
+    job.cache_key = (cache_key(content_hash, workflow_type, parameters, variant=ALL_OUTPUTS_CACHE_VARIANT)
+                     if all_outputs else job.conversion_key)
+    job.job_key = job_key(job.conversion_key, job.output_path)
+
+
+def end_job_span(job):
+    """
+    ジョブ全体のスパンに結果を記録して終了する
+
+    Parameters
+    ----------
+    job : BatchJob
+        完了したジョブ
+    """
+    job.span.set_attributes(**{
+        "unity.asset_id": job.asset_id,
+        "unity.workflow_type": job.workflow_type,
+        "unity.transformation_id": job.transformation_id,
+        "unity.cache_hit": job.cache_hit,
+        "unity.reused_asset": job.reused_asset,
+        "unity.resumed": job.resumed,
+        "unity.bytes_uploaded": job.bytes_uploaded,
+        "unity.bytes_downloaded": job.bytes_downloaded,
+        "unity.triangles": sum(stats.triangles for stats in job.validation) if job.validation else None,
+        "unity.failed_stage": job.failed_stage
+    })
+    job.span.end(job.error)
+
+
+def resume_job(job, record):
+    """
+    保存されたジョブの状態を復元し、続きのステージを skip_to に設定する
+
+    Sourceデータセットの作成前に終了していた場合は、作成ステージでデータセットだけを用意する。
+    変換済みのアセットを再利用したジョブ（Sourceデータセットを持たない）はダウンロードから再開する。
+
+    Parameters
+    ----------
+    job : BatchJob
+        ジョブ
+    record : dict
+        JobStore.get の戻り値
+    """
+    job.asset_id = record["asset_id"]
+    job.version_id = record["version_id"]
+    job.dataset_id = record["dataset_id"]
+    job.transformation_id = record["transformation_id"]
+    job.transformation_started_at = record["transformation_started_at"]
+    job.resumed = True
+    job.resumed_state = record["state"]
+    if job.dataset_id or RESUME_STEPS[record["state"]] == "download":
+        job.skip_to = RESUME_STEPS[record["state"]]
+    print(f"  {os.path.basename(job.input_path)}: 中断したジョブを再開します（状態: {record['state']}）")
+
+
+class StagePipeline:
+    """
+    ステージごとに独立したスレッドプールを持つパイプラインスケジューラ
+
+    ジョブはステージを順番に通過し、あるステージが終わると即座に次のステージの
+    キューへ投入される。いずれかのステージで例外が発生したジョブはそこで打ち切られる。
+    ステージ関数が Future を返した場合は、その Future の完了をもってステージ完了とする。
+    完了（成功・失敗とも）したジョブは完了順にストリームとして返す。
+    ステージ関数はジョブの期限（job.deadline）を実行中の期限として実行する。
+    すべてのジョブを返す前に終了した場合（Ctrl+C など）は、処理中のジョブの期限をキャンセルし、
+    新しいステージを始めずに終了する。
+
+    Parameters
+    ----------
+    stages : list of tuple(str, callable, int)
+        (ステージ名, ジョブを受け取る関数, 同時実行数) のリスト
+    max_in_flight : int
+        パイプライン内に同時に存在できるジョブ数の上限
+    job_deadline : float
+        パイプラインに入ってからの1ジョブあたりの期限（秒、None の場合は期限を設けない）
+    """
+
+    def __init__(self, stages, max_in_flight=DEFAULT_MAX_IN_FLIGHT, job_deadline=None):
+        self._stages = stages
+        self._executors = [
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"stage-{name}")
+            for name, _, concurrency in stages
+        ]
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._results = queue.Queue()
+        self.job_deadline = job_deadline
+        self._started = []
+        self._delivered = set()
+        self._cancelled = threading.Event()
+
+    def run(self, jobs):
+        """
+        ジョブ群をパイプラインに流し、完了した順にジョブを返す
+
+        Parameters
+        ----------
+        jobs : list of BatchJob
+            処理するジョブ
+
+        Yields
+        ------
+        BatchJob
+            完了したジョブ（error が設定されていれば失敗）
+        """
+        feeder = threading.Thread(target=self._feed, args=(jobs,), name="stage-feeder", daemon=True)
+        feeder.start()
+        try:
+            for _ in range(len(jobs)):
+                job = self._results.get()
+                self._delivered.add(id(job))
+                yield job
+        finally:
+            if len(self._delivered) < len(jobs):
+                self.cancel()
+            feeder.join()
+            for executor in self._executors:
+                executor.shutdown(wait=True)
+
+    def cancel(self):
+        """
+        処理中のジョブの期限をキャンセルし、待機中のステージを破棄する
+
+        実行中のステージは次のHTTPリクエストの前に DeadlineExceeded で終了する。
+        """
+        self._cancelled.set()
+        for job in self._started:
+            if job.deadline is not None:
+                job.deadline.cancel()
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def unfinished(self):
+        """パイプラインに入ったが、完了したジョブとして返していないジョブ"""
+        return [job for job in self._started if id(job) not in self._delivered]
+
+    def _feed(self, jobs):
+        for job in jobs:
+            # 処理中のジョブ数が上限に達している間は投入を待つ（キャンセルされたら投入をやめる）
+            while not self._in_flight.acquire(timeout=1.0):
+                if self._cancelled.is_set():
+                    return
+            if self._cancelled.is_set():
+                return
+            job.started_at = time.time()
+            job.deadline = Deadline(self.job_deadline, started_at=job.started_at)
+            job.span = start_span("batch.job", **{"unity.input.path": job.input_path})
+            self._started.append(job)
+            self._executors[0].submit(self._run_stage, 0, job)
+
+    def _run_stage(self, index, job):
+        stage_start = time.time()
+        span = start_span(f"stage.{self._stages[index][0]}", parent=job.span)
+        try:
+            with use_span(span), use_deadline(job.deadline):
+                result = self._stages[index][1](job)
+        except Exception as e:
+            self._finish_stage(index, job, stage_start, span, e)
+            return
+
+        if isinstance(result, Future):
+            # 外部で完了を待つステージ（ポーリングなど）はワーカーを占有せず、完了時に次へ進む
+            result.add_done_callback(
+                lambda f: self._finish_stage(index, job, stage_start, span,
+                                             CancelledError() if f.cancelled() else f.exception()))
+            return
+
+        self._finish_stage(index, job, stage_start, span, None)
+
+    def _finish_stage(self, index, job, stage_start, span, error):
+        name = self._stages[index][0]
+        job.stage_durations[name] = time.time() - stage_start
+        span.end(error)
+        if error is not None:
+            job.failed_stage = name
+            job.error = error
+
+        next_index = index + 1
+        if job.skip_to is not None:
+            names = [stage[0] for stage in self._stages]
+            next_index = names.index(job.skip_to) if job.skip_to in names else len(self._stages)
+            job.skip_to = None
+
+        if job.error is None and next_index < len(self._stages) and self._cancelled.is_set():
+            # キャンセル後は次のステージを始めない
+            job.failed_stage = self._stages[next_index][0]
+            job.error = CancelledError()
+
+        if job.error is None and next_index < len(self._stages):
+            self._executors[next_index].submit(self._run_stage, next_index, job)
+            return
+
+        job.finished_at = time.time()
+        end_job_span(job)
+        self._in_flight.release()
+        self._results.put(job)
+
+
+class BatchConverter:
+    """
+    main_webapi.py の各ステップをパイプラインのステージとして束ねる
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    org_id : str
+        組織ID
+    project_id : str
+        プロジェクトID
+    output_folder : str
+        出力フォルダ
+    workflow_type : str
+        ワークフロータイプ
+    stage_concurrency : dict
+        ステージ名 → 同時実行数（省略したステージはデフォルト値）
+    max_in_flight : int
+        パイプライン内に同時に存在できるジョブ数の上限
+    poll_timeout : float
+        1ジョブあたりの変換待ちタイムアウト秒数（None の場合は過去の変換所要時間から求める）
+    all_outputs : bool
+        True の場合、.glb だけでなく変換結果の全ファイルをアセットごとのディレクトリへ保存する
+    export_formats : list of str
+        1回の変換で出力する形式（glb 以外を含む場合は all_outputs と同じくディレクトリへ保存する）
+    labels : list of str
+        ファイナライズで付与するラベル名（None の場合は UNITY_FINALIZE_LABELS）
+    metadata : dict
+        ファイナライズで付与するメタデータ（None の場合は UNITY_FINALIZE_METADATA）
+    submit : bool
+        ファイナライズでアセットバージョンを Submit するかどうか
+    finalize_batch_size : int
+        1回の一括操作にまとめるアセットバージョンの最大数
+    new_versions : bool
+        True の場合、以前に変換した入力ファイル（JobStore に記録したアセット）は
+        新しいアセットを作らず、同じアセットの新しいバージョンとして変換する
+    job_deadline : float
+        1ジョブ（アップロードからダウンロードまで）の期限秒数（None または 0 の場合は期限を設けない）
+    """
+
+    def __init__(self, auth_credentials, org_id, project_id, output_folder=OUTPUT_FOLDER,
+                 workflow_type=WORKFLOW_TYPE, stage_concurrency=None,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT, poll_timeout=None, all_outputs=False, export_formats=None,
+                 labels=None, metadata=None, submit=SUBMIT_ON_COMPLETION,
+                 finalize_batch_size=DEFAULT_FINALIZE_BATCH_SIZE, new_versions=False, job_deadline=JOB_DEADLINE):
+        self.auth_credentials = auth_credentials
+        self.org_id = org_id
+        self.project_id = project_id
+        self.dedupe_enabled = False
+        self.output_folder = output_folder
+        self.workflow_type = workflow_type
+        self.poll_timeout = poll_timeout
+        self.export_formats = export_formats or EXPORT_FORMATS
+        self.all_outputs = all_outputs or needs_output_folder(self.export_formats)
+        self.new_versions = new_versions
+        self.poller = None
+        self.cache = ConversionCache()
+        self.jobs = JobStore()
+        # 変換が完了したアセットバージョンを集め、ラベル付け・メタデータ付与・Submit を一括操作でまとめて行う
+        self.finalizer = BulkFinalizer(
+            auth_credentials, org_id, project_id,
+            get_definitions=get_bulk_operation_definitions_via_api,
+            create_operation=create_bulk_operation_via_api,
+            get_operation=get_bulk_operation_via_api,
+            labels=labels, metadata=metadata, submit=submit, batch_size=finalize_batch_size, jobs=self.jobs
+        )
+        self.stage_concurrency = dict(DEFAULT_STAGE_CONCURRENCY)
+        self.stage_concurrency.update(stage_concurrency or {})
+        self.max_in_flight = max_in_flight
+        self.job_deadline = job_deadline
+
+    def create_jobs(self, input_paths):
+        """
+        入力ファイルのリストからジョブを作成する
+
+        Parameters
+        ----------
+        input_paths : list of str
+            入力ファイルのパス
+
+        Returns
+        -------
+        list of BatchJob
+            作成されたジョブ
+        """
+        return create_jobs(input_paths, self.output_folder, all_outputs=self.all_outputs)
+
+    def run(self, input_paths):
+        """
+        入力ファイル群を変換し、完了した順にジョブを返す
+
+        Parameters
+        ----------
+        input_paths : list of str
+            入力ファイルのパス
+
+        Yields
+        ------
+        BatchJob
+            完了したジョブ
+        """
+        os.makedirs(self.output_folder, exist_ok=True)
+
+        # 変換キーを記録するメタデータフィールドが使えない場合は検索・記録を行わない
+        self.dedupe_enabled = create_metadata_field_via_api(
+            auth_credentials=self.auth_credentials,
+            org_id=self.org_id,
+            field_name=CONTENT_HASH_METADATA_FIELD,
+            display_name="Conversion Key"
+        )
+
+        pipeline = StagePipeline([
+            ("preflight", self._preflight_stage, self.stage_concurrency["preflight"]),
+            ("cache", self._cache_stage, self.stage_concurrency["cache"]),
+            ("create", self._create_stage, self.stage_concurrency["create"]),
+            ("upload", self._upload_stage, self.stage_concurrency["upload"]),
+            ("transform", self._transform_stage, self.stage_concurrency["transform"]),
+            ("poll", self._poll_stage, self.stage_concurrency["poll"]),
+            ("download", self._download_stage, self.stage_concurrency["download"]),
+        ], max_in_flight=self.max_in_flight, job_deadline=self.job_deadline)
+
+        # 変換待ちは全ジョブで1つのポーラーを共有する
+        self.poller = TransformationPoller(self.auth_credentials, self.project_id)
+        results = pipeline.run(self.create_jobs(input_paths))
+        try:
+            with self.poller:
+                for job in results:
+                    if isinstance(job.error, TimeoutError):
+                        self.abort_job(job, str(job.error))
+                    yield job
+        except BaseException:
+            # Ctrl+C・SIGTERM などで途中で終了した場合は、処理中だったすべてのジョブの変換を停止する
+            results.close()
+            for job in pipeline.unfinished:
+                self.abort_job(job, "中断されました")
+            raise
+
+        # 残りのアセットバージョンを送信し、すべての一括操作の完了を待つ
+        self.finalizer.close()
+
+    def print_connection_stats(self):
+        """
+        コネクション再利用状況を出力する
+        """
+        get_http_client().print_connection_stats()
+
+    def abort_job(self, job, reason):
+        """
+        期限切れ・中断したジョブの変換を停止し、途中までダウンロードしたファイルを削除する
+
+        停止した変換は、次回の実行でアップロード済みのファイルから開始し直す。
+
+        Parameters
+        ----------
+        job : BatchJob
+            期限切れ・中断したジョブ
+        reason : str
+            ジョブに記録する理由
+        """
+        record = self.jobs.get(job.job_key) if job.job_key else None
+        if record and record["state"] == JOB_TRANSFORMING and record["transformation_id"]:
+            try:
+                terminate_transformation_via_api(self.auth_credentials, self.project_id, record["transformation_id"])
+                self.jobs.rewind(job.job_key, JOB_UPLOADED, error=reason)
+            except requests.exceptions.RequestException:
+                # 停止できなかった変換には、次回の実行で再接続する
+                pass
+        remove_partial_downloads(job.output_path)
+
+    def _preflight_stage(self, job):
+        # 壊れた入力はアセットを作成する前に失敗させる
+        plan_transformation(job, self.workflow_type, self.export_formats)
+
+    def _cache_stage(self, job):
+        # 同じ内容・同じパラメータで変換済みであれば、残りのステージを省略する
+        assign_cache_keys(job, self.all_outputs)
+        record = self.jobs.get(job.job_key)
+        if self.cache.materialize(job.cache_key, job.output_path):
+            job.cache_hit = True
+            if record and record["state"] == JOB_DOWNLOADED:
+                # ファイナライズが終わっていないジョブは、キャッシュから出力したうえでファイナライズだけをやり直す
+                resume_job(job, record)
+            else:
+                job.skip_to = STAGE_DONE
+            return
+
+        # 前回の実行が途中で終了していれば、続きのステージから再開する
+        if record:
+            resume_job(job, record)
+
+    def _create_stage(self, job):
+        if job.resumed:
+            # アセットは作成済みのため、アセット詳細からSourceデータセットを探す
+            asset = get_asset_details_via_api(self.auth_credentials, self.project_id, job.asset_id, job.version_id)
+            asset.update(assetId=job.asset_id, assetVersion=job.version_id)
+            job.dataset_id = get_or_create_source_dataset_id(
+                auth_credentials=self.auth_credentials,
+                project_id=self.project_id,
+                asset=asset
+            )
+            self.jobs.advance(job.job_key, JOB_CREATED, dataset_id=job.dataset_id)
+            return
+
+        if self.dedupe_enabled:
+            # 他のマシンで変換済みのアセットがあれば、アップロードと変換を省略してダウンロードする
+            existing_asset = find_converted_asset_via_api(
+                auth_credentials=self.auth_credentials,
+                project_id=self.project_id,
+                conversion_key=job.conversion_key,
+                output_name=job.transformation_params["outputFileName"],
+                export_formats=job.transformation_params["exportFormats"]
+            )
+            if existing_asset:
+                job.asset_id = existing_asset.get("assetId")
+                job.version_id = existing_asset.get("assetVersion")
+                job.reused_asset = True
+                job.skip_to = "download"
+                # 再実行時はダウンロードから再開できるよう、変換済みのジョブとして記録する
+                self.jobs.advance(job.job_key, JOB_SUCCEEDED, input_path=job.input_path, output_path=job.output_path,
+                                  workflow_type=job.workflow_type, asset_id=job.asset_id, version_id=job.version_id)
+                return
+
+        previous = self.jobs.get_asset(job.input_path) if self.new_versions else None
+        if previous and previous["asset_id"]:
+            # 以前に変換したファイルは、同じアセットの新しいバージョンとして変換する
+            asset = self._create_version(job, previous["asset_id"])
+        else:
+            asset = create_asset_via_api(
+                auth_credentials=self.auth_credentials,
+                project_id=self.project_id,
+                asset_name=f"Web API - {os.path.basename(job.input_path)}",
+                description="REST API経由でアップロードされた3Dモデル",
+                metadata={CONTENT_HASH_METADATA_FIELD: job.conversion_key} if self.dedupe_enabled else None
+            )
+        job.asset_id = asset.get("assetId")
+        job.version_id = asset.get("assetVersion")
+
+        if not job.asset_id or not job.version_id:
+            raise ValueError("アセット作成に失敗: IDまたはバージョンが取得できませんでした")
+        if self.new_versions:
+            self.jobs.record_asset(job.input_path, asset_id=job.asset_id, version_id=job.version_id)
+        self.jobs.advance(job.job_key, JOB_CREATED, input_path=job.input_path, output_path=job.output_path,
+                          workflow_type=job.workflow_type, asset_id=job.asset_id, version_id=job.version_id)
+
+        job.dataset_id = get_or_create_source_dataset_id(
+            auth_credentials=self.auth_credentials,
+            project_id=self.project_id,
+            asset=asset
+        )
+        self.jobs.advance(job.job_key, JOB_CREATED, dataset_id=job.dataset_id)
+
+    def _create_version(self, job, asset_id):
+        version = create_asset_version_via_api(self.auth_credentials, self.project_id, asset_id)
+        version_id = version.get("assetVersion")
+        if not version_id:
+            raise ValueError("バージョン作成に失敗: バージョンが取得できませんでした")
+
+        if self.dedupe_enabled:
+            # 親バージョンの変換キーを引き継がないよう、新しい内容の変換キーに置き換える
+            update_asset_version_via_api(self.auth_credentials, self.project_id, asset_id, version_id,
+                                         metadata={CONTENT_HASH_METADATA_FIELD: job.conversion_key})
+
+        # 新しいバージョンは親バージョンのSourceデータセットを参照している
+        asset = get_asset_details_via_api(self.auth_credentials, self.project_id, asset_id, version_id)
+        asset.update(assetId=asset_id, assetVersion=version_id)
+        return asset
+
+    def _upload_stage(self, job):
+        upload_source_files_via_api(
+            auth_credentials=self.auth_credentials,
+            project_id=self.project_id,
+            asset_id=job.asset_id,
+            version_id=job.version_id,
+            dataset_id=job.dataset_id,
+            source_files=job.source_files
+        )
+        job.bytes_uploaded = total_size(job.source_files)
+        self.jobs.advance(job.job_key, JOB_UPLOADED)
+
+    def _transform_stage(self, job):
+        job.transformation_started_at = time.time()
+        transformation = start_transformation_via_api(
+            auth_credentials=self.auth_credentials,
+            project_id=self.project_id,
+            asset_id=job.asset_id,
+            version_id=job.version_id,
+            dataset_id=job.dataset_id,
+            workflow_type=job.workflow_type,
+            parameters=job.transformation_params
+        )
+        job.transformation_id = transformation.get("transformationId")
+
+        if not job.transformation_id:
+            raise ValueError("変換処理の開始に失敗: Transformation IDが取得できませんでした")
+        self.jobs.advance(job.job_key, JOB_TRANSFORMING, transformation_id=job.transformation_id,
+                          transformation_started_at=job.transformation_started_at)
+
+    def _poll_stage(self, job):
+        # ステータスの変化とキュー待ち・実行時間をステージのスパンに記録する
+        trace = TransformationTrace(current_span(), job.transformation_started_at)
+
+        def on_status(transformation_id, status):
+            print(f"  {os.path.basename(job.input_path)}: ステータス {status.get('status')}")
+            trace.observe(status.get("status"))
+
+        future = self.poller.watch(
+            transformation_id=job.transformation_id,
+            asset_id=job.asset_id,
+            version_id=job.version_id,
+            dataset_id=job.dataset_id,
+            workflow_type=job.workflow_type,
+            input_size=total_size(job.source_files),
+            timeout=self.poll_timeout,
+            started_at=job.transformation_started_at,
+            deadline=job.deadline,
+            callback=on_status
+        )
+        # パイプラインが次のステージへ進める前にジョブの状態を記録する
+        future.add_done_callback(lambda f: self._record_transformation(job, f))
+        return future
+
+    def _record_transformation(self, job, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            self.jobs.advance(job.job_key, JOB_SUCCEEDED)
+        elif isinstance(error, TransformationFailedError):
+            # 次回はアップロード済みのファイルで変換だけをやり直す
+            self.jobs.rewind(job.job_key, JOB_UPLOADED, error=str(error))
+
+    def _download_stage(self, job):
+        if job.resumed_state in (JOB_DOWNLOADED, JOB_FINALIZED) and os.path.exists(job.output_path):
+            # 前回の実行でダウンロード・検証済みの出力はそのまま使う
+            print(f"  {os.path.basename(job.input_path)}: ダウンロード済みの出力を使います: {job.output_path}")
+        else:
+            # 全出力・複数の出力形式の場合は、ダウンロードURLを一括取得して全ファイルを並列に取得する
+            downloaded = download_outputs_via_api(
+                auth_credentials=self.auth_credentials,
+                project_id=self.project_id,
+                asset_id=job.asset_id,
+                version_id=job.version_id,
+                output_path=job.output_path,
+                export_formats=self.export_formats,
+                all_outputs=self.all_outputs
+            )
+            job.bytes_downloaded = sum(os.path.getsize(path) for path in downloaded)
+
+            # 壊れたGLBファイルはキャッシュにも後続の処理にも渡さない（ジョブは再実行でダウンロードからやり直す）
+            job.validation = get_cpu_pool().run(validate_output, job.output_path)
+            self.jobs.advance(job.job_key, JOB_DOWNLOADED, validation=results_to_json(job.validation))
+
+        if job.resumed_state != JOB_FINALIZED:
+            # 一括操作は他のジョブのアセットバージョンもまとめて送るため、このジョブの期限を適用しない
+            with use_deadline(None):
+                self.finalizer.add(job.asset_id, job.version_id, job_key=job.job_key)
+        self.cache.store(job.cache_key, job.output_path)
+
+
+class BatchSummary:
+    """
+    バッチ全体のスループットを集計する
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.finished_at = None
+        self.succeeded = []
+        self.failed = []
+
+    def add(self, job):
+        """完了したジョブを集計に加える"""
+        if job.succeeded:
+            self.succeeded.append(job)
+        else:
+            self.failed.append(job)
+
+    def finish(self):
+        """集計を締める"""
+        self.finished_at = time.time()
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.started_at
+
+    def report(self):
+        """
+        集計結果を出力する
+        """
+        elapsed = self.elapsed
+        total = len(self.succeeded) + len(self.failed)
+        bytes_uploaded = sum(job.bytes_uploaded for job in self.succeeded + self.failed)
+        bytes_downloaded = sum(job.bytes_downloaded for job in self.succeeded)
+
+        print("\n" + "="*60)
+        print("バッチ処理サマリー")
+        print("="*60)
+        print(f"  ジョブ数: {total} (成功: {len(self.succeeded)}, 失敗: {len(self.failed)})")
+        print(f"  経過時間: {elapsed:.1f} 秒")
+        if elapsed > 0:
+            print(f"  スループット: {len(self.succeeded) / elapsed:.3f} jobs/s")
+            print(f"  アップロード: {bytes_uploaded / elapsed / 1024 / 1024:.2f} MB/s")
+            print(f"  ダウンロード: {bytes_downloaded / elapsed / 1024 / 1024:.2f} MB/s")
+        if self.succeeded:
+            latencies = sorted(job.elapsed for job in self.succeeded)
+            print(f"  ジョブ所要時間: 平均 {sum(latencies) / len(latencies):.1f} 秒, "
+                  f"最大 {latencies[-1]:.1f} 秒")
+
+            # ステージごとの平均所要時間
+            print(f"  ステージ別平均所要時間:")
+            for stage in DEFAULT_STAGE_CONCURRENCY:
+                durations = [job.stage_durations[stage] for job in self.succeeded if stage in job.stage_durations]
+                if durations:
+                    print(f"    {stage}: {sum(durations) / len(durations):.1f} 秒")
+
+            validated = [stats for job in self.succeeded for stats in job.validation or []]
+            if validated:
+                print(f"  GLB検証: {len(validated)} ファイル, 三角形 {sum(s.triangles for s in validated):,}, "
+                      f"合計 {sum(s.seconds for s in validated) * 1000:.1f} ms")
+
+        for job in self.failed:
+            print(f"  ✗ {job.input_path} ({job.failed_stage}): {job.error}")
+
+
+def collect_input_paths(directory=None, manifest=None):
+    """
+    ディレクトリまたはマニフェストから入力ファイルのリストを作成する
+
+    Parameters
+    ----------
+    directory : str
+        OBJファイルを含むディレクトリ（直下の *.obj を対象とする）
+    manifest : str
+        1行に1ファイルパスを記載したマニフェストファイル（# で始まる行はコメント）
+
+    Returns
+    -------
+    list of str
+        入力ファイルのパス
+    """
+    input_paths = []
+
+    if directory:
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith(".obj"):
+                input_paths.append(os.path.join(directory, name))
+
+    if manifest:
+        manifest_dir = os.path.dirname(manifest)
+        with open(manifest, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                # 相対パスはマニフェストの場所を基準にする
+                input_paths.append(line if os.path.isabs(line) else os.path.join(manifest_dir, line))
+
+    return input_paths
+
+
+def parse_annotation(value):
+    """
+    --annotate の FIELD=VALUE を (フィールド名, 値) に分解する
+    """
+    field_name, separator, field_value = value.partition("=")
+    if not separator or not field_name:
+        raise argparse.ArgumentTypeError(f"FIELD=VALUE の形式で指定してください: {value}")
+    return field_name, field_value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Unity Asset Manager バッチ変換")
+    parser.add_argument("input_dir", nargs="?", help="OBJファイルを含むディレクトリ")
+    parser.add_argument("--manifest", help="入力ファイルのパスを1行ずつ記載したファイル")
+    parser.add_argument("--output", default=OUTPUT_FOLDER, help="出力フォルダ")
+    parser.add_argument("--workflow-type", default=WORKFLOW_TYPE,
+                        help="ワークフロータイプ（auto: OBJファイルの事前チェックの結果から Free / Pro ティアを選ぶ）")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help="同時に処理中にできるジョブ数の上限")
+    parser.add_argument("--poll-timeout", type=float, default=None,
+                        help="1ジョブあたりの変換待ちタイムアウト秒数（省略時は過去の変換所要時間から求める）")
+    parser.add_argument("--job-deadline", type=float, default=JOB_DEADLINE,
+                        help="1ジョブのアップロードからダウンロードまでの期限秒数（0 で無制限、省略時は UNITY_JOB_DEADLINE）。"
+                             "期限を過ぎたジョブは変換を停止する")
+    parser.add_argument("--token-cache", default=TOKEN_CACHE_PATH,
+                        help="アクセストークンの保存先（次回の起動時にトークン交換を省略する）")
+    parser.add_argument("--all-outputs", action="store_true",
+                        help="変換結果の全ファイル（.bin・テクスチャなど）を <出力フォルダ>/<ファイル名>/ に保存する")
+    parser.add_argument("--export-formats", type=parse_export_formats, default=EXPORT_FORMATS,
+                        help="1回の変換で出力する形式（カンマ区切り、例: glb,gltf,fbx）。"
+                             "glb 以外を含む場合は <出力フォルダ>/<ファイル名>/ に保存する")
+    parser.add_argument("--label", action="append", dest="labels",
+                        help="変換後のアセットバージョンに付与するラベル（複数回指定可、省略時は UNITY_FINALIZE_LABELS）")
+    parser.add_argument("--annotate", action="append", type=parse_annotation, metavar="FIELD=VALUE",
+                        help="変換後のアセットバージョンに付与するメタデータ（複数回指定可、省略時は UNITY_FINALIZE_METADATA）")
+    parser.add_argument("--no-submit", action="store_false", dest="submit", default=SUBMIT_ON_COMPLETION,
+                        help="変換後のアセットバージョンを Submit しない")
+    parser.add_argument("--finalize-batch-size", type=int, default=DEFAULT_FINALIZE_BATCH_SIZE,
+                        help="ファイナライズの1回の一括操作にまとめるアセットバージョンの最大数")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="各ステップ・API呼び出しのスパンを OpenTelemetry 形式の JSON Lines で FILE に出力する")
+    parser.add_argument("--asyncio", action="store_true",
+                        help="スレッドプールの代わりに asyncio のイベントループで変換する（async_webapi.py）")
+    parser.add_argument("--cpu-workers", type=int, default=CPU_POOL_SIZE,
+                        help="事前チェック・ハッシュ計算・GLB検証を実行するプロセス数"
+                             "（0 の場合はステージのスレッドで実行、省略時は UNITY_CPU_POOL_SIZE）")
+    for stage, concurrency in DEFAULT_STAGE_CONCURRENCY.items():
+        parser.add_argument(f"--{stage}-concurrency", type=int, default=concurrency,
+                            help=f"{stage} ステージの同時実行数")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    バッチ処理：複数のOBJファイルをパイプラインで変換する
+    """
+    args = parse_args(argv)
+
+    print("\n" + "="*60)
+    print("Unity Asset Manager - バッチ変換")
+    print("="*60)
+
+    required_configs = [ORG_ID, PROJECT_ID, KEY_ID, SECRET_KEY]
+    if not all(required_configs):
+        print("\nエラー: .envファイルに必要な設定が不足しています。")
+        print("UNITY_CLOUD_ORGANIZATION_ID, UNITY_CLOUD_PROJECT_ID, UNITY_CLOUD_KEY_ID, UNITY_CLOUD_SECRET_KEY")
+        sys.exit(1)
+
+    if not args.input_dir and not args.manifest:
+        print("\nエラー: 入力ディレクトリまたは --manifest を指定してください。")
+        sys.exit(1)
+
+    input_paths = collect_input_paths(directory=args.input_dir, manifest=args.manifest)
+    missing = [path for path in input_paths if not os.path.exists(path)]
+    if missing:
+        print(f"\nエラー: 入力ファイルが見つかりません: {', '.join(missing)}")
+        sys.exit(1)
+    if not input_paths:
+        print("\nエラー: 変換対象のファイルがありません。")
+        sys.exit(1)
+
+    stage_concurrency = {stage: getattr(args, f"{stage}_concurrency") for stage in DEFAULT_STAGE_CONCURRENCY}
+
+    # 全ステージのワーカーが同時に通信してもプール外の接続が作られないようにする
+    configure_http_client(pool_maxsize=sum(stage_concurrency.values()))
+    configure_cpu_pool(max_workers=args.cpu_workers)
+
+    print(f"\n  入力ファイル数: {len(input_paths)}")
+    print(f"  出力フォルダ: {args.output}")
+    print(f"  出力形式: {', '.join(args.export_formats)}")
+    print(f"  ステージ同時実行数: {stage_concurrency}")
+    print(f"  CPUプール: {args.cpu_workers} プロセス" if args.cpu_workers else "  CPUプール: なし（ステージのスレッドで実行）")
+
+    if args.trace:
+        configure_tracing(args.trace)
+        print(f"  トレース出力: {args.trace}")
+
+    if args.asyncio:
+        # aiohttp は asyncio 版を使う場合にだけ必要
+        from async_webapi import AsyncBatchConverter
+        converter_class = AsyncBatchConverter
+    else:
+        converter_class = BatchConverter
+
+    converter = converter_class(
+        auth_credentials=get_auth_provider(KEY_ID, SECRET_KEY, PROJECT_ID, api_base=UNITY_API_BASE,
+                                           token_cache_path=args.token_cache),
+        org_id=ORG_ID,
+        project_id=PROJECT_ID,
+        output_folder=args.output,
+        workflow_type=args.workflow_type,
+        stage_concurrency=stage_concurrency,
+        max_in_flight=args.max_in_flight,
+        poll_timeout=args.poll_timeout,
+        all_outputs=args.all_outputs,
+        export_formats=args.export_formats,
+        labels=args.labels,
+        metadata=dict(args.annotate) if args.annotate else None,
+        submit=args.submit,
+        finalize_batch_size=args.finalize_batch_size,
+        job_deadline=args.job_deadline
+    )
+
+    # SIGTERM でも Ctrl+C と同じく処理中の変換を停止してから終了する
+    handle_termination_signal()
+
+    summary = BatchSummary()
+    try:
+        for job in converter.run(input_paths):
+            summary.add(job)
+            done = len(summary.succeeded) + len(summary.failed)
+            if job.cache_hit:
+                print(f"[{done}/{len(input_paths)}] ✓ {job.input_path} → {job.output_path} (キャッシュ)")
+            elif job.reused_asset and job.succeeded:
+                print(f"[{done}/{len(input_paths)}] ✓ {job.input_path} → {job.output_path} (変換済みアセット {job.asset_id})")
+            elif job.succeeded:
+                resumed = ", 中断したジョブを再開" if job.resumed else ""
+                print(f"[{done}/{len(input_paths)}] ✓ {job.input_path} → {job.output_path} ({job.elapsed:.1f} 秒{resumed})")
+            else:
+                print(f"[{done}/{len(input_paths)}] ✗ {job.input_path} ({job.failed_stage}): {job.error}")
+    except KeyboardInterrupt:
+        print("\n中断しました。処理中だった変換は停止しました")
+        print("  同じコマンドを再実行すると、未完了のジョブは完了したステップの続きから再開します")
+        sys.exit(1)
+    summary.finish()
+    summary.report()
+    converter.print_connection_stats()
+    print(f"  ステータス確認: {converter.poller.tick_count} ティック / API呼び出し {converter.poller.api_calls} 回")
+    print(f"  トークン交換: {converter.auth_credentials.exchange_count} 回")
+    converter.cache.print_stats()
+    get_cpu_pool().print_stats()
+    if converter.finalizer.enabled:
+        converter.finalizer.print_stats()
+
+    if summary.failed or converter.finalizer.failed:
+        print("  同じコマンドを再実行すると、失敗したジョブは完了したステップの続きから再開します")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Unity Asset Manager - エンドツーエンドのベンチマーク
+
+mock_server.py のモックサーバーを起動し、batch_webapi.py のバッチ変換を
+同時実行数とファイルサイズの組み合わせごとに実行して、次の値を計測します。
+
+- スループット（jobs/s）
+- 1ジョブのエンドツーエンド所要時間の p50 / p99（秒）
+- クライアントプロセスのピークRSS（MB）
+
+各組み合わせは新しいプロセスで実行するため、ピークRSSは組み合わせごとに独立して計測されます。
+--output で結果をJSONに保存し、次回 --baseline に指定すると、
+許容範囲（--tolerance）を超えて悪化した項目を表示して終了コード 1 で終了します。
+
+使い方:
+    python benchmark.py --concurrency 1,4,16 --sizes 64KB,4MB --jobs 20
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import contextlib
+
+from mock_server import MockServer, add_config_arguments, config_from_args, parse_size
+
+# 計測する同時実行数とファイルサイズのデフォルト
+DEFAULT_CONCURRENCY_LEVELS = "1,4,16"
+DEFAULT_FILE_SIZES = "64KB,4MB,32MB"
+
+# 1つの組み合わせで変換するファイル数
+DEFAULT_JOB_COUNT = 20
+
+# 1つの組み合わせの実行時間の上限（秒）
+DEFAULT_SCENARIO_TIMEOUT = 600
+
+# ベースラインから何割悪化したら回帰とみなすか
+DEFAULT_TOLERANCE = 0.2
+
+# ベンチマーク中のモックサーバーの変換所要時間（秒）
+DEFAULT_TRANSFORMATION_DURATION = 1.0
+
+# ダミーの入力ファイル（OBJ）の繰り返し単位
+_OBJ_LINES = "v 0.0 0.0 0.0\nv 1.0 0.0 0.0\nv 0.0 1.0 0.0\nvn 0.0 0.0 1.0\nf 1//1 2//1 3//1\n"
+
+
+def write_obj(path, size, label):
+    """
+    約 size バイトのダミーOBJファイルを書き込む（行の途中では切らない）
+
+    Parameters
+    ----------
+    path : str
+        出力先のパス
+    size : int
+        目標のバイト数
+    label : str
+        先頭のコメント行に書く文字列（ファイルごとに内容を変え、変換キャッシュに当たらないようにする）
+    """
+    block = _OBJ_LINES * (64 * 1024 // len(_OBJ_LINES))
+    with open(path, "w", encoding="ascii") as f:
+        written = f.write(f"# benchmark input {label}\n")
+        while written + len(block) <= size:
+            written += f.write(block)
+        while written < size:
+            written += f.write(_OBJ_LINES)
+
+
+def percentile(values, fraction):
+    """
+    最近傍順位法でパーセンタイルを求める（値が無い場合は 0.0）
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(-(-fraction * len(ordered) // 1)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb():
+    """
+    このプロセスのピークRSS（MB）を取得する（resource モジュールが無い環境では None）
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(spec):
+    """
+    1つの組み合わせのバッチ変換を実行し、結果をJSONで標準出力に書き出す（子プロセス側）
+
+    Parameters
+    ----------
+    spec : dict
+        inputs, output_folder, concurrency, use_asyncio を含む実行内容
+    """
+    # 環境変数（UNITY_API_BASE など）は親プロセスが設定済みのため、ここで初めて読み込む
+    from batch_webapi import DEFAULT_STAGE_CONCURRENCY, BatchConverter
+    from main_webapi import ORG_ID, PROJECT_ID, KEY_ID, SECRET_KEY, UNITY_API_BASE
+    from auth_provider import get_auth_provider
+    from http_client import configure_http_client
+
+    concurrency = spec["concurrency"]
+    stage_concurrency = {stage: concurrency for stage in DEFAULT_STAGE_CONCURRENCY}
+    configure_http_client(pool_maxsize=sum(stage_concurrency.values()))
+
+    if spec["use_asyncio"]:
+        from async_webapi import AsyncBatchConverter
+        converter_class = AsyncBatchConverter
+    else:
+        converter_class = BatchConverter
+
+    converter = converter_class(
+        auth_credentials=get_auth_provider(KEY_ID, SECRET_KEY, PROJECT_ID, api_base=UNITY_API_BASE),
+        org_id=ORG_ID,
+        project_id=PROJECT_ID,
+        output_folder=spec["output_folder"],
+        stage_concurrency=stage_concurrency,
+        # 全ステージが同時に埋まる数までジョブを流す
+        max_in_flight=concurrency * len(stage_concurrency)
+    )
+
+    # 変換処理の進捗表示は計測結果と混ざらないよう捨てる
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        jobs = list(converter.run(spec["inputs"]))
+        wall_seconds = time.perf_counter() - started
+
+    latencies = [job.elapsed for job in jobs if job.succeeded]
+    errors = [f"{job.input_path} ({job.failed_stage}): {job.error}" for job in jobs if not job.succeeded]
+    print(json.dumps({
+        "jobs": len(jobs),
+        "failed": len(errors),
+        "errors": errors[:5],
+        "wall_seconds": wall_seconds,
+        "jobs_per_second": len(latencies) / wall_seconds if wall_seconds else 0.0,
+        "p50_seconds": percentile(latencies, 0.50),
+        "p99_seconds": percentile(latencies, 0.99),
+        "peak_rss_mb": peak_rss_mb()
+    }))
+
+
+def run_scenario(server, work_dir, inputs, size, concurrency, args):
+    """
+    1つの組み合わせを子プロセスで実行する（親プロセス側）
+
+    Returns
+    -------
+    dict
+        計測結果
+    """
+    scenario_dir = os.path.join(work_dir, f"c{concurrency}-s{size}")
+    os.makedirs(scenario_dir, exist_ok=True)
+    server.state.reset()
+
+    # ジョブの状態・変換キャッシュ・所要時間の履歴は組み合わせごとに空の状態から始める
+    env = dict(os.environ)
+    for name in ("UNITY_TOKEN_CACHE", "UNITY_TRACE_FILE"):
+        env.pop(name, None)
+    env.update({
+        "UNITY_API_BASE": server.base_url,
+        "UNITY_CLOUD_ORGANIZATION_ID": "benchmark-org",
+        "UNITY_CLOUD_PROJECT_ID": "benchmark-project",
+        "UNITY_CLOUD_KEY_ID": "benchmark-key",
+        "UNITY_CLOUD_SECRET_KEY": "benchmark-secret",
+        "UNITY_JOB_STORE": os.path.join(scenario_dir, "jobs.sqlite3"),
+        "UNITY_CONVERSION_CACHE_DIR": os.path.join(scenario_dir, "cache"),
+        "UNITY_TRANSFORMATION_HISTORY": os.path.join(scenario_dir, "history.json"),
+    })
+    spec = {
+        "inputs": inputs,
+        "output_folder": os.path.join(scenario_dir, "output"),
+        "concurrency": concurrency,
+        "use_asyncio": args.asyncio
+    }
+
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(spec)],
+        env=env, cwd=scenario_dir, capture_output=True, text=True, timeout=args.timeout
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"ベンチマークの実行に失敗しました (同時実行数 {concurrency}, サイズ {size}):\n"
+                           f"{completed.stderr.strip()}")
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result.update(size=size, concurrency=concurrency, api_requests=server.state.stats["api_requests"],
+                  injected_faults=server.state.stats["injected_errors"] + server.state.stats["injected_throttles"])
+    return result
+
+
+def format_size(size):
+    for unit, factor in (("GB", 1000 ** 3), ("MB", 1000 ** 2), ("KB", 1000)):
+        if size >= factor:
+            return f"{size / factor:g}{unit}"
+    return f"{size}B"
+
+
+def print_results(results):
+    print(f"\n{'サイズ':>8} {'同時実行数':>10} {'ジョブ':>6} {'失敗':>4} {'jobs/s':>8} "
+          f"{'p50 (秒)':>9} {'p99 (秒)':>9} {'ピークRSS (MB)':>14} {'API呼び出し':>11}")
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.1f}" if r["peak_rss_mb"] is not None else "-"
+        print(f"{format_size(r['size']):>8} {r['concurrency']:>10} {r['jobs']:>6} {r['failed']:>4} "
+              f"{r['jobs_per_second']:>8.2f} {r['p50_seconds']:>9.2f} {r['p99_seconds']:>9.2f} "
+              f"{rss:>14} {r['api_requests']:>11}")
+        for error in r["errors"]:
+            print(f"  ✗ {error}")
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    ベースラインと比べて tolerance の割合を超えて悪化した項目を探す
+
+    Parameters
+    ----------
+    results : list of dict
+        今回の計測結果
+    baseline : list of dict
+        以前の計測結果（同じサイズ・同時実行数の組み合わせ同士を比べる）
+    tolerance : float
+        許容する悪化の割合
+
+    Returns
+    -------
+    list of str
+        悪化した項目の説明
+    """
+    previous = {(r["size"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        base = previous.get((r["size"], r["concurrency"]))
+        if base is None:
+            continue
+        label = f"サイズ {format_size(r['size'])} / 同時実行数 {r['concurrency']}"
+        if r["failed"] > base["failed"]:
+            regressions.append(f"{label}: 失敗 {base['failed']} → {r['failed']} 件")
+        if r["jobs_per_second"] < base["jobs_per_second"] * (1 - tolerance):
+            regressions.append(f"{label}: jobs/s {base['jobs_per_second']:.2f} → {r['jobs_per_second']:.2f}")
+        for key, name in (("p50_seconds", "p50"), ("p99_seconds", "p99"), ("peak_rss_mb", "ピークRSS")):
+            if base.get(key) and r.get(key) and r[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{label}: {name} {base[key]:.2f} → {r[key]:.2f}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Unity Asset Manager エンドツーエンドのベンチマーク（モックサーバー使用）")
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY_LEVELS,
+                        help="計測する同時実行数（カンマ区切り、各ステージの同時実行数として使用）")
+    parser.add_argument("--sizes", default=DEFAULT_FILE_SIZES, help="計測するファイルサイズ（カンマ区切り、例: 64KB,4MB）")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOB_COUNT, help="1つの組み合わせで変換するファイル数")
+    parser.add_argument("--asyncio", action="store_true", help="asyncio版（AsyncBatchConverter）を計測する")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_SCENARIO_TIMEOUT, help="1つの組み合わせの実行時間の上限（秒）")
+    parser.add_argument("--output", help="計測結果を保存するJSONファイル")
+    parser.add_argument("--baseline", help="比較するベースラインのJSONファイル（--output で保存したもの）")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="回帰とみなす悪化の割合（0.2 = 20%%）")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    add_config_arguments(parser)
+    parser.set_defaults(transformation_duration=DEFAULT_TRANSFORMATION_DURATION)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.worker:
+        run_worker(json.loads(args.worker))
+        return 0
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+
+    print("\n" + "="*60)
+    print("Unity Asset Manager - ベンチマーク")
+    print("="*60)
+    print(f"\n  同時実行数: {levels}")
+    print(f"  ファイルサイズ: {[format_size(size) for size in sizes]}")
+    print(f"  ジョブ数: {args.jobs} / 組み合わせ")
+    print(f"  実装: {'asyncio' if args.asyncio else 'スレッドプール'}")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="unity-benchmark-") as work_dir, \
+            MockServer(config_from_args(args), blob_dir=os.path.join(work_dir, "blobs")) as server:
+        print(f"  モックサーバー: {server.base_url}")
+        for size in sizes:
+            input_dir = os.path.join(work_dir, f"inputs-{size}")
+            os.makedirs(input_dir)
+            inputs = []
+            for index in range(args.jobs):
+                path = os.path.join(input_dir, f"model_{index:04d}.obj")
+                write_obj(path, size, f"{size}-{index}")
+                inputs.append(path)
+
+            for concurrency in levels:
+                print(f"\n  計測中: サイズ {format_size(size)} / 同時実行数 {concurrency} ...", flush=True)
+                result = run_scenario(server, work_dir, inputs, size, concurrency, args)
+                print(f"  ✓ {result['jobs_per_second']:.2f} jobs/s, p50 {result['p50_seconds']:.2f} 秒, "
+                      f"p99 {result['p99_seconds']:.2f} 秒")
+                results.append(result)
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n  計測結果を保存しました: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n✗ ベースラインから {args.tolerance:.0%} を超えて悪化しました:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\n✓ ベースラインからの悪化はありません（許容範囲 {args.tolerance:.0%}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+"""
+Unity Asset Manager - Azure Blob Storage 転送
+
+署名付きURL（Azure Blob Storage）に対する大容量ファイルの転送処理です。
+
+- アップロード: ファイルをメモリマップし、ブロック単位（Put Block）で並列にアップロードしたあと
+  Put Block List でひとつの BlockBlob としてコミットします。
+- ダウンロード: 一時ファイルへ固定サイズのチャンクでストリーミング保存し、完了後に
+  アトミックにリネームします。大きなファイルは Range リクエストで並列に取得し、
+  接続が切れた場合は完了済みの範囲から再開します。
+  ジョブの期限を過ぎた場合やキャンセルされた場合は、チャンクの受信の合間に打ち切ります。
+"""
+
+import os
+import json
+import mmap
+import math
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from urllib.parse import urlsplit, urlunsplit, urlencode
+from xml.sax.saxutils import escape
+
+from http_client import get_http_client
+from tracing import bind_context, traced
+from job_deadline import check_deadline
+
+# 1ブロックのサイズ（Azureの上限は 4000 MiB / ブロック）
+DEFAULT_BLOCK_SIZE = 8 * 1024 * 1024
+
+# 並列にアップロードするブロック数
+DEFAULT_UPLOAD_WORKERS = 4
+
+# このサイズを超えるファイルはブロック単位でアップロードする
+BLOCK_UPLOAD_THRESHOLD = 32 * 1024 * 1024
+
+# Azure Blob Storage の1 Blobあたりのブロック数上限
+MAX_BLOCK_COUNT = 50000
+
+# ダウンロード時に1回で書き込むチャンクのサイズ
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Range リクエスト1回あたりのサイズ
+DEFAULT_RANGE_SIZE = 16 * 1024 * 1024
+
+# 並列に取得する Range の数
+DEFAULT_DOWNLOAD_WORKERS = 4
+
+# このサイズを超えるファイルは Range リクエストで並列にダウンロードする
+RANGED_DOWNLOAD_THRESHOLD = 64 * 1024 * 1024
+
+# 接続が切れた場合に1つの範囲を再試行する回数
+DEFAULT_DOWNLOAD_RETRIES = 3
+
+
+def _with_query(url, **params):
+    """
+    署名付きURLのクエリ（SASトークン）を残したままパラメータを追加する
+    """
+    parts = urlsplit(url)
+    query = urlencode(params)
+    if parts.query:
+        query = f"{parts.query}&{query}"
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, parts.fragment))
+
+
+def _block_id(index):
+    # ブロックIDは同じBlob内で全て同じ長さである必要がある
+    return base64.b64encode(f"block-{index:08d}".encode("ascii")).decode("ascii")
+
+
+@traced()
+def upload_blob_in_blocks(upload_url, file_path, block_size=DEFAULT_BLOCK_SIZE, max_workers=DEFAULT_UPLOAD_WORKERS):
+    """
+    ファイルをブロックに分割して署名付きURLへ並列アップロードする
+
+    ファイルはメモリマップし、各ブロックは memoryview のスライスとしてコピーせずに送信する。
+    同時に読み込まれるのは max_workers 個のブロックまでなので、
+    ファイルサイズに関係なく使用メモリは block_size × max_workers 程度に収まる。
+
+    Parameters
+    ----------
+    upload_url : str
+        署名付きアップロードURL（Azure Blob Storage）
+    file_path : str
+        アップロードするファイルのパス
+    block_size : int
+        1ブロックのバイト数
+    max_workers : int
+        並列にアップロードするブロック数
+
+    Returns
+    -------
+    int
+        アップロードしたブロック数
+    """
+    client = get_http_client()
+    file_size = os.path.getsize(file_path)
+
+    # ブロック数の上限を超える場合はブロックサイズを広げる
+    block_size = max(block_size, math.ceil(file_size / MAX_BLOCK_COUNT))
+    block_count = max(math.ceil(file_size / block_size), 1)
+    block_ids = [_block_id(i) for i in range(block_count)]
+
+    # OpenAPI仕様書に準拠: アップロードURLへのリクエストには
+    # x-ms-blob-type: BlockBlob と Content-Type: application/octet-stream が必要
+    block_headers = {
+        'Content-Type': 'application/octet-stream',
+        'x-ms-blob-type': 'BlockBlob'
+    }
+
+    with open(file_path, 'rb') as f:
+        # 空ファイルはメモリマップできないため、空のブロックを1つだけ送る
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if file_size else None
+        try:
+            def put_block(index):
+                offset = index * block_size
+                view = memoryview(mapped)[offset:offset + block_size] if mapped else b""
+                try:
+                    response = client.put(
+                        _with_query(upload_url, comp="block", blockid=block_ids[index]),
+                        data=view,
+                        headers=block_headers
+                    )
+                    response.raise_for_status()
+                finally:
+                    if isinstance(view, memoryview):
+                        view.release()
+
+            # スライスは各ワーカー内で作るため、同時に触れるのは max_workers 個のブロックだけ
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="put-block") as executor:
+                list(executor.map(bind_context(put_block), range(block_count)))
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+    # Put Block List: 送信済みブロックを順番どおりにコミットして BlockBlob を作成する
+    block_list = "".join(f"<Latest>{escape(block_id)}</Latest>" for block_id in block_ids)
+    body = f'<?xml version="1.0" encoding="utf-8"?><BlockList>{block_list}</BlockList>'
+    commit_headers = {
+        'Content-Type': 'application/xml',
+        'x-ms-blob-content-type': 'application/octet-stream'  # コミット後のBlobのContent-Type
+    }
+    response = client.put(
+        _with_query(upload_url, comp="blocklist"),
+        data=body.encode("utf-8"),
+        headers=commit_headers
+    )
+    response.raise_for_status()
+
+    return block_count
+
+
+def _probe_blob(download_url):
+    """
+    ダウンロード対象のサイズ・ETag・Range対応可否を取得する（取得できない項目は None / False）
+    """
+    try:
+        response = get_http_client().head(download_url, allow_redirects=True)
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        return None, None, False
+
+    content_length = response.headers.get("Content-Length")
+    total_size = int(content_length) if content_length and content_length.isdigit() else None
+    accepts_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+    return total_size, response.headers.get("ETag"), accepts_ranges
+
+
+def _load_download_state(state_path, total_size, etag, range_size):
+    """
+    前回中断したダウンロードの完了済み範囲を読み込む（Blobが変わっていれば破棄する）
+    """
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return set()
+
+    if (state.get("totalSize") != total_size or state.get("etag") != etag
+            or state.get("rangeSize") != range_size):
+        return set()
+    return set(state.get("completedRanges", []))
+
+
+def _save_download_state(state_path, total_size, etag, range_size, completed):
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "totalSize": total_size,
+            "etag": etag,
+            "rangeSize": range_size,
+            "completedRanges": sorted(completed)
+        }, f)
+    os.replace(tmp_path, state_path)
+
+
+def _stream_range(download_url, part_path, start, end, chunk_size, retries):
+    """
+    [start, end] の範囲を一時ファイルの同じ位置へ書き込む
+
+    接続が切れた場合は、書き込み済みの位置から Range を詰めて再試行する。
+    """
+    client = get_http_client()
+    position = start
+
+    for attempt in range(retries + 1):
+        try:
+            headers = {"Range": f"bytes={position}-{end}"}
+            with client.get(download_url, headers=headers, stream=True) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise ValueError("サーバーがRangeリクエストに対応していません")
+
+                with open(part_path, "r+b") as f:
+                    f.seek(position)
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        position += len(chunk)
+                        check_deadline("ダウンロード")
+
+            if position > end:
+                return
+            raise requests.exceptions.ChunkedEncodingError(
+                f"範囲 {start}-{end} の受信が途中で終了しました（{position - start} bytes）")
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            if attempt == retries:
+                raise
+            print(f"    警告: ダウンロードが中断されました。{position} bytes 目から再開します: {e}")
+
+
+def _download_in_ranges(download_url, part_path, state_path, total_size, etag,
+                        chunk_size, range_size, max_workers, retries):
+    """
+    Range リクエストで並列にダウンロードし、完了した範囲を状態ファイルに記録する
+    """
+    range_count = math.ceil(total_size / range_size)
+    completed = _load_download_state(state_path, total_size, etag, range_size)
+
+    if completed and os.path.exists(part_path) and os.path.getsize(part_path) == total_size:
+        print(f"    前回の続きから再開します（完了済み: {len(completed)}/{range_count} 範囲）")
+    else:
+        completed = set()
+        # 各ワーカーが自分の範囲へ直接書き込めるよう、先に最終サイズで確保しておく
+        with open(part_path, "wb") as f:
+            f.truncate(total_size)
+
+    lock = threading.Lock()
+
+    def fetch(index):
+        start = index * range_size
+        end = min(start + range_size, total_size) - 1
+        _stream_range(download_url, part_path, start, end, chunk_size, retries)
+        with lock:
+            completed.add(index)
+            _save_download_state(state_path, total_size, etag, range_size, completed)
+
+    pending = [i for i in range(range_count) if i not in completed]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="get-range") as executor:
+        list(executor.map(bind_context(fetch), pending))
+
+
+def _download_stream(download_url, part_path, chunk_size, accepts_ranges, retries):
+    """
+    1本のストリームで一時ファイルへダウンロードする
+
+    Range に対応したサーバーであれば、接続が切れても受信済みの位置から再開する。
+    """
+    client = get_http_client()
+    position = 0
+
+    with open(part_path, "wb") as f:
+        for attempt in range(retries + 1):
+            try:
+                headers = {"Range": f"bytes={position}-"} if position else {}
+                with client.get(download_url, headers=headers, stream=True) as response:
+                    response.raise_for_status()
+                    if position and response.status_code != 206:
+                        # Rangeが無視された場合は先頭から受信し直す
+                        position = 0
+                        f.seek(0)
+                        f.truncate()
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        position += len(chunk)
+                        check_deadline("ダウンロード")
+                return position
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout) as e:
+                if attempt == retries or not accepts_ranges:
+                    raise
+                print(f"    警告: ダウンロードが中断されました。{position} bytes 目から再開します: {e}")
+                f.seek(position)
+                f.truncate()
+
+
+@traced()
+def download_blob(download_url, output_path, chunk_size=DEFAULT_DOWNLOAD_CHUNK_SIZE,
+                  range_size=DEFAULT_RANGE_SIZE, max_workers=DEFAULT_DOWNLOAD_WORKERS,
+                  ranged_threshold=RANGED_DOWNLOAD_THRESHOLD, retries=DEFAULT_DOWNLOAD_RETRIES):
+    """
+    署名付きURLからファイルをストリーミングでダウンロードする
+
+    データは "<output_path>.part" へチャンク単位で書き込み、完了後に output_path へ
+    アトミックにリネームするため、途中で失敗しても不完全なファイルが output_path に残らない。
+    ranged_threshold を超えるファイルは Range リクエストで並列に取得し、完了した範囲を
+    "<output_path>.part.json" に記録する。接続が切れた場合や再実行時は、記録済みの範囲を飛ばして再開する。
+
+    Parameters
+    ----------
+    download_url : str
+        署名付きダウンロードURL
+    output_path : str
+        保存先のパス
+    chunk_size : int
+        1回で書き込むチャンクのバイト数
+    range_size : int
+        Range リクエスト1回あたりのバイト数
+    max_workers : int
+        並列に取得する Range の数
+    ranged_threshold : int
+        このサイズを超えるファイルは Range リクエストで並列に取得する
+    retries : int
+        接続が切れた場合に再開を試みる回数
+
+    Returns
+    -------
+    int
+        ダウンロードしたファイルのバイト数
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    part_path = f"{output_path}.part"
+    state_path = f"{part_path}.json"
+
+    total_size, etag, accepts_ranges = _probe_blob(download_url)
+
+    if accepts_ranges and total_size is not None and total_size > ranged_threshold:
+        print(f"    Rangeリクエストで並列ダウンロード中... (サイズ: {total_size} bytes, "
+              f"範囲サイズ: {range_size} bytes, 並列数: {max_workers})")
+        _download_in_ranges(download_url, part_path, state_path, total_size, etag,
+                            chunk_size, range_size, max_workers, retries)
+        downloaded_size = total_size
+    else:
+        downloaded_size = _download_stream(download_url, part_path, chunk_size, accepts_ranges, retries)
+
+    os.replace(part_path, output_path)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+    return downloaded_size
+
+
+def remove_partial_downloads(output_path):
+    """
+    中断したダウンロードの一時ファイル（"<output_path>.part" と再開用の状態ファイル）を削除する
+
+    output_path がディレクトリの場合は、その中の一時ファイルをすべて削除する。
+
+    Parameters
+    ----------
+    output_path : str
+        download_blob の保存先のパス（またはそれらを含むディレクトリ）
+
+    Returns
+    -------
+    int
+        削除したファイル数
+    """
+    suffixes = (".part", ".part.json", ".part.json.tmp")
+    if os.path.isdir(output_path):
+        paths = [os.path.join(root, name) for root, _, files in os.walk(output_path)
+                 for name in files if name.endswith(suffixes)]
+    else:
+        paths = [f"{output_path}{suffix}" for suffix in suffixes]
+
+    removed = 0
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        removed += 1
+    return removed
@@ -0,0 +1,459 @@
+"""
+Unity Asset Manager - 変換後のファイナライズを一括操作でまとめて行う
+
+変換が完了したアセットバージョンを集めておき、
+POST /assets/v1/projects/{projectId}/assets/versions/bulk で
+ラベル付け・メタデータ付与・Submit を最大 batch_size 件ずつ1回のリクエストで行います。
+作成した一括操作は close() でまとめて完了を待ち、アセットバージョンごとの結果をジョブに記録します。
+
+変換の完了前に Submit（AutoSubmit）を行うと失敗するため、ファイナライズは
+ダウンロードが完了したジョブに対してだけ行います。
+
+一括操作のAPI関数は呼び出し元から受け取るため、このモジュールは main_webapi に依存しません。
+asyncio版の AsyncBulkFinalizer には async_webapi の非同期版のAPI関数を渡します。
+"""
+
+import os
+import time
+import asyncio
+import threading
+
+import requests
+from dotenv import load_dotenv
+
+from poll_schedule import INITIAL_POLL_INTERVAL, MAX_POLL_INTERVAL, POLL_BACKOFF
+from job_store import JOB_DOWNLOADED, JOB_FINALIZED
+
+# main_webapi より先に読み込まれる場合も .env の設定を使う
+load_dotenv()
+
+# 変換後のファイナライズ（ラベル付け・メタデータ付与・Submit）を一括操作でまとめて行う設定
+# UNITY_FINALIZE_LABELS はカンマ区切りのラベル名、UNITY_FINALIZE_METADATA はカンマ区切りの フィールド=値
+FINALIZE_LABELS = [label.strip() for label in os.getenv("UNITY_FINALIZE_LABELS", "").split(",") if label.strip()]
+FINALIZE_METADATA = dict(
+    item.split("=", 1) for item in os.getenv("UNITY_FINALIZE_METADATA", "").split(",") if "=" in item
+)
+SUBMIT_ON_COMPLETION = os.getenv("UNITY_SUBMIT_ON_COMPLETION", "1") != "0"
+
+# 一括操作の種類（GET /organizations/{organizationId}/bulk/definitions で提供されているものだけを使う）
+BULK_ASSIGN_LABELS_OPERATION = "AssignLabels"
+BULK_UPDATE_METADATA_OPERATION = "UpdateMetadata"
+BULK_RESOURCE_TYPE = "AssetVersion"
+
+# 一括操作のステータス（大文字で比較する）
+BULK_SUCCEEDED_STATUSES = {"COMPLETED", "SUCCEEDED"}
+BULK_FINISHED_STATUSES = BULK_SUCCEEDED_STATUSES | {"FAILED", "CANCELLED", "CANCELED", "PARTIALLYCOMPLETED"}
+BULK_RESULTS_PAGE_SIZE = 1000
+
+# 1回の一括操作にまとめるアセットバージョンの最大数
+DEFAULT_BATCH_SIZE = 100
+
+# 一括操作の完了を待つ最大秒数
+DEFAULT_TIMEOUT = 600
+
+
+def _requested_operations(labels, metadata):
+    # ラベル・メタデータの設定から、一括操作で行う操作の種類と引数を作る
+    requested = []
+    if labels:
+        requested.append((BULK_ASSIGN_LABELS_OPERATION, {"labelNames": labels}))
+    if metadata:
+        requested.append((BULK_UPDATE_METADATA_OPERATION, {"metadata": metadata}))
+    return requested
+
+
+def _select_operations(requested, definitions):
+    # 一括操作の種類は組織ごとに提供されているものが異なるため、定義APIの結果にあるものだけを使う
+    available = {definition.get("type") for definition in definitions}
+    operations = []
+    for operation_type, arguments in requested:
+        if operation_type not in available:
+            print(f"  警告: 一括操作 {operation_type} は提供されていないため省略します")
+            continue
+        operations.append({"operationType": operation_type, "operationArguments": arguments})
+    return operations
+
+
+def _add_results(results, page):
+    # 結果の1ページ分を (アセットID, バージョンID) → 操作ごとの結果 の辞書に加える
+    for result in page.get("results") or []:
+        results.setdefault((result.get("assetId"), result.get("assetVersion")), []).append(result)
+
+
+def _batch_errors(batch, info, results):
+    # 完了した一括操作の結果から、アセットバージョンごとのエラー（成功した場合は None）を返す
+    status = (info.get("status") or "").upper()
+    fail_reasons = "; ".join(info.get("failReasons") or []) or status
+    for asset_id, version_id in batch:
+        operations = results.get((asset_id, version_id))
+        if operations is None:
+            # アセットバージョンごとの結果が無い場合は一括操作全体のステータスに従う
+            error = None if status in BULK_SUCCEEDED_STATUSES else fail_reasons
+        else:
+            failed = [operation for operation in operations
+                      if (operation.get("status") or "").upper() not in BULK_SUCCEEDED_STATUSES]
+            error = "; ".join(operation.get("failReason") or operation.get("status") or "失敗"
+                              for operation in failed) or None
+        yield (asset_id, version_id), error
+
+
+class BulkFinalizer:
+    """
+    変換が完了したアセットバージョンを集め、一括操作でファイナライズする
+
+    複数スレッドから共有して使用できる。add() で登録したアセットバージョンは
+    batch_size 件たまるたびに一括操作として送信され、close() で残りを送信して
+    すべての一括操作の完了を待つ。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    org_id : str
+        組織ID
+    project_id : str
+        プロジェクトID
+    get_definitions : callable
+        一括操作の定義を取得する関数（main_webapi.get_bulk_operation_definitions_via_api）
+    create_operation : callable
+        一括操作を作成する関数（main_webapi.create_bulk_operation_via_api）
+    get_operation : callable
+        一括操作のステータスと結果を取得する関数（main_webapi.get_bulk_operation_via_api）
+    labels : list of str
+        付与するラベル名
+    metadata : dict
+        付与するメタデータ（フィールド名 → 値）
+    submit : bool
+        操作の完了後にアセットバージョンを Submit するかどうか
+    batch_size : int
+        1回の一括操作にまとめるアセットバージョンの最大数
+    jobs : JobStore
+        一括操作のIDと結果を記録するジョブストア（None の場合は記録しない）
+    timeout : float
+        一括操作の完了を待つ最大秒数
+    """
+
+    def __init__(self, auth_credentials, org_id, project_id, get_definitions, create_operation, get_operation,
+                 labels=None, metadata=None, submit=SUBMIT_ON_COMPLETION, batch_size=DEFAULT_BATCH_SIZE, jobs=None,
+                 timeout=DEFAULT_TIMEOUT):
+        self.auth_credentials = auth_credentials
+        self.org_id = org_id
+        self.project_id = project_id
+        self.get_definitions = get_definitions
+        self.create_operation = create_operation
+        self.get_operation = get_operation
+        self.labels = list(FINALIZE_LABELS if labels is None else labels)
+        self.metadata = dict(FINALIZE_METADATA if metadata is None else metadata)
+        self.submit = submit
+        self.batch_size = batch_size
+        self.jobs = jobs
+        self.timeout = timeout
+        self.api_calls = 0
+        self.finalized = 0
+        self.failed = 0
+        self._operations = None
+        self._pending = []
+        self._bulk_ids = []
+        self._job_keys = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """ファイナライズで行う操作があるかどうか"""
+        return bool(self.submit or self.labels or self.metadata)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, asset_id, version_id, job_key=None):
+        """
+        ファイナライズするアセットバージョンを登録する（batch_size 件たまったら送信する）
+
+        Parameters
+        ----------
+        asset_id : str
+            アセットID
+        version_id : str
+            バージョンID
+        job_key : str
+            結果を記録するジョブのキー
+        """
+        if not self.enabled:
+            return
+        if self.jobs is not None and job_key is not None:
+            record = self.jobs.get(job_key)
+            if record and record["state"] == JOB_FINALIZED:
+                # 前回の実行でファイナライズ済み
+                return
+
+        with self._lock:
+            self._pending.append((asset_id, version_id))
+            if job_key is not None:
+                self._job_keys[(asset_id, version_id)] = job_key
+            if len(self._pending) < self.batch_size:
+                return
+            batch, self._pending = self._pending, []
+        self._send(batch)
+
+    def flush(self):
+        """
+        たまっているアセットバージョンを一括操作として送信する
+        """
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._send(batch)
+
+    def _resolve_operations(self):
+        requested = _requested_operations(self.labels, self.metadata)
+        if not requested:
+            return []
+        self.api_calls += 1
+        return _select_operations(requested, self.get_definitions(self.auth_credentials, self.org_id))
+
+    def _send(self, batch):
+        try:
+            with self._lock:
+                if self._operations is None:
+                    self._operations = self._resolve_operations()
+                operations = self._operations
+        except requests.exceptions.RequestException as e:
+            self._record_failures(batch, f"一括操作の定義の取得に失敗しました: {e}")
+            return
+        if not operations and not self.submit:
+            return
+
+        try:
+            self.api_calls += 1
+            bulk_id = self.create_operation(self.auth_credentials, self.project_id, batch, operations,
+                                            submit_on_completion=self.submit)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self._record_failures(batch, f"一括操作の作成に失敗しました: {e}")
+            return
+
+        with self._lock:
+            self._bulk_ids.append((bulk_id, batch))
+        for asset_id, version_id in batch:
+            key = self._job_keys.get((asset_id, version_id))
+            if self.jobs is not None and key is not None:
+                self.jobs.advance(key, JOB_DOWNLOADED, bulk_id=bulk_id)
+
+    def close(self):
+        """
+        残りを送信し、すべての一括操作の完了を待ってアセットバージョンごとの結果を記録する
+        """
+        self.flush()
+        with self._lock:
+            bulk_ids, self._bulk_ids = self._bulk_ids, []
+        for bulk_id, batch in bulk_ids:
+            self._wait(bulk_id, batch)
+
+    def _wait(self, bulk_id, batch):
+        deadline = time.time() + self.timeout
+        delay = INITIAL_POLL_INTERVAL
+        while True:
+            try:
+                self.api_calls += 1
+                info = self.get_operation(self.auth_credentials, self.org_id, bulk_id)
+            except requests.exceptions.RequestException as e:
+                self._record_failures(batch, f"一括操作のステータス取得に失敗しました: {e}")
+                return
+            status = (info.get("status") or "").upper()
+            if status in BULK_FINISHED_STATUSES:
+                break
+            if time.time() + delay > deadline:
+                self._record_failures(batch, f"一括操作 {bulk_id} が {self.timeout} 秒以内に完了しませんでした")
+                return
+            time.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, MAX_POLL_INTERVAL)
+
+        # 完了時に取得した1ページ目に続けて、残りの結果をページ単位で取得する
+        results = {}
+        page = info
+        offset = 0
+        while True:
+            _add_results(results, page)
+            offset += BULK_RESULTS_PAGE_SIZE
+            if offset >= (page.get("total") or 0):
+                break
+            try:
+                self.api_calls += 1
+                page = self.get_operation(self.auth_credentials, self.org_id, bulk_id, offset=offset)
+            except requests.exceptions.RequestException as e:
+                self._record_failures(batch, f"一括操作の結果の取得に失敗しました: {e}")
+                return
+
+        for asset_version, error in _batch_errors(batch, info, results):
+            if error:
+                self._record_failures([asset_version], error)
+            else:
+                self._record_success(*asset_version)
+
+    def _record_success(self, asset_id, version_id):
+        with self._lock:
+            self.finalized += 1
+            key = self._job_keys.pop((asset_id, version_id), None)
+        if self.jobs is not None and key is not None:
+            self.jobs.advance(key, JOB_FINALIZED, error=None)
+
+    def _record_failures(self, batch, error):
+        print(f"  ✗ ファイナライズに失敗 ({len(batch)} 件): {error}")
+        with self._lock:
+            self.failed += len(batch)
+            keys = [self._job_keys.pop(asset_version, None) for asset_version in batch]
+        for key in keys:
+            if self.jobs is not None and key is not None:
+                self.jobs.advance(key, JOB_DOWNLOADED, error=error)
+
+    def print_stats(self):
+        """
+        ファイナライズの統計情報を出力する
+        """
+        print(f"  ファイナライズ: 成功 {self.finalized} 件 / 失敗 {self.failed} 件 "
+              f"(API呼び出し {self.api_calls} 回)")
+
+
+class AsyncBulkFinalizer(BulkFinalizer):
+    """
+    BulkFinalizer の asyncio版
+
+    引数は BulkFinalizer と同じで、API関数には async_webapi の非同期版を渡す。
+    add(), flush(), close() はコルーチンで、1つのイベントループから共有して使用する。
+    ジョブストアへの記録はスレッドで行い、イベントループを止めない。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def add(self, asset_id, version_id, job_key=None):
+        """
+        ファイナライズするアセットバージョンを登録する（batch_size 件たまったら送信する）
+        """
+        if not self.enabled:
+            return
+        if self.jobs is not None and job_key is not None:
+            record = await asyncio.to_thread(self.jobs.get, job_key)
+            if record and record["state"] == JOB_FINALIZED:
+                # 前回の実行でファイナライズ済み
+                return
+
+        self._pending.append((asset_id, version_id))
+        if job_key is not None:
+            self._job_keys[(asset_id, version_id)] = job_key
+        if len(self._pending) < self.batch_size:
+            return
+        batch, self._pending = self._pending, []
+        await self._send(batch)
+
+    async def flush(self):
+        """
+        たまっているアセットバージョンを一括操作として送信する
+        """
+        batch, self._pending = self._pending, []
+        if batch:
+            await self._send(batch)
+
+    async def _resolve_operations(self):
+        requested = _requested_operations(self.labels, self.metadata)
+        if not requested:
+            return []
+        self.api_calls += 1
+        return _select_operations(requested, await self.get_definitions(self.auth_credentials, self.org_id))
+
+    async def _send(self, batch):
+        try:
+            # 同時に送信するタスクがあっても、定義APIは1回だけ呼び出す
+            async with self._lock:
+                if self._operations is None:
+                    self._operations = await self._resolve_operations()
+            operations = self._operations
+        except requests.exceptions.RequestException as e:
+            await self._record_failures(batch, f"一括操作の定義の取得に失敗しました: {e}")
+            return
+        if not operations and not self.submit:
+            return
+
+        try:
+            self.api_calls += 1
+            bulk_id = await self.create_operation(self.auth_credentials, self.project_id, batch, operations,
+                                                  submit_on_completion=self.submit)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            await self._record_failures(batch, f"一括操作の作成に失敗しました: {e}")
+            return
+
+        self._bulk_ids.append((bulk_id, batch))
+        for asset_id, version_id in batch:
+            key = self._job_keys.get((asset_id, version_id))
+            if self.jobs is not None and key is not None:
+                await asyncio.to_thread(self.jobs.advance, key, JOB_DOWNLOADED, bulk_id=bulk_id)
+
+    async def close(self):
+        """
+        残りを送信し、すべての一括操作の完了を待ってアセットバージョンごとの結果を記録する
+        """
+        await self.flush()
+        bulk_ids, self._bulk_ids = self._bulk_ids, []
+        await asyncio.gather(*(self._wait(bulk_id, batch) for bulk_id, batch in bulk_ids))
+
+    async def _wait(self, bulk_id, batch):
+        deadline = time.time() + self.timeout
+        delay = INITIAL_POLL_INTERVAL
+        while True:
+            try:
+                self.api_calls += 1
+                info = await self.get_operation(self.auth_credentials, self.org_id, bulk_id)
+            except requests.exceptions.RequestException as e:
+                await self._record_failures(batch, f"一括操作のステータス取得に失敗しました: {e}")
+                return
+            if (info.get("status") or "").upper() in BULK_FINISHED_STATUSES:
+                break
+            if time.time() + delay > deadline:
+                await self._record_failures(batch, f"一括操作 {bulk_id} が {self.timeout} 秒以内に完了しませんでした")
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, MAX_POLL_INTERVAL)
+
+        results = {}
+        page = info
+        offset = 0
+        while True:
+            _add_results(results, page)
+            offset += BULK_RESULTS_PAGE_SIZE
+            if offset >= (page.get("total") or 0):
+                break
+            try:
+                self.api_calls += 1
+                page = await self.get_operation(self.auth_credentials, self.org_id, bulk_id, offset=offset)
+            except requests.exceptions.RequestException as e:
+                await self._record_failures(batch, f"一括操作の結果の取得に失敗しました: {e}")
+                return
+
+        for asset_version, error in _batch_errors(batch, info, results):
+            if error:
+                await self._record_failures([asset_version], error)
+            else:
+                await self._record_success(*asset_version)
+
+    async def _record_success(self, asset_id, version_id):
+        self.finalized += 1
+        key = self._job_keys.pop((asset_id, version_id), None)
+        if self.jobs is not None and key is not None:
+            await asyncio.to_thread(self.jobs.advance, key, JOB_FINALIZED, error=None)
+
+    async def _record_failures(self, batch, error):
+        print(f"  ✗ ファイナライズに失敗 ({len(batch)} 件): {error}")
+        self.failed += len(batch)
+        keys = [self._job_keys.pop(asset_version, None) for asset_version in batch]
+        for key in keys:
+            if self.jobs is not None and key is not None:
+                await asyncio.to_thread(self.jobs.advance, key, JOB_DOWNLOADED, error=error)
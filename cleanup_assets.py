@@ -0,0 +1,374 @@
+"""
+Unity Asset Manager - 変換で作成された古いアセットの一括削除
+
+main.py（"Automated Upload - …"）や main_webapi.py・batch_webapi.py（"Web API - …"）の実行のたびに
+作成されるアセットを、名前のパターン・作成からの経過日数・ラベルでページ単位に検索し、
+一定数ずつまとめてゴミ箱へ移動します（--purge を指定した場合はゴミ箱からも完全に削除します）。
+--dry-run の場合は削除せずに対象の一覧と集計だけを出力します。
+
+監視モードの対応表（watch_webapi.py）と未完了のジョブが使用しているアセットは削除しません。
+"""
+
+import sys
+import json
+import time
+import fnmatch
+import argparse
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from http_client import configure_http_client, get_http_client
+from auth_provider import TOKEN_CACHE_PATH, get_auth_provider
+from main_webapi import (
+    ORG_ID,
+    PROJECT_ID,
+    KEY_ID,
+    SECRET_KEY,
+    UNITY_API_BASE,
+    search_assets_via_api,
+    trash_assets_via_api,
+    delete_assets_from_trash_via_api,
+)
+from job_store import JobStore
+
+# 各スクリプトが作成するアセット名のパターン（main.py と main_webapi.py・batch_webapi.py）
+DEFAULT_NAME_PATTERNS = ["Automated Upload - *", "Web API - *"]
+
+# 検索の1ページあたりの件数（APIの上限）
+SEARCH_PAGE_SIZE = 100
+
+# 1回のリクエストでゴミ箱へ移動・削除するアセット数
+# （削除はアセットIDをクエリ文字列で渡すため、URLの長さに収まる件数にする）
+DEFAULT_BATCH_SIZE = 50
+
+# ゴミ箱への移動・削除のリクエストの同時実行数
+DEFAULT_CONCURRENCY = 4
+
+# dry-run の一覧に表示する最大件数
+REPORT_LIMIT = 20
+
+
+def build_include_query(name_pattern, created_before=None, label=None):
+    """
+    検索条件（AssetReadFilter.includeQuery）を作成する
+
+    Parameters
+    ----------
+    name_pattern : str
+        アセット名のワイルドカードパターン（'*' は0文字以上、'?' は1文字）
+    created_before : datetime
+        この時刻より前に作成されたアセットだけを対象にする
+    label : str
+        このラベルが付いたアセットだけを対象にする
+
+    Returns
+    -------
+    dict
+        検索条件
+    """
+    include_query = {"name": {"type": "wildcard", "value": name_pattern}}
+    if created_before is not None:
+        include_query["created"] = {
+            "type": "date-range",
+            "conditions": [{"conditionType": "lessThan",
+                            "value": created_before.strftime("%Y-%m-%dT%H:%M:%SZ")}]
+        }
+    if label:
+        include_query["labels"] = {"type": "exact-match", "value": label}
+    return include_query
+
+
+def _parse_created(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def matches(asset, name_pattern, created_before=None, label=None):
+    """
+    検索結果のアセットが条件に一致するかをローカルでも確認する
+
+    検索APIが一部の条件を解釈しない場合でも、条件外のアセットを削除しないようにする。
+    """
+    if not fnmatch.fnmatchcase(asset.get("name") or "", name_pattern):
+        return False
+    if created_before is not None:
+        created = _parse_created(asset.get("created"))
+        if created is None or created >= created_before:
+            return False
+    if label and label not in (asset.get("labels") or []):
+        return False
+    return True
+
+
+class AssetCleaner:
+    """
+    条件に一致するアセットを検索し、ゴミ箱への移動と完全な削除をまとめて行う
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    name_patterns : list of str
+        アセット名のワイルドカードパターン（いずれかに一致したアセットを対象にする）
+    older_than : float
+        作成からこの日数以上経過したアセットだけを対象にする（None の場合は経過日数で絞り込まない）
+    label : str
+        このラベルが付いたアセットだけを対象にする
+    batch_size : int
+        1回のリクエストでゴミ箱へ移動・削除するアセット数
+    concurrency : int
+        ゴミ箱への移動・削除のリクエストの同時実行数
+    protected_asset_ids : set of str
+        削除しないアセットのID
+    """
+
+    def __init__(self, auth_credentials, project_id, name_patterns=None, older_than=None, label=None,
+                 batch_size=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY, protected_asset_ids=None):
+        self.auth_credentials = auth_credentials
+        self.project_id = project_id
+        self.name_patterns = name_patterns or DEFAULT_NAME_PATTERNS
+        self.created_before = None
+        if older_than is not None:
+            self.created_before = datetime.now(timezone.utc) - timedelta(days=older_than)
+        self.label = label
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.protected_asset_ids = set(protected_asset_ids or ())
+        self.search_calls = 0
+        self.skipped = 0
+        self.trashed = 0
+        self.purged = 0
+        self.failed = 0
+
+    def find(self, trash=False):
+        """
+        条件に一致するアセットをページ単位で検索する
+
+        Parameters
+        ----------
+        trash : bool
+            True の場合はゴミ箱内を検索する
+
+        Returns
+        -------
+        dict
+            アセットID → アセット情報（name, created, labels など。複数のバージョンが一致した場合は1件にまとめる）
+        """
+        found = {}
+        for name_pattern in self.name_patterns:
+            include_query = build_include_query(name_pattern, self.created_before, self.label)
+            token = None
+            while True:
+                self.search_calls += 1
+                result = search_assets_via_api(
+                    auth_credentials=self.auth_credentials,
+                    project_id=self.project_id,
+                    include_query=include_query,
+                    include_fields=["name", "labels", "created"],
+                    limit=SEARCH_PAGE_SIZE,
+                    token=token,
+                    trash=trash
+                )
+                for asset in result.get("assets") or []:
+                    asset_id = asset.get("assetId")
+                    if not asset_id or asset_id in found:
+                        continue
+                    if not matches(asset, name_pattern, self.created_before, self.label):
+                        continue
+                    if asset_id in self.protected_asset_ids:
+                        self.skipped += 1
+                        continue
+                    found[asset_id] = asset
+                token = result.get("next")
+                if not token:
+                    break
+        return found
+
+    def _run_batches(self, action, asset_ids, description):
+        batches = [asset_ids[i:i + self.batch_size] for i in range(0, len(asset_ids), self.batch_size)]
+        done = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(action, self.auth_credentials, self.project_id, batch): batch
+                       for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    future.result()
+                except requests.exceptions.RequestException:
+                    self.failed += len(batch)
+                    continue
+                done.extend(batch)
+                print(f"  ✓ {description}: {len(done)}/{len(asset_ids)} 件")
+        return done
+
+    def trash(self, asset_ids):
+        """
+        アセットを batch_size 件ずつゴミ箱へ移動する
+
+        Returns
+        -------
+        list of str
+            ゴミ箱へ移動できたアセットのID
+        """
+        moved = self._run_batches(trash_assets_via_api, list(asset_ids), "ゴミ箱へ移動")
+        self.trashed += len(moved)
+        return moved
+
+    def purge(self, asset_ids):
+        """
+        ゴミ箱内のアセットを batch_size 件ずつ完全に削除する（元に戻せない）
+
+        Returns
+        -------
+        list of str
+            削除できたアセットのID
+        """
+        deleted = self._run_batches(delete_assets_from_trash_via_api, list(asset_ids), "ゴミ箱から削除")
+        self.purged += len(deleted)
+        return deleted
+
+    def print_stats(self, elapsed):
+        """
+        削除の集計を出力する
+        """
+        print(f"  検索: {self.search_calls} ページ")
+        print(f"  ゴミ箱へ移動: {self.trashed} 件 / 完全に削除: {self.purged} 件 / 失敗: {self.failed} 件")
+        if self.skipped:
+            print(f"  使用中のため除外: {self.skipped} 件")
+        print(f"  経過時間: {elapsed:.1f} 秒")
+
+
+def print_report(assets):
+    """
+    削除対象のアセットの集計と一覧を出力する（dry-run）
+    """
+    print(f"\n  対象: {len(assets)} 件")
+    if not assets:
+        return
+
+    created = sorted(value for value in (_parse_created(a.get("created")) for a in assets.values()) if value)
+    if created:
+        print(f"  作成日時: {created[0]:%Y-%m-%d %H:%M} 〜 {created[-1]:%Y-%m-%d %H:%M}")
+    for asset_id, asset in list(assets.items())[:REPORT_LIMIT]:
+        print(f"    {asset_id}  {asset.get('created') or '-':<25}  {asset.get('name')}")
+    if len(assets) > REPORT_LIMIT:
+        print(f"    ...ほか {len(assets) - REPORT_LIMIT} 件（すべての一覧は --report で出力できます）")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Unity Asset Manager 古い変換アセットの一括削除")
+    parser.add_argument("--name", action="append", dest="name_patterns", metavar="PATTERN",
+                        help="対象にするアセット名のパターン（'*'・'?' を使用可、複数回指定可。"
+                             f"省略時は {' と '.join(repr(p) for p in DEFAULT_NAME_PATTERNS)}）")
+    parser.add_argument("--older-than", type=float, metavar="DAYS",
+                        help="作成からこの日数以上経過したアセットだけを対象にする")
+    parser.add_argument("--label", help="このラベルが付いたアセットだけを対象にする")
+    parser.add_argument("--purge", action="store_true",
+                        help="ゴミ箱へ移動したアセット（と、ゴミ箱内の条件に一致するアセット）を完全に削除する")
+    parser.add_argument("--dry-run", action="store_true", help="削除せずに対象の一覧と集計だけを出力する")
+    parser.add_argument("--report", metavar="FILE", help="対象のアセットの一覧を JSON で FILE に出力する")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="1回のリクエストでゴミ箱へ移動・削除するアセット数")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="ゴミ箱への移動・削除のリクエストの同時実行数")
+    parser.add_argument("--include-tracked", action="store_true",
+                        help="監視モードの対応表や未完了のジョブが使用しているアセットも削除する")
+    parser.add_argument("--token-cache", default=TOKEN_CACHE_PATH,
+                        help="アクセストークンの保存先（次回の起動時にトークン交換を省略する）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    古い変換アセットを検索し、ゴミ箱へ移動する（--purge の場合は完全に削除する）
+    """
+    args = parse_args(argv)
+
+    print("\n" + "="*60)
+    print("Unity Asset Manager - 古い変換アセットの一括削除")
+    print("="*60)
+
+    required_configs = [ORG_ID, PROJECT_ID, KEY_ID, SECRET_KEY]
+    if not all(required_configs):
+        print("\nエラー: .envファイルに必要な設定が不足しています。")
+        print("UNITY_CLOUD_ORGANIZATION_ID, UNITY_CLOUD_PROJECT_ID, UNITY_CLOUD_KEY_ID, UNITY_CLOUD_SECRET_KEY")
+        sys.exit(1)
+
+    configure_http_client(pool_maxsize=args.concurrency)
+
+    protected_asset_ids = set()
+    if not args.include_tracked:
+        jobs = JobStore()
+        protected_asset_ids = jobs.tracked_asset_ids()
+        jobs.close()
+
+    cleaner = AssetCleaner(
+        auth_credentials=get_auth_provider(KEY_ID, SECRET_KEY, PROJECT_ID, api_base=UNITY_API_BASE,
+                                           token_cache_path=args.token_cache),
+        project_id=PROJECT_ID,
+        name_patterns=args.name_patterns,
+        older_than=args.older_than,
+        label=args.label,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        protected_asset_ids=protected_asset_ids
+    )
+
+    print(f"\n  アセット名: {', '.join(cleaner.name_patterns)}")
+    if cleaner.created_before:
+        print(f"  作成日時: {cleaner.created_before:%Y-%m-%d %H:%M} (UTC) より前")
+    if args.label:
+        print(f"  ラベル: {args.label}")
+    print(f"  モード: {'dry-run' if args.dry_run else ('ゴミ箱へ移動して完全に削除' if args.purge else 'ゴミ箱へ移動')}")
+
+    started_at = time.time()
+    try:
+        assets = cleaner.find()
+        trashed_assets = cleaner.find(trash=True) if args.purge else {}
+
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump({"assets": assets, "trash": trashed_assets}, f, ensure_ascii=False, indent=2)
+            print(f"  対象の一覧を出力しました: {args.report}")
+
+        if args.dry_run:
+            print_report(assets)
+            if args.purge:
+                print(f"  ゴミ箱内の対象: {len(trashed_assets)} 件")
+            return
+
+        moved = []
+        if assets:
+            print("\n" + "-"*60)
+            print(f"ゴミ箱へ移動: {len(assets)} 件")
+            print("-"*60)
+            moved = cleaner.trash(assets)
+
+        if args.purge:
+            # 検索はEventual Consistencyのため、直前にゴミ箱へ移動したアセットもIDで削除する
+            purge_ids = list(dict.fromkeys([*moved, *trashed_assets]))
+            if purge_ids:
+                print("\n" + "-"*60)
+                print(f"ゴミ箱から完全に削除: {len(purge_ids)} 件")
+                print("-"*60)
+                cleaner.purge(purge_ids)
+    except requests.exceptions.RequestException as e:
+        print(f"\n✗ エラーが発生しました: {e}")
+        sys.exit(1)
+    finally:
+        print()
+        cleaner.print_stats(time.time() - started_at)
+        get_http_client().print_connection_stats()
+
+    if cleaner.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
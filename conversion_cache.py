@@ -0,0 +1,286 @@
+"""
+Unity Asset Manager - コンテンツアドレス型の変換キャッシュ
+
+入力ファイルの内容のハッシュと変換パラメータ（outputFileName、exportFormats、ワークフロータイプ）を
+キーにして、ダウンロード済みの変換結果をローカルに保存します。
+同じ内容・同じパラメータの変換はネットワークに触れずにキャッシュから出力フォルダへ
+ハードリンク（できない場合はコピー）します。
+
+インデックスは SQLite に保存し、合計サイズが上限を超えた場合は最後に使われた時刻が
+古いものから削除します（LRU）。
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+# キャッシュの保存先と合計サイズの上限
+CACHE_DIR = os.getenv("UNITY_CONVERSION_CACHE_DIR", ".conversion_cache")
+CACHE_MAX_BYTES = int(os.getenv("UNITY_CONVERSION_CACHE_MAX_BYTES", str(10 * 1024 * 1024 * 1024)))
+
+# ハッシュ計算時に1回で読み込むバイト数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path, chunk_size=HASH_CHUNK_SIZE):
+    """
+    ファイル内容の SHA-256 をストリーミングで計算する
+
+    Parameters
+    ----------
+    file_path : str
+        対象ファイルのパス
+    chunk_size : int
+        1回で読み込むバイト数
+
+    Returns
+    -------
+    str
+        16進数のハッシュ値
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(content_hash, workflow_type, parameters, variant=None):
+    """
+    入力内容のハッシュと変換パラメータからキャッシュキーを作成する
+
+    Parameters
+    ----------
+    content_hash : str
+        入力ファイルの内容のハッシュ値
+    workflow_type : str
+        ワークフロータイプ
+    parameters : dict
+        変換パラメータ（extraParameters）
+    variant : str
+        変換パラメータ以外で保存内容が変わる場合の区別（例: 全出力ファイルを保存する場合は "all-outputs"）
+
+    Returns
+    -------
+    str
+        キャッシュキー
+    """
+    key_material = {
+        "contentHash": content_hash,
+        "workflowType": workflow_type,
+        "parameters": parameters
+    }
+    if variant:
+        key_material["variant"] = variant
+    material = json.dumps(key_material, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _link_or_copy(source_path, destination_path):
+    if os.path.isdir(source_path):
+        # ディレクトリ（複数の出力ファイル）はファイルごとにリンクする
+        for root, _, files in os.walk(source_path):
+            for name in files:
+                path = os.path.join(root, name)
+                _link_or_copy(path, os.path.join(destination_path, os.path.relpath(path, source_path)))
+        return
+
+    os.makedirs(os.path.dirname(destination_path) or ".", exist_ok=True)
+    if os.path.exists(destination_path) and os.path.samefile(source_path, destination_path):
+        # 既に同じファイルへのリンク（rename は何もせず一時ファイルが残るため、ここで終える）
+        return
+    tmp_path = f"{destination_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source_path, tmp_path)
+    except OSError:
+        # 別ボリュームなどでハードリンクできない場合はコピーする
+        shutil.copy2(source_path, tmp_path)
+    os.replace(tmp_path, destination_path)
+
+
+def _total_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+class ConversionCache:
+    """
+    変換結果のローカルキャッシュ
+
+    複数スレッドから共有して使用できる。
+
+    Parameters
+    ----------
+    cache_dir : str
+        キャッシュの保存先ディレクトリ
+    max_bytes : int
+        キャッシュの合計サイズの上限
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def _object_path(self, key, file_name):
+        return os.path.join(self.cache_dir, "objects", key[:2], key, file_name)
+
+    def _count(self, name):
+        self._db.execute(
+            "INSERT INTO stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def lookup(self, key):
+        """
+        キャッシュを検索する（ヒット・ミスの件数も記録する）
+
+        Parameters
+        ----------
+        key : str
+            キャッシュキー
+
+        Returns
+        -------
+        str or None
+            キャッシュされたファイルのパス。見つからない場合は None
+        """
+        with self._lock:
+            row = self._db.execute("SELECT file_name FROM entries WHERE key = ?", (key,)).fetchone()
+            object_path = self._object_path(key, row[0]) if row else None
+
+            if object_path and not os.path.exists(object_path):
+                # ファイルが外部から削除されていた場合はインデックスからも消す
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                object_path = None
+
+            if object_path:
+                self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._count("hits")
+            else:
+                self._count("misses")
+            self._db.commit()
+            return object_path
+
+    def materialize(self, key, output_path):
+        """
+        キャッシュされた変換結果を出力先へハードリンク（またはコピー）する
+
+        ディレクトリとして保存された変換結果は、同じ構成で出力先ディレクトリへリンクする。
+
+        Parameters
+        ----------
+        key : str
+            キャッシュキー
+        output_path : str
+            出力先のパス
+
+        Returns
+        -------
+        bool
+            キャッシュにヒットして出力できた場合は True
+        """
+        object_path = self.lookup(key)
+        if not object_path:
+            return False
+        _link_or_copy(object_path, output_path)
+        return True
+
+    def store(self, key, source_path):
+        """
+        変換結果をキャッシュに保存し、上限を超えた分を古い順に削除する
+
+        Parameters
+        ----------
+        key : str
+            キャッシュキー
+        source_path : str
+            保存する変換結果のファイル（またはディレクトリ）のパス
+        """
+        file_name = os.path.basename(os.path.normpath(source_path))
+        object_path = self._object_path(key, file_name)
+        _link_or_copy(source_path, object_path)
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, file_name, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, file_name, _total_size(object_path), now, now)
+            )
+            self._db.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._db.execute("SELECT key, file_name, size FROM entries ORDER BY last_access").fetchall()
+        for key, file_name, size in rows:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(os.path.dirname(self._object_path(key, file_name)), ignore_errors=True)
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count("evictions")
+            total -= size
+        self._db.commit()
+
+    def stats(self):
+        """
+        キャッシュの統計情報を取得する
+
+        Returns
+        -------
+        dict
+            hits, misses, evictions, entries, bytes
+        """
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM stats").fetchall())
+            entries, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "entries": entries,
+            "bytes": total
+        }
+
+    def print_stats(self):
+        """
+        キャッシュの統計情報を出力する
+        """
+        stats = self.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups * 100 if lookups else 0
+        print(f"  変換キャッシュ: ヒット {stats['hits']} 件 / ミス {stats['misses']} 件 "
+              f"(ヒット率 {hit_rate:.1f}%), {stats['entries']} 件 {stats['bytes'] / 1024 / 1024:.1f} MB, "
+              f"削除 {stats['evictions']} 件")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,217 @@
+"""
+Unity Asset Manager - CPU処理のプロセスプール
+
+OBJファイルの事前チェック（NumPy）、入力ファイルのハッシュ計算、GLBファイルの検証など、
+ローカルのCPU処理をプロセスプールで実行し、通信を行うスレッドやイベントループと GIL を取り合わないようにします。
+ワーカーにはファイルのパスだけを渡し、ファイルの内容はワーカー側で読み込む（メモリマップする）ため、
+大きなデータをプロセス間でコピー（pickle）することはありません。
+
+通信を行うステージはこれまでどおりスレッド（asyncio 版はイベントループ）で実行し、
+CPU処理の結果を待つ間だけスレッドを使います。
+プールの大きさは環境変数 `UNITY_CPU_POOL_SIZE`（0 の場合はプロセスを使わず呼び出し元のスレッドで実行）で指定します。
+"""
+
+import os
+import sys
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from job_deadline import DeadlineExceeded, current_deadline
+
+# プロセスプールのワーカー数（0 の場合は呼び出し元のスレッドで実行する）
+CPU_POOL_SIZE = int(os.getenv("UNITY_CPU_POOL_SIZE", str(os.cpu_count() or 1)))
+
+
+def _mp_context():
+    # 通信中のスレッドやロックを持つプロセスを fork すると子プロセスが固まることがあるため、fork は使わない
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _call(func, args, kwargs):
+    # ワーカープロセスで実行し、実行時間を結果と一緒に返す（例外も呼び出し元で送出するために返す）
+    started_at = time.perf_counter()
+    try:
+        return True, func(*args, **kwargs), time.perf_counter() - started_at
+    except Exception as e:
+        return False, e, time.perf_counter() - started_at
+    finally:
+        # 出力をファイルへリダイレクトしている場合も、処理中に出力したログを呼び出し元のログと同じ順に並べる
+        sys.stdout.flush()
+
+
+class CpuPool:
+    """
+    CPU処理を実行するプロセスプール
+
+    複数スレッドから共有して使用できる。プロセスは最初の処理を投入したときに起動する。
+    渡す関数はモジュールの最上位で定義された関数、引数と戻り値は pickle できる小さな値（パスなど）にする。
+
+    Parameters
+    ----------
+    max_workers : int
+        ワーカープロセス数（0 の場合はプロセスを使わず、呼び出し元のスレッドで実行する）
+    """
+
+    def __init__(self, max_workers=CPU_POOL_SIZE):
+        self.max_workers = max_workers
+        self._executor = None
+        self._started_at = None
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """プロセスで実行するかどうか"""
+        return self.max_workers > 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_mp_context())
+                self._started_at = time.time()
+            return self._executor
+
+    def _record(self, name, busy, waited):
+        with self._lock:
+            stats = self._stats.setdefault(name, {"tasks": 0, "busy": 0.0, "waited": 0.0})
+            stats["tasks"] += 1
+            stats["busy"] += busy
+            stats["waited"] += max(waited, 0.0)
+
+    def _unwrap(self, name, submitted_at, outcome):
+        ok, value, busy = outcome
+        self._record(name, busy, time.perf_counter() - submitted_at - busy)
+        if not ok:
+            raise value
+        return value
+
+    def run(self, func, *args, **kwargs):
+        """
+        関数をワーカープロセスで実行し、結果を返す
+
+        実行中のジョブに期限がある場合は、期限までに終わらなければ DeadlineExceeded を送出する。
+
+        Parameters
+        ----------
+        func : callable
+            モジュールの最上位で定義された関数
+        *args, **kwargs
+            関数の引数
+
+        Returns
+        -------
+        object
+            関数の戻り値
+
+        Raises
+        ------
+        DeadlineExceeded
+            ジョブの期限までに処理が終わらなかった場合
+        """
+        name = func.__name__
+        submitted_at = time.perf_counter()
+        if not self.enabled:
+            return self._unwrap(name, submitted_at, _call(func, args, kwargs))
+
+        future = self._get_executor().submit(_call, func, args, kwargs)
+        deadline = current_deadline()
+        try:
+            outcome = future.result(timeout=deadline.cap(None) if deadline is not None else None)
+        except TimeoutError:
+            future.cancel()
+            deadline.check(name)
+            raise DeadlineExceeded(f"ジョブの期限を過ぎました（{name}）")
+        return self._unwrap(name, submitted_at, outcome)
+
+    def stats(self):
+        """
+        処理の種類ごとの統計情報
+
+        Returns
+        -------
+        dict
+            関数名 → {"tasks": 実行回数, "busy": 実行時間の合計（秒）, "waited": 空きワーカーを待った時間の合計（秒）}
+        """
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def utilization(self):
+        """
+        プールの稼働率（起動してからのワーカー時間のうち処理を実行していた割合、0.0〜1.0）
+        """
+        with self._lock:
+            if not self.enabled or self._started_at is None:
+                return 0.0
+            capacity = self.max_workers * (time.time() - self._started_at)
+            busy = sum(stats["busy"] for stats in self._stats.values())
+        return min(busy / capacity, 1.0) if capacity > 0 else 0.0
+
+    def print_stats(self):
+        """
+        プールの統計情報を出力する
+        """
+        stats = self.stats()
+        if not stats:
+            return
+        if self.enabled:
+            print(f"  CPUプール: プロセス {self.max_workers} 個 / 稼働率 {self.utilization() * 100:.1f}%")
+        else:
+            print("  CPUプール: 無効（呼び出し元のスレッドで実行）")
+        for name, item in stats.items():
+            print(f"    {name}: {item['tasks']} 件 / 実行 {item['busy']:.2f} 秒 / "
+                  f"待ち時間 平均 {item['waited'] / item['tasks'] * 1000:.1f} ms")
+
+    def close(self):
+        """
+        ワーカープロセスを終了する（実行中の処理の完了は待たない）
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_cpu_pool():
+    """
+    プロセス共有のCPUプールを取得する
+
+    Returns
+    -------
+    CpuPool
+        共有プール
+    """
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = CpuPool()
+    return _default_pool
+
+
+def configure_cpu_pool(max_workers=CPU_POOL_SIZE):
+    """
+    共有CPUプールを指定したワーカー数で作り直す
+
+    Parameters
+    ----------
+    max_workers : int
+        ワーカープロセス数（0 の場合は呼び出し元のスレッドで実行する）
+
+    Returns
+    -------
+    CpuPool
+        新しい共有プール
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+        _default_pool = CpuPool(max_workers=max_workers)
+    return _default_pool
@@ -0,0 +1,223 @@
+"""
+Unity Asset Manager - 入力ディレクトリの監視
+
+Linux では inotify でファイルの変更を受け取り、inotify が使えない環境（macOS・Windows、
+監視数の上限に達した場合など）では一定間隔でディレクトリを走査して更新時刻・サイズの変化を検出します。
+エディタの保存のように短時間に続く書き込みは、debounce 秒間変更が止まるまでまとめてから通知します。
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# 変更が止まってから通知するまでの秒数
+DEFAULT_DEBOUNCE = 1.0
+
+# inotify が使えない場合にディレクトリを走査する間隔（秒）
+DEFAULT_POLL_INTERVAL = 2.0
+
+# inotify のフラグ（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# inotify_event 構造体のヘッダー（wd, mask, cookie, len）
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _is_ignored(name):
+    # 隠しファイル・エディタの一時ファイルは通知しない
+    return name.startswith(".") or name.endswith(("~", ".swp", ".tmp"))
+
+
+class _Inotify:
+    """inotify のファイルディスクリプタとディレクトリごとの監視"""
+
+    def __init__(self, directory):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self._paths = {}
+        try:
+            self.add_tree(directory)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def add_tree(self, directory):
+        """directory とそのサブディレクトリを監視対象に加える"""
+        for root, dirs, _ in os.walk(directory):
+            dirs[:] = [name for name in dirs if not _is_ignored(name)]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                # ENOSPC は max_user_watches の上限に達した場合
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()), root)
+            self._paths[wd] = root
+
+    def read(self, timeout):
+        """
+        timeout 秒まで待ち、変更されたパスを返す（キューがあふれた場合は None）
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        overflow = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            root = self._paths.get(wd)
+            if root is None or not name or _is_ignored(name):
+                continue
+            path = os.path.join(root, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # 新しいサブディレクトリも監視し、中のファイルを変更として扱う
+                    self.add_tree(path)
+                    changed.update(os.path.join(r, f) for r, _, files in os.walk(path) for f in files)
+                continue
+            changed.add(path)
+        return None if overflow else changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """
+    ディレクトリ（サブディレクトリを含む）の変更を監視し、変更が落ち着いたらまとめて通知する
+
+    Parameters
+    ----------
+    directory : str
+        監視するディレクトリ
+    debounce : float
+        最後の変更からこの秒数だけ変更が無ければ通知する
+    poll_interval : float
+        inotify が使えない場合にディレクトリを走査する間隔（秒）
+    use_inotify : bool
+        False の場合は常に走査で監視する
+    """
+
+    def __init__(self, directory, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True):
+        self.directory = os.path.abspath(directory)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._inotify = None
+        self._snapshot = None
+
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify(self.directory)
+            except (OSError, AttributeError) as e:
+                reason = "監視数の上限に達しました" if getattr(e, "errno", None) == errno.ENOSPC else e
+                print(f"  警告: inotify を使用できないため、{poll_interval:g} 秒ごとの走査で監視します: {reason}")
+        if self._inotify is None:
+            self._snapshot = self._scan()
+
+    @property
+    def backend(self):
+        """監視の方式（"inotify" または "polling"）"""
+        return "inotify" if self._inotify else "polling"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _scan(self):
+        snapshot = {}
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = [name for name in dirs if not _is_ignored(name)]
+            for name in files:
+                if _is_ignored(name):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll(self, timeout):
+        time.sleep(timeout)
+        snapshot = self._scan()
+        previous, self._snapshot = self._snapshot, snapshot
+        return {path for path in previous.keys() | snapshot.keys() if previous.get(path) != snapshot.get(path)}
+
+    def _wait(self, timeout):
+        if self._inotify is None:
+            return self._poll(timeout)
+        changed = self._inotify.read(timeout)
+        if changed is None:
+            # イベントが失われたため、すべてのファイルを変更として扱う
+            print("  警告: inotify のイベントキューがあふれました。すべてのファイルを確認します")
+            changed = set(self._scan())
+        return changed
+
+    def changes(self, stop_event=None):
+        """
+        変更されたファイルのパスを、変更が落ち着くたびにまとめて返す
+
+        Parameters
+        ----------
+        stop_event : threading.Event
+            設定されると監視を終了する
+
+        Yields
+        ------
+        set of str
+            前回の通知以降に変更・作成・削除されたファイルの絶対パス
+        """
+        pending = set()
+        quiet_at = None
+        while stop_event is None or not stop_event.is_set():
+            if pending:
+                timeout = max(0.0, quiet_at - time.monotonic())
+            else:
+                timeout = self.poll_interval if self._inotify is None else 1.0
+            if self._inotify is None:
+                # 走査の場合は debounce より細かく確認しても検出できる変更は増えない
+                timeout = max(timeout, min(self.poll_interval, self.debounce))
+
+            changed = self._wait(timeout)
+            if changed:
+                pending |= changed
+                quiet_at = time.monotonic() + self.debounce
+            elif pending and time.monotonic() >= quiet_at:
+                yield pending
+                pending = set()
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
@@ -0,0 +1,164 @@
+"""
+Unity Asset Manager - データセット内ファイルの索引と短時間キャッシュ
+
+ファイル一覧を datasetId・filePath・ファイル名ごとの辞書に索引付けし、
+ファイルの検索をリストの走査ではなく辞書の参照で行います。
+同じ実行中に同じデータセットを何度も参照する場合は、TTL付きのキャッシュから索引を返します。
+"""
+
+import os
+import time
+import threading
+
+# 索引をキャッシュする秒数
+DEFAULT_INDEX_TTL = float(os.getenv("UNITY_FILE_INDEX_TTL", "60"))
+
+# 変換結果として扱う拡張子（ファイル名が一致しない場合の代替）
+MODEL_EXTENSIONS = (".glb", ".gltf")
+
+
+class DatasetFileIndex:
+    """
+    ファイル情報の索引
+
+    ファイル情報は datasetId → filePath → ファイル情報、および
+    datasetId → ファイル名 → ファイル情報 の辞書で保持する。
+    """
+
+    def __init__(self):
+        self.by_dataset = {}
+        self.by_name = {}
+        self.dataset_ids_by_name = {}
+        self.file_count = 0
+
+    def add(self, file_info, dataset_ids=None):
+        """
+        ファイル情報を索引に加える
+
+        Parameters
+        ----------
+        file_info : dict
+            ファイル情報（filePath を含む）
+        dataset_ids : list of str
+            ファイルが属するデータセットID（None の場合は file_info の datasetIds）
+        """
+        file_path = file_info.get("filePath")
+        if not file_path:
+            return
+        self.file_count += 1
+        for dataset_id in dataset_ids or file_info.get("datasetIds") or [None]:
+            self.by_dataset.setdefault(dataset_id, {})[file_path] = file_info
+            # 同じファイル名が複数ある場合は最初のものを優先する
+            self.by_name.setdefault(dataset_id, {}).setdefault(os.path.basename(file_path), file_info)
+
+    def add_dataset(self, dataset_name, dataset_id):
+        """データセット名とIDの対応を索引に加える"""
+        self.dataset_ids_by_name.setdefault(dataset_name, dataset_id)
+
+    def dataset_id_for(self, dataset_name):
+        """
+        データセット名からデータセットIDを取得する（見つからない場合は None）
+        """
+        return self.dataset_ids_by_name.get(dataset_name)
+
+    def files_in(self, dataset_id):
+        """
+        データセット内のファイル情報を取得する
+
+        Returns
+        -------
+        dict
+            filePath → ファイル情報
+        """
+        return self.by_dataset.get(dataset_id, {})
+
+    def find(self, file_name, dataset_id):
+        """
+        データセット内のファイルを探す
+
+        filePath の完全一致、ファイル名の一致、最初のGLB/GLTFファイルの順に探す。
+
+        Parameters
+        ----------
+        file_name : str
+            ファイル名またはデータセット内のファイルパス
+        dataset_id : str
+            データセットID
+
+        Returns
+        -------
+        dict or None
+            ファイル情報。見つからない場合は None
+        """
+        files = self.files_in(dataset_id)
+        target_file = files.get(file_name) or self.by_name.get(dataset_id, {}).get(os.path.basename(file_name))
+        if target_file:
+            return target_file
+
+        for file_path, file_info in files.items():
+            if file_path.lower().endswith(MODEL_EXTENSIONS):
+                print(f"    代わりに '{file_path}' を使用します")
+                return file_info
+        return None
+
+    @classmethod
+    def from_asset_details(cls, asset_details):
+        """
+        アセット詳細情報（files, datasets フィールド）から索引を作成する
+
+        Parameters
+        ----------
+        asset_details : dict
+            アセット詳細情報
+
+        Returns
+        -------
+        DatasetFileIndex
+            作成された索引
+        """
+        index = cls()
+        for ds in asset_details.get("datasets") or []:
+            index.add_dataset(ds.get("name"), ds.get("datasetId"))
+        for file_info in asset_details.get("files") or []:
+            index.add(file_info)
+        return index
+
+
+class TTLCache:
+    """
+    有効期限付きの小さなキャッシュ
+
+    複数スレッドから共有して使用できる。
+
+    Parameters
+    ----------
+    ttl : float
+        キャッシュの有効秒数
+    """
+
+    def __init__(self, ttl=DEFAULT_INDEX_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """有効期限内の値を取得する（無い場合は None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        """値を保存する"""
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+
+    def invalidate(self, key):
+        """値を削除する"""
+        with self._lock:
+            self._entries.pop(key, None)
@@ -0,0 +1,480 @@
+"""
+Unity Asset Manager - ダウンロードしたGLBファイルの検証
+
+変換サービスからダウンロードしたGLB（glTF 2.0 バイナリ）を検証し、
+メッシュ・プリミティブ・三角形の数とチャンクのバイト数を集計します。
+
+ファイルはメモリマップで開き、12バイトのヘッダーとチャンクを memoryview 上で解析します。
+コピーするのはJSONチャンクのデコードだけで、BINチャンクは読み込まずに
+bufferView・accessor の範囲がBINチャンク内に収まることを確認します。
+インデックスの範囲チェックも NumPy の配列をBINチャンクの上に直接作成して行うため、
+バッチ変換のすべての出力に適用できる速度で動作します。
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+
+GLB_MAGIC = b"glTF"
+GLB_VERSION = 2
+GLB_HEADER_SIZE = 12
+GLB_CHUNK_HEADER_SIZE = 8
+GLB_CHUNK_JSON = 0x4E4F534A
+GLB_CHUNK_BIN = 0x004E4942
+
+# accessor の componentType ごとのバイト数と NumPy の型
+COMPONENT_TYPES = {
+    5120: (1, np.int8),
+    5121: (1, np.uint8),
+    5122: (2, np.int16),
+    5123: (2, np.uint16),
+    5125: (4, np.uint32),
+    5126: (4, np.float32),
+}
+
+# accessor の type ごとの (列数, 行数)
+ACCESSOR_TYPES = {
+    "SCALAR": (1, 1),
+    "VEC2": (1, 2),
+    "VEC3": (1, 3),
+    "VEC4": (1, 4),
+    "MAT2": (2, 2),
+    "MAT3": (3, 3),
+    "MAT4": (4, 4),
+}
+
+# プリミティブの mode（省略時は TRIANGLES）
+MODE_TRIANGLES = 4
+MODE_TRIANGLE_STRIP = 5
+MODE_TRIANGLE_FAN = 6
+
+# 問題の一覧に載せる件数の上限（壊れたファイルで同じ問題が大量に出るのを防ぐ）
+MAX_REPORTED_PROBLEMS = 20
+
+
+class GlbValidationError(ValueError):
+    """
+    ダウンロードしたGLBファイルが壊れている場合の例外
+    """
+
+
+@dataclass
+class GlbStats:
+    """
+    GLBファイルの検証結果と集計
+    """
+    path: str
+    size: int = 0
+    json_bytes: int = 0
+    bin_bytes: int = 0
+    meshes: int = 0
+    primitives: int = 0
+    triangles: int = 0
+    vertices: int = 0
+    accessors: int = 0
+    buffer_views: int = 0
+    materials: int = 0
+    textures: int = 0
+    images: int = 0
+    seconds: float = 0.0
+    problems: list = field(default_factory=list)
+
+    @property
+    def valid(self):
+        return not self.problems
+
+    def to_record(self):
+        """
+        ジョブに保存する形式（JSONに変換できる辞書）にする
+        """
+        record = asdict(self)
+        record["path"] = os.path.basename(self.path)
+        record["seconds"] = round(self.seconds, 4)
+        return record
+
+
+def _element_size(component_size, columns, rows):
+    """
+    accessor の1要素のバイト数（行列の列は4バイト境界に揃える）
+    """
+    if columns == 1:
+        return component_size * rows
+    return columns * ((component_size * rows + 3) & ~3)
+
+
+def _valid_index(items, index):
+    """
+    index が glTF の配列の範囲内の整数かどうか
+    """
+    return isinstance(index, int) and not isinstance(index, bool) and 0 <= index < len(items)
+
+
+def _index(items, index):
+    """
+    glTF の配列を index で参照する（範囲外・不正な値は None）
+    """
+    return items[index] if _valid_index(items, index) else None
+
+
+def _parse_chunks(view, stats):
+    """
+    ヘッダーとチャンクを解析し、JSONチャンクとBINチャンクの memoryview を返す
+
+    Returns
+    -------
+    json_view : memoryview or None
+        JSONチャンクの内容
+    bin_view : memoryview or None
+        BINチャンクの内容（無ければ None）
+    """
+    if len(view) < GLB_HEADER_SIZE:
+        stats.problems.append(f"ヘッダー（{GLB_HEADER_SIZE} バイト）より短いファイルです（{len(view)} バイト）")
+        return None, None
+
+    magic, version, length = struct.unpack_from("<4sII", view, 0)
+    if magic != GLB_MAGIC:
+        stats.problems.append(f"GLBファイルではありません（マジックナンバー: {bytes(magic)!r}）")
+        return None, None
+    if version != GLB_VERSION:
+        stats.problems.append(f"対応していないGLBのバージョンです: {version}")
+        return None, None
+    if length != len(view):
+        # 途中で切れたファイル（ダウンロードの中断など）はここで見つかる
+        stats.problems.append(f"ヘッダーのファイル長 {length:,} バイトと実際のサイズ {len(view):,} バイトが異なります")
+        if length > len(view):
+            return None, None
+
+    json_view = bin_view = None
+    offset = GLB_HEADER_SIZE
+    while offset < length:
+        if offset + GLB_CHUNK_HEADER_SIZE > length:
+            stats.problems.append(f"オフセット {offset:,} のチャンクヘッダーが途中で切れています")
+            break
+        chunk_length, chunk_type = struct.unpack_from("<II", view, offset)
+        start = offset + GLB_CHUNK_HEADER_SIZE
+        end = start + chunk_length
+        if end > length:
+            stats.problems.append(f"オフセット {offset:,} のチャンク（{chunk_length:,} バイト）がファイルの終端を超えています")
+            break
+        if chunk_length % 4:
+            stats.problems.append(f"オフセット {offset:,} のチャンク長 {chunk_length:,} が4バイト境界に揃っていません")
+
+        if json_view is None:
+            if chunk_type != GLB_CHUNK_JSON:
+                stats.problems.append("最初のチャンクがJSONチャンクではありません")
+                break
+            json_view = view[start:end]
+        elif chunk_type == GLB_CHUNK_BIN:
+            if bin_view is not None:
+                stats.problems.append("BINチャンクが2つ以上あります")
+            else:
+                bin_view = view[start:end]
+        # その他の種類のチャンクは仕様どおり読み飛ばす
+        offset = end
+
+    if json_view is None and not stats.problems:
+        stats.problems.append("JSONチャンクがありません")
+    stats.json_bytes = len(json_view) if json_view is not None else 0
+    stats.bin_bytes = len(bin_view) if bin_view is not None else 0
+    return json_view, bin_view
+
+
+def _check_buffers(document, bin_view, stats):
+    """
+    buffer ごとの参照可能なバイト数を返す（外部ファイルの buffer は範囲を確認できないため None）
+    """
+    buffer_sizes = []
+    for index, buffer in enumerate(document.get("buffers", [])):
+        byte_length = buffer.get("byteLength", 0)
+        if "uri" in buffer:
+            buffer_sizes.append(None)
+            continue
+        if index != 0:
+            stats.problems.append(f"buffers[{index}] に uri がありません（BINチャンクを参照できるのは buffers[0] のみ）")
+            buffer_sizes.append(0)
+            continue
+        bin_length = len(bin_view) if bin_view is not None else 0
+        if byte_length > bin_length:
+            stats.problems.append(f"buffers[0] の byteLength {byte_length:,} がBINチャンク {bin_length:,} バイトを超えています")
+        buffer_sizes.append(min(byte_length, bin_length))
+    return buffer_sizes
+
+
+def _check_buffer_views(document, buffer_sizes, stats):
+    """
+    bufferView が buffer の範囲内にあることを確認し、BINチャンク上の (開始, 長さ) を返す
+    """
+    ranges = []
+    for index, buffer_view in enumerate(document.get("bufferViews", [])):
+        buffer_index = buffer_view.get("buffer")
+        offset = buffer_view.get("byteOffset", 0)
+        byte_length = buffer_view.get("byteLength", 0)
+        if not _valid_index(buffer_sizes, buffer_index):
+            stats.problems.append(f"bufferViews[{index}] が存在しない buffers[{buffer_index}] を参照しています")
+            ranges.append(None)
+            continue
+        buffer_size = buffer_sizes[buffer_index]
+        if buffer_size is None:
+            # 外部ファイルの buffer は確認しない
+            ranges.append(None)
+            continue
+        if offset < 0 or byte_length < 0 or offset + byte_length > buffer_size:
+            stats.problems.append(f"bufferViews[{index}]（オフセット {offset:,}、{byte_length:,} バイト）が"
+                                  f"buffers[{buffer_index}]（{buffer_size:,} バイト）の範囲外です")
+            ranges.append(None)
+            continue
+        ranges.append((offset, byte_length, buffer_view.get("byteStride")))
+    return ranges
+
+
+def _check_accessors(document, view_ranges, stats):
+    """
+    accessor が bufferView の範囲内にあることを確認し、accessor ごとの (要素数, BIN上の開始, NumPyの型, 間隔) を返す
+    """
+    layouts = []
+    for index, accessor in enumerate(document.get("accessors", [])):
+        count = accessor.get("count", 0)
+        component = COMPONENT_TYPES.get(accessor.get("componentType"))
+        shape = ACCESSOR_TYPES.get(accessor.get("type"))
+        if component is None or shape is None or not isinstance(count, int) or count < 0:
+            stats.problems.append(f"accessors[{index}] の componentType・type・count が不正です")
+            layouts.append(None)
+            continue
+
+        if "bufferView" not in accessor:
+            # bufferView の無い accessor はすべて0（sparse で一部を上書き）として扱われる
+            layouts.append((count, None, None, None))
+            continue
+        buffer_view_index = accessor["bufferView"]
+        if not _valid_index(view_ranges, buffer_view_index):
+            stats.problems.append(f"accessors[{index}] が存在しない bufferViews[{buffer_view_index}] を参照しています")
+            layouts.append(None)
+            continue
+        view_range = view_ranges[buffer_view_index]
+        if view_range is None:
+            layouts.append((count, None, None, None))
+            continue
+
+        view_offset, view_length, stride = view_range
+        component_size, dtype = component
+        element_size = _element_size(component_size, *shape)
+        stride = stride or element_size
+        offset = accessor.get("byteOffset", 0)
+        needed = offset + stride * (count - 1) + element_size if count else 0
+        if offset < 0 or needed > view_length:
+            stats.problems.append(f"accessors[{index}]（{count:,} 要素、{needed:,} バイト）が"
+                                  f"bufferViews[{buffer_view_index}]（{view_length:,} バイト）の範囲外です")
+            layouts.append(None)
+            continue
+        layouts.append((count, view_offset + offset, dtype, stride))
+    return layouts
+
+
+def _max_index(bin_view, layout):
+    """
+    インデックスの accessor の最大値をBINチャンクからコピーせずに求める
+    """
+    count, start, dtype, stride = layout
+    if count == 0 or start is None:
+        return 0
+    item_size = np.dtype(dtype).itemsize
+    if stride != item_size or start % item_size:
+        # 仕様ではインデックスは詰めて並べるため、ここに来るのは壊れたファイルのみ
+        return None
+    indices = np.frombuffer(bin_view, dtype=dtype, count=count, offset=start)
+    return int(indices.max())
+
+
+def _check_meshes(document, layouts, bin_view, stats):
+    """
+    メッシュとプリミティブの参照を確認し、三角形数と頂点数を集計する
+    """
+    accessors = document.get("accessors", [])
+    for mesh_index, mesh in enumerate(document.get("meshes", [])):
+        for primitive_index, primitive in enumerate(mesh.get("primitives", [])):
+            stats.primitives += 1
+            name = f"meshes[{mesh_index}].primitives[{primitive_index}]"
+
+            position = primitive.get("attributes", {}).get("POSITION")
+            position_layout = _index(layouts, position)
+            if position is not None and _index(accessors, position) is None:
+                stats.problems.append(f"{name} の POSITION が存在しない accessors[{position}] を参照しています")
+            vertex_count = position_layout[0] if position_layout else 0
+            stats.vertices += vertex_count
+
+            element_count = vertex_count
+            if "indices" in primitive:
+                indices = primitive["indices"]
+                indices_layout = _index(layouts, indices)
+                if _index(accessors, indices) is None:
+                    stats.problems.append(f"{name} の indices が存在しない accessors[{indices}] を参照しています")
+                    continue
+                if indices_layout is None:
+                    continue
+                element_count = indices_layout[0]
+                if position_layout and bin_view is not None:
+                    max_index = _max_index(bin_view, indices_layout)
+                    if max_index is None:
+                        stats.problems.append(f"{name} の indices のレイアウトが不正です")
+                    elif element_count and max_index >= vertex_count:
+                        stats.problems.append(f"{name} の indices に頂点数 {vertex_count:,} 以上の値 {max_index:,} があります")
+
+            mode = primitive.get("mode", MODE_TRIANGLES)
+            if mode == MODE_TRIANGLES:
+                stats.triangles += element_count // 3
+            elif mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+                stats.triangles += max(element_count - 2, 0)
+
+
+def _inspect(view, stats):
+    """
+    memoryview 上のGLBファイルを検証し、stats に集計する
+    """
+    json_view, bin_view = _parse_chunks(view, stats)
+    if json_view is None:
+        return
+    try:
+        _inspect_document(json_view, bin_view, stats)
+    finally:
+        # メモリマップを閉じる前に、チャンクの memoryview を解放する
+        json_view.release()
+        if bin_view is not None:
+            bin_view.release()
+
+
+def _inspect_document(json_view, bin_view, stats):
+    """
+    JSONチャンクの glTF を解析し、BINチャンクへの参照を確認する
+    """
+    try:
+        # JSONチャンクのデコードだけはコピーが必要（BINチャンクに比べて十分小さい）
+        document = json.loads(str(json_view, "utf-8"))
+    except ValueError as e:
+        stats.problems.append(f"JSONチャンクを解析できません: {e}")
+        return
+    if not isinstance(document, dict):
+        stats.problems.append("JSONチャンクがオブジェクトではありません")
+        return
+
+    try:
+        buffer_sizes = _check_buffers(document, bin_view, stats)
+        view_ranges = _check_buffer_views(document, buffer_sizes, stats)
+        layouts = _check_accessors(document, view_ranges, stats)
+        _check_meshes(document, layouts, bin_view, stats)
+
+        stats.meshes = len(document.get("meshes", []))
+        stats.accessors = len(document.get("accessors", []))
+        stats.buffer_views = len(document.get("bufferViews", []))
+        stats.materials = len(document.get("materials", []))
+        stats.textures = len(document.get("textures", []))
+        stats.images = len(document.get("images", []))
+    except (AttributeError, TypeError) as e:
+        # 型の違う値（配列の代わりに数値など）を含むJSON
+        stats.problems.append(f"glTF の構造が不正です: {e}")
+
+
+def inspect_glb(path):
+    """
+    GLBファイルを検証して集計する（問題があっても例外は送出しない）
+
+    Parameters
+    ----------
+    path : str
+        GLBファイルのパス
+
+    Returns
+    -------
+    GlbStats
+        検証結果と集計（問題は problems に入る）
+    """
+    started_at = time.perf_counter()
+    stats = GlbStats(path=path, size=os.path.getsize(path))
+    if stats.size < GLB_HEADER_SIZE:
+        # 空のファイルはメモリマップできない
+        stats.problems.append(f"ヘッダー（{GLB_HEADER_SIZE} バイト）より短いファイルです（{stats.size} バイト）")
+    else:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                _inspect(view, stats)
+
+    del stats.problems[MAX_REPORTED_PROBLEMS:]
+    stats.seconds = time.perf_counter() - started_at
+    return stats
+
+
+def print_stats(stats):
+    """
+    検証結果を出力する
+    """
+    name = os.path.basename(stats.path)
+    if stats.valid:
+        print(f"  ✓ GLB検証: {name}（メッシュ {stats.meshes:,} / プリミティブ {stats.primitives:,} / "
+              f"三角形 {stats.triangles:,}、JSON {stats.json_bytes:,} バイト / BIN {stats.bin_bytes:,} バイト、"
+              f"{stats.seconds * 1000:.1f} ms）")
+    else:
+        print(f"  ✗ GLB検証: {name} に {len(stats.problems)} 件の問題があります")
+        for problem in stats.problems:
+            print(f"    - {problem}")
+
+
+def validate_output(output_path, remove_invalid=True):
+    """
+    ダウンロードした出力（GLBファイル、または全出力を保存したディレクトリ内のGLBファイル）を検証する
+
+    GLB以外のファイル（.gltf など）は検証しない。
+
+    Parameters
+    ----------
+    output_path : str
+        出力ファイル、または出力ディレクトリのパス
+    remove_invalid : bool
+        壊れたファイルを削除するかどうか（後続の処理へ渡さないため）
+
+    Returns
+    -------
+    list of GlbStats
+        GLBファイルごとの検証結果
+
+    Raises
+    ------
+    GlbValidationError
+        壊れたGLBファイルがある場合
+    """
+    if os.path.isdir(output_path):
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(output_path)
+            for name in names if name.lower().endswith(".glb")
+        )
+    else:
+        paths = [output_path] if output_path.lower().endswith(".glb") else []
+
+    results = []
+    for path in paths:
+        stats = inspect_glb(path)
+        print_stats(stats)
+        results.append(stats)
+
+    invalid = [stats for stats in results if not stats.valid]
+    if invalid:
+        if remove_invalid:
+            for stats in invalid:
+                os.remove(stats.path)
+        removed = "（削除しました）" if remove_invalid else ""
+        raise GlbValidationError(
+            f"ダウンロードしたGLBファイルが壊れています{removed}: "
+            + "; ".join(f"{os.path.basename(stats.path)}: {stats.problems[0]}" for stats in invalid)
+        )
+    return results
+
+
+def results_to_json(results):
+    """
+    検証結果をジョブに保存するJSON文字列にする
+    """
+    return json.dumps([stats.to_record() for stats in results], ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,269 @@
+"""
+Unity Asset Manager - 共有HTTPクライアント
+
+ホストごとに keep-alive の requests.Session を保持し、
+services.api.unity.com や Azure Blob Storage への接続を使い回します。
+各 *_via_api 関数はこのモジュールの共有クライアント経由で通信します。
+
+すべてのリクエストは http_retry.py のポリシー（再試行・レート制限・サーキットブレーカー）を通ります。
+実行中のジョブに期限（job_deadline.py）がある場合は、期限を過ぎたリクエストを送らず、
+タイムアウトと再試行の待ち時間も残り時間までに抑えます。
+"""
+
+import os
+import time
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_retry import (
+    before_request,
+    record_response,
+    record_error,
+    get_retry_policy,
+    body_position,
+    rewind,
+    describe_retry,
+)
+from tracing import http_span, record_http_response
+from job_deadline import current_deadline
+
+# ホストごとのコネクションプールの大きさ（同時ワーカー数に合わせて調整する）
+DEFAULT_POOL_MAXSIZE = int(os.getenv("UNITY_HTTP_POOL_MAXSIZE", "16"))
+
+
+class UnityHttpClient:
+    """
+    ホストごとにプールされた keep-alive セッションを持つHTTPクライアント
+
+    スレッド間で共有して使用できる。
+
+    Parameters
+    ----------
+    pool_maxsize : int
+        1ホストあたりに保持するコネクション数の上限
+    pool_block : bool
+        True の場合、プールが埋まっているときは空きが出るまで待つ
+        （False の場合はプール外の使い捨てコネクションを作成する）
+    """
+
+    def __init__(self, pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False):
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url):
+        """
+        URLのホストに対応するセッションを取得する（無ければ作成する）
+
+        Parameters
+        ----------
+        url : str
+            リクエスト先のURL
+
+        Returns
+        -------
+        requests.Session
+            ホスト専用のセッション
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                    pool_block=self.pool_block
+                )
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """
+        ホスト専用のセッションでリクエストを送信する
+
+        429・一時的な5xx・接続エラーは http_retry.py のポリシーに従って再試行する。
+        再試行しても解消しない場合は最後のレスポンスを返す（または例外を送出する）。
+        実行中のジョブの期限を過ぎている場合は、送信せずに DeadlineExceeded を送出する。
+
+        Parameters
+        ----------
+        method : str
+            HTTPメソッド
+        url : str
+            リクエスト先のURL
+        idempotent : bool
+            再送しても安全なリクエストかどうか（None の場合はメソッドで判断する）
+        **kwargs
+            requests.Session.request に渡す引数
+
+        Returns
+        -------
+        requests.Response
+            レスポンス
+        """
+        policy = get_retry_policy()
+        idempotent = policy.is_idempotent(method, idempotent)
+        position = body_position(kwargs.get("data"))
+        session = self.session_for(url)
+        deadline = current_deadline()
+        timeout = kwargs.pop("timeout", None)
+
+        with http_span(method, url, kwargs.get("data")) as span:
+            attempt = 0
+            while True:
+                wait = before_request(url)
+                if wait > 0:
+                    time.sleep(wait if deadline is None else deadline.cap(wait))
+                if deadline is not None:
+                    deadline.check(f"{method} {urlsplit(url).path}")
+
+                try:
+                    response = session.request(
+                        method, url, timeout=timeout if deadline is None else deadline.cap(timeout), **kwargs)
+                except requests.exceptions.RequestException as e:
+                    record_error(url, e)
+                    span.set_attribute("http.retry_count", attempt)
+                    if not (policy.should_retry_error(e, attempt, idempotent) and rewind(kwargs.get("data"), position)):
+                        raise
+                    wait = policy.backoff(attempt)
+                    describe_retry(method, url, type(e).__name__, wait, attempt, policy.max_retries)
+                else:
+                    record_response(url, response.status_code, response.headers)
+                    record_http_response(span, response.status_code, response.headers, attempt)
+                    if not (policy.should_retry_status(response.status_code, attempt, idempotent)
+                            and rewind(kwargs.get("data"), position)):
+                        return response
+                    wait = policy.backoff(attempt, response.headers)
+                    describe_retry(method, url, response.status_code, wait, attempt, policy.max_retries)
+                    response.close()
+
+                time.sleep(wait if deadline is None else deadline.cap(wait))
+                attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def connection_stats(self):
+        """
+        ホストごとのコネクション再利用状況を取得する
+
+        Returns
+        -------
+        dict
+            ホスト → {"requests": 送信リクエスト数, "connections": 新規接続数,
+            "reused": 既存接続を再利用したリクエスト数}
+        """
+        stats = {}
+        with self._lock:
+            sessions = list(self._sessions.items())
+
+        for host, session in sessions:
+            num_requests = 0
+            num_connections = 0
+            for adapter in session.adapters.values():
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    num_requests += pool.num_requests
+                    num_connections += pool.num_connections
+            stats[host] = {
+                "requests": num_requests,
+                "connections": num_connections,
+                "reused": max(num_requests - num_connections, 0)
+            }
+        return stats
+
+    def print_connection_stats(self):
+        """
+        コネクション再利用状況を出力する
+        """
+        print("  コネクション再利用状況:")
+        for host, stats in self.connection_stats().items():
+            print(f"    {host}: リクエスト {stats['requests']} 件 / "
+                  f"新規接続 {stats['connections']} 件 / 再利用 {stats['reused']} 件")
+
+    def close(self):
+        """
+        保持しているすべてのセッションを閉じる
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    プロセス共有のHTTPクライアントを取得する
+
+    Returns
+    -------
+    UnityHttpClient
+        共有クライアント
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = UnityHttpClient()
+    return _default_client
+
+
+def configure_http_client(pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False):
+    """
+    共有HTTPクライアントを指定した設定で作り直す
+
+    同時ワーカー数を増やす場合は、ワーカー数以上の pool_maxsize を指定する。
+
+    Parameters
+    ----------
+    pool_maxsize : int
+        1ホストあたりに保持するコネクション数の上限
+    pool_block : bool
+        プールが埋まっているときに空きを待つかどうか
+
+    Returns
+    -------
+    UnityHttpClient
+        新しい共有クライアント
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = UnityHttpClient(pool_maxsize=pool_maxsize, pool_block=pool_block)
+    return _default_client
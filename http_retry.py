@@ -0,0 +1,433 @@
+"""
+Unity Asset Manager - 再試行・レート制限・サーキットブレーカー
+
+共有HTTPクライアント（http_client.py / async_http_client.py）がすべてのリクエストで使用する
+送信ポリシーをまとめたモジュールです。
+
+- 429・一時的な5xx・接続エラーは指数バックオフ（ジッター付き）で再試行し、
+  Retry-After ヘッダーがあればその秒数だけ待つ
+- Unity API へのリクエストはプロセス共有のトークンバケットを通し、
+  並列ワーカーが増えてもAPIのクォータを超えないようにする
+- ホストごとのサーキットブレーカーが連続した失敗を検知すると、
+  一定時間はリクエストを送らずに CircuitOpenError を送出する
+
+再試行してよいかはメソッドで判断する（GET/HEAD/PUT/DELETE/OPTIONS は安全）。
+POST は 429（処理されずに拒否された）と接続タイムアウト（送信前）のみ再試行し、
+検索のように副作用の無いPOSTは呼び出し側で idempotent=True を指定する。
+"""
+
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+# 再試行の最大回数
+DEFAULT_MAX_RETRIES = int(os.getenv("UNITY_HTTP_MAX_RETRIES", "5"))
+
+# バックオフの基準秒数と上限秒数（待ち時間は base * 2^試行回数 を上限とするランダムな値）
+DEFAULT_BACKOFF_BASE = float(os.getenv("UNITY_HTTP_BACKOFF_BASE", "0.5"))
+DEFAULT_BACKOFF_MAX = float(os.getenv("UNITY_HTTP_BACKOFF_MAX", "30"))
+
+# Retry-After で指定された待ち時間の上限秒数
+MAX_RETRY_AFTER = 300
+
+# Unity API への1秒あたりのリクエスト数と瞬間的に許すリクエスト数（0 の場合は制限しない）
+DEFAULT_RATE_LIMIT = float(os.getenv("UNITY_API_RATE_LIMIT", "10"))
+DEFAULT_RATE_BURST = int(os.getenv("UNITY_API_BURST", "20"))
+
+# レート制限の対象とするホスト（末尾一致、カンマ区切り）
+RATE_LIMITED_HOSTS = tuple(
+    host.strip() for host in os.getenv("UNITY_RATE_LIMITED_HOSTS", "api.unity.com").split(",") if host.strip()
+)
+
+# サーキットブレーカーを開く連続失敗回数と、開いてから試行を再開するまでの秒数
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv("UNITY_CIRCUIT_FAILURES", "5"))
+DEFAULT_RESET_TIMEOUT = float(os.getenv("UNITY_CIRCUIT_RESET", "30"))
+
+# 再試行するステータスコード（429以外は冪等なリクエストのみ）
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# サーキットブレーカーが失敗として数えるステータスコード
+FAILURE_STATUSES = {500, 502, 503, 504}
+
+# 再試行しても副作用が重複しないメソッド
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    サーキットブレーカーが開いているためリクエストを送らなかったことを示す例外
+
+    requests.exceptions.ConnectionError のサブクラスのため、
+    既存の requests.exceptions.RequestException の処理でそのまま扱える。
+    """
+
+
+def parse_retry_after(headers):
+    """
+    Retry-After ヘッダーから待ち時間（秒）を求める
+
+    Parameters
+    ----------
+    headers : Mapping
+        レスポンスヘッダー
+
+    Returns
+    -------
+    float or None
+        待ち時間。ヘッダーが無いか解釈できない場合は None
+    """
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0), MAX_RETRY_AFTER)
+
+
+class RetryPolicy:
+    """
+    再試行の可否と待ち時間を決めるポリシー
+
+    Parameters
+    ----------
+    max_retries : int
+        再試行の最大回数
+    backoff_base : float
+        バックオフの基準秒数
+    backoff_max : float
+        バックオフの上限秒数
+    """
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @staticmethod
+    def is_idempotent(method, idempotent=None):
+        """
+        リクエストを再送しても安全かどうか（idempotent が指定されていればそれに従う）
+        """
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in IDEMPOTENT_METHODS
+
+    def should_retry_status(self, status_code, attempt, idempotent):
+        """
+        ステータスコードに対して再試行するかどうか
+        """
+        if attempt >= self.max_retries or status_code not in RETRY_STATUSES:
+            return False
+        return status_code == 429 or idempotent
+
+    def should_retry_error(self, error, attempt, idempotent):
+        """
+        通信エラーに対して再試行するかどうか
+        """
+        if attempt >= self.max_retries or isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            # 接続できていないため、リクエストは送信されていない
+            return True
+        return idempotent and isinstance(error, (requests.exceptions.ConnectionError,
+                                                 requests.exceptions.Timeout,
+                                                 requests.exceptions.ChunkedEncodingError))
+
+    def backoff(self, attempt, headers=None):
+        """
+        次の試行までの待ち時間（秒）を求める
+
+        Retry-After ヘッダーがあればその値を、無ければジッター付きの指数バックオフを使う。
+
+        Parameters
+        ----------
+        attempt : int
+            これまでの再試行回数
+        headers : Mapping
+            レスポンスヘッダー
+
+        Returns
+        -------
+        float
+            待ち時間
+        """
+        retry_after = parse_retry_after(headers)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    プロセス共有のトークンバケット
+
+    スレッド・イベントループのどちらからも使えるよう、待ち時間を返すだけで自身は待たない。
+
+    Parameters
+    ----------
+    rate : float
+        1秒あたりに補充するトークン数（0 の場合は制限しない）
+    capacity : int
+        貯められるトークン数の上限（瞬間的に許すリクエスト数）
+    """
+
+    def __init__(self, rate=DEFAULT_RATE_LIMIT, capacity=DEFAULT_RATE_BURST):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        トークンを1つ予約し、送信してよいまでの待ち時間（秒）を返す
+
+        Returns
+        -------
+        float
+            待ち時間
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds):
+        """
+        指定した秒数だけ全ワーカーの送信を止める（429 を受け取った場合）
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """
+    ホストごとのサーキットブレーカー
+
+    連続 failure_threshold 回失敗すると開き、reset_timeout 秒後に1件だけ試行を通す。
+    その試行が成功すれば閉じ、失敗すれば再び開く。
+
+    Parameters
+    ----------
+    host : str
+        対象のホスト
+    failure_threshold : int
+        開くまでの連続失敗回数
+    reset_timeout : float
+        開いてから試行を再開するまでの秒数
+    """
+
+    def __init__(self, host, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """状態（"closed"、"open"、"half-open" のいずれか）"""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def check(self):
+        """
+        リクエストを送ってよいか確認する
+
+        Raises
+        ------
+        CircuitOpenError
+            ブレーカーが開いている場合
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed >= self.reset_timeout and not self._probing:
+                self._probing = True
+                return
+            remaining = max(self.reset_timeout - elapsed, 0)
+        raise CircuitOpenError(f"{self.host} への接続を一時停止中です（連続して失敗したため。約{remaining:.0f}秒後に再開）")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    print(f"  警告: {self.host} への失敗が続いたため、{self.reset_timeout:.0f}秒間リクエストを停止します")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+_default_policy = RetryPolicy()
+_rate_limiter = TokenBucket()
+_breaker_settings = (DEFAULT_FAILURE_THRESHOLD, DEFAULT_RESET_TIMEOUT)
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def _host_of(url):
+    return urlsplit(url).netloc
+
+
+def get_retry_policy():
+    """
+    プロセス共有の再試行ポリシーを取得する
+    """
+    return _default_policy
+
+
+def get_rate_limiter():
+    """
+    プロセス共有のトークンバケットを取得する
+    """
+    return _rate_limiter
+
+
+def configure_retry(max_retries=DEFAULT_MAX_RETRIES, rate=DEFAULT_RATE_LIMIT, burst=DEFAULT_RATE_BURST,
+                    failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+    """
+    再試行ポリシー・トークンバケット・サーキットブレーカーを指定した設定で作り直す
+
+    Parameters
+    ----------
+    max_retries : int
+        再試行の最大回数
+    rate : float
+        Unity API への1秒あたりのリクエスト数（0 の場合は制限しない）
+    burst : int
+        瞬間的に許すリクエスト数
+    failure_threshold : int
+        サーキットブレーカーを開く連続失敗回数
+    reset_timeout : float
+        サーキットブレーカーを開いてから試行を再開するまでの秒数
+    """
+    global _default_policy, _rate_limiter, _breaker_settings
+    _default_policy = RetryPolicy(max_retries=max_retries)
+    _rate_limiter = TokenBucket(rate=rate, capacity=burst)
+    with _breakers_lock:
+        _breakers.clear()
+        _breaker_settings = (failure_threshold, reset_timeout)
+
+
+def get_circuit_breaker(url):
+    """
+    URLのホストに対応するサーキットブレーカーを取得する（無ければ作成する）
+    """
+    host = _host_of(url)
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            failure_threshold, reset_timeout = _breaker_settings
+            breaker = CircuitBreaker(host, failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+            _breakers[host] = breaker
+        return breaker
+
+
+def is_rate_limited(url):
+    """
+    URLがレート制限の対象（Unity API）かどうか
+    """
+    host = _host_of(url).split(":")[0]
+    return any(host == suffix or host.endswith(f".{suffix}") for suffix in RATE_LIMITED_HOSTS)
+
+
+def before_request(url):
+    """
+    送信前の確認を行い、送信までに待つ秒数を返す
+
+    Raises
+    ------
+    CircuitOpenError
+        ホストのサーキットブレーカーが開いている場合
+    """
+    get_circuit_breaker(url).check()
+    return _rate_limiter.reserve() if is_rate_limited(url) else 0.0
+
+
+def record_response(url, status_code, headers=None):
+    """
+    レスポンスの結果をサーキットブレーカーとトークンバケットに記録する
+    """
+    breaker = get_circuit_breaker(url)
+    if status_code in FAILURE_STATUSES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    if status_code == 429 and is_rate_limited(url):
+        # 1つのワーカーが制限を受けたら、他のワーカーもまとめて待たせる
+        _rate_limiter.pause(parse_retry_after(headers) or _default_policy.backoff_base)
+
+
+def record_error(url, error):
+    """
+    通信エラーをサーキットブレーカーに記録する
+    """
+    if not isinstance(error, CircuitOpenError):
+        get_circuit_breaker(url).record_failure()
+
+
+def rewind(data, position):
+    """
+    再送の前にファイルオブジェクトの本文を先頭に戻す（戻せない場合は False）
+    """
+    if position is None:
+        return True
+    if position < 0:
+        return False
+    try:
+        data.seek(position)
+        return True
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def body_position(data):
+    """
+    本文がファイルオブジェクトの場合は現在位置を返す（それ以外は None）
+
+    memoryview（mmap したブロックの一部など）はバイト列と同じく、そのまま再送できる。
+    """
+    if data is None or isinstance(data, (bytes, bytearray, memoryview, str, dict, list, tuple)):
+        return None
+    try:
+        return data.tell()
+    except (AttributeError, OSError, ValueError):
+        return -1
+
+
+def describe_retry(method, url, reason, wait, attempt, max_retries):
+    """
+    再試行することを出力する
+    """
+    print(f"  警告: {method} {urlsplit(url).path} が {reason} のため、{wait:.1f}秒後に再試行します "
+          f"({attempt + 1}/{max_retries})")
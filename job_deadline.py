@@ -0,0 +1,137 @@
+"""
+Unity Asset Manager - ジョブの期限とキャンセル
+
+1ジョブ（アップロード → 変換開始 → ポーリング → ダウンロード）全体で使える時間を Deadline として持ち、
+各ステージは同じ期限から残り時間を使います。use_deadline() で実行中の期限にすると、
+共有HTTPクライアントは期限を過ぎた（またはキャンセルされた）ジョブのリクエストを送らずに
+DeadlineExceeded を送出し、送信するリクエストのタイムアウトも残り時間までに抑えます。
+
+期限はコンテキスト変数で保持するため、tracing.bind_context で実行したスレッドや
+asyncio のタスクにもそのまま引き継がれます。
+"""
+
+import os
+import time
+import signal
+import threading
+import contextvars
+
+# 1ジョブあたりの期限（秒）。0 の場合は期限を設けない
+JOB_DEADLINE = float(os.getenv("UNITY_JOB_DEADLINE", "3600"))
+
+
+class DeadlineExceeded(TimeoutError):
+    """ジョブの期限を過ぎた、またはジョブがキャンセルされた"""
+
+
+class Deadline:
+    """
+    1ジョブ全体の期限
+
+    複数スレッドから共有して使用できる。cancel() を呼ぶと、残り時間にかかわらず期限切れとして扱う。
+
+    Parameters
+    ----------
+    budget : float
+        ジョブ全体で使える秒数（None または 0 の場合は期限を設けず、キャンセルだけを扱う）
+    started_at : float
+        予算の計測を始めた時刻（time.time()、None の場合は作成時刻）
+    """
+
+    def __init__(self, budget=JOB_DEADLINE, started_at=None):
+        self.budget = budget or None
+        self.started_at = started_at or time.time()
+        self.expires_at = self.started_at + self.budget if self.budget else None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """ジョブをキャンセルする（以降のリクエストは送信されない）"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def remaining(self):
+        """
+        残り秒数（期限が無い場合は None、キャンセル済みの場合は 0）
+        """
+        if self.cancelled:
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.time(), 0.0)
+
+    @property
+    def expired(self):
+        return self.remaining() == 0.0
+
+    def cap(self, timeout):
+        """
+        タイムアウト秒数を残り時間までに抑える（timeout が None の場合は残り時間）
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def check(self, stage=None):
+        """
+        期限を過ぎている（またはキャンセルされている）場合は DeadlineExceeded を送出する
+
+        Parameters
+        ----------
+        stage : str
+            エラーメッセージに含める処理の名前
+        """
+        if not self.expired:
+            return
+        where = f"（{stage}）" if stage else ""
+        if self.cancelled:
+            raise DeadlineExceeded(f"ジョブがキャンセルされました{where}")
+        raise DeadlineExceeded(f"ジョブの期限（{self.budget:.0f}秒）を過ぎました{where}")
+
+
+_current_deadline = contextvars.ContextVar("unity_job_deadline", default=None)
+
+
+def current_deadline():
+    """実行中のジョブの期限（無い場合は None）"""
+    return _current_deadline.get()
+
+
+def check_deadline(stage=None):
+    """実行中のジョブの期限を確認する（期限が無ければ何もしない）"""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def use_deadline(deadline):
+    """
+    期限を実行中のジョブの期限にする（with 文のブロック内で有効、None の場合は期限を外す）
+    """
+    return _DeadlineScope(deadline)
+
+
+class _DeadlineScope:
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def __enter__(self):
+        self._token = _current_deadline.set(self.deadline)
+        return self.deadline
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_deadline.reset(self._token)
+        return False
+
+
+def handle_termination_signal():
+    """
+    SIGTERM を Ctrl+C と同じく KeyboardInterrupt として扱い、終了時の後片付け（変換の停止など）を行えるようにする
+
+    メインスレッド以外から呼ばれた場合は何もしない。
+    """
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
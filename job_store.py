@@ -0,0 +1,331 @@
+"""
+Unity Asset Manager - 変換ジョブの状態管理
+
+変換ごとのジョブ（アセットID・バージョン・データセットID・変換ID と進捗状態）を
+SQLite に保存し、途中で終了した実行を再実行したときに続きのステップから再開します。
+
+状態は次の順に進みます。
+
+    created → uploaded → transforming → succeeded → downloaded → finalized
+
+- created: アセット（とSourceデータセット）を作成した
+- uploaded: 入力ファイルのアップロードが完了した
+- transforming: 変換を開始した（再開時は同じ変換の完了を待つ）
+- succeeded: 変換が完了した（再開時はダウンロードのみ行う）
+- downloaded: 変換結果をダウンロードした（ダウンロードしたGLBファイルの検証結果を validation に記録する）
+- finalized: 一括操作でラベル付け・メタデータ付与・Submit を行った（一括操作のIDを bulk_id に記録する）
+
+監視モード（watch_webapi.py）のために、入力ファイルごとに変換先のアセットと
+最後に変換した内容のハッシュも記録します。内容を変更したファイルは同じアセットの新しいバージョンとして変換します。
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+# ジョブの保存先
+JOB_STORE_PATH = os.getenv("UNITY_JOB_STORE", ".conversion_jobs.sqlite3")
+
+# ジョブの状態（この順に進む）
+JOB_CREATED = "created"
+JOB_UPLOADED = "uploaded"
+JOB_TRANSFORMING = "transforming"
+JOB_SUCCEEDED = "succeeded"
+JOB_DOWNLOADED = "downloaded"
+JOB_FINALIZED = "finalized"
+JOB_STATES = (JOB_CREATED, JOB_UPLOADED, JOB_TRANSFORMING, JOB_SUCCEEDED, JOB_DOWNLOADED, JOB_FINALIZED)
+
+# 状態ごとに、再開時に最初に行うステップ
+RESUME_STEPS = {
+    JOB_CREATED: "upload",
+    JOB_UPLOADED: "transform",
+    JOB_TRANSFORMING: "poll",
+    JOB_SUCCEEDED: "download",
+    JOB_DOWNLOADED: "download",
+    JOB_FINALIZED: "download",
+}
+
+# ジョブに保存するフィールド
+JOB_FIELDS = (
+    "input_path",
+    "output_path",
+    "workflow_type",
+    "asset_id",
+    "version_id",
+    "dataset_id",
+    "transformation_id",
+    "transformation_started_at",
+    "validation",
+    "bulk_id",
+    "error",
+)
+
+# 入力ファイルごとに記録するアセットのフィールド
+ASSET_FIELDS = (
+    "asset_id",
+    "version_id",
+    "content_hash",
+)
+
+
+def job_key(conversion_key, output_path):
+    """
+    変換キーと出力先からジョブのキーを作成する
+
+    同じ内容のファイルを別の出力先へ変換する場合は別のジョブになる。
+
+    Parameters
+    ----------
+    conversion_key : str
+        変換キー（入力内容のハッシュ＋変換パラメータ）
+    output_path : str
+        出力先のパス
+
+    Returns
+    -------
+    str
+        ジョブのキー
+    """
+    material = f"{conversion_key}:{os.path.abspath(output_path)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    変換ジョブの状態を保存するストア
+
+    複数スレッドから共有して使用できる。
+
+    Parameters
+    ----------
+    path : str
+        SQLiteファイルのパス
+    """
+
+    def __init__(self, path=JOB_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                key TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                input_path TEXT,
+                output_path TEXT,
+                workflow_type TEXT,
+                asset_id TEXT,
+                version_id TEXT,
+                dataset_id TEXT,
+                transformation_id TEXT,
+                transformation_started_at REAL,
+                validation TEXT,
+                bulk_id TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+            CREATE TABLE IF NOT EXISTS assets (
+                input_path TEXT PRIMARY KEY,
+                asset_id TEXT,
+                version_id TEXT,
+                content_hash TEXT,
+                updated_at REAL NOT NULL
+            );
+        """)
+        # 以前のバージョンで作成したストアには、後から追加した列が無い
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column in ("validation", "bulk_id"):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        self._db.commit()
+
+    def get(self, key):
+        """
+        ジョブを取得する
+
+        Parameters
+        ----------
+        key : str
+            ジョブのキー
+
+        Returns
+        -------
+        dict or None
+            ジョブ（state と JOB_FIELDS の各フィールド）。見つからない場合は None
+        """
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def advance(self, key, state, **fields):
+        """
+        ジョブを次の状態へ進め、フィールドを更新する（ジョブが無ければ作成する）
+
+        同じ状態のままフィールドだけを更新することもできる。
+
+        Parameters
+        ----------
+        key : str
+            ジョブのキー
+        state : str
+            新しい状態（JOB_STATES のいずれか）
+        **fields
+            更新するフィールド（JOB_FIELDS のいずれか）
+
+        Raises
+        ------
+        ValueError
+            不明な状態・フィールドの場合や、状態を前に戻そうとした場合
+        """
+        if state not in JOB_STATES:
+            raise ValueError(f"不明なジョブの状態です: {state}")
+        unknown = set(fields) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"不明なジョブのフィールドです: {', '.join(sorted(unknown))}")
+
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT state FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                columns = ["key", "state", "created_at", "updated_at", *fields]
+                self._db.execute(
+                    f"INSERT INTO jobs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    (key, state, now, now, *fields.values())
+                )
+            else:
+                if state == JOB_DOWNLOADED and row["state"] == JOB_FINALIZED:
+                    # ファイナライズ済みのジョブを再ダウンロードした場合は、ファイナライズ済みのままにする
+                    state = JOB_FINALIZED
+                elif JOB_STATES.index(state) < JOB_STATES.index(row["state"]):
+                    raise ValueError(f"ジョブの状態を {row['state']} から {state} に戻すことはできません")
+                self._update(key, state, now, fields)
+            self._db.commit()
+
+    def rewind(self, key, state, error=None):
+        """
+        ジョブを前の状態に戻す（変換が失敗した場合など）
+
+        戻した状態より後のステップで記録されたフィールドは消去する。
+
+        Parameters
+        ----------
+        key : str
+            ジョブのキー
+        state : str
+            戻す先の状態
+        error : str
+            記録するエラーメッセージ
+        """
+        fields = {"error": error}
+        if JOB_STATES.index(state) < JOB_STATES.index(JOB_TRANSFORMING):
+            fields.update(transformation_id=None, transformation_started_at=None)
+        with self._lock:
+            self._update(key, state, time.time(), fields)
+            self._db.commit()
+
+    def _update(self, key, state, now, fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._db.execute(
+            f"UPDATE jobs SET state = ?, updated_at = ?{', ' + assignments if fields else ''} WHERE key = ?",
+            (state, now, *fields.values(), key)
+        )
+
+    def delete(self, key):
+        """
+        ジョブを削除する
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE key = ?", (key,))
+            self._db.commit()
+
+    def unfinished(self):
+        """
+        ダウンロードまで完了していないジョブの一覧を取得する（ダウンロード済み・ファイナライズ済みは含まない）
+
+        Returns
+        -------
+        list of dict
+            ジョブ（更新が古い順）
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE state NOT IN (?, ?) ORDER BY updated_at", (JOB_DOWNLOADED, JOB_FINALIZED)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_asset(self, input_path):
+        """
+        入力ファイルの変換先として記録したアセットを取得する
+
+        Parameters
+        ----------
+        input_path : str
+            入力ファイルのパス
+
+        Returns
+        -------
+        dict or None
+            アセット（ASSET_FIELDS の各フィールド）。記録が無い場合は None
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM assets WHERE input_path = ?", (os.path.abspath(input_path),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record_asset(self, input_path, **fields):
+        """
+        入力ファイルの変換先のアセットを記録する（指定したフィールドだけを更新する）
+
+        Parameters
+        ----------
+        input_path : str
+            入力ファイルのパス
+        **fields
+            更新するフィールド（ASSET_FIELDS のいずれか）
+
+        Raises
+        ------
+        ValueError
+            不明なフィールドの場合
+        """
+        unknown = set(fields) - set(ASSET_FIELDS)
+        if unknown:
+            raise ValueError(f"不明なアセットのフィールドです: {', '.join(sorted(unknown))}")
+
+        columns = ["input_path", "updated_at", *fields]
+        assignments = ", ".join(f"{name} = excluded.{name}" for name in columns[1:])
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO assets ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(input_path) DO UPDATE SET {assignments}",
+                (os.path.abspath(input_path), time.time(), *fields.values())
+            )
+            self._db.commit()
+
+    def tracked_asset_ids(self):
+        """
+        入力ファイルの変換先として記録したアセットと、未完了のジョブが使用しているアセットのIDを取得する
+
+        Returns
+        -------
+        set of str
+            アセットID
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT asset_id FROM assets WHERE asset_id IS NOT NULL "
+                "UNION SELECT asset_id FROM jobs WHERE asset_id IS NOT NULL AND state NOT IN (?, ?)",
+                (JOB_DOWNLOADED, JOB_FINALIZED)
+            ).fetchall()
+        return {row["asset_id"] for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,13 +1,22 @@
 import os
 import time
 import sys
-import base64
 import json
 from dotenv import load_dotenv
 from pathlib import PurePath, PurePosixPath
 import unity_cloud
 from unity_cloud.assets import AssetCreation, AssetType, FileUploadInformation
 import requests
+from http_client import get_http_client
+from auth_provider import get_auth_provider
+from blob_transfer import download_blob, remove_partial_downloads
+from concurrent.futures import ThreadPoolExecutor
+from obj_dependencies import find_source_files, total_size
+from glb_validator import validate_output
+from poll_schedule import AdaptivePollSchedule, get_transformation_history
+from tracing import TransformationTrace, bind_context, current_span, start_span, traced
+from job_deadline import Deadline, handle_termination_signal, use_deadline
+from main_webapi import parse_export_formats
 
 # .envファイルから環境変数を読み込む
 load_dotenv()
@@ -23,8 +32,20 @@ SECRET_KEY = os.getenv("UNITY_CLOUD_SECRET_KEY")
 INPUT_FILE_PATH = "assets_input/your_model.obj"
 OUTPUT_FOLDER = "assets_output"
 
-# Unity Services API Base URL
-UNITY_SERVICES_API_BASE = "https://services.api.unity.com"
+# Unity Services API Base URL（mock_server.py などに向ける場合は環境変数で上書きする）
+UNITY_SERVICES_API_BASE = os.getenv("UNITY_API_BASE", "https://services.api.unity.com")
+
+# 変換ワークフロータイプ
+WORKFLOW_TYPE = "OptimizeAndConvert"
+
+# 変換結果の出力形式（カンマ区切りで複数指定すると、1回の変換ですべての形式を出力する）
+EXPORT_FORMATS = parse_export_formats(os.getenv("UNITY_EXPORT_FORMATS", "gltf"))
+
+# 入力ファイルと依存ファイル（MTL・テクスチャ）を並列にアップロードする数
+DEFAULT_FILE_UPLOAD_WORKERS = 4
+
+# 変換結果のファイルを並列にダウンロードする数
+DEFAULT_FILE_DOWNLOAD_WORKERS = 4
 
 
 def get_access_token(key_id, secret_key, project_id):
@@ -43,34 +64,13 @@ def get_access_token(key_id, secret_key, project_id):
     Returns
     -------
     str
-        アクセストークン
+        アクセストークン（有効期限が近づくまでは同じトークンを返す）
     """
-    # Base64エンコード: key_id:secret_key
-    credentials = f"{key_id}:{secret_key}"
-    encoded_credentials = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
-
-    # Token Exchange APIを呼び出し
-    url = f"{UNITY_SERVICES_API_BASE}/auth/v1/token-exchange"
-    headers = {
-        "Authorization": f"Basic {encoded_credentials}"
-    }
-    params = {
-        "projectId": project_id
-    }
-
-    try:
-        response = requests.post(url, headers=headers, params=params)
-        response.raise_for_status()
-
-        token_data = response.json()
-        return token_data.get("token")
-    except requests.exceptions.RequestException as e:
-        print(f"アクセストークンの取得に失敗しました: {e}")
-        if hasattr(e.response, 'text'):
-            print(f"エラー詳細: {e.response.text}")
-        raise
+    # プロセス共有の認証プロバイダーがトークンをキャッシュし、期限前に更新する
+    return get_auth_provider(key_id, secret_key, project_id, api_base=UNITY_SERVICES_API_BASE).access_token()
 
 
+@traced()
 def start_transformation_via_api(access_token, org_id, project_id, asset_id, version_id, dataset_id, workflow_type, parameters):
     """
     Web APIで変換処理を開始する
@@ -112,7 +112,7 @@ def start_transformation_via_api(access_token, org_id, project_id, asset_id, ver
     }
 
     try:
-        response = requests.post(url, headers=headers, json=body)
+        response = get_http_client().post(url, headers=headers, json=body)
         response.raise_for_status()
 
         return response.json()
@@ -123,6 +123,7 @@ def start_transformation_via_api(access_token, org_id, project_id, asset_id, ver
         raise
 
 
+@traced()
 def get_transformation_status_via_api(access_token, org_id, project_id, asset_id, version_id, dataset_id, transformation_id):
     """
     Web APIで変換ステータスを確認する
@@ -156,7 +157,7 @@ def get_transformation_status_via_api(access_token, org_id, project_id, asset_id
     }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = get_http_client().get(url, headers=headers)
         response.raise_for_status()
 
         return response.json()
@@ -167,6 +168,38 @@ def get_transformation_status_via_api(access_token, org_id, project_id, asset_id
         raise
 
 
+@traced()
+def terminate_transformation_via_api(access_token, project_id, transformation_id):
+    """
+    Web APIで実行中の変換処理を停止する
+
+    Parameters
+    ----------
+    access_token : str
+        アクセストークン
+    project_id : str
+        プロジェクトID
+    transformation_id : str
+        変換ID
+    """
+    url = f"{UNITY_SERVICES_API_BASE}/assets/v1/projects/{project_id}/transformations/{transformation_id}/termination"
+
+    headers = {
+        "Authorization": f"Bearer {access_token}"
+    }
+
+    try:
+        response = get_http_client().post(url, headers=headers, idempotent=True)
+        response.raise_for_status()
+        print(f"変換処理を停止しました。Transformation ID: {transformation_id}")
+    except requests.exceptions.RequestException as e:
+        print(f"変換処理の停止に失敗しました: {e}")
+        if hasattr(e.response, 'text'):
+            print(f"エラー詳細: {e.response.text}")
+        raise
+
+
+@traced("main.main")
 def main():
     """
     OBJファイルのアップロード、GLTFへの変換、ダウンロードまでの一連の処理を実行する。
@@ -184,6 +217,9 @@ def main():
 
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
+    # SIGTERM でも Ctrl+C と同じく変換を停止してから終了する
+    handle_termination_signal()
+
     # --- 1. SDKの初期化 ---
     print("Unity Cloud SDKを初期化しています...")
     try:
@@ -201,145 +237,201 @@ def main():
         unity_cloud.uninitialize()  # 失敗した場合はクリーンアップ
         sys.exit(1)
 
-    try:
-        # --- 2. ファイルのアップロード ---
-        print(
-            f"\n--- ステップ2: '{os.path.basename(INPUT_FILE_PATH)}' をアップロードしています ---")
-
-        print("アセットを作成中...")
-        asset_creation = AssetCreation(
-            name=f"Automated Upload - {os.path.basename(INPUT_FILE_PATH)}",
-            description="OBJファイルからの自動変換",
-            type=AssetType.MODEL_3D
-        )
-        asset = unity_cloud.assets.create_asset(
-            asset_creation=asset_creation,
-            org_id=ORG_ID,
-            project_id=PROJECT_ID
-        )
-        print(f"アセットを作成しました。Asset ID: {asset.id}")
-
-        print("データセットを作成中...")
-        dataset_id = unity_cloud.assets.create_dataset(
-            org_id=ORG_ID,
-            project_id=PROJECT_ID,
-            asset_id=asset.id,
-            asset_version=asset.version,
-            dataset_name="source_obj"
-        )
-        print(f"データセットを作成しました。Dataset ID: {dataset_id}")
-
-        print("ファイルをアップロード中...")
-        upload_info = FileUploadInformation(
-            organization_id=ORG_ID,
-            project_id=PROJECT_ID,
-            asset_id=asset.id,
-            asset_version=asset.version,
-            dataset_id=dataset_id,
-            upload_file_path=PurePath(INPUT_FILE_PATH),
-            cloud_file_path=PurePosixPath(os.path.basename(INPUT_FILE_PATH))
-        )
-        unity_cloud.assets.upload_file(asset_upload_information=upload_info)
-        print(f"ファイルのアップロードが完了しました。")
+    # アップロードからダウンロードまでのすべてのステップで、1つの期限（UNITY_JOB_DEADLINE）を使う
+    deadline = Deadline()
+    running_transformation_id = None
+    download_paths = []
 
-        # --- 3. 変換処理の開始（Web API使用）---
-        print("\n--- ステップ3: GLTFへの変換処理を開始します ---")
-
-        # Web API用のアクセストークンを取得
-        print("アクセストークンを取得中...")
-        access_token = get_access_token(KEY_ID, SECRET_KEY, PROJECT_ID)
-        print("アクセストークンを取得しました。")
-
-        output_filename = f"{os.path.splitext(os.path.basename(INPUT_FILE_PATH))[0]}.gltf"
-
-        # 変換パラメータ
-        transformation_params = {
-            "outputs": [
-                {
-                    "outputName": output_filename,
-                    "outputFormat": "gltf"
+    try:
+        with use_deadline(deadline):
+            # --- 2. ファイルのアップロード ---
+            with start_span("step.upload") as span:
+                print(
+                    f"\n--- ステップ2: '{os.path.basename(INPUT_FILE_PATH)}' をアップロードしています ---")
+
+                print("アセットを作成中...")
+                asset_creation = AssetCreation(
+                    name=f"Automated Upload - {os.path.basename(INPUT_FILE_PATH)}",
+                    description="OBJファイルからの自動変換",
+                    type=AssetType.MODEL_3D
+                )
+                asset = unity_cloud.assets.create_asset(
+                    asset_creation=asset_creation,
+                    org_id=ORG_ID,
+                    project_id=PROJECT_ID
+                )
+                print(f"アセットを作成しました。Asset ID: {asset.id}")
+
+                print("データセットを作成中...")
+                dataset_id = unity_cloud.assets.create_dataset(
+                    org_id=ORG_ID,
+                    project_id=PROJECT_ID,
+                    asset_id=asset.id,
+                    asset_version=asset.version,
+                    dataset_name="source_obj"
+                )
+                print(f"データセットを作成しました。Dataset ID: {dataset_id}")
+
+                # OBJファイルが参照するマテリアル・テクスチャも相対パスを保って同じデータセットへアップロードする
+                source_files = find_source_files(INPUT_FILE_PATH)
+                print(f"ファイルをアップロード中... ({len(source_files)} ファイル)")
+
+                def upload(source_file):
+                    local_path, file_path = source_file
+                    upload_info = FileUploadInformation(
+                        organization_id=ORG_ID,
+                        project_id=PROJECT_ID,
+                        asset_id=asset.id,
+                        asset_version=asset.version,
+                        dataset_id=dataset_id,
+                        upload_file_path=PurePath(local_path),
+                        cloud_file_path=PurePosixPath(file_path)
+                    )
+                    unity_cloud.assets.upload_file(asset_upload_information=upload_info)
+
+                with ThreadPoolExecutor(max_workers=min(DEFAULT_FILE_UPLOAD_WORKERS, len(source_files))) as executor:
+                    list(executor.map(bind_context(upload), source_files))
+                # SDK経由のアップロードはHTTPクライアントを通らないため、送信バイト数をここで記録する
+                span.set_attribute("unity.bytes_sent", total_size(source_files))
+                print(f"ファイルのアップロードが完了しました。")
+
+            # --- 3. 変換処理の開始（Web API使用）---
+            with start_span("step.start_transformation"):
+                print("\n--- ステップ3: GLTFへの変換処理を開始します ---")
+
+                # Web API用のアクセストークンを取得
+                print("アクセストークンを取得中...")
+                access_token = get_access_token(KEY_ID, SECRET_KEY, PROJECT_ID)
+                print("アクセストークンを取得しました。")
+
+                output_name = os.path.splitext(os.path.basename(INPUT_FILE_PATH))[0]
+                output_filenames = [f"{output_name}.{export_format}" for export_format in EXPORT_FORMATS]
+
+                # 変換パラメータ（すべての出力形式を1回の変換で出力する）
+                transformation_params = {
+                    "outputs": [
+                        {
+                            "outputName": output_filename,
+                            "outputFormat": export_format
+                        }
+                        for output_filename, export_format in zip(output_filenames, EXPORT_FORMATS)
+                    ]
                 }
-            ]
-        }
-
-        # Web APIで変換処理を開始
-        transformation_response = start_transformation_via_api(
-            access_token=access_token,
-            org_id=ORG_ID,
-            project_id=PROJECT_ID,
-            asset_id=asset.id,
-            version_id=asset.version,
-            dataset_id=dataset_id,
-            workflow_type="OptimizeAndConvert",
-            parameters=transformation_params
-        )
-        transformation_id = transformation_response.get("id")
-        print(f"変換を開始しました。Transformation ID: {transformation_id}")
-
-        # --- 4. 変換ステータスのポーリング（Web API使用）---
-        print("\n--- ステップ4: 変換処理の完了を待っています (最大5分)... ---")
-        start_time = time.time()
-        while time.time() - start_time < 300:  # 5分間のタイムアウト
-            # Web APIで変換ステータスを取得
-            transformation_status_response = get_transformation_status_via_api(
-                access_token=access_token,
-                org_id=ORG_ID,
-                project_id=PROJECT_ID,
-                asset_id=asset.id,
-                version_id=asset.version,
-                dataset_id=dataset_id,
-                transformation_id=transformation_id
-            )
-            status = transformation_status_response.get("status")
-            print(f"現在のステータス: {status}")
-            if status == "SUCCEEDED":
-                print("変換に成功しました！")
-                break
-            elif status == "FAILED":
-                print("エラー: 変換に失敗しました。")
-                sys.exit(1)
-            time.sleep(10)  # 10秒待機
-        else:
-            print("エラー: 変換がタイムアウトしました。")
-            sys.exit(1)
-
-        # --- 5. 変換後ファイルのダウンロード ---
-        print("\n--- ステップ5: 変換されたGLTFファイルをダウンロードします ---")
-
-        print("変換後のデータセットを検索中...")
-        asset_details = unity_cloud.assets.get_asset(
-            org_id=ORG_ID,
-            project_id=PROJECT_ID,
-            asset_id=asset.id
-        )
-        optimized_dataset = next(
-            (ds for ds in asset_details.datasets if ds.name == "Optimize and convert"), None)
-
-        if not optimized_dataset:
-            print("エラー: 'Optimize and convert' データセットが見つかりませんでした。")
-            sys.exit(1)
-        print(f"データセットを発見しました。Dataset ID: {optimized_dataset.id}")
-
-        target_file = next(
-            (f for f in optimized_dataset.files if f.name == output_filename), None)
-        if not target_file:
-            print(f"エラー: データセット内で '{output_filename}' が見つかりませんでした。")
-            sys.exit(1)
-
-        print(f"ダウンロード対象ファイルを発見: {target_file.name}")
-
-        download_url = target_file.get_download_url()
-        print("ダウンロードURLを取得しました。ダウンロードを開始します...")
-
-        response = requests.get(download_url)
-        response.raise_for_status()
-
-        output_path = os.path.join(OUTPUT_FOLDER, output_filename)
-        with open(output_path, "wb") as f:
-            f.write(response.content)
-
-        print(f"\nダウンロードが完了しました！ ファイルは '{output_path}' に保存されました。")
 
+                # Web APIで変換処理を開始
+                start_time = time.time()
+                transformation_response = start_transformation_via_api(
+                    access_token=access_token,
+                    org_id=ORG_ID,
+                    project_id=PROJECT_ID,
+                    asset_id=asset.id,
+                    version_id=asset.version,
+                    dataset_id=dataset_id,
+                    workflow_type=WORKFLOW_TYPE,
+                    parameters=transformation_params
+                )
+                transformation_id = transformation_response.get("id")
+                running_transformation_id = transformation_id
+                print(f"変換を開始しました。Transformation ID: {transformation_id}")
+
+            # --- 4. 変換ステータスのポーリング（Web API使用）---
+            with start_span("step.wait_transformation"):
+                # タイムアウトとポーリング間隔は過去の変換所要時間から決める
+                input_size = total_size(source_files)
+                history = get_transformation_history()
+                expected_duration = history.predict(WORKFLOW_TYPE, input_size)
+                timeout = history.timeout_for(WORKFLOW_TYPE, input_size)
+                if deadline.expires_at is not None:
+                    # 変換の開始から数えたタイムアウトを、ジョブ全体の期限より後にしない
+                    timeout = min(timeout, deadline.expires_at - start_time)
+                schedule = AdaptivePollSchedule(expected_duration)
+                # ステータスの変化とキュー待ち・実行時間をスパンに記録する
+                trace = TransformationTrace(current_span(), start_time)
+
+                print(f"\n--- ステップ4: 変換処理の完了を待っています (最大{timeout:.0f}秒)... ---")
+                while time.time() - start_time < timeout:
+                    # Web APIで変換ステータスを取得
+                    # 長い変換の途中でトークンが期限切れにならないよう、毎回キャッシュから取得する
+                    transformation_status_response = get_transformation_status_via_api(
+                        access_token=get_access_token(KEY_ID, SECRET_KEY, PROJECT_ID),
+                        org_id=ORG_ID,
+                        project_id=PROJECT_ID,
+                        asset_id=asset.id,
+                        version_id=asset.version,
+                        dataset_id=dataset_id,
+                        transformation_id=transformation_id
+                    )
+                    status = transformation_status_response.get("status")
+                    trace.observe(status)
+                    print(f"現在のステータス: {status}")
+                    if status == "SUCCEEDED":
+                        print("変換に成功しました！")
+                        history.record(WORKFLOW_TYPE, input_size, time.time() - start_time)
+                        running_transformation_id = None
+                        break
+                    elif status == "FAILED":
+                        print("エラー: 変換に失敗しました。")
+                        running_transformation_id = None
+                        sys.exit(1)
+                    elapsed = time.time() - start_time
+                    time.sleep(min(schedule.next_delay(elapsed), max(timeout - elapsed, 0)))
+                else:
+                    raise TimeoutError("変換がタイムアウトしました。")
+
+            # --- 5. 変換後ファイルのダウンロード ---
+            with start_span("step.download"):
+                print("\n--- ステップ5: 変換されたGLTFファイルをダウンロードします ---")
+
+                print("変換後のデータセットを検索中...")
+                asset_details = unity_cloud.assets.get_asset(
+                    org_id=ORG_ID,
+                    project_id=PROJECT_ID,
+                    asset_id=asset.id
+                )
+                optimized_dataset = next(
+                    (ds for ds in asset_details.datasets if ds.name == "Optimize and convert"), None)
+
+                if not optimized_dataset:
+                    print("エラー: 'Optimize and convert' データセットが見つかりませんでした。")
+                    sys.exit(1)
+                print(f"データセットを発見しました。Dataset ID: {optimized_dataset.id}")
+
+                file_names = {f.name for f in optimized_dataset.files}
+                missing = [name for name in output_filenames if name not in file_names]
+                if missing:
+                    print(f"エラー: データセット内で {', '.join(missing)} が見つかりませんでした。")
+                    sys.exit(1)
+
+                # すべての出力形式と、.gltf が参照する .bin・テクスチャをまとめて並列にダウンロードする
+                target_files = list(optimized_dataset.files)
+                download_paths = [os.path.join(OUTPUT_FOLDER, f.name) for f in target_files]
+                print(f"ダウンロード対象ファイルを発見: {', '.join(f.name for f in target_files)}")
+
+                def download(target_file):
+                    output_path = os.path.join(OUTPUT_FOLDER, target_file.name)
+                    download_blob(target_file.get_download_url(), output_path)
+                    print(f"  ✓ {target_file.name}")
+                    return output_path
+
+                with ThreadPoolExecutor(max_workers=min(DEFAULT_FILE_DOWNLOAD_WORKERS, len(target_files))) as executor:
+                    output_paths = list(executor.map(bind_context(download), target_files))
+                for output_path in output_paths:
+                    validate_output(output_path)
+
+                print(f"\nダウンロードが完了しました！ ファイルは '{OUTPUT_FOLDER}' に保存されました。")
+
+    except (TimeoutError, KeyboardInterrupt) as e:
+        # 期限切れ・Ctrl+C・SIGTERM では変換を停止してクラウド側の変換枠を空け、途中までのダウンロードを削除する
+        print(f"\nエラー: {e}" if isinstance(e, TimeoutError) else "\n処理が中断されました。")
+        if running_transformation_id:
+            try:
+                terminate_transformation_via_api(
+                    get_access_token(KEY_ID, SECRET_KEY, PROJECT_ID), PROJECT_ID, running_transformation_id)
+            except requests.exceptions.RequestException:
+                pass
+        for path in download_paths:
+            remove_partial_downloads(path)
+        sys.exit(1)
     except Exception as e:
         print(f"\n処理中に予期せぬエラーが発生しました: {e}")
         import traceback
@@ -8,13 +8,43 @@ Unity Asset Manager - 全Web API実装版
 """
 
 import os
-import base64
 import json
 import time
 import sys
 import requests
 from dotenv import load_dotenv
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client import get_http_client
+from auth_provider import authorization_header, get_auth_provider
+from blob_transfer import (
+    DEFAULT_BLOCK_SIZE,
+    DEFAULT_UPLOAD_WORKERS,
+    BLOCK_UPLOAD_THRESHOLD,
+    upload_blob_in_blocks,
+    download_blob,
+    remove_partial_downloads,
+)
+from poll_schedule import AdaptivePollSchedule, get_transformation_history
+from conversion_cache import ConversionCache, cache_key
+from obj_dependencies import find_source_files, hash_source_files, total_size
+from obj_preflight import PreflightError, preflight_input, route_transformation
+from glb_validator import results_to_json, validate_output
+from file_index import DatasetFileIndex, TTLCache
+from tracing import TransformationTrace, bind_context, current_span, start_span, traced
+from job_deadline import Deadline, current_deadline, handle_termination_signal, use_deadline
+from job_store import (
+    JOB_CREATED,
+    JOB_UPLOADED,
+    JOB_TRANSFORMING,
+    JOB_SUCCEEDED,
+    JOB_DOWNLOADED,
+    JOB_FINALIZED,
+    JobStore,
+    job_key,
+)
+from bulk_finalizer import BULK_RESOURCE_TYPE, BULK_RESULTS_PAGE_SIZE, BulkFinalizer
 
 # .envファイルから環境変数を読み込む
 load_dotenv()
@@ -29,8 +59,68 @@ SECRET_KEY = os.getenv("UNITY_CLOUD_SECRET_KEY")
 INPUT_FILE_PATH = "assets_input/your_model.obj"
 OUTPUT_FOLDER = "assets_output"
 
-# Unity Services API Base URL
-UNITY_API_BASE = "https://services.api.unity.com"
+# Unity Services API Base URL（mock_server.py などに向ける場合は環境変数で上書きする）
+UNITY_API_BASE = os.getenv("UNITY_API_BASE", "https://services.api.unity.com")
+
+# 変換ワークフロー設定
+# OpenAPI仕様書に準拠 (Pro/Enterpriseティア用)
+# "auto" を指定すると、OBJファイルの事前チェックの結果から Free / Pro ティアを選ぶ（obj_preflight.py）
+WORKFLOW_TYPE = os.getenv("UNITY_WORKFLOW_TYPE", "higher-tier-optimize-and-convert")
+OUTPUT_DATASET_NAME = "Optimize and convert"
+
+
+def parse_export_formats(value):
+    """
+    カンマ区切りの出力形式（例: "glb,gltf,fbx"）をリストにする
+
+    Parameters
+    ----------
+    value : str
+        カンマ区切りの出力形式（先頭の . は無視する）
+
+    Returns
+    -------
+    list of str
+        小文字の出力形式（重複は除く）
+
+    Raises
+    ------
+    ValueError
+        出力形式が1つも無い場合
+    """
+    formats = []
+    for export_format in value.split(","):
+        export_format = export_format.strip().lstrip(".").lower()
+        if export_format and export_format not in formats:
+            formats.append(export_format)
+    if not formats:
+        raise ValueError(f"出力形式が指定されていません: '{value}'")
+    return formats
+
+
+# 変換結果の出力形式（カンマ区切りで複数指定すると、1回の変換ですべての形式を出力する）
+# glb だけの場合は1ファイルを、それ以外は出力データセット全体（.gltf の .bin・テクスチャなど）を取得する
+EXPORT_FORMATS = parse_export_formats(os.getenv("UNITY_EXPORT_FORMATS", "glb"))
+
+# データセット内の複数ファイルを並列にダウンロードする数
+DEFAULT_FILE_DOWNLOAD_WORKERS = 4
+
+# 入力ファイルと依存ファイル（MTL・テクスチャ）を並列にアップロードする数
+DEFAULT_FILE_UPLOAD_WORKERS = 4
+
+# データセットのファイル一覧で取得するフィールドと1ページあたりの件数
+DATASET_FILE_FIELDS = ("filePath", "fileSize", "status")
+DATASET_FILE_PAGE_SIZE = 100
+
+# 変換済みアセットに変換キー（入力内容のハッシュ＋変換パラメータ）を記録するメタデータフィールド
+CONTENT_HASH_METADATA_FIELD = os.getenv("UNITY_CONTENT_HASH_FIELD", "ConversionKey")
+
+# 変換ステータス（大文字で比較する）
+TRANSFORMATION_SUCCEEDED_STATUS = "SUCCEEDED"
+TRANSFORMATION_FAILED_STATUSES = {"FAILED", "ERROR", "TERMINATED", "SKIPPED", "TIMEDOUT"}
+
+# データセットIDとファイルの索引を同じ実行中に使い回すキャッシュ
+_file_index_cache = TTLCache()
 
 
 def log_error_response(error_response):
@@ -71,6 +161,9 @@ def get_access_token(key_id, secret_key, project_id):
     """
     サービスアカウント認証でアクセストークンを取得する
 
+    トークンはプロセス共有の認証プロバイダーにキャッシュされ、
+    有効期限が近づくまでは再度呼び出してもトークン交換を行わない。
+
     Parameters
     ----------
     key_id : str
@@ -85,56 +178,266 @@ def get_access_token(key_id, secret_key, project_id):
     str
         アクセストークン
     """
-    print("  アクセストークンを取得中...")
+    return get_auth_provider(key_id, secret_key, project_id, api_base=UNITY_API_BASE).access_token()
+
+
+@traced()
+def create_metadata_field_via_api(auth_credentials, org_id, field_name, display_name, field_type="Text"):
+    """
+    Web APIで組織のライブラリにメタデータフィールドを定義する（定義済みの場合は何もしない）
 
-    # Base64エンコード: key_id:secret_key
-    credentials = f"{key_id}:{secret_key}"
-    encoded_credentials = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    org_id : str
+        組織ID
+    field_name : str
+        フィールド名
+    display_name : str
+        表示名
+    field_type : str
+        フィールドの型（例: Text, Number, Boolean）
+
+    Returns
+    -------
+    bool
+        フィールドが作成された、または定義済みの場合は True
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/organizations/{org_id}/templates/fields"
 
-    # Token Exchange APIを呼び出し
-    url = f"{UNITY_API_BASE}/auth/v1/token-exchange"
     headers = {
-        "Authorization": f"Basic {encoded_credentials}"
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
     }
-    params = {
-        "projectId": project_id
+
+    body = {
+        "name": field_name,
+        "displayName": display_name,
+        "type": field_type
     }
 
     try:
-        response = requests.post(url, headers=headers, params=params)
+        # 定義済みの場合は409が返るため、再送しても重複しない
+        response = get_http_client().post(url, headers=headers, json=body, idempotent=True)
+        if response.status_code == 409:
+            # 定義済み
+            return True
         response.raise_for_status()
 
-        token_data = response.json()
+        print(f"  ✓ メタデータフィールド '{field_name}' を作成しました")
+        return True
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ メタデータフィールドの作成に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        return False
 
-        # レスポンス構造を確認
-        print(f"  レスポンス構造: {list(token_data.keys())}")
 
-        # 複数の可能性のあるキー名を試す
-        token = token_data.get("token") or token_data.get("accessToken") or token_data.get("access_token")
+@traced()
+def search_assets_via_api(auth_credentials, project_id, include_query, include_fields=None, limit=100, token=None,
+                          sorting_field="name", trash=False):
+    """
+    Web APIでプロジェクト内のアセットを検索する（trash=True の場合はゴミ箱内を検索する）
 
-        if not token:
-            print(f"  警告: トークンが見つかりません。レスポンス全体: {token_data}")
-            raise ValueError("アクセストークンがレスポンスに含まれていません")
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    include_query : dict
+        検索条件（AssetReadFilter.includeQuery）
+    include_fields : list of str
+        取得するフィールド
+    limit : int
+        1ページあたりの件数（最大100）
+    token : str
+        次ページのページネーショントークン
+    sorting_field : str
+        並び替えに使うフィールド
+    trash : bool
+        True の場合はゴミ箱内のアセットを検索する（POST /trash/assets/search）
+
+    Returns
+    -------
+    dict
+        検索結果（"assets" と次ページのトークン "next" を含む）
+    """
+    if trash:
+        url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/trash/assets/search"
+    else:
+        url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/search"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    pagination = {
+        "limit": limit,
+        "sortingField": sorting_field
+    }
+    if token:
+        pagination["token"] = token
+
+    body = {
+        "filter": {"includeQuery": include_query},
+        "pagination": pagination
+    }
+    if include_fields:
+        body["includeFields"] = include_fields
+
+    try:
+        # 検索は副作用が無いため再試行してよい
+        response = get_http_client().post(url, headers=headers, json=body, idempotent=True)
+        response.raise_for_status()
+
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ アセット検索に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+
+@traced()
+def trash_assets_via_api(auth_credentials, project_id, asset_ids):
+    """
+    Web APIで複数のアセットをゴミ箱へ移動する
+
+    OpenAPI仕様書に準拠: POST /assets/v1/projects/{projectId}/assets/unlink?trash=true
+    （元のプロジェクトから unlink したアセットは、trash=true の場合ゴミ箱へ移動する）
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_ids : list of str
+        ゴミ箱へ移動するアセットのID
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/unlink"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    try:
+        # ゴミ箱への移動は同じアセットに繰り返しても結果が変わらない
+        response = get_http_client().post(url, headers=headers, params={"trash": "true"},
+                                          json={"assetIds": list(asset_ids)}, idempotent=True)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ アセットのゴミ箱への移動に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+
+@traced()
+def delete_assets_from_trash_via_api(auth_credentials, project_id, asset_ids):
+    """
+    Web APIでゴミ箱内の複数のアセットを完全に削除する（元に戻せない）
+
+    OpenAPI仕様書に準拠: DELETE /assets/v1/projects/{projectId}/trash/assets?assetIds=...
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_ids : list of str
+        完全に削除するアセットのID
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/trash/assets"
 
-        print(f"  ✓ アクセストークン取得成功")
-        print(f"    トークン（最初の10文字）: {token[:10]}...")
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
 
-        return token
+    try:
+        response = get_http_client().delete(url, headers=headers, params={"assetIds": list(asset_ids)})
+        response.raise_for_status()
     except requests.exceptions.RequestException as e:
-        print(f"  ✗ アクセストークンの取得に失敗: {e}")
+        print(f"  ✗ ゴミ箱内のアセットの削除に失敗: {e}")
         if hasattr(e, 'response') and e.response is not None:
             log_error_response(e.response)
         raise
 
 
-def create_asset_via_api(auth_credentials, project_id, asset_name, primary_type="3D Model", description=""):
+@traced()
+def find_converted_asset_via_api(auth_credentials, project_id, conversion_key, output_name, export_formats,
+                                  dataset_name=OUTPUT_DATASET_NAME):
+    """
+    変換キーが記録された変換済みアセットを検索する
+
+    検索はEventual Consistencyのため、直前に作成されたアセットは見つからない場合がある。
+    変換結果のデータセットに要求したすべての出力形式のファイルが揃っているアセットだけを返す。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    conversion_key : str
+        変換キー（入力内容のハッシュ＋変換パラメータ）
+    output_name : str
+        変換パラメータの outputFileName
+    export_formats : list of str
+        要求した出力形式
+    dataset_name : str
+        変換結果のデータセット名
+
+    Returns
+    -------
+    dict or None
+        変換結果のデータセットを持つアセット情報。見つからない場合や検索に失敗した場合は None
+    """
+    try:
+        result = search_assets_via_api(
+            auth_credentials=auth_credentials,
+            project_id=project_id,
+            include_query={f"metadata.{CONTENT_HASH_METADATA_FIELD}": conversion_key},
+            include_fields=["*", "metadata", "datasets.*"],
+            limit=10
+        )
+    except requests.exceptions.RequestException:
+        # 検索できなくても通常の変換は続行できる
+        return None
+
+    expected = {f"{output_name}.{fmt}".lower() for fmt in export_formats}
+    for asset in result.get("assets") or []:
+        for ds in asset.get("datasets") or []:
+            if ds.get("name") != dataset_name:
+                continue
+            try:
+                index = get_dataset_file_index_via_api(
+                    auth_credentials, project_id, asset.get("assetId"), asset.get("assetVersion"), ds.get("datasetId"))
+            except requests.exceptions.RequestException:
+                continue
+            # 変換が途中で失敗したアセットなど、出力ファイルが揃っていないアセットは再利用しない
+            names = {os.path.basename(file_path).lower() for file_path in index.files_in(ds.get("datasetId"))}
+            if expected <= names:
+                return asset
+            print(f"    警告: 変換済みのアセット {asset.get('assetId')} には出力ファイル"
+                  f"（{', '.join(sorted(expected - names))}）が無いため、再利用しません")
+    return None
+
+
+@traced()
+def create_asset_via_api(auth_credentials, project_id, asset_name, primary_type="3D Model", description="", metadata=None):
     """
     Web APIでアセットを作成する
 
     Parameters
     ----------
-    auth_credentials : str
-        Base64エンコードされた認証情報
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
     project_id : str
         プロジェクトID
     asset_name : str
@@ -144,6 +447,8 @@ def create_asset_via_api(auth_credentials, project_id, asset_name, primary_type=
         例: "Other", "3D Model", "Audio", "Video", "2D Asset", "Script", "Material"
     description : str
         アセットの説明（オプション）
+    metadata : dict
+        カスタムメタデータ（オプション、フィールドは組織のライブラリに定義済みである必要がある）
 
     Returns
     -------
@@ -155,7 +460,7 @@ def create_asset_via_api(auth_credentials, project_id, asset_name, primary_type=
     url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets"
 
     headers = {
-        "Authorization": f"Basic {auth_credentials}",
+        "Authorization": authorization_header(auth_credentials),
         "Content-Type": "application/json"
     }
 
@@ -166,9 +471,11 @@ def create_asset_via_api(auth_credentials, project_id, asset_name, primary_type=
 
     if description:
         body["description"] = description
+    if metadata:
+        body["metadata"] = metadata
 
     try:
-        response = requests.post(url, headers=headers, json=body)
+        response = get_http_client().post(url, headers=headers, json=body)
         response.raise_for_status()
 
         asset_data = response.json()
@@ -185,14 +492,106 @@ def create_asset_via_api(auth_credentials, project_id, asset_name, primary_type=
         raise
 
 
+@traced()
+def create_asset_version_via_api(auth_credentials, project_id, asset_id, parent_version=None):
+    """
+    Web APIで既存のアセットに新しいバージョンを作成する
+
+    OpenAPI仕様書に準拠: POST /assets/v1/projects/{projectId}/assets/{assetId}/versions
+    新しいバージョンは親バージョンのSourceデータセットを参照した状態で作成される。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    parent_version : str
+        派生元のバージョン（None の場合は最新のバージョン）
+
+    Returns
+    -------
+    dict
+        作成されたバージョン情報（assetVersion, parentAssetVersion など）
+    """
+    print(f"  アセット {asset_id} の新しいバージョンを作成中...")
+
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    body = {}
+    if parent_version:
+        body["parentAssetVersion"] = parent_version
+
+    try:
+        response = get_http_client().post(url, headers=headers, json=body)
+        response.raise_for_status()
+
+        version_data = response.json()
+
+        print(f"  ✓ バージョン作成成功")
+        print(f"    Version: {version_data.get('assetVersion')} (親: {version_data.get('parentAssetVersion')})")
+
+        return version_data
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ バージョン作成に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+
+@traced()
+def update_asset_version_via_api(auth_credentials, project_id, asset_id, version_id, metadata):
+    """
+    Web APIでアセットバージョンのメタデータを更新する
+
+    OpenAPI仕様書に準拠: PATCH /assets/v1/projects/{projectId}/assets/{assetId}/versions/{assetVersion}
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    version_id : str
+        バージョンID
+    metadata : dict
+        更新するメタデータ（フィールドは組織のライブラリに定義済みである必要がある）
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    try:
+        response = get_http_client().patch(url, headers=headers, json={"metadata": metadata}, idempotent=True)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ アセットバージョンの更新に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+
+@traced()
 def create_dataset_via_api(auth_credentials, project_id, asset_id, version_id, dataset_name):
     """
     Web APIでデータセットを作成する
 
     Parameters
     ----------
-    auth_credentials : str
-        Base64エンコードされた認証情報
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
     project_id : str
         プロジェクトID
     asset_id : str
@@ -212,7 +611,7 @@ def create_dataset_via_api(auth_credentials, project_id, asset_id, version_id, d
     url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets"
 
     headers = {
-        "Authorization": f"Basic {auth_credentials}",
+        "Authorization": authorization_header(auth_credentials),
         "Content-Type": "application/json"
     }
 
@@ -221,7 +620,7 @@ def create_dataset_via_api(auth_credentials, project_id, asset_id, version_id, d
     }
 
     try:
-        response = requests.post(url, headers=headers, json=body)
+        response = get_http_client().post(url, headers=headers, json=body)
         response.raise_for_status()
 
         dataset_data = response.json()
@@ -237,14 +636,61 @@ def create_dataset_via_api(auth_credentials, project_id, asset_id, version_id, d
         raise
 
 
-def upload_file_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id, file_path):
+def get_or_create_source_dataset_id(auth_credentials, project_id, asset, dataset_name="source_obj"):
+    """
+    アセット作成レスポンスからSourceデータセットを探し、無ければ作成する
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset : dict
+        create_asset_via_api の戻り値
+    dataset_name : str
+        Sourceデータセットが無い場合に作成するデータセット名
+
+    Returns
+    -------
+    str
+        データセットID
+    """
+    # OpenAPI仕様書に準拠: CreateNewAssetResponseにはdatasetsが含まれる
+    for ds in asset.get("datasets", []):
+        # デフォルトで作成されるSourceデータセットを探す
+        if ds.get("name") == "Source" or "Source" in ds.get("systemTags", []):
+            dataset_id = ds.get("datasetId")
+            print(f"  ✓ デフォルトのSourceデータセットを使用: {dataset_id}")
+            return dataset_id
+
+    # データセットが見つからない場合は作成
+    dataset = create_dataset_via_api(
+        auth_credentials=auth_credentials,
+        project_id=project_id,
+        asset_id=asset.get("assetId"),
+        version_id=asset.get("assetVersion"),
+        dataset_name=dataset_name
+    )
+    dataset_id = dataset.get("datasetId")
+
+    if not dataset_id:
+        raise ValueError("データセット作成に失敗: IDが取得できませんでした")
+
+    return dataset_id
+
+
+@traced()
+def upload_file_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id, file_path,
+                        block_size=DEFAULT_BLOCK_SIZE, max_workers=DEFAULT_UPLOAD_WORKERS,
+                        block_upload_threshold=BLOCK_UPLOAD_THRESHOLD, dataset_file_path=None):
     """
     Web APIでファイルをアップロードする
 
     Parameters
     ----------
-    auth_credentials : str
-        Base64エンコードされた認証情報
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
     project_id : str
         プロジェクトID
     asset_id : str
@@ -255,24 +701,32 @@ def upload_file_via_api(auth_credentials, project_id, asset_id, version_id, data
         データセットID
     file_path : str
         アップロードするファイルのパス
+    block_size : int
+        ブロック単位アップロード時の1ブロックのバイト数
+    max_workers : int
+        ブロック単位アップロード時に並列に送信するブロック数
+    block_upload_threshold : int
+        このサイズを超えるファイルはブロック単位で並列アップロードする
+    dataset_file_path : str
+        データセット内のファイルパス（省略時はファイル名）
 
     Returns
     -------
     dict
         アップロード結果情報
     """
-    print(f"  ファイル '{os.path.basename(file_path)}' をアップロード中...")
+    file_name = dataset_file_path or os.path.basename(file_path)
+    print(f"  ファイル '{file_name}' をアップロード中...")
 
     # ステップ1: アップロード用の署名付きURLを取得
     # このエンドポイントはAPIパターンから推測
     url_request = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets/{dataset_id}/files"
 
     headers = {
-        "Authorization": f"Basic {auth_credentials}",
+        "Authorization": authorization_header(auth_credentials),
         "Content-Type": "application/json"
     }
 
-    file_name = os.path.basename(file_path)
     file_size = os.path.getsize(file_path)
 
     # リクエストボディ (OpenAPI仕様書に準拠)
@@ -284,7 +738,7 @@ def upload_file_via_api(auth_credentials, project_id, asset_id, version_id, data
     try:
         # 署名付きURLの取得
         print(f"    署名付きURLを取得中...")
-        response = requests.post(url_request, headers=headers, json=body)
+        response = get_http_client().post(url_request, headers=headers, json=body)
         response.raise_for_status()
 
         upload_info = response.json()
@@ -298,22 +752,34 @@ def upload_file_via_api(auth_credentials, project_id, asset_id, version_id, data
             print(f"    警告: アップロードURLが見つかりません。レスポンス: {upload_info}")
             raise ValueError("アップロードURLがレスポンスに含まれていません")
 
-        print(f"    ファイルをアップロード中... (サイズ: {file_size} bytes)")
+        if file_size > block_upload_threshold:
+            # 大きなファイルはメモリマップしてブロック単位で並列にアップロード
+            print(f"    ファイルをブロック単位でアップロード中... (サイズ: {file_size} bytes, "
+                  f"ブロックサイズ: {block_size} bytes, 並列数: {max_workers})")
+            block_count = upload_blob_in_blocks(
+                upload_url,
+                file_path,
+                block_size=block_size,
+                max_workers=max_workers
+            )
+            print(f"    ✓ {block_count} ブロックをコミットしました")
+        else:
+            print(f"    ファイルをアップロード中... (サイズ: {file_size} bytes)")
 
-        with open(file_path, 'rb') as f:
-            file_data = f.read()
+            with open(file_path, 'rb') as f:
+                file_data = f.read()
 
-        # 署名付きURLへのアップロード（Azure Blob Storage）
-        upload_headers = {
-            'Content-Type': 'application/octet-stream',
-            'x-ms-blob-type': 'BlockBlob'  # Azure Blob Storage必須ヘッダー
-        }
-        upload_response = requests.put(
-            upload_url,
-            data=file_data,
-            headers=upload_headers
-        )
-        upload_response.raise_for_status()
+            # 署名付きURLへのアップロード（Azure Blob Storage）
+            upload_headers = {
+                'Content-Type': 'application/octet-stream',
+                'x-ms-blob-type': 'BlockBlob'  # Azure Blob Storage必須ヘッダー
+            }
+            upload_response = get_http_client().put(
+                upload_url,
+                data=file_data,
+                headers=upload_headers
+            )
+            upload_response.raise_for_status()
 
         print(f"  ✓ ファイルアップロード成功")
 
@@ -323,9 +789,9 @@ def upload_file_via_api(auth_credentials, project_id, asset_id, version_id, data
         if complete_url:
             print(f"    アップロード完了を通知中...")
             complete_headers = {
-                "Authorization": f"Basic {auth_credentials}"
+                "Authorization": authorization_header(auth_credentials)
             }
-            complete_response = requests.post(complete_url, headers=complete_headers)
+            complete_response = get_http_client().post(complete_url, headers=complete_headers, idempotent=True)
             complete_response.raise_for_status()
             print(f"    ✓ アップロード完了通知成功")
 
@@ -338,14 +804,127 @@ def upload_file_via_api(auth_credentials, project_id, asset_id, version_id, data
         raise
 
 
+@traced()
+def upload_source_files_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id, source_files,
+                                max_workers=DEFAULT_FILE_UPLOAD_WORKERS):
+    """
+    入力ファイルと依存ファイル（MTL・テクスチャ）を同じデータセットへ並列にアップロードする
+
+    各ファイルはデータセット内の相対パスを保ったままアップロードするため、
+    OBJ・MTLファイル内の参照がそのまま解決される。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    version_id : str
+        バージョンID
+    dataset_id : str
+        データセットID
+    source_files : list of tuple
+        (ローカルのパス, データセット内のファイルパス) のリスト（obj_dependencies.find_source_files の戻り値）
+    max_workers : int
+        並列にアップロードするファイル数
+
+    Returns
+    -------
+    list of dict
+        ファイルごとのアップロード結果情報（source_files と同じ順）
+    """
+    def upload(source_file):
+        local_path, file_path = source_file
+        return upload_file_via_api(
+            auth_credentials=auth_credentials,
+            project_id=project_id,
+            asset_id=asset_id,
+            version_id=version_id,
+            dataset_id=dataset_id,
+            file_path=local_path,
+            dataset_file_path=file_path
+        )
+
+    if len(source_files) == 1:
+        return [upload(source_files[0])]
+
+    print(f"  {len(source_files)} ファイル（依存ファイル {len(source_files) - 1} 件を含む）を並列にアップロード中...")
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(source_files))) as executor:
+        results = list(executor.map(bind_context(upload), source_files))
+    print(f"  ✓ {len(source_files)} ファイルのアップロードが完了しました")
+    return results
+
+
+def needs_output_folder(export_formats):
+    """
+    変換結果を出力フォルダ（データセット全体）として取得する必要があるかどうか
+
+    自己完結した1ファイルになるのは glb だけの場合のみ。複数の形式や .gltf（.bin・テクスチャを伴う）は
+    出力データセットのファイルをまとめて並列に取得する。
+    """
+    return list(export_formats) != ["glb"]
+
+
+def build_transformation_params(file_path, export_formats=None):
+    """
+    入力ファイルから変換パラメータ（extraParameters）を組み立てる
+
+    Parameters
+    ----------
+    file_path : str
+        変換対象のファイルパス
+    export_formats : list of str
+        出力形式（省略時は EXPORT_FORMATS）。複数指定すると1回の変換ですべての形式を出力する
+
+    Returns
+    -------
+    dict
+        start_transformation_via_api に渡す変換パラメータ
+    """
+    # OpenAPI仕様書に準拠: extraParametersの正しい構造
+    return {
+        "outputFileName": os.path.splitext(os.path.basename(file_path))[0],
+        "exportFormats": list(export_formats or EXPORT_FORMATS)  # Freeティアではglbが標準
+        # strategy, target, mergeOptimization, meshCleaning などもオプショナル
+    }
+
+
+def check_export_files(downloaded, output_name, export_formats):
+    """
+    出力データセットからダウンロードしたファイルに、要求したすべての出力形式が含まれるか確認する
+
+    Parameters
+    ----------
+    downloaded : dict
+        データセット内のファイルパス → 保存先のパス（download_dataset_files_via_api の戻り値）
+    output_name : str
+        変換パラメータの outputFileName
+    export_formats : list of str
+        要求した出力形式
+
+    Returns
+    -------
+    list of str
+        見つからなかった出力形式
+    """
+    names = {os.path.basename(file_path).lower() for file_path in downloaded}
+    missing = [fmt for fmt in export_formats if f"{output_name}.{fmt}".lower() not in names]
+    for export_format in missing:
+        print(f"    警告: 出力形式 '{export_format}' のファイル（{output_name}.{export_format}）が出力データセットにありません")
+    return missing
+
+
+@traced()
 def start_transformation_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id, workflow_type, parameters):
     """
     Web APIで変換処理を開始する
 
     Parameters
     ----------
-    auth_credentials : str
-        Base64エンコードされた認証情報
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
     project_id : str
         プロジェクトID
     asset_id : str
@@ -370,7 +949,7 @@ def start_transformation_via_api(auth_credentials, project_id, asset_id, version
     url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets/{dataset_id}/transformations/start/{workflow_type}"
 
     headers = {
-        "Authorization": f"Basic {auth_credentials}",
+        "Authorization": authorization_header(auth_credentials),
         "Content-Type": "application/json"
     }
 
@@ -381,7 +960,7 @@ def start_transformation_via_api(auth_credentials, project_id, asset_id, version
     }
 
     try:
-        response = requests.post(url, headers=headers, json=body)
+        response = get_http_client().post(url, headers=headers, json=body)
         response.raise_for_status()
 
         transformation_data = response.json()
@@ -400,14 +979,15 @@ def start_transformation_via_api(auth_credentials, project_id, asset_id, version
         raise
 
 
+@traced()
 def get_transformation_status_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id, transformation_id):
     """
     Web APIで変換ステータスを確認する
 
     Parameters
     ----------
-    auth_credentials : str
-        Base64エンコードされた認証情報
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
     project_id : str
         プロジェクトID
     asset_id : str
@@ -427,11 +1007,11 @@ def get_transformation_status_via_api(auth_credentials, project_id, asset_id, ve
     url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets/{dataset_id}/transformations/{transformation_id}"
 
     headers = {
-        "Authorization": f"Basic {auth_credentials}"
+        "Authorization": authorization_header(auth_credentials)
     }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = get_http_client().get(url, headers=headers)
         response.raise_for_status()
 
         return response.json()
@@ -443,31 +1023,204 @@ def get_transformation_status_via_api(auth_credentials, project_id, asset_id, ve
         raise
 
 
-def get_asset_details_via_api(auth_credentials, project_id, asset_id, version_id):
+@traced()
+def list_transformations_via_api(auth_credentials, project_id, offset=0, limit=100, **filters):
     """
-    Web APIでアセットの詳細情報を取得する
+    Web APIでプロジェクト内の変換処理を一覧取得する
 
     Parameters
     ----------
-    auth_credentials : str
-        Base64エンコードされた認証情報
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
     project_id : str
         プロジェクトID
-    asset_id : str
-        アセットID
-    version_id : str
-        バージョンID
+    offset : int
+        取得開始位置
+    limit : int
+        取得件数
+    **filters
+        assetId, assetVersion, datasetId, status などの絞り込み条件
 
     Returns
     -------
-    dict
-        アセットの詳細情報
+    list of dict
+        変換ステータス情報のリスト
     """
-    # OpenAPI仕様書に準拠: エンドポイントにはversionIdが必要
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/transformations"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    params = {"offset": offset, "limit": limit}
+    params.update({k: v for k, v in filters.items() if v is not None})
+
+    try:
+        response = get_http_client().get(url, headers=headers, params=params)
+        response.raise_for_status()
+
+        return response.json()
+
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ 変換一覧の取得に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+
+@traced()
+def terminate_transformation_via_api(auth_credentials, project_id, transformation_id):
+    """
+    Web APIで実行中の変換処理を停止する
+
+    タイムアウト・中断したジョブの変換を停止し、クラウド側の変換枠を後続のジョブに空ける。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    transformation_id : str
+        変換ID
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/transformations/{transformation_id}/termination"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    try:
+        # 停止の再送は同じ結果になるため、接続エラーでも再試行する
+        response = get_http_client().post(url, headers=headers, idempotent=True)
+        response.raise_for_status()
+
+        print(f"  ✓ 変換処理を停止しました: {transformation_id}")
+
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ 変換処理の停止に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+
+@traced()
+def wait_for_transformation_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id, transformation_id,
+                                    workflow_type=WORKFLOW_TYPE, input_size=None, timeout=None, started_at=None):
+    """
+    変換処理が完了するまでステータスをポーリングする
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    version_id : str
+        バージョンID
+    dataset_id : str
+        データセットID
+    transformation_id : str
+        変換ID
+    workflow_type : str
+        ワークフロータイプ（所要時間の予測と記録に使用）
+    input_size : int
+        入力ファイルのバイト数（所要時間の予測と記録に使用）
+    timeout : float
+        タイムアウト秒数（None の場合は過去の変換所要時間から求める。ジョブの期限がある場合はその残り時間まで）
+    started_at : float
+        変換を開始した時刻（time.time()、None の場合は呼び出し時刻）
+
+    Returns
+    -------
+    dict
+        完了時の変換ステータス情報
+
+    Raises
+    ------
+    RuntimeError
+        変換が失敗した場合
+    TimeoutError
+        タイムアウト（またはジョブの期限）までに変換が完了しなかった場合
+    """
+    history = get_transformation_history()
+    expected_duration = history.predict(workflow_type, input_size)
+    if timeout is None:
+        timeout = history.timeout_for(workflow_type, input_size)
+    start_time = started_at or time.time()
+    deadline = current_deadline()
+    if deadline is not None and deadline.expires_at is not None:
+        # 変換の開始から数えたタイムアウトを、ジョブ全体の期限より後にしない
+        timeout = min(timeout, deadline.expires_at - start_time)
+    if expected_duration:
+        print(f"  予測所要時間: {expected_duration:.0f}秒 / タイムアウト: {timeout:.0f}秒")
+
+    # 最初は短い間隔で確認し、徐々に間隔を広げ、予測完了時刻の付近では再び詰める
+    schedule = AdaptivePollSchedule(expected_duration)
+    # ステータスの変化とキュー待ち・実行時間をスパンに記録する
+    trace = TransformationTrace(current_span(), start_time)
+
+    while time.time() - start_time < timeout:
+        transformation_status = get_transformation_status_via_api(
+            auth_credentials=auth_credentials,
+            project_id=project_id,
+            asset_id=asset_id,
+            version_id=version_id,
+            dataset_id=dataset_id,
+            transformation_id=transformation_id
+        )
+
+        status = transformation_status.get("status")
+        trace.observe(status)
+        print(f"  現在のステータス: {status}")
+
+        # ステータスは大文字小文字を区別しないで比較
+        if status and status.upper() == TRANSFORMATION_SUCCEEDED_STATUS:
+            print("  ✓ 変換が成功しました！")
+            # デバッグ: 変換レスポンス全体を確認
+            print(f"  変換レスポンス詳細: {json.dumps(transformation_status, indent=2, ensure_ascii=False)}")
+            history.record(workflow_type, input_size, time.time() - start_time)
+            return transformation_status
+        elif status and status.upper() in TRANSFORMATION_FAILED_STATUSES:
+            error_msg = transformation_status.get("errorMessage") or transformation_status.get("error", "不明なエラー")
+            print(f"  ✗ 変換が失敗しました: {error_msg}")
+            raise RuntimeError(f"変換が失敗しました: {error_msg}")
+
+        elapsed = time.time() - start_time
+        time.sleep(min(schedule.next_delay(elapsed), max(timeout - elapsed, 0)))
+
+    print(f"  ✗ 変換がタイムアウトしました（{timeout:.0f}秒経過）")
+    raise TimeoutError(f"変換がタイムアウトしました: {transformation_id}")
+
+
+@traced()
+def get_asset_details_via_api(auth_credentials, project_id, asset_id, version_id):
+    """
+    Web APIでアセットの詳細情報を取得する
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    version_id : str
+        バージョンID
+
+    Returns
+    -------
+    dict
+        アセットの詳細情報
+    """
+    # OpenAPI仕様書に準拠: エンドポイントにはversionIdが必要
     url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}"
 
     headers = {
-        "Authorization": f"Basic {auth_credentials}"
+        "Authorization": authorization_header(auth_credentials)
     }
 
     # データセット情報を含めるためにIncludeFieldsパラメータを追加
@@ -476,7 +1229,7 @@ def get_asset_details_via_api(auth_credentials, project_id, asset_id, version_id
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = get_http_client().get(url, headers=headers, params=params)
         response.raise_for_status()
 
         return response.json()
@@ -488,14 +1241,331 @@ def get_asset_details_via_api(auth_credentials, project_id, asset_id, version_id
         raise
 
 
+@traced()
+def get_download_urls_via_api(auth_credentials, project_id, asset_id, version_id, dataset_ids=None):
+    """
+    Web APIでアセットバージョン内の全ファイルのダウンロードURLを一括取得する
+
+    ダウンロードURLの有効期限は10分のため、取得後すぐにダウンロードすること。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    version_id : str
+        バージョンID
+    dataset_ids : list of str
+        対象のデータセットID（None の場合はすべてのデータセット）
+
+    Returns
+    -------
+    list of dict
+        datasetId, filePath, url を含むファイル情報のリスト
+    """
+    # OpenAPI仕様書に準拠: GET /versions/{assetVersion}/download-urls
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/download-urls"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    params = {}
+    if dataset_ids:
+        params["datasets"] = list(dataset_ids)
+
+    try:
+        response = get_http_client().get(url, headers=headers, params=params)
+        response.raise_for_status()
+
+        return response.json().get("files") or []
+
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ ダウンロードURLの一括取得に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+
+@traced()
+def find_dataset_id_via_api(auth_credentials, project_id, asset_id, version_id, dataset_name):
+    """
+    Web APIでデータセット名からデータセットIDを取得する
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    version_id : str
+        バージョンID
+    dataset_name : str
+        データセット名
+
+    Returns
+    -------
+    str
+        データセットID
+    """
+    key = ("dataset", project_id, asset_id, version_id, dataset_name)
+    dataset_id = _file_index_cache.get(key)
+    if dataset_id:
+        return dataset_id
+
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    params = {
+        "IncludeFields": ["datasets.*"]
+    }
+
+    try:
+        response = get_http_client().get(url, headers=headers, params=params)
+        response.raise_for_status()
+
+        for ds in response.json().get("datasets", []):
+            if ds.get("name") == dataset_name:
+                _file_index_cache.set(key, ds.get("datasetId"))
+                return ds.get("datasetId")
+
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ データセット情報の取得に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+    raise ValueError(f"データセット '{dataset_name}' が見つかりません")
+
+
+def local_path_for(output_dir, file_path):
+    """
+    データセット内のファイルパスから保存先のパスを求める（output_dir の外には出さない）
+
+    Parameters
+    ----------
+    output_dir : str
+        保存先ディレクトリ
+    file_path : str
+        データセット内のファイルパス
+
+    Returns
+    -------
+    str
+        保存先のパス
+    """
+    relative = os.path.normpath(file_path.replace("\\", "/").lstrip("/"))
+    if relative == ".." or relative.startswith(f"..{os.sep}") or os.path.isabs(relative):
+        raise ValueError(f"不正なファイルパスです: {file_path}")
+    return os.path.join(output_dir, relative)
+
+
+@traced()
+def download_dataset_files_via_api(auth_credentials, project_id, asset_id, version_id, output_dir,
+                                   dataset_name=OUTPUT_DATASET_NAME, dataset_id=None,
+                                   max_workers=DEFAULT_FILE_DOWNLOAD_WORKERS):
+    """
+    Web APIでデータセット内の全ファイル（.glb と .bin・テクスチャなど）を並列にダウンロードする
+
+    ダウンロードURLは download-urls で一括取得するため、ファイル数に関係なく
+    API呼び出しはデータセットIDの解決（dataset_id 指定時は不要）とURL取得の最大2回で済む。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    version_id : str
+        バージョンID
+    output_dir : str
+        保存先ディレクトリ（データセット内のディレクトリ構成を保って保存する）
+    dataset_name : str
+        データセット名
+    dataset_id : str
+        データセットID（分かっている場合はデータセット名からの検索を省略する）
+    max_workers : int
+        並列にダウンロードするファイル数
+
+    Returns
+    -------
+    dict
+        データセット内のファイルパス → 保存先のパス
+    """
+    print(f"  データセット '{dataset_name}' の全ファイルをダウンロード中...")
+
+    if not dataset_id:
+        dataset_id = find_dataset_id_via_api(auth_credentials, project_id, asset_id, version_id, dataset_name)
+
+    files = [
+        file_info for file_info in get_download_urls_via_api(
+            auth_credentials, project_id, asset_id, version_id, dataset_ids=[dataset_id])
+        if file_info.get("datasetId") in (None, dataset_id) and file_info.get("url")
+    ]
+    if not files:
+        raise ValueError(f"データセット '{dataset_name}' にダウンロードできるファイルがありません")
+    print(f"    ✓ {len(files)} ファイルのダウンロードURLを取得しました")
+
+    def fetch(file_info):
+        local_path = local_path_for(output_dir, file_info["filePath"])
+        size = download_blob(file_info["url"], local_path)
+        print(f"    ✓ {file_info['filePath']} ({size} bytes)")
+        return file_info["filePath"], local_path
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="get-file") as executor:
+        downloaded = dict(executor.map(bind_context(fetch), files))
+
+    print(f"  ✓ {len(downloaded)} ファイルをダウンロードしました: {output_dir}")
+    return downloaded
+
+
+@traced()
+def iter_dataset_files_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id,
+                               include_fields=DATASET_FILE_FIELDS, page_size=DATASET_FILE_PAGE_SIZE):
+    """
+    Web APIでデータセット内のファイル情報を1件ずつ取得する（ページは next トークンで辿る）
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    version_id : str
+        バージョンID
+    dataset_id : str
+        データセットID
+    include_fields : tuple of str
+        取得するフィールド
+    page_size : int
+        1ページあたりの件数
+
+    Yields
+    ------
+    dict
+        ファイル情報
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets/{dataset_id}/files"
+
+    token = None
+    while True:
+        headers = {
+            "Authorization": authorization_header(auth_credentials)
+        }
+        params = {
+            "includeFields": list(include_fields),
+            "limit": page_size,
+            "token": token
+        }
+
+        try:
+            response = get_http_client().get(url, headers=headers, params=params)
+            response.raise_for_status()
+            page = response.json()
+
+        except requests.exceptions.RequestException as e:
+            print(f"  ✗ ファイル一覧の取得に失敗: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                log_error_response(e.response)
+            raise
+
+        yield from page.get("results") or []
+
+        token = page.get("next")
+        if not token:
+            return
+
+
+@traced()
+def get_dataset_file_index_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id, refresh=False):
+    """
+    Web APIでデータセット内のファイル一覧を取得し、索引を作成する
+
+    同じデータセットの索引は UNITY_FILE_INDEX_TTL 秒の間キャッシュから返す。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    version_id : str
+        バージョンID
+    dataset_id : str
+        データセットID
+    refresh : bool
+        True の場合はキャッシュを使わずに取得し直す
+
+    Returns
+    -------
+    DatasetFileIndex
+        ファイルの索引
+    """
+    key = ("files", project_id, asset_id, version_id, dataset_id)
+    index = None if refresh else _file_index_cache.get(key)
+    if index is None:
+        index = DatasetFileIndex()
+        for file_info in iter_dataset_files_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id):
+            index.add(file_info, [dataset_id])
+        _file_index_cache.set(key, index)
+    return index
+
+
+def find_dataset_file(asset_details, dataset_name, file_name):
+    """
+    アセット詳細の files フィールドからデータセット内の対象ファイルを探す
+
+    ファイル名が一致するものが無い場合は、データセット内の最初のGLB/GLTFファイルを使う。
+
+    Parameters
+    ----------
+    asset_details : dict
+        アセット詳細情報（files, datasets フィールドを含む）
+    dataset_name : str
+        データセット名
+    file_name : str
+        探すファイル名
+
+    Returns
+    -------
+    tuple(dict, str)
+        ファイル情報とデータセットID
+    """
+    index = DatasetFileIndex.from_asset_details(asset_details)
+    print(f"    Asset内の全ファイル数: {index.file_count}")
+
+    dataset_id = index.dataset_id_for(dataset_name)
+    target_file = index.find(file_name, dataset_id) if dataset_id else None
+
+    if not target_file:
+        raise ValueError(f"ファイル '{file_name}' がデータセット '{dataset_name}' 内に見つかりません")
+
+    return target_file, dataset_id
+
+
+@traced()
 def download_file_via_api(auth_credentials, project_id, asset_id, version_id, dataset_name, file_name, output_path):
     """
     Web APIで変換後のファイルをダウンロードする
 
     Parameters
     ----------
-    auth_credentials : str
-        Base64エンコードされた認証情報
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
     project_id : str
         プロジェクトID
     asset_id : str
@@ -517,67 +1587,27 @@ def download_file_via_api(auth_credentials, project_id, asset_id, version_id, da
     print(f"  ファイル '{file_name}' をダウンロード中...")
 
     try:
-        # ステップ1: アセット詳細を取得（filesフィールドを含む）
-        print(f"    アセット詳細を取得中...")
-
-        asset_url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}"
-        headers = {"Authorization": f"Basic {auth_credentials}"}
-        params = {
-            "IncludeFields": ["*", "datasets", "datasets.*", "files", "files.*"]
-        }
+        # ステップ1: データセットのファイル一覧から対象ファイルを検索
+        print(f"    ファイル一覧を取得中...")
+        headers = {"Authorization": authorization_header(auth_credentials)}
 
-        asset_response = requests.get(asset_url, headers=headers, params=params)
-        asset_response.raise_for_status()
-        asset_details = asset_response.json()
-
-        # ステップ2: filesフィールドから対象ファイルを検索
-        files_list = asset_details.get("files", [])
-        print(f"    Asset内の全ファイル数: {len(files_list)}")
-
-        target_file = None
-        dataset_id = None
-
-        for file_info in files_list:
-            file_path_value = file_info.get("filePath")
-            print(f"      - {file_path_value} (status: {file_info.get('status')})")
-
-            # ファイル名が一致するかチェック
-            if file_path_value == file_name or file_path_value.endswith(file_name):
-                # このファイルが属するデータセットIDを取得
-                dataset_ids = file_info.get("datasetIds", [])
-                if dataset_ids:
-                    # データセット名と一致するか確認
-                    datasets = asset_details.get("datasets", [])
-                    for ds in datasets:
-                        if ds.get("datasetId") in dataset_ids and ds.get("name") == dataset_name:
-                            target_file = file_info
-                            dataset_id = ds.get("datasetId")
-                            break
-
-                if target_file:
-                    break
+        dataset_id = find_dataset_id_via_api(auth_credentials, project_id, asset_id, version_id, dataset_name)
+        index = get_dataset_file_index_via_api(auth_credentials, project_id, asset_id, version_id, dataset_id)
+        target_file = index.find(file_name, dataset_id)
 
         if not target_file:
-            # ファイル名が完全一致しない場合、最初のGLB/GLTFファイルを検索
-            print(f"    完全一致するファイルが見つかりません。GLB/GLTFファイルを検索中...")
-            for file_info in files_list:
-                file_path_value = file_info.get("filePath", "")
-                if file_path_value.endswith('.glb') or file_path_value.endswith('.gltf'):
-                    dataset_ids = file_info.get("datasetIds", [])
-                    if dataset_ids:
-                        datasets = asset_details.get("datasets", [])
-                        for ds in datasets:
-                            if ds.get("datasetId") in dataset_ids and ds.get("name") == dataset_name:
-                                print(f"    代わりに '{file_path_value}' を使用します")
-                                target_file = file_info
-                                dataset_id = ds.get("datasetId")
-                                break
-
-                    if target_file:
-                        break
-
-        if not target_file or not dataset_id:
-            raise ValueError(f"ファイル '{file_name}' がデータセット '{dataset_name}' 内に見つかりません")
+            # ステップ2: 変換直後はファイル一覧が空の場合があるため、アセット詳細のfilesフィールドから検索
+            print(f"    ファイル一覧に見つかりません。アセット詳細を取得中...")
+            _file_index_cache.invalidate(("files", project_id, asset_id, version_id, dataset_id))
+
+            asset_url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}"
+            params = {
+                "IncludeFields": ["datasets.*", "files.*"]
+            }
+
+            asset_response = get_http_client().get(asset_url, headers=headers, params=params)
+            asset_response.raise_for_status()
+            target_file, dataset_id = find_dataset_file(asset_response.json(), dataset_name, file_name)
 
         print(f"    ✓ ファイル発見: {target_file.get('filePath')}")
         print(f"    ✓ データセットID: {dataset_id}")
@@ -588,7 +1618,7 @@ def download_file_via_api(auth_credentials, project_id, asset_id, version_id, da
         download_url_endpoint = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/{asset_id}/versions/{version_id}/datasets/{dataset_id}/files/{file_path_encoded}/download-url"
 
         print(f"    ダウンロードURLを取得中...")
-        url_response = requests.get(download_url_endpoint, headers=headers)
+        url_response = get_http_client().get(download_url_endpoint, headers=headers)
         url_response.raise_for_status()
 
         url_data = url_response.json()
@@ -599,18 +1629,12 @@ def download_file_via_api(auth_credentials, project_id, asset_id, version_id, da
 
         print(f"    ✓ ダウンロードURL取得成功")
 
-        # ステップ4: ファイルをダウンロード
+        # ステップ4: 一時ファイルへストリーミングで保存し、完了後に output_path へリネーム
         print(f"    ファイルをダウンロード中...")
-        response = requests.get(download_url)
-        response.raise_for_status()
-
-        # ステップ5: ファイルを保存
-        os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else ".", exist_ok=True)
-        with open(output_path, "wb") as f:
-            f.write(response.content)
+        downloaded_size = download_blob(download_url, output_path)
 
         print(f"  ✓ ファイルダウンロード成功: {output_path}")
-        print(f"    ファイルサイズ: {len(response.content)} bytes")
+        print(f"    ファイルサイズ: {downloaded_size} bytes")
 
         return output_path
 
@@ -624,6 +1648,197 @@ def download_file_via_api(auth_credentials, project_id, asset_id, version_id, da
         raise
 
 
+@traced()
+def get_bulk_operation_definitions_via_api(auth_credentials, org_id, resource_type=BULK_RESOURCE_TYPE):
+    """
+    Web APIで一括操作に使える操作の定義を取得する
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    org_id : str
+        組織ID
+    resource_type : str
+        操作対象のリソースの種類
+
+    Returns
+    -------
+    list of dict
+        操作の定義（type, description, operationArguments など）
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/organizations/{org_id}/bulk/definitions"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    try:
+        response = get_http_client().get(url, headers=headers, params={"resourceType": resource_type})
+        response.raise_for_status()
+
+        return response.json().get("operationDefinitions") or []
+
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ 一括操作の定義の取得に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+
+@traced()
+def create_bulk_operation_via_api(auth_credentials, project_id, asset_versions, operations, submit_on_completion=True):
+    """
+    Web APIで複数のアセットバージョンに対する一括操作を作成する
+
+    OpenAPI仕様書に準拠: POST /assets/v1/projects/{projectId}/assets/versions/bulk
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_versions : list of tuple
+        (アセットID, バージョンID) のリスト
+    operations : list of dict
+        操作（operationType, operationArguments）のリスト
+    submit_on_completion : bool
+        操作の完了後にアセットバージョンを Submit するかどうか
+
+    Returns
+    -------
+    str
+        一括操作のID（bulkId）
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/projects/{project_id}/assets/versions/bulk"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials),
+        "Content-Type": "application/json"
+    }
+
+    body = {
+        "assetVersions": [{"assetId": asset_id, "assetVersion": version_id} for asset_id, version_id in asset_versions],
+        "operations": operations,
+        "submitOnCompletion": submit_on_completion
+    }
+
+    try:
+        response = get_http_client().post(url, headers=headers, json=body)
+        response.raise_for_status()
+
+        bulk_id = response.json().get("bulkId")
+        if not bulk_id:
+            raise ValueError("一括操作の作成に失敗: bulkId が取得できませんでした")
+        print(f"  ✓ 一括操作を作成しました: {bulk_id}（アセットバージョン {len(asset_versions)} 件）")
+        return bulk_id
+
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ 一括操作の作成に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+
+@traced()
+def get_bulk_operation_via_api(auth_credentials, org_id, bulk_id, offset=0, limit=BULK_RESULTS_PAGE_SIZE):
+    """
+    Web APIで一括操作のステータスとアセットバージョンごとの結果を取得する
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    org_id : str
+        組織ID
+    bulk_id : str
+        一括操作のID
+    offset : int
+        結果の取得開始位置
+    limit : int
+        結果の取得件数
+
+    Returns
+    -------
+    dict
+        一括操作の情報（status, failReasons, results, total）
+    """
+    url = f"{UNITY_API_BASE}/assets/v1/organizations/{org_id}/bulk/{bulk_id}"
+
+    headers = {
+        "Authorization": authorization_header(auth_credentials)
+    }
+
+    try:
+        response = get_http_client().get(url, headers=headers, params={"offset": offset, "limit": limit})
+        response.raise_for_status()
+
+        return response.json()
+
+    except requests.exceptions.RequestException as e:
+        print(f"  ✗ 一括操作のステータス取得に失敗: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error_response(e.response)
+        raise
+
+
+def download_outputs_via_api(auth_credentials, project_id, asset_id, version_id, output_path, export_formats=None,
+                             all_outputs=False):
+    """
+    Web APIで変換結果をダウンロードする（1ファイル、または出力データセット全体）
+
+    glb だけを出力した場合は output_path へ1ファイルを、複数の出力形式や all_outputs の場合は
+    output_path をディレクトリとして出力データセットの全ファイルを並列にダウンロードする。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    asset_id : str
+        アセットID
+    version_id : str
+        バージョンID
+    output_path : str
+        保存先のパス（出力フォルダとして取得する場合はディレクトリ）
+    export_formats : list of str
+        変換で要求した出力形式（省略時は EXPORT_FORMATS）
+    all_outputs : bool
+        glb だけの場合も出力データセット全体を取得するかどうか
+
+    Returns
+    -------
+    list of str
+        保存されたファイルのパス
+    """
+    export_formats = export_formats or EXPORT_FORMATS
+    if not (all_outputs or needs_output_folder(export_formats)):
+        download_file_via_api(
+            auth_credentials=auth_credentials,
+            project_id=project_id,
+            asset_id=asset_id,
+            version_id=version_id,
+            dataset_name=OUTPUT_DATASET_NAME,
+            file_name=os.path.basename(output_path),
+            output_path=output_path
+        )
+        return [output_path]
+
+    # ダウンロードURLを一括取得し、すべての出力形式（と .bin・テクスチャなど）を並列に取得する
+    downloaded = download_dataset_files_via_api(
+        auth_credentials=auth_credentials,
+        project_id=project_id,
+        asset_id=asset_id,
+        version_id=version_id,
+        output_dir=output_path
+    )
+    check_export_files(downloaded, os.path.basename(output_path), export_formats)
+    return list(downloaded.values())
+
+
+@traced("main_webapi.main")
 def main():
     """
     メイン処理：OBJファイルのアップロード、GLTF変換、ダウンロードの完全なワークフロー
@@ -632,6 +1847,9 @@ def main():
     print("Unity Asset Manager - 完全REST API実装版")
     print("="*60)
 
+    # SIGTERM でも Ctrl+C と同じく変換を停止してから終了する
+    handle_termination_signal()
+
     # --- 0. 事前チェック ---
     required_configs = [ORG_ID, PROJECT_ID, KEY_ID, SECRET_KEY]
     if not all(required_configs):
@@ -651,207 +1869,323 @@ def main():
     print(f"  Key ID: {KEY_ID[:8]}...")
     print(f"  入力ファイル: {INPUT_FILE_PATH}")
     print(f"  出力フォルダ: {OUTPUT_FOLDER}")
+    print(f"  出力形式: {', '.join(EXPORT_FORMATS)}")
 
-    try:
-        # === ステップ1: 認証情報の準備 ===
-        print("\n" + "-"*60)
-        print("ステップ1: 認証情報の準備")
-        print("-"*60)
-
-        # Basic認証用の認証情報を作成
-        credentials = f"{KEY_ID}:{SECRET_KEY}"
-        auth_credentials = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
-        print("  ✓ Basic認証情報を作成しました")
-
-        # === ステップ2: アセット作成 ===
-        print("\n" + "-"*60)
-        print("ステップ2: アセット作成")
-        print("-"*60)
-
-        asset_name = f"Web API - {os.path.basename(INPUT_FILE_PATH)}"
-        asset = create_asset_via_api(
-            auth_credentials=auth_credentials,
-            project_id=PROJECT_ID,
-            asset_name=asset_name,
-            description="REST API経由でアップロードされた3Dモデル"
-        )
-
-        asset_id = asset.get("assetId")
-        version_id = asset.get("assetVersion")
-
-        if not asset_id or not version_id:
-            raise ValueError("アセット作成に失敗: IDまたはバージョンが取得できませんでした")
-
-        # === ステップ3: データセット取得/作成 ===
-        print("\n" + "-"*60)
-        print("ステップ3: データセット取得/作成")
-        print("-"*60)
-
-        # OpenAPI仕様書に準拠: CreateNewAssetResponseにはdatasetsが含まれる
-        dataset_id = None
-        datasets = asset.get("datasets", [])
-
-        if datasets:
-            # デフォルトで作成されるSourceデータセットを探す
-            for ds in datasets:
-                if ds.get("name") == "Source" or "Source" in ds.get("systemTags", []):
-                    dataset_id = ds.get("datasetId")
-                    print(f"  ✓ デフォルトのSourceデータセットを使用: {dataset_id}")
-                    break
-
-        # データセットが見つからない場合は作成
-        if not dataset_id:
-            dataset = create_dataset_via_api(
-                auth_credentials=auth_credentials,
-                project_id=PROJECT_ID,
-                asset_id=asset_id,
-                version_id=version_id,
-                dataset_name="source_obj"
-            )
-            dataset_id = dataset.get("datasetId")
-
-        if not dataset_id:
-            raise ValueError("データセット作成に失敗: IDが取得できませんでした")
-
-        # === ステップ4: ファイルアップロード ===
-        print("\n" + "-"*60)
-        print("ステップ4: ファイルアップロード")
-        print("-"*60)
-
-        upload_file_via_api(
-            auth_credentials=auth_credentials,
-            project_id=PROJECT_ID,
-            asset_id=asset_id,
-            version_id=version_id,
-            dataset_id=dataset_id,
-            file_path=INPUT_FILE_PATH
-        )
-
-        # === ステップ5: 変換処理の開始 ===
-        print("\n" + "-"*60)
-        print("ステップ5: GLTF変換処理の開始")
-        print("-"*60)
-
-        # OpenAPI仕様書に準拠: free-tier-optimize-and-convertはglbをデフォルト出力
-        output_filename = f"{os.path.splitext(os.path.basename(INPUT_FILE_PATH))[0]}.glb"
-
-        # OpenAPI仕様書に準拠: extraParametersの正しい構造
-        transformation_params = {
-            "outputFileName": os.path.splitext(os.path.basename(INPUT_FILE_PATH))[0],
-            "exportFormats": ["glb"]  # Freeティアではglbが標準
-            # strategy, target, mergeOptimization, meshCleaning などもオプショナル
-        }
-
-        transformation = start_transformation_via_api(
-            auth_credentials=auth_credentials,
-            project_id=PROJECT_ID,
-            asset_id=asset_id,
-            version_id=version_id,
-            dataset_id=dataset_id,
-            workflow_type="higher-tier-optimize-and-convert",  # OpenAPI仕様書に準拠 (Pro/Enterpriseティア用)
-            parameters=transformation_params
-        )
-
-        # OpenAPI仕様書に準拠: レスポンスフィールドは "transformationId"
-        transformation_id = transformation.get("transformationId")
+    # === 変換キャッシュの確認 ===
+    # 同じ内容・同じパラメータで変換済みであれば、ネットワークに触れずに出力する
+    # OpenAPI仕様書に準拠: free-tier-optimize-and-convertはglbをデフォルト出力
+    # 複数の出力形式（UNITY_EXPORT_FORMATS）は1回の変換で出力し、出力フォルダへまとめてダウンロードする
+    output_name = os.path.splitext(os.path.basename(INPUT_FILE_PATH))[0]
+    output_path = os.path.join(OUTPUT_FOLDER, output_name if needs_output_folder(EXPORT_FORMATS) else f"{output_name}.glb")
 
-        if not transformation_id:
-            raise ValueError("変換処理の開始に失敗: Transformation IDが取得できませんでした")
-
-        # === ステップ5.5: AutoSubmitを有効化（変換完了後に自動的にSubmit） ===
-        print("\n" + "-"*60)
-        print("ステップ5.5: AutoSubmitを有効化")
-        print("-"*60)
-
-        autosubmit_url = f"{UNITY_API_BASE}/assets/v1/projects/{PROJECT_ID}/assets/{asset_id}/versions/{version_id}/autosubmit"
-        autosubmit_headers = {
-            "Authorization": f"Basic {auth_credentials}",
-            "Content-Type": "application/json"
-        }
-        autosubmit_body = {
-            "changeLog": "REST API経由でOBJからGLBに変換"
-        }
-
-        try:
-            autosubmit_response = requests.post(autosubmit_url, headers=autosubmit_headers, json=autosubmit_body)
-            autosubmit_response.raise_for_status()
-            print("  ✓ AutoSubmit有効化成功（変換完了後に自動的にSubmitされます）")
-        except requests.exceptions.RequestException as e:
-            print(f"  警告: AutoSubmit有効化に失敗: {e}")
-            # AutoSubmit失敗は致命的ではないので続行
-
-        # === ステップ6: 変換ステータスのポーリング ===
-        print("\n" + "-"*60)
-        print("ステップ6: 変換処理の完了を待機 (最大5分)")
-        print("-"*60)
-
-        start_time = time.time()
-        timeout = 300  # 5分
-
-        while time.time() - start_time < timeout:
-            transformation_status = get_transformation_status_via_api(
-                auth_credentials=auth_credentials,
-                project_id=PROJECT_ID,
-                asset_id=asset_id,
-                version_id=version_id,
-                dataset_id=dataset_id,
-                transformation_id=transformation_id
-            )
+    # OBJファイルを事前チェックし、壊れた入力はアセットを作成する前に失敗させる
+    # ワークフロータイプが auto の場合は、ポリゴン数などからティアと削減パラメータを選ぶ
+    try:
+        preflight = preflight_input(INPUT_FILE_PATH)
+    except PreflightError as e:
+        print(f"\nエラー: {e}")
+        sys.exit(1)
+    workflow_type, transformation_params = route_transformation(
+        preflight, WORKFLOW_TYPE, build_transformation_params(INPUT_FILE_PATH))
 
-            status = transformation_status.get("status")
-            print(f"  現在のステータス: {status}")
-
-            # ステータスは大文字小文字を区別しないで比較
-            if status and status.upper() == "SUCCEEDED":
-                print("  ✓ 変換が成功しました！")
-                # デバッグ: 変換レスポンス全体を確認
-                print(f"  変換レスポンス詳細: {json.dumps(transformation_status, indent=2, ensure_ascii=False)}")
-                break
-            elif status and status.upper() == "FAILED":
-                error_msg = transformation_status.get("error", "不明なエラー")
-                print(f"  ✗ 変換が失敗しました: {error_msg}")
-                sys.exit(1)
-
-            time.sleep(10)  # 10秒待機
-        else:
-            print("  ✗ 変換がタイムアウトしました（5分経過）")
-            sys.exit(1)
+    # OBJファイルが参照するマテリアル・テクスチャも変換キーに含め、一緒にアップロードする
+    source_files = find_source_files(INPUT_FILE_PATH)
 
-        # === ステップ7: 変換後ファイルのダウンロード ===
-        print("\n" + "-"*60)
-        print("ステップ7: 変換後ファイルのダウンロード")
-        print("-"*60)
+    cache = ConversionCache()
+    conversion_key = cache_key(hash_source_files(source_files), workflow_type, transformation_params)
 
-        output_path = os.path.join(OUTPUT_FOLDER, output_filename)
+    # 途中で終了した場合に次回の実行で再開できるよう、ジョブの状態を記録する
+    jobs = JobStore()
+    key = job_key(conversion_key, output_path)
+    job = jobs.get(key)
 
-        # データセット名を "Optimize and convert" に変更
-        download_file_via_api(
-            auth_credentials=auth_credentials,
-            project_id=PROJECT_ID,
-            asset_id=asset_id,
-            version_id=version_id,
-            dataset_name="Optimize and convert",
-            file_name=output_filename,  # これで.glbファイルを検索
-            output_path=output_path
-        )
+    # ファイナライズが終わっていないジョブは、キャッシュから出力したうえでファイナライズだけをやり直す
+    if cache.materialize(conversion_key, output_path) and not (job and job["state"] == JOB_DOWNLOADED):
+        print(f"\n✓ 変換キャッシュにヒットしました。変換をスキップします: {output_path}")
+        cache.print_stats()
+        jobs.close()
+        return
 
-        # === 完了 ===
-        print("\n" + "="*60)
-        print("すべての処理が完了しました！")
-        print("="*60)
-        print(f"\n作成されたリソース:")
-        print(f"  Asset ID: {asset_id}")
-        print(f"  Version ID: {version_id}")
-        print(f"  Dataset ID: {dataset_id}")
-        print(f"  Transformation ID: {transformation_id}")
-        print(f"\n出力ファイル:")
-        print(f"  {output_path}")
+    # アップロードからダウンロードまでのすべてのステップで、1つの期限（UNITY_JOB_DEADLINE）を使う
+    deadline = Deadline()
+    auth_credentials = None
+    state = transformation_id = None
 
+    try:
+        with use_deadline(deadline):
+            # === ステップ1: 認証情報の準備 ===
+            with start_span("step.authenticate"):
+                print("\n" + "-"*60)
+                print("ステップ1: 認証情報の準備")
+                print("-"*60)
+
+                # アクセストークンを一度だけ取得し、以降は期限前にバックグラウンドで更新する
+                auth_credentials = get_auth_provider(KEY_ID, SECRET_KEY, PROJECT_ID, api_base=UNITY_API_BASE)
+                print("  ✓ 認証プロバイダーを準備しました")
+
+            # === ステップ1.5: 中断したジョブの確認・変換済みアセットの検索 ===
+            with start_span("step.find_existing"):
+                print("\n" + "-"*60)
+                print("ステップ1.5: 中断したジョブの確認・変換済みアセットの検索")
+                print("-"*60)
+
+                if job:
+                    # 前回の実行が途中で終了していれば、作成済みのアセット・変換をそのまま使う
+                    state = job["state"]
+                    asset_id = job["asset_id"]
+                    version_id = job["version_id"]
+                    dataset_id = job["dataset_id"]
+                    transformation_id = job["transformation_id"]
+                    transformation_started_at = job["transformation_started_at"]
+                    print(f"  ✓ 中断したジョブを再開します（状態: {state}, Asset ID: {asset_id}）")
+                else:
+                    state = None
+                    asset_id = version_id = dataset_id = transformation_id = transformation_started_at = None
+
+                    # 変換キーを記録するメタデータフィールドが使えない場合は検索・記録を行わない
+                    dedupe_enabled = create_metadata_field_via_api(
+                        auth_credentials=auth_credentials,
+                        org_id=ORG_ID,
+                        field_name=CONTENT_HASH_METADATA_FIELD,
+                        display_name="Conversion Key"
+                    )
+                    existing_asset = None
+                    if dedupe_enabled:
+                        existing_asset = find_converted_asset_via_api(
+                            auth_credentials=auth_credentials,
+                            project_id=PROJECT_ID,
+                            conversion_key=conversion_key,
+                            output_name=transformation_params["outputFileName"],
+                            export_formats=transformation_params["exportFormats"]
+                        )
+
+                    if existing_asset:
+                        # 他のマシンで変換済みのアセットがあれば、アップロードと変換を省略してダウンロードする
+                        # 再実行時はダウンロードから再開できるよう、変換済みのジョブとして記録する
+                        asset_id = existing_asset.get("assetId")
+                        version_id = existing_asset.get("assetVersion")
+                        print(f"  ✓ 変換済みのアセットが見つかりました: {asset_id}")
+                        state = JOB_SUCCEEDED
+                        jobs.advance(key, state, input_path=INPUT_FILE_PATH, output_path=output_path,
+                                     workflow_type=workflow_type, asset_id=asset_id, version_id=version_id)
+                    else:
+                        print("  変換済みのアセットは見つかりませんでした")
+
+            asset = None
+            if state is None:
+                # === ステップ2: アセット作成 ===
+                with start_span("step.create_asset"):
+                    print("\n" + "-"*60)
+                    print("ステップ2: アセット作成")
+                    print("-"*60)
+
+                    asset_name = f"Web API - {os.path.basename(INPUT_FILE_PATH)}"
+                    asset = create_asset_via_api(
+                        auth_credentials=auth_credentials,
+                        project_id=PROJECT_ID,
+                        asset_name=asset_name,
+                        description="REST API経由でアップロードされた3Dモデル",
+                        # 他のマシンからも変換済みアセットを検索できるよう変換キーを記録する
+                        metadata={CONTENT_HASH_METADATA_FIELD: conversion_key} if dedupe_enabled else None
+                    )
+
+                    asset_id = asset.get("assetId")
+                    version_id = asset.get("assetVersion")
+
+                    if not asset_id or not version_id:
+                        raise ValueError("アセット作成に失敗: IDまたはバージョンが取得できませんでした")
+
+                    state = JOB_CREATED
+                    jobs.advance(key, state, input_path=INPUT_FILE_PATH, output_path=output_path,
+                                 workflow_type=workflow_type, asset_id=asset_id, version_id=version_id)
+
+            if not dataset_id and state == JOB_CREATED:
+                # === ステップ3: データセット取得/作成 ===
+                with start_span("step.dataset"):
+                    print("\n" + "-"*60)
+                    print("ステップ3: データセット取得/作成")
+                    print("-"*60)
+
+                    if asset is None:
+                        # 再開時はアセット作成のレスポンスが無いため、アセット詳細からデータセットを探す
+                        asset = get_asset_details_via_api(auth_credentials, PROJECT_ID, asset_id, version_id)
+                        asset.update(assetId=asset_id, assetVersion=version_id)
+
+                    dataset_id = get_or_create_source_dataset_id(
+                        auth_credentials=auth_credentials,
+                        project_id=PROJECT_ID,
+                        asset=asset
+                    )
+                    jobs.advance(key, state, dataset_id=dataset_id)
+
+            if state == JOB_CREATED:
+                # === ステップ4: ファイルアップロード ===
+                with start_span("step.upload"):
+                    print("\n" + "-"*60)
+                    print("ステップ4: ファイルアップロード")
+                    print("-"*60)
+
+                    upload_source_files_via_api(
+                        auth_credentials=auth_credentials,
+                        project_id=PROJECT_ID,
+                        asset_id=asset_id,
+                        version_id=version_id,
+                        dataset_id=dataset_id,
+                        source_files=source_files
+                    )
+
+                    state = JOB_UPLOADED
+                    jobs.advance(key, state)
+
+            if state == JOB_UPLOADED:
+                # === ステップ5: 変換処理の開始 ===
+                with start_span("step.start_transformation"):
+                    print("\n" + "-"*60)
+                    print("ステップ5: GLTF変換処理の開始")
+                    print("-"*60)
+
+                    transformation_started_at = time.time()
+                    transformation = start_transformation_via_api(
+                        auth_credentials=auth_credentials,
+                        project_id=PROJECT_ID,
+                        asset_id=asset_id,
+                        version_id=version_id,
+                        dataset_id=dataset_id,
+                        workflow_type=workflow_type,
+                        parameters=transformation_params
+                    )
+
+                    # OpenAPI仕様書に準拠: レスポンスフィールドは "transformationId"
+                    transformation_id = transformation.get("transformationId")
+
+                    if not transformation_id:
+                        raise ValueError("変換処理の開始に失敗: Transformation IDが取得できませんでした")
+
+                    state = JOB_TRANSFORMING
+                    jobs.advance(key, state, transformation_id=transformation_id,
+                                 transformation_started_at=transformation_started_at)
+
+            if state == JOB_TRANSFORMING:
+                # === ステップ6: 変換ステータスのポーリング ===
+                with start_span("step.wait_transformation"):
+                    print("\n" + "-"*60)
+                    print("ステップ6: 変換処理の完了を待機")
+                    print("-"*60)
+
+                    if job and job["state"] == JOB_TRANSFORMING:
+                        # 前回開始した変換にそのまま再接続する
+                        print(f"  前回開始した変換に再接続します: {transformation_id}")
+
+                    try:
+                        wait_for_transformation_via_api(
+                            auth_credentials=auth_credentials,
+                            project_id=PROJECT_ID,
+                            asset_id=asset_id,
+                            version_id=version_id,
+                            dataset_id=dataset_id,
+                            transformation_id=transformation_id,
+                            workflow_type=workflow_type,
+                            input_size=total_size(source_files),
+                            started_at=transformation_started_at
+                        )
+                    except RuntimeError as e:
+                        # 変換が失敗した場合は、次回はアップロード済みのファイルで変換だけをやり直す
+                        jobs.rewind(key, JOB_UPLOADED, error=str(e))
+                        raise
+
+                    state = JOB_SUCCEEDED
+                    jobs.advance(key, state)
+
+            if state in (JOB_DOWNLOADED, JOB_FINALIZED) and os.path.exists(output_path):
+                # 前回の実行でダウンロード・検証済みの出力はそのまま使う
+                print(f"\n  ✓ ダウンロード済みの出力を使います: {output_path}")
+            else:
+                # === ステップ7: 変換後ファイルのダウンロード ===
+                with start_span("step.download"):
+                    print("\n" + "-"*60)
+                    print("ステップ7: 変換後ファイルのダウンロード")
+                    print("-"*60)
+
+                    # "Optimize and convert" データセットから .glb（複数の出力形式の場合はすべてのファイル）を取得する
+                    download_outputs_via_api(
+                        auth_credentials=auth_credentials,
+                        project_id=PROJECT_ID,
+                        asset_id=asset_id,
+                        version_id=version_id,
+                        output_path=output_path
+                    )
+
+                    # 壊れたGLBファイル（途中で切れたファイルなど）は削除してエラーにする
+                    # ジョブは succeeded のままのため、再実行するとダウンロードからやり直す
+                    validation = validate_output(output_path)
+                    jobs.advance(key, JOB_DOWNLOADED, validation=results_to_json(validation))
+                    if state != JOB_FINALIZED:
+                        state = JOB_DOWNLOADED
+
+                    # 次回以降の同じ変換のためにキャッシュへ保存
+                    cache.store(conversion_key, output_path)
+
+            # === ステップ8: ファイナライズ（ラベル付け・メタデータ付与・Submit） ===
+            # 変換中の AutoSubmit は失敗するため、ダウンロードの完了後に一括操作でまとめて行う
+            # 前回の実行でファイナライズ済みのジョブは、同じ一括操作を送り直さない
+            with start_span("step.finalize"):
+                finalizer = BulkFinalizer(
+                    auth_credentials, ORG_ID, PROJECT_ID,
+                    get_definitions=get_bulk_operation_definitions_via_api,
+                    create_operation=create_bulk_operation_via_api,
+                    get_operation=get_bulk_operation_via_api,
+                    jobs=jobs
+                )
+                if finalizer.enabled and state != JOB_FINALIZED:
+                    print("\n" + "-"*60)
+                    print("ステップ8: ファイナライズ")
+                    print("-"*60)
+
+                    with finalizer:
+                        finalizer.add(asset_id, version_id, job_key=key)
+                    finalizer.print_stats()
+                    if finalizer.failed:
+                        # ジョブは downloaded のままのため、再実行するとファイナライズをやり直す
+                        raise RuntimeError("ファイナライズに失敗しました")
+
+            # === 完了 ===
+            print("\n" + "="*60)
+            print("すべての処理が完了しました！")
+            print("="*60)
+            print(f"\n作成されたリソース:")
+            print(f"  Asset ID: {asset_id}")
+            print(f"  Version ID: {version_id}")
+            print(f"  Dataset ID: {dataset_id}")
+            print(f"  Transformation ID: {transformation_id}")
+            print(f"\n出力ファイル:")
+            print(f"  {output_path}")
+            print()
+            get_http_client().print_connection_stats()
+            cache.print_stats()
+
+    except (TimeoutError, KeyboardInterrupt) as e:
+        # 期限切れ・Ctrl+C・SIGTERM では変換を停止してクラウド側の変換枠を空け、途中までのダウンロードを削除する
+        reason = str(e) if isinstance(e, TimeoutError) else "中断されました"
+        print(f"\n\n✗ {reason}")
+        if state == JOB_TRANSFORMING and transformation_id:
+            try:
+                terminate_transformation_via_api(auth_credentials, PROJECT_ID, transformation_id)
+                # 次回はアップロード済みのファイルで変換だけをやり直す
+                jobs.rewind(key, JOB_UPLOADED, error=reason)
+            except requests.exceptions.RequestException:
+                print("  警告: 変換を停止できませんでした。次回の実行で変換に再接続します")
+        if remove_partial_downloads(output_path):
+            print(f"  途中までダウンロードしたファイルを削除しました: {output_path}")
+        print("  同じコマンドを再実行すると、完了したステップの続きから再開します")
+        sys.exit(1)
     except Exception as e:
         print(f"\n\n✗ エラーが発生しました: {e}")
+        print("  同じコマンドを再実行すると、完了したステップの続きから再開します")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        jobs.close()
 
 
 if __name__ == "__main__":
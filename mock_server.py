@@ -0,0 +1,1169 @@
+"""
+Unity Asset Manager - ローカルのモックサーバー
+
+doc/AssetManagerAPIv1.yaml のうち、各スクリプトが使用するエンドポイントを
+メモリ上（Blobは一時ディレクトリ）で再現します。Unity Cloud の認証情報が無くても、
+環境変数 `UNITY_API_BASE` をこのサーバーに向けるだけで、アップロードから変換・ダウンロードまでを実行できます。
+
+- トークン交換: POST /auth/v1/token-exchange
+- メタデータフィールド: POST /assets/v1/organizations/{organizationId}/templates/fields
+- アセット: POST /assets、POST /assets/search、GET・PATCH /assets/{assetId}/versions/{assetVersion}、
+  POST /assets/{assetId}/versions（新しいバージョン）
+- ゴミ箱: POST /assets/unlink（trash=true でゴミ箱へ移動）、POST /trash/assets/search、DELETE /trash/assets
+- データセット: POST .../datasets
+- ファイル: POST・GET .../datasets/{datasetId}/files、POST .../files/{filePath}/finalize、
+  GET .../files/{filePath}/download-url、GET .../download-urls
+- 変換: POST .../transformations/start/{workflowType}、GET .../transformations/{transformationId}、
+  GET /projects/{projectId}/transformations、POST /projects/{projectId}/transformations/{transformationId}/termination
+- AutoSubmit: POST .../autosubmit（変換が完了していないアセットバージョンは 400）
+- 一括操作: GET /organizations/{organizationId}/bulk/definitions、POST /projects/{projectId}/assets/versions/bulk、
+  GET /organizations/{organizationId}/bulk/{bulkId}
+- Blob（署名付きURLの代わり）: PUT（一括・Put Block・Put Block List）、GET（Range対応）、HEAD
+
+応答の遅延、変換の所要時間・失敗率、5xx・429 の注入、Blob転送の帯域を MockConfig で設定できます。
+変換結果は入力と同じサイズのバイナリチャンクを持つ、構造上有効な GLB ファイルとして生成します。
+
+使い方:
+    python mock_server.py --port 8080 --latency 0.05 --transformation-duration 5
+    UNITY_API_BASE=http://127.0.0.1:8080 python batch_webapi.py assets_input/
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import fnmatch
+import random
+import shutil
+import struct
+import argparse
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+from xml.etree import ElementTree
+
+# 変換結果を出力するデータセット名（main_webapi.OUTPUT_DATASET_NAME と同じ）
+OUTPUT_DATASET_NAME = "Optimize and convert"
+
+# Blobの読み書きとレスポンス送信の単位
+TRANSFER_CHUNK_SIZE = 64 * 1024
+
+# サイズ指定の単位（"64KB"、"4MiB" など）
+_SIZE_UNITS = {
+    "": 1, "B": 1,
+    "K": 1000, "KB": 1000, "KIB": 1024,
+    "M": 1000 ** 2, "MB": 1000 ** 2, "MIB": 1024 ** 2,
+    "G": 1000 ** 3, "GB": 1000 ** 3, "GIB": 1024 ** 3,
+}
+
+
+def parse_size(value):
+    """
+    "64KB"、"4MiB"、"1048576" のようなサイズ指定をバイト数に変換する
+
+    Parameters
+    ----------
+    value : str or int
+        サイズ指定
+
+    Returns
+    -------
+    int
+        バイト数
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r"\s*([\d.]+)\s*([A-Za-z]*)\s*", value)
+    if not match or match.group(2).upper() not in _SIZE_UNITS:
+        raise ValueError(f"不正なサイズ指定です: {value}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def write_glb(path, bin_size):
+    """
+    bin_size バイトのバイナリチャンクを持つ最小限の GLB（glTF 2.0 バイナリ）を書き込む
+
+    バイナリチャンクは疎ファイルとして確保するため、大きなサイズでも高速に作成できる。
+
+    Parameters
+    ----------
+    path : str
+        出力先のパス
+    bin_size : int
+        バイナリチャンクのバイト数（4バイト境界に切り上げる）
+    """
+    bin_size = (bin_size + 3) & ~3
+    document = {"asset": {"version": "2.0", "generator": "unity-asset-manager-mock"}}
+    if bin_size:
+        document["buffers"] = [{"byteLength": bin_size}]
+    json_chunk = json.dumps(document, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+
+    total = 12 + 8 + len(json_chunk) + (8 + bin_size if bin_size else 0)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sII", b"glTF", 2, total))
+        f.write(struct.pack("<I4s", len(json_chunk), b"JSON"))
+        f.write(json_chunk)
+        if bin_size:
+            f.write(struct.pack("<I4s", bin_size, b"BIN\x00"))
+            f.truncate(total)
+
+
+def write_sparse_file(path, size):
+    """
+    size バイトの疎ファイル（中身はすべて0）を書き込む
+    """
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+
+def write_gltf(path, bin_name, bin_size):
+    """
+    bin_size バイトの外部バイナリ（bin_name）を参照する最小限の glTF（JSON）を書き込む
+    """
+    document = {
+        "asset": {"version": "2.0", "generator": "unity-asset-manager-mock"},
+        "buffers": [{"uri": bin_name, "byteLength": bin_size}],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, separators=(",", ":"))
+
+
+@dataclass
+class MockConfig:
+    """
+    モックサーバーの動作設定
+
+    latency / latency_jitter はすべてのリクエストに、error_rate / throttle_rate は
+    Blob以外のAPIリクエストに、bandwidth はBlobの送受信に適用する。
+    """
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    transformation_queue_time: float = 0.0
+    transformation_duration: float = 2.0
+    transformation_failure_rate: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 1.0
+    bandwidth: int = 0
+    seed: int = None
+
+
+class BandwidthLimiter:
+    """
+    サーバー全体で共有する転送帯域の上限（バイト/秒、0 は無制限）
+
+    複数スレッドから共有して使用できる。
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def consume(self, size):
+        """size バイトの転送が帯域内に収まるまで待つ"""
+        if not self.rate or size <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next_at, now)
+            self._next_at = start + size / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+@dataclass
+class MockRequest:
+    """ルーティング済みのAPIリクエスト（params はURLパスのパラメータ）"""
+    params: dict
+    query: dict
+    body: dict
+    headers: object
+
+
+class MockError(Exception):
+    """APIのエラーレスポンスとして返す例外"""
+
+    def __init__(self, status, title, detail=None, headers=None):
+        super().__init__(detail or title)
+        self.status = status
+        self.title = title
+        self.detail = detail
+        self.headers = headers or {}
+
+
+class MockAssetManager:
+    """
+    モックサーバーが保持するアセット・データセット・ファイル・変換・Blobの状態
+
+    複数スレッドから共有して使用できる。
+
+    Parameters
+    ----------
+    config : MockConfig
+        動作設定
+    blob_dir : str
+        Blobを保存するディレクトリ
+    """
+
+    def __init__(self, config, blob_dir):
+        self.config = config
+        self.blob_dir = blob_dir
+        self.base_url = None
+        self.bandwidth = BandwidthLimiter(config.bandwidth)
+        self._random = random.Random(config.seed)
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """すべてのアセット・変換・Blobと統計を消去する"""
+        with self._lock:
+            self.fields = set()
+            self.assets = {}
+            self.transformations = {}
+            self.bulk_operations = {}
+            self.blobs = {}
+            self.stats = {"requests": 0, "api_requests": 0, "injected_errors": 0, "injected_throttles": 0,
+                          "bytes_received": 0, "bytes_sent": 0, "routes": {}}
+            for name in os.listdir(self.blob_dir):
+                path = os.path.join(self.blob_dir, name)
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+
+    # --- 共通処理 ---
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def count_route(self, route):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["routes"][route] = self.stats["routes"].get(route, 0) + 1
+
+    def simulate_latency(self):
+        delay = self.config.latency
+        if self.config.latency_jitter:
+            with self._lock:
+                delay += self._random.uniform(0, self.config.latency_jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def inject_fault(self):
+        """
+        設定された割合で 429 または 503 を発生させる
+
+        Raises
+        ------
+        MockError
+            注入したエラー
+        """
+        with self._lock:
+            self.stats["api_requests"] += 1
+            roll = self._random.random()
+        if roll < self.config.throttle_rate:
+            self.count("injected_throttles")
+            raise MockError(429, "Too Many Requests", headers={"Retry-After": f"{self.config.retry_after:g}"})
+        if roll < self.config.throttle_rate + self.config.error_rate:
+            self.count("injected_errors")
+            raise MockError(503, "Service Unavailable", "モックサーバーが注入したエラーです")
+
+    def _asset(self, asset_id, version_id):
+        asset = self.assets.get((asset_id, version_id))
+        if asset is None or asset.get("_trashed"):
+            raise MockError(404, "Not Found", f"アセットが見つかりません: {asset_id}/{version_id}")
+        return asset
+
+    def _dataset(self, asset, dataset_id):
+        dataset = asset["datasets"].get(dataset_id)
+        if dataset is None:
+            raise MockError(404, "Not Found", f"データセットが見つかりません: {dataset_id}")
+        return dataset
+
+    def _new_dataset(self, asset, name, system_tags=()):
+        dataset_id = uuid.uuid4().hex
+        asset["datasets"][dataset_id] = {
+            "datasetId": dataset_id,
+            "name": name,
+            "systemTags": list(system_tags),
+            "files": {}
+        }
+        return asset["datasets"][dataset_id]
+
+    def _new_blob(self):
+        blob_id = uuid.uuid4().hex
+        self.blobs[blob_id] = {"path": os.path.join(self.blob_dir, blob_id), "blocks": {}, "etag": None}
+        return blob_id
+
+    def blob_url(self, blob_id):
+        # 署名付きURLと同様に、クエリに署名（ダミー）を含める
+        return f"{self.base_url}/blob/{blob_id}?sig=mock"
+
+    def _file_info(self, dataset_id, file):
+        info = {key: value for key, value in file.items() if not key.startswith("_")}
+        info["datasetIds"] = [dataset_id]
+        return info
+
+    # --- 認証・メタデータ ---
+
+    def token_exchange(self, request):
+        if not request.headers.get("Authorization", "").startswith("Basic "):
+            raise MockError(401, "Unauthorized", "Basic認証情報がありません")
+        return 200, {"accessToken": f"mock-{uuid.uuid4().hex}", "expiresIn": 3600}
+
+    def create_field(self, request):
+        org_id = request.params["org_id"]
+        name = request.body.get("name")
+        with self._lock:
+            if (org_id, name) in self.fields:
+                raise MockError(409, "Conflict", f"フィールド '{name}' は定義済みです")
+            self.fields.add((org_id, name))
+        return 201, {"name": name}
+
+    # --- アセット・データセット ---
+
+    def create_asset(self, request):
+        body = request.body
+        with self._lock:
+            asset_id = uuid.uuid4().hex
+            asset = {
+                "assetId": asset_id,
+                "assetVersion": "1",
+                "projectId": request.params["project_id"],
+                "name": body.get("name"),
+                "description": body.get("description"),
+                "primaryType": body.get("primaryType"),
+                "metadata": dict(body.get("metadata") or {}),
+                "autoSubmit": False,
+                "status": "Draft",
+                "labels": [],
+                "created": _now_iso(),
+                "datasets": {}
+            }
+            self.assets[(asset_id, asset["assetVersion"])] = asset
+            source = self._new_dataset(asset, "Source", system_tags=["Source"])
+        return 200, {
+            "assetId": asset_id,
+            "assetVersion": asset["assetVersion"],
+            "datasets": [{"datasetId": source["datasetId"], "name": source["name"],
+                          "systemTags": source["systemTags"]}]
+        }
+
+    def _matches_query(self, asset, include_query):
+        for key, condition in include_query.items():
+            if key.startswith("metadata."):
+                if asset["metadata"].get(key.split(".", 1)[1]) != condition:
+                    return False
+            elif key == "name":
+                if not fnmatch.fnmatchcase(asset["name"] or "", condition.get("value") or ""):
+                    return False
+            elif key == "labels":
+                if condition.get("value") not in asset["labels"]:
+                    return False
+            elif key == "created":
+                for date_condition in condition.get("conditions") or []:
+                    value = date_condition.get("value") or ""
+                    if date_condition.get("conditionType") == "lessThan" and not asset["created"] < value:
+                        return False
+                    if date_condition.get("conditionType") == "greaterThanOrEqual" and not asset["created"] >= value:
+                        return False
+        return True
+
+    def _search(self, request, trashed):
+        project_id = request.params["project_id"]
+        include_query = (request.body.get("filter") or {}).get("includeQuery") or {}
+        pagination = request.body.get("pagination") or {}
+        limit = pagination.get("limit") or 100
+        offset = int(pagination.get("token") or 0)
+        with self._lock:
+            matches = [self._asset_details(asset) for asset in self.assets.values()
+                       if asset["projectId"] == project_id
+                       and bool(asset.get("_trashed")) == trashed
+                       and self._matches_query(asset, include_query)]
+        # ページングのトークンは次のページの開始位置とする
+        next_token = str(offset + limit) if offset + limit < len(matches) else None
+        return 200, {"assets": matches[offset:offset + limit], "next": next_token}
+
+    def search_assets(self, request):
+        return self._search(request, trashed=False)
+
+    def search_trash(self, request):
+        return self._search(request, trashed=True)
+
+    def unlink_assets(self, request):
+        asset_ids = set(request.body.get("assetIds") or [])
+        trash = (request.query.get("trash") or ["false"])[0].lower() == "true"
+        with self._lock:
+            for key, asset in list(self.assets.items()):
+                if key[0] not in asset_ids or asset["projectId"] != request.params["project_id"]:
+                    continue
+                if trash:
+                    asset["_trashed"] = True
+                else:
+                    self._remove_asset(key)
+        return 200, {}
+
+    def delete_trash(self, request):
+        asset_ids = set(request.query.get("assetIds") or [])
+        with self._lock:
+            for key, asset in list(self.assets.items()):
+                if key[0] in asset_ids and asset.get("_trashed"):
+                    self._remove_asset(key)
+        return 200, {}
+
+    def _remove_asset(self, key):
+        del self.assets[key]
+        # 削除したアセットバージョンの変換は結果を書き込む先が無いため、一覧からも消す
+        for transformation_id, transformation in list(self.transformations.items()):
+            if (transformation["assetId"], transformation["assetVersion"]) == key:
+                del self.transformations[transformation_id]
+
+    def _asset_details(self, asset):
+        self._settle_asset(asset["assetId"])
+        datasets, files = [], []
+        for dataset in asset["datasets"].values():
+            dataset_files = [self._file_info(dataset["datasetId"], f) for f in dataset["files"].values()]
+            datasets.append({"datasetId": dataset["datasetId"], "name": dataset["name"],
+                             "systemTags": dataset["systemTags"], "files": dataset_files})
+            files.extend(dataset_files)
+        return {
+            "assetId": asset["assetId"],
+            "assetVersion": asset["assetVersion"],
+            "name": asset["name"],
+            "description": asset["description"],
+            "primaryType": asset["primaryType"],
+            "metadata": asset["metadata"],
+            "autoSubmit": asset["autoSubmit"],
+            "status": asset["status"],
+            "labels": asset["labels"],
+            "created": asset["created"],
+            "datasets": datasets,
+            "files": files
+        }
+
+    def create_version(self, request):
+        asset_id = request.params["asset_id"]
+        with self._lock:
+            versions = {version: asset for (key, version), asset in self.assets.items() if key == asset_id}
+            if not versions:
+                raise MockError(404, "Not Found", f"アセットが見つかりません: {asset_id}")
+            latest = max(versions, key=int)
+            parent_version = request.body.get("parentAssetVersion") or latest
+            parent = self._asset(asset_id, parent_version)
+
+            # Sourceデータセットは親バージョンのものを参照する（ファイルの一覧だけを複製する）
+            version_id = str(int(latest) + 1)
+            asset = dict(parent, assetVersion=version_id, metadata=dict(parent["metadata"]), autoSubmit=False,
+                         status="Draft", labels=[], created=_now_iso(), datasets={})
+            for dataset_id, dataset in parent["datasets"].items():
+                if "Source" in dataset["systemTags"]:
+                    asset["datasets"][dataset_id] = dict(dataset, files=dict(dataset["files"]))
+            self.assets[(asset_id, version_id)] = asset
+        return 200, {"assetVersion": version_id, "parentAssetVersion": parent_version,
+                     "parentVersionNumber": int(parent_version)}
+
+    def update_asset(self, request):
+        with self._lock:
+            asset = self._asset(request.params["asset_id"], request.params["version_id"])
+            for key in ("name", "description", "primaryType"):
+                if request.body.get(key) is not None:
+                    asset[key] = request.body[key]
+            asset["metadata"].update(request.body.get("metadata") or {})
+        return 200, {}
+
+    def get_asset(self, request):
+        with self._lock:
+            return 200, self._asset_details(self._asset(request.params["asset_id"], request.params["version_id"]))
+
+    def create_dataset(self, request):
+        with self._lock:
+            asset = self._asset(request.params["asset_id"], request.params["version_id"])
+            dataset = self._new_dataset(asset, request.body.get("name") or "dataset")
+        return 200, {"datasetId": dataset["datasetId"]}
+
+    def autosubmit(self, request):
+        with self._lock:
+            asset = self._asset(request.params["asset_id"], request.params["version_id"])
+            self._require_settled(asset)
+            asset["autoSubmit"] = True
+            asset["status"] = "Submitted"
+        return 200, {}
+
+    def _require_settled(self, asset):
+        """変換が完了していないアセットバージョンは Submit できない"""
+        self._settle_asset(asset["assetId"])
+        if any(t["assetId"] == asset["assetId"] and t["assetVersion"] == asset["assetVersion"] and not t["_done"]
+               for t in self.transformations.values()):
+            raise MockError(400, "Bad Request", "変換中のアセットバージョンは Submit できません")
+
+    # --- 一括操作 ---
+
+    def bulk_definitions(self, request):
+        resource_type = request.query.get("resourceType", [None])[0]
+        definitions = [
+            {"type": "AssignLabels", "description": "ラベルを付与する",
+             "operationArguments": {"labelNames": []}, "resourceType": "AssetVersion"},
+            {"type": "UpdateMetadata", "description": "メタデータを更新する",
+             "operationArguments": {"metadata": {}}, "resourceType": "AssetVersion"},
+        ]
+        return 200, {"operationDefinitions": [d for d in definitions
+                                              if resource_type in (None, d["resourceType"])]}
+
+    def create_bulk_operation(self, request):
+        body = request.body
+        operations = body.get("operations") or []
+        submit = bool(body.get("submitOnCompletion"))
+        unknown = [op.get("operationType") for op in operations
+                   if op.get("operationType") not in ("AssignLabels", "UpdateMetadata")]
+        if unknown:
+            raise MockError(400, "Bad Request", f"不明な一括操作です: {unknown[0]}")
+
+        results = []
+        with self._lock:
+            for asset_version in body.get("assetVersions") or []:
+                asset_id, version_id = asset_version.get("assetId"), asset_version.get("assetVersion")
+                fail_reason = None
+                try:
+                    asset = self._asset(asset_id, version_id)
+                    if submit:
+                        self._require_settled(asset)
+                except MockError as e:
+                    fail_reason = e.detail
+                    asset = None
+                for operation in operations or [{"operationType": None}]:
+                    if asset is not None:
+                        arguments = operation.get("operationArguments") or {}
+                        if operation["operationType"] == "AssignLabels":
+                            asset["labels"].extend(name for name in arguments.get("labelNames") or []
+                                                   if name not in asset["labels"])
+                        elif operation["operationType"] == "UpdateMetadata":
+                            asset["metadata"].update(arguments.get("metadata") or {})
+                    results.append({
+                        "assetId": asset_id,
+                        "assetVersion": version_id,
+                        "operationType": operation["operationType"],
+                        "status": "Failed" if fail_reason else "Completed",
+                        "failReason": fail_reason,
+                        "submitOnCompletion": submit
+                    })
+                if asset is not None and submit:
+                    asset["status"] = "Submitted"
+
+            failed = sum(1 for result in results if result["status"] == "Failed")
+            bulk_id = uuid.uuid4().hex
+            self.bulk_operations[bulk_id] = {
+                "bulkId": bulk_id,
+                "status": "Completed" if not failed else ("Failed" if failed == len(results) else "PartiallyCompleted"),
+                "failReasons": sorted({r["failReason"] for r in results if r["failReason"]}),
+                "results": results
+            }
+        return 200, {"bulkId": bulk_id}
+
+    def get_bulk_operation(self, request):
+        offset = int(request.query.get("offset", ["0"])[0])
+        limit = int(request.query.get("limit", ["100"])[0])
+        with self._lock:
+            operation = self.bulk_operations.get(request.params["bulk_id"])
+            if operation is None:
+                raise MockError(404, "Not Found", f"一括操作が見つかりません: {request.params['bulk_id']}")
+            return 200, {
+                "status": operation["status"],
+                "failReasons": operation["failReasons"],
+                "results": operation["results"][offset:offset + limit],
+                "total": len(operation["results"])
+            }
+
+    # --- ファイル ---
+
+    def create_file(self, request):
+        file_path = request.body.get("filePath")
+        if not file_path:
+            raise MockError(400, "Bad Request", "filePath は必須です")
+        with self._lock:
+            dataset = self._dataset(self._asset(request.params["asset_id"], request.params["version_id"]),
+                                    request.params["dataset_id"])
+            blob_id = self._new_blob()
+            dataset["files"][file_path] = {
+                "filePath": file_path,
+                "status": "Draft",
+                "fileSize": 0,
+                "created": _now_iso(),
+                "_blob": blob_id
+            }
+        return 200, {"uploadUrl": self.blob_url(blob_id)}
+
+    def list_files(self, request):
+        asset_id, dataset_id = request.params["asset_id"], request.params["dataset_id"]
+        limit = int(request.query.get("limit", ["100"])[0])
+        offset = int(request.query.get("token", ["0"])[0] or 0)
+        with self._lock:
+            asset = self._asset(asset_id, request.params["version_id"])
+            self._settle_asset(asset_id)
+            dataset = self._dataset(asset, dataset_id)
+            files = [self._file_info(dataset_id, f) for f in dataset["files"].values()]
+        page = files[offset:offset + limit]
+        next_token = str(offset + limit) if offset + limit < len(files) else None
+        return 200, {"results": page, "total": len(files), "next": next_token}
+
+    def _file(self, params):
+        dataset = self._dataset(self._asset(params["asset_id"], params["version_id"]), params["dataset_id"])
+        file_path = params["file_path"]
+        file = dataset["files"].get(file_path)
+        if file is None:
+            raise MockError(404, "Not Found", f"ファイルが見つかりません: {file_path}")
+        return file
+
+    def finalize_file(self, request):
+        with self._lock:
+            self._file(request.params)["status"] = "Uploaded"
+        return 204, None
+
+    def download_url(self, request):
+        with self._lock:
+            file = self._file(request.params)
+        return 200, {"url": self.blob_url(file["_blob"]), "isOriginalImage": True}
+
+    def download_urls(self, request):
+        dataset_ids = set(request.query.get("datasets", []))
+        with self._lock:
+            asset = self._asset(request.params["asset_id"], request.params["version_id"])
+            self._settle_asset(asset["assetId"])
+            files = [
+                {"datasetId": dataset["datasetId"], "filePath": file["filePath"],
+                 "url": self.blob_url(file["_blob"]), "isOriginalImage": True}
+                for dataset in asset["datasets"].values()
+                if not dataset_ids or dataset["datasetId"] in dataset_ids
+                for file in dataset["files"].values()
+            ]
+        return 200, {"files": files}
+
+    # --- 変換 ---
+
+    def start_transformation(self, request):
+        params = request.params
+        extra = request.body.get("extraParameters") or {}
+        with self._lock:
+            dataset = self._dataset(self._asset(params["asset_id"], params["version_id"]), params["dataset_id"])
+            input_files = [f for f in dataset["files"].values() if os.path.exists(self.blobs[f["_blob"]]["path"])]
+            if not input_files:
+                raise MockError(400, "Bad Request", "データセットにアップロード済みのファイルがありません")
+            input_file = input_files[0]
+            output_name = extra.get("outputFileName") or os.path.splitext(input_file["filePath"])[0]
+            transformation_id = uuid.uuid4().hex
+            self.transformations[transformation_id] = {
+                "id": transformation_id,
+                "projectId": params["project_id"],
+                "assetId": params["asset_id"],
+                "assetVersion": params["version_id"],
+                "inputDatasetId": params["dataset_id"],
+                "inputFiles": [f["filePath"] for f in input_files],
+                "outputDatasetId": None,
+                "workflowType": params["workflow_type"],
+                "status": "Pending",
+                "errorMessage": None,
+                "progress": 0,
+                "createdOn": _now_iso(),
+                "updatedAt": _now_iso(),
+                "startedAt": None,
+                "_started": time.time(),
+                "_fails": self._random.random() < self.config.transformation_failure_rate,
+                "_input_size": sum(f["fileSize"] for f in input_files),
+                "_output_name": output_name,
+                "_export_formats": extra.get("exportFormats") or ["glb"],
+                "_done": False
+            }
+        return 200, {"transformationId": transformation_id}
+
+    def _settle_asset(self, asset_id):
+        for transformation in self.transformations.values():
+            if transformation["assetId"] == asset_id:
+                self._settle(transformation)
+
+    def _settle(self, transformation):
+        """経過時間から変換のステータスを進め、完了時は変換結果のデータセットを作成する"""
+        if transformation["_done"]:
+            return
+        elapsed = time.time() - transformation["_started"]
+        queue_time = self.config.transformation_queue_time
+        duration = self.config.transformation_duration
+
+        if elapsed < queue_time:
+            return
+        if transformation["startedAt"] is None:
+            transformation["startedAt"] = _now_iso()
+        if elapsed < queue_time + duration:
+            transformation["status"] = "Running"
+            transformation["progress"] = int(100 * (elapsed - queue_time) / duration) if duration else 0
+            transformation["updatedAt"] = _now_iso()
+            return
+
+        transformation["_done"] = True
+        transformation["updatedAt"] = _now_iso()
+        if transformation["_fails"]:
+            transformation["status"] = "Failed"
+            transformation["errorMessage"] = "モックサーバーが注入した変換エラーです"
+            return
+
+        asset = self.assets[(transformation["assetId"], transformation["assetVersion"])]
+        output = next((ds for ds in asset["datasets"].values() if ds["name"] == OUTPUT_DATASET_NAME), None)
+        if output is None:
+            output = self._new_dataset(asset, OUTPUT_DATASET_NAME)
+        self._write_outputs(output, transformation)
+        transformation["outputDatasetId"] = output["datasetId"]
+        transformation["status"] = "Succeeded"
+        transformation["progress"] = 100
+
+    def _write_outputs(self, output, transformation):
+        """exportFormats の形式ごとに、変換結果のファイルを出力データセットに作成する"""
+        name = transformation["_output_name"]
+        size = transformation["_input_size"]
+        for export_format in transformation["_export_formats"]:
+            if export_format == "glb":
+                self._add_output_file(output, f"{name}.glb", lambda path: write_glb(path, size))
+            elif export_format == "gltf":
+                bin_size = (size + 3) & ~3
+                self._add_output_file(output, f"{name}.bin", lambda path: write_sparse_file(path, bin_size))
+                self._add_output_file(output, f"{name}.gltf", lambda path: write_gltf(path, f"{name}.bin", bin_size))
+            else:
+                # その他の形式（fbx、usdz など）は入力と同じサイズのダミーのファイルにする
+                self._add_output_file(output, f"{name}.{export_format}", lambda path: write_sparse_file(path, size))
+
+    def _add_output_file(self, dataset, file_path, write):
+        blob_id = self._new_blob()
+        write(self.blobs[blob_id]["path"])
+        dataset["files"][file_path] = {
+            "filePath": file_path,
+            "status": "Uploaded",
+            "fileSize": os.path.getsize(self.blobs[blob_id]["path"]),
+            "created": _now_iso(),
+            "_blob": blob_id
+        }
+
+    def _transformation_info(self, transformation):
+        self._settle(transformation)
+        return {key: value for key, value in transformation.items() if not key.startswith("_")}
+
+    def get_transformation(self, request):
+        transformation_id = request.params["transformation_id"]
+        with self._lock:
+            transformation = self.transformations.get(transformation_id)
+            if transformation is None:
+                raise MockError(404, "Not Found", f"変換が見つかりません: {transformation_id}")
+            return 200, self._transformation_info(transformation)
+
+    def list_transformations(self, request):
+        project_id, query = request.params["project_id"], request.query
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["100"])[0])
+        filters = {key: query[key][0] for key in ("assetId", "assetVersion", "status") if key in query}
+        dataset_id = query.get("datasetId", [None])[0]
+        with self._lock:
+            # 新しい変換から順に返す
+            items = [self._transformation_info(t) for t in reversed(list(self.transformations.values()))
+                     if t["projectId"] == project_id]
+        items = [t for t in items
+                 if all(str(t.get(k)).lower() == v.lower() for k, v in filters.items())
+                 and (dataset_id is None or t["inputDatasetId"] == dataset_id)]
+        return 200, items[offset:offset + limit]
+
+    def terminate_transformation(self, request):
+        transformation_id = request.params["transformation_id"]
+        with self._lock:
+            transformation = self.transformations.get(transformation_id)
+            if transformation is None or transformation["projectId"] != request.params["project_id"]:
+                raise MockError(404, "Not Found", f"変換が見つかりません: {transformation_id}")
+            self._settle(transformation)
+            if transformation["_done"]:
+                raise MockError(400, "Bad Request", f"変換は終了しています: {transformation['status']}")
+            transformation["_done"] = True
+            transformation["status"] = "Terminated"
+            transformation["updatedAt"] = _now_iso()
+        return 204, None
+
+    # --- Blob ---
+
+    def blob(self, blob_id):
+        with self._lock:
+            blob = self.blobs.get(blob_id)
+        if blob is None:
+            raise MockError(404, "BlobNotFound", f"Blobが見つかりません: {blob_id}")
+        return blob
+
+    def commit_blocks(self, blob, body):
+        try:
+            block_ids = [element.text for element in ElementTree.fromstring(body)]
+        except ElementTree.ParseError as e:
+            raise MockError(400, "InvalidXmlDocument", str(e))
+        missing = [block_id for block_id in block_ids if block_id not in blob["blocks"]]
+        if missing:
+            raise MockError(400, "InvalidBlockList", f"未送信のブロックがあります: {missing[0]}")
+
+        tmp_path = f"{blob['path']}.commit"
+        with open(tmp_path, "wb") as out:
+            for block_id in block_ids:
+                with open(blob["blocks"][block_id], "rb") as block:
+                    shutil.copyfileobj(block, out, TRANSFER_CHUNK_SIZE)
+        os.replace(tmp_path, blob["path"])
+        for path in blob["blocks"].values():
+            os.remove(path)
+        blob["blocks"].clear()
+        self.blob_committed(blob)
+
+    def blob_committed(self, blob):
+        """Blobの書き込み完了時にETagとファイルサイズを更新する"""
+        blob["etag"] = f'"{uuid.uuid4().hex}"'
+        size = os.path.getsize(blob["path"])
+        blob_id = os.path.basename(blob["path"])
+        with self._lock:
+            for asset in self.assets.values():
+                for dataset in asset["datasets"].values():
+                    for file in dataset["files"].values():
+                        if file["_blob"] == blob_id:
+                            file["fileSize"] = size
+                            file["status"] = "Uploaded"
+
+
+# URLパス → (MockAssetManager のメソッド名, 引数に使うパスパラメータ)
+_VERSION = r"/assets/v1/projects/(?P<project_id>[^/]+)/assets/(?P<asset_id>[^/]+)/versions/(?P<version_id>[^/]+)"
+_DATASET = _VERSION + r"/datasets/(?P<dataset_id>[^/]+)"
+_ROUTES = [
+    ("POST", r"/auth/v1/token-exchange", "token_exchange"),
+    ("POST", r"/assets/v1/organizations/(?P<org_id>[^/]+)/templates/fields", "create_field"),
+    ("POST", r"/assets/v1/projects/(?P<project_id>[^/]+)/assets", "create_asset"),
+    ("POST", r"/assets/v1/projects/(?P<project_id>[^/]+)/assets/search", "search_assets"),
+    ("POST", r"/assets/v1/projects/(?P<project_id>[^/]+)/assets/unlink", "unlink_assets"),
+    ("POST", r"/assets/v1/projects/(?P<project_id>[^/]+)/trash/assets/search", "search_trash"),
+    ("DELETE", r"/assets/v1/projects/(?P<project_id>[^/]+)/trash/assets", "delete_trash"),
+    ("GET", r"/assets/v1/projects/(?P<project_id>[^/]+)/transformations", "list_transformations"),
+    ("POST", r"/assets/v1/projects/(?P<project_id>[^/]+)/transformations/(?P<transformation_id>[^/]+)/termination",
+     "terminate_transformation"),
+    ("GET", r"/assets/v1/organizations/(?P<org_id>[^/]+)/bulk/definitions", "bulk_definitions"),
+    ("GET", r"/assets/v1/organizations/(?P<org_id>[^/]+)/bulk/(?P<bulk_id>[^/]+)", "get_bulk_operation"),
+    ("POST", r"/assets/v1/projects/(?P<project_id>[^/]+)/assets/versions/bulk", "create_bulk_operation"),
+    ("GET", _VERSION, "get_asset"),
+    ("PATCH", _VERSION, "update_asset"),
+    ("POST", r"/assets/v1/projects/(?P<project_id>[^/]+)/assets/(?P<asset_id>[^/]+)/versions", "create_version"),
+    ("POST", _VERSION + r"/autosubmit", "autosubmit"),
+    ("GET", _VERSION + r"/download-urls", "download_urls"),
+    ("POST", _VERSION + r"/datasets", "create_dataset"),
+    ("POST", _DATASET + r"/files", "create_file"),
+    ("GET", _DATASET + r"/files", "list_files"),
+    ("POST", _DATASET + r"/files/(?P<file_path>[^/]+)/finalize", "finalize_file"),
+    ("GET", _DATASET + r"/files/(?P<file_path>[^/]+)/download-url", "download_url"),
+    ("POST", _DATASET + r"/transformations/start/(?P<workflow_type>[^/]+)", "start_transformation"),
+    ("GET", _DATASET + r"/transformations/(?P<transformation_id>[^/]+)", "get_transformation"),
+]
+_COMPILED_ROUTES = [(method, re.compile(pattern + r"/?$"), name) for method, pattern, name in _ROUTES]
+_BLOB_PATH = re.compile(r"/blob/(?P<blob_id>[0-9a-f]+)$")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "UnityAssetManagerMock/1.0"
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_HEAD(self):
+        self._dispatch("HEAD")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        self.state.simulate_latency()
+        try:
+            blob_match = _BLOB_PATH.match(parts.path)
+            if blob_match:
+                self.state.count_route(f"blob_{method.lower()}")
+                self._handle_blob(method, blob_match.group("blob_id"), query)
+                return
+
+            body = self._read_body()
+            if parts.path.startswith("/_mock/"):
+                self._handle_control(method, parts.path, body)
+                return
+
+            for route_method, pattern, name in _COMPILED_ROUTES:
+                match = pattern.match(parts.path)
+                if match and route_method == method:
+                    break
+            else:
+                raise MockError(404, "Not Found", f"未対応のエンドポイントです: {method} {parts.path}")
+
+            self.state.count_route(name)
+            self.state.inject_fault()
+            params = {key: unquote(value) for key, value in match.groupdict().items()}
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                raise MockError(400, "Bad Request", "リクエスト本文がJSONではありません")
+            status, payload = getattr(self.state, name)(MockRequest(params, query, data or {}, self.headers))
+            self._send_json(status, payload)
+        except MockError as e:
+            self._send_json(e.status, {"title": e.title, "status": e.status, "detail": e.detail}, e.headers)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.state.count("bytes_received", len(body))
+        return body
+
+    def _send_json(self, status, payload, headers=None):
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        if payload is not None:
+            content_type = "application/problem+json" if status >= 400 else "application/json"
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+            self.state.count("bytes_sent", len(body))
+
+    def _handle_control(self, method, path, body):
+        if method == "GET" and path == "/_mock/stats":
+            with self.state._lock:
+                self._send_json(200, json.loads(json.dumps(self.state.stats)))
+        elif method == "POST" and path == "/_mock/reset":
+            self.state.reset()
+            self._send_json(204, None)
+        else:
+            raise MockError(404, "Not Found", f"未対応のエンドポイントです: {method} {path}")
+
+    # --- Blob ---
+
+    def _handle_blob(self, method, blob_id, query):
+        state = self.state
+        if method == "PUT":
+            # エラーで応答する場合も、接続を使い回せるよう本文は先に読み切る
+            blob = state.blobs.get(blob_id)
+            comp = query.get("comp", [None])[0]
+            if comp == "blocklist":
+                body = self._read_body()
+                state.commit_blocks(self._require(blob, blob_id), body)
+            elif comp == "block":
+                block_id = query.get("blockid", [""])[0]
+                block_path = f"{self._require_path(blob, blob_id)}.block-{uuid.uuid4().hex}"
+                self._receive_to(block_path)
+                blob["blocks"][block_id] = block_path
+            else:
+                self._receive_to(f"{self._require_path(blob, blob_id)}.upload")
+                os.replace(f"{blob['path']}.upload", blob["path"])
+                state.blob_committed(blob)
+            self._send_json(201, None)
+            return
+
+        if method not in ("GET", "HEAD"):
+            raise MockError(405, "Method Not Allowed")
+        blob = state.blob(blob_id)
+        if not os.path.exists(blob["path"]):
+            raise MockError(404, "BlobNotFound", f"Blobにまだ書き込まれていません: {blob_id}")
+        self._send_blob(blob)
+
+    def _require(self, blob, blob_id):
+        if blob is None:
+            raise MockError(404, "BlobNotFound", f"Blobが見つかりません: {blob_id}")
+        return blob
+
+    def _require_path(self, blob, blob_id):
+        if blob is None:
+            # 本文を読み捨ててからエラーを返す
+            self._receive_to(os.devnull)
+        return self._require(blob, blob_id)["path"]
+
+    def _receive_to(self, path):
+        remaining = int(self.headers.get("Content-Length") or 0)
+        with open(path, "wb") as f:
+            while remaining > 0:
+                chunk = self.rfile.read(min(TRANSFER_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.state.bandwidth.consume(len(chunk))
+                f.write(chunk)
+                remaining -= len(chunk)
+                self.state.count("bytes_received", len(chunk))
+
+    def _send_blob(self, blob):
+        size = os.path.getsize(blob["path"])
+        start, end = 0, size - 1
+        status = 200
+        range_header = self.headers.get("Range")
+        if range_header:
+            match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+            if not match or (not match.group(1) and not match.group(2)):
+                raise MockError(416, "InvalidRange", range_header)
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(size - int(match.group(2)), 0)
+            if start >= size or start > end:
+                raise MockError(416, "InvalidRange", range_header, {"Content-Range": f"bytes */{size}"})
+            status = 206
+
+        length = end - start + 1 if size else 0
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", blob["etag"] or '"0"')
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+
+        with open(blob["path"], "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(TRANSFER_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.state.bandwidth.consume(len(chunk))
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+                self.state.count("bytes_sent", len(chunk))
+
+
+class MockServer:
+    """
+    モックサーバーをバックグラウンドスレッドで起動する
+
+    Parameters
+    ----------
+    config : MockConfig
+        動作設定（None の場合はデフォルト）
+    host : str
+        待ち受けるアドレス
+    port : int
+        待ち受けるポート（0 の場合は空いているポート）
+    blob_dir : str
+        Blobの保存先（None の場合は一時ディレクトリを作成し、停止時に削除する）
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0, blob_dir=None):
+        self.config = config or MockConfig()
+        self._own_blob_dir = blob_dir is None
+        self.blob_dir = blob_dir or tempfile.mkdtemp(prefix="unity-mock-blobs-")
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = MockAssetManager(self.config, self.blob_dir)
+        self.httpd.state.base_url = self.base_url
+        self._thread = None
+
+    @property
+    def state(self):
+        return self.httpd.state
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """待ち受けを開始する"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """待ち受けを停止し、一時ディレクトリを削除する"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._own_blob_dir:
+            shutil.rmtree(self.blob_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def add_config_arguments(parser):
+    """MockConfig の各設定をコマンドライン引数として追加する"""
+    parser.add_argument("--latency", type=float, default=0.0, help="すべての応答に加える遅延（秒）")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="遅延に加える 0〜指定秒 の乱数")
+    parser.add_argument("--transformation-queue-time", type=float, default=0.0,
+                        help="変換が Pending のままでいる秒数")
+    parser.add_argument("--transformation-duration", type=float, default=2.0, help="変換が Running でいる秒数")
+    parser.add_argument("--transformation-failure-rate", type=float, default=0.0, help="変換が失敗する割合（0〜1）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="APIリクエストに 503 を返す割合（0〜1）")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="APIリクエストに 429 を返す割合（0〜1）")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 の Retry-After（秒）")
+    parser.add_argument("--bandwidth", default="0", help="Blob転送の帯域上限（例: 100MB、0 は無制限）")
+    parser.add_argument("--seed", type=int, default=None, help="エラー注入などの乱数シード")
+
+
+def config_from_args(args):
+    """add_config_arguments で追加した引数から MockConfig を作成する"""
+    return MockConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        transformation_queue_time=args.transformation_queue_time,
+        transformation_duration=args.transformation_duration,
+        transformation_failure_rate=args.transformation_failure_rate,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        bandwidth=parse_size(args.bandwidth),
+        seed=args.seed
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Unity Asset Manager モックサーバー")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けるアドレス")
+    parser.add_argument("--port", type=int, default=8080, help="待ち受けるポート（0 は空いているポート）")
+    parser.add_argument("--blob-dir", default=None, help="Blobの保存先（省略時は一時ディレクトリ）")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = MockServer(config_from_args(args), host=args.host, port=args.port, blob_dir=args.blob_dir)
+    print(f"UNITY_API_BASE={server.base_url}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Unity Asset Manager - OBJファイルの依存ファイルの解決
+
+OBJファイルが参照するマテリアル（mtllib の MTLファイル）と、
+MTLファイルが参照するテクスチャ（map_Kd、map_Bump など）を探し、
+変換に必要なファイルをOBJファイルからの相対パスとともに列挙します。
+
+OBJファイルは全体を読み込まずにチャンク単位で走査し、mtllib を含むチャンクだけを行に分解します。
+列挙したファイルは同じデータセットへ相対パスを保ったままアップロードするため、
+変換サービス側でもOBJ・MTLファイル内のパスのままマテリアルとテクスチャが解決されます。
+"""
+
+import os
+import re
+import json
+import hashlib
+
+from conversion_cache import hash_file
+
+# OBJファイルを走査するときに1回で読み込むバイト数
+OBJ_SCAN_CHUNK_SIZE = 1024 * 1024
+
+# mtllib 行（行頭の空白は許容する）
+_MTLLIB_LINE = re.compile(rb"^[ \t]*mtllib[ \t]+(.+?)[ \t]*\r?$", re.MULTILINE)
+
+# テクスチャを参照するMTLのキーワード（小文字で比較する）
+# PBR拡張（map_Pr など）と、書き出しツールによって使われる別名も含む
+MTL_TEXTURE_KEYWORDS = {
+    "map_ka", "map_kd", "map_ks", "map_ke", "map_ns", "map_d", "map_bump", "bump", "disp", "decal", "refl",
+    "norm", "map_norm", "map_pr", "map_pm", "map_ps", "map_rma", "map_orm",
+}
+
+# テクスチャ参照のオプションと引数の数（None は数値が続く限り引数とみなす）
+_MTL_OPTION_ARGS = {
+    "-blendu": 1, "-blendv": 1, "-bm": 1, "-boost": 1, "-cc": 1, "-clamp": 1, "-imfchan": 1,
+    "-texres": 1, "-type": 1, "-mm": 2, "-o": None, "-s": None, "-t": None,
+}
+
+
+def _is_number(token):
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
+
+def _decode(raw):
+    # OBJ・MTLファイルのエンコーディングは決まっていないため、UTF-8 で読めない場合は Latin-1 とみなす
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+def _split_names(base_dir, rest):
+    """
+    mtllib の引数をファイル名に分割する（空白を含むファイル名は、全体が存在する場合のみ1つとみなす）
+    """
+    if os.path.isfile(os.path.join(base_dir, rest.replace("\\", "/"))):
+        return [rest]
+    return rest.split()
+
+
+def iter_mtllib_names(obj_path, chunk_size=OBJ_SCAN_CHUNK_SIZE):
+    """
+    OBJファイルの mtllib で参照されるファイル名を順に返す（ファイル全体は読み込まない）
+
+    Parameters
+    ----------
+    obj_path : str
+        OBJファイルのパス
+    chunk_size : int
+        1回で読み込むバイト数
+
+    Yields
+    ------
+    str
+        OBJファイル内に書かれたとおりのMTLファイル名
+    """
+    base_dir = os.path.dirname(obj_path)
+    tail = b""
+    with open(obj_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            # 行の途中で切れた末尾は次のチャンクと合わせて調べる
+            buffer = tail + chunk
+            cut = buffer.rfind(b"\n") + 1
+            lines, tail = buffer[:cut], buffer[cut:]
+            if b"mtllib" in lines:
+                for match in _MTLLIB_LINE.finditer(lines):
+                    yield from _split_names(base_dir, _decode(match.group(1)))
+        if b"mtllib" in tail:
+            for match in _MTLLIB_LINE.finditer(tail):
+                yield from _split_names(base_dir, _decode(match.group(1)))
+
+
+def iter_mtl_texture_names(mtl_path):
+    """
+    MTLファイルのテクスチャ参照（map_Kd、map_Bump など）のファイル名を順に返す
+
+    Parameters
+    ----------
+    mtl_path : str
+        MTLファイルのパス
+
+    Yields
+    ------
+    str
+        MTLファイル内に書かれたとおりのテクスチャのファイル名
+    """
+    with open(mtl_path, "rb") as f:
+        for raw in f:
+            tokens = _decode(raw).split()
+            if len(tokens) < 2 or tokens[0].lower() not in MTL_TEXTURE_KEYWORDS:
+                continue
+
+            # ファイル名の前に置かれたオプション（-s 1 1 1、-bm 0.5 など）を読み飛ばす
+            index = 1
+            while index < len(tokens) - 1 and tokens[index].lower() in _MTL_OPTION_ARGS:
+                count = _MTL_OPTION_ARGS[tokens[index].lower()]
+                index += 1
+                if count is None:
+                    while index < len(tokens) - 1 and _is_number(tokens[index]):
+                        index += 1
+                else:
+                    index = min(index + count, len(tokens) - 1)
+
+            # 残りはすべてファイル名（空白を含む場合がある）
+            yield " ".join(tokens[index:])
+
+
+def _dataset_path(root_dir, local_path):
+    """
+    OBJファイルのディレクトリからの相対パスを、データセット内のファイルパス（/ 区切り）にする
+
+    OBJファイルのディレクトリの外にあるファイルは相対パスを保てないため None を返す。
+    """
+    relative = os.path.relpath(local_path, root_dir)
+    if relative.startswith(os.pardir) or os.path.isabs(relative):
+        return None
+    return relative.replace(os.sep, "/")
+
+
+def _resolve(root_dir, base_dir, name, kind, files, seen):
+    """
+    参照されたファイル名を解決して files に追加する（見つからない場合は警告のみ）
+
+    Returns
+    -------
+    str or None
+        見つかったファイルのローカルパス（追加済みのファイルの場合も返す）
+    """
+    # Windows で書き出されたファイルは \ 区切りのことがある
+    local_path = os.path.normpath(os.path.join(base_dir, name.replace("\\", "/")))
+    if not os.path.isfile(local_path):
+        print(f"    警告: {kind} '{name}' が見つかりません（{local_path}）。このファイルなしで変換します")
+        return None
+    if local_path in seen:
+        return local_path
+
+    file_path = _dataset_path(root_dir, local_path)
+    if file_path is None:
+        file_path = os.path.basename(local_path)
+        print(f"    警告: {kind} '{name}' はOBJファイルのディレクトリの外にあるため、"
+              f"データセットにはファイル名 '{file_path}' でアップロードします")
+    seen.add(local_path)
+    files.append((local_path, file_path))
+    return local_path
+
+
+def find_source_files(input_path):
+    """
+    変換に必要なファイル（入力ファイル自身と、OBJファイルの場合はMTL・テクスチャ）を列挙する
+
+    Parameters
+    ----------
+    input_path : str
+        入力ファイルのパス
+
+    Returns
+    -------
+    list of tuple
+        (ローカルのパス, データセット内のファイルパス) のリスト。先頭は入力ファイル自身
+    """
+    files = [(input_path, os.path.basename(input_path))]
+    if os.path.splitext(input_path)[1].lower() != ".obj":
+        return files
+
+    root_dir = os.path.dirname(os.path.abspath(input_path))
+    seen = {os.path.normpath(os.path.abspath(input_path))}
+    for mtl_name in iter_mtllib_names(input_path):
+        mtl_path = _resolve(root_dir, root_dir, mtl_name, "マテリアルファイル", files, seen)
+        if mtl_path is None:
+            continue
+        # テクスチャのパスはMTLファイルのディレクトリからの相対パス
+        for texture_name in iter_mtl_texture_names(mtl_path):
+            _resolve(root_dir, os.path.dirname(mtl_path), texture_name, "テクスチャ", files, seen)
+    return files
+
+
+def hash_source_files(source_files):
+    """
+    変換に必要なファイル全体の内容のハッシュを計算する
+
+    依存ファイルが無い場合は入力ファイルのハッシュ（hash_file）と同じ値になるため、
+    依存ファイルを扱う前に作成された変換キャッシュ・変換済みアセットもそのまま使用できる。
+
+    Parameters
+    ----------
+    source_files : list of tuple
+        find_source_files の戻り値
+
+    Returns
+    -------
+    str
+        16進数のハッシュ値
+    """
+    input_path = source_files[0][0]
+    if len(source_files) == 1:
+        return hash_file(input_path)
+
+    # データセット内のパスも含めるため、テクスチャの配置を変えた場合も別の変換になる
+    material = [[file_path, hash_file(local_path)] for local_path, file_path in source_files]
+    return hashlib.sha256(json.dumps(material, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def total_size(source_files):
+    """
+    変換に必要なファイルの合計バイト数
+    """
+    return sum(os.path.getsize(local_path) for local_path, _ in source_files)
@@ -0,0 +1,579 @@
+"""
+Unity Asset Manager - OBJファイルの事前チェック
+
+変換を開始する前にOBJファイルをローカルで解析し、頂点・面・グループの数、座標の範囲、
+縮退した面（同じ頂点を2回以上使う面、頂点が3つ未満の面）、範囲外の頂点インデックスを集計します。
+壊れた入力はクラウドでの変換を始める前に中止し、集計結果からワークフロータイプと
+変換パラメータ（ポリゴン数の削減、メッシュのクリーニングなど）を決めます。
+
+ファイルは一定サイズのチャンクごとに読み込み、各チャンクの行の分類と数値の解析を
+NumPy の配列演算でまとめて行うため、数GBのファイルでも使用メモリはチャンクサイズに比例する量に収まります。
+"""
+
+import os
+import re
+import time
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+
+# 1回で読み込んで解析するバイト数（作業用の配列はこの数倍程度のメモリを使う）
+PREFLIGHT_CHUNK_SIZE = 4 * 1024 * 1024
+
+# これを超える三角形数の入力は変換せずに中止する
+MAX_TRIANGLES = 50_000_000
+
+# 縮退した面がこの割合を超える入力は変換せずに中止する
+MAX_DEGENERATE_RATIO = 0.5
+
+# ワークフロータイプに "auto" を指定した場合、この三角形数以下のきれいなモデルは Free ティアで変換する
+FREE_TIER_MAX_TRIANGLES = 100_000
+
+# Pro/Enterprise ティアの変換で、この三角形数を超えるモデルはこの数まで削減する
+DECIMATION_TARGET_TRIANGLES = 1_000_000
+
+# グループ・オブジェクトがこの数を超えるモデルはコンポーネントを結合する
+MERGE_GROUP_THRESHOLD = 1000
+
+# ワークフロータイプ
+WORKFLOW_AUTO = "auto"
+FREE_TIER_WORKFLOW_TYPE = "free-tier-optimize-and-convert"
+HIGHER_TIER_WORKFLOW_TYPE = "higher-tier-optimize-and-convert"
+
+# 空白・タブ・CR・LF はすべて 0x20 以下のため、空白類は 0x20 以下かどうかで判定する
+_SPACE, _TAB, _LF = 0x20, 0x09, 0x0A
+_SLASH, _DOT, _MINUS, _PLUS = ord("/"), ord("."), ord("-"), ord("+")
+_USEMTL = np.frombuffer(b"usemtl", dtype=np.uint8)
+
+# 10 のべき乗の表（数値の桁の重み）
+_POW10 = 10.0 ** np.arange(309)
+
+# 行頭の空白（ベクトル化した行の分類の前に取り除く）
+_LEADING_WHITESPACE = re.compile(rb"^[ \t]+", re.MULTILINE)
+
+# キーワードを取り除いた面の行の最初のトークン
+_FIRST_TOKEN = re.compile(rb" *(\S+)")
+_SLASH_TO_SPACE = bytes.maketrans(b"/", b" ")
+
+# 同じ種類の行の塊がこれより多いチャンクは、1文字ずつのマスクで行を取り出す
+_MAX_LINE_RUNS = 256
+
+
+class PreflightError(ValueError):
+    """
+    事前チェックで変換できない入力と判定された場合の例外
+    """
+
+
+@dataclass
+class ObjStats:
+    """
+    OBJファイルの集計結果
+    """
+    path: str
+    size: int = 0
+    vertices: int = 0
+    texcoords: int = 0
+    normals: int = 0
+    faces: int = 0
+    triangles: int = 0
+    groups: int = 0
+    objects: int = 0
+    material_switches: int = 0
+    degenerate_faces: int = 0
+    broken_faces: int = 0
+    invalid_vertices: int = 0
+    bounds_min: tuple = None
+    bounds_max: tuple = None
+    seconds: float = 0.0
+
+    def problems(self, max_triangles=MAX_TRIANGLES, max_degenerate_ratio=MAX_DEGENERATE_RATIO):
+        """
+        変換を中止すべき問題の一覧を返す（問題が無ければ空のリスト）
+
+        Parameters
+        ----------
+        max_triangles : int
+            許容する三角形数の上限
+        max_degenerate_ratio : float
+            許容する縮退した面の割合の上限
+
+        Returns
+        -------
+        list of str
+            問題の説明
+        """
+        problems = []
+        if self.faces == 0:
+            problems.append("面がありません")
+        if self.broken_faces:
+            problems.append(f"存在しない頂点を参照する面が {self.broken_faces:,} 件あります")
+        if self.invalid_vertices:
+            problems.append(f"座標が不正（数値でない・不足・無限大）な頂点が {self.invalid_vertices:,} 件あります")
+        if self.triangles > max_triangles:
+            problems.append(f"三角形数 {self.triangles:,} が上限 {max_triangles:,} を超えています")
+        if self.faces and self.degenerate_faces / self.faces > max_degenerate_ratio:
+            problems.append(f"縮退した面が {self.degenerate_faces:,} / {self.faces:,} 件あります")
+        return problems
+
+
+def _first_per_token(positions, token_ids, token_count, default):
+    """
+    位置（昇順）ごとのトークン番号から、各トークンで最初の位置を求める
+    """
+    first = np.full(token_count, default, dtype=np.int64)
+    if len(positions):
+        keep = np.empty(len(positions), dtype=bool)
+        keep[0] = True
+        np.not_equal(token_ids[1:], token_ids[:-1], out=keep[1:])
+        first[token_ids[keep]] = positions[keep]
+    return first
+
+
+def _digit_values(digits, token_ids, token_count):
+    """
+    トークンごとに連続する数字（token_ids は昇順）を整数値にする
+    """
+    order = np.arange(len(digits))
+    last = np.zeros(token_count, dtype=np.int64)
+    if len(digits):
+        is_last = np.empty(len(digits), dtype=bool)
+        is_last[-1] = True
+        np.not_equal(token_ids[1:], token_ids[:-1], out=is_last[:-1])
+        last[token_ids[is_last]] = order[is_last]
+    weights = _POW10[np.minimum(last[token_ids] - order, len(_POW10) - 1)]
+    return np.bincount(token_ids, weights=(digits - 48) * weights, minlength=token_count)
+
+
+def _parse_numbers(text, line_count, stop_at_slash=False):
+    """
+    空白区切りの数値（整数・小数・指数表記）を1文字ずつの配列演算で解析する
+
+    書式がそろっていない行（空白の数が不ぞろい、数値でないトークンを含むなど）でも
+    トークンごとに正しく解析できるが、_fast_vertices・_fast_faces より数倍遅い。
+
+    Parameters
+    ----------
+    text : numpy.ndarray
+        uint8 の配列（行頭のキーワードを空白に置き換え、行末の改行を含む）
+    line_count : int
+        行数
+    stop_at_slash : bool
+        各トークンの "/" 以降を無視する（面の "頂点/テクスチャ/法線" の頂点インデックスだけを読む）
+
+    Returns
+    -------
+    values : numpy.ndarray
+        トークンごとの値
+    valid : numpy.ndarray
+        トークンごとに数値として読めたかどうか
+    counts : numpy.ndarray
+        行ごとのトークン数
+    """
+    whitespace = text <= _SPACE
+    token_start = ~whitespace
+    token_start[1:] &= whitespace[:-1]
+    starts = np.flatnonzero(token_start)
+    token_count = len(starts)
+    counts = np.bincount(np.searchsorted(np.flatnonzero(text == _LF), starts), minlength=line_count)
+
+    positions = np.flatnonzero(~whitespace)
+    token_ids = (np.cumsum(token_start, dtype=np.int32) - 1)[positions]
+    del whitespace, token_start
+
+    if stop_at_slash:
+        slashes = text[positions] == _SLASH
+        first_slash = _first_per_token(positions[slashes], token_ids[slashes], token_count, len(text))
+        keep = positions < first_slash[token_ids]
+        positions, token_ids = positions[keep], token_ids[keep]
+
+    chars = text[positions]
+    is_digit = (chars >= 48) & (chars <= 57)
+    is_exponent = (chars == ord("e")) | (chars == ord("E"))
+    allowed = is_digit | is_exponent | (chars == _DOT) | (chars == _MINUS) | (chars == _PLUS)
+
+    # 指数部（e 以降）と小数部（. 以降）の区別
+    first_exponent = _first_per_token(positions[is_exponent], token_ids[is_exponent], token_count, len(text))
+    dots = chars == _DOT
+    first_dot = _first_per_token(positions[dots], token_ids[dots], token_count, len(text))
+    in_exponent = positions > first_exponent[token_ids]
+    mantissa = is_digit & ~in_exponent
+    exponent = is_digit & in_exponent
+
+    mantissa_ids = token_ids[mantissa]
+    values = _digit_values(chars[mantissa], mantissa_ids, token_count)
+    fraction_digits = np.bincount(mantissa_ids[positions[mantissa] > first_dot[mantissa_ids]],
+                                  minlength=token_count)
+    scale = -fraction_digits.astype(np.float64)
+    if exponent.any():
+        exponent_ids = token_ids[exponent]
+        exponent_values = _digit_values(chars[exponent], exponent_ids, token_count)
+        has_exponent = first_exponent < len(text) - 1
+        negative = np.zeros(token_count, dtype=bool)
+        negative[has_exponent] = text[first_exponent[has_exponent] + 1] == _MINUS
+        scale += np.where(negative, -exponent_values, exponent_values)
+    with np.errstate(over="ignore", invalid="ignore"):
+        values = values * np.power(10.0, scale)
+    values[text[starts] == _MINUS] *= -1
+
+    # 数字を含まないトークンや、数値に使わない文字（nan、inf など）を含むトークンは不正
+    valid = np.bincount(mantissa_ids, minlength=token_count) > 0
+    valid &= np.bincount(token_ids[~allowed], minlength=token_count) == 0
+    valid &= np.isfinite(values)
+    return values, valid, counts
+
+
+def _fromstring(text, dtype):
+    """
+    空白区切りの数値を np.fromstring で解析する（数値として読めない部分があれば None）
+    """
+    try:
+        with warnings.catch_warnings():
+            # 古い NumPy は読めない部分があると例外ではなく警告を出す
+            warnings.simplefilter("error", DeprecationWarning)
+            return np.fromstring(text, dtype=dtype, sep=" ")
+    except (ValueError, DeprecationWarning):
+        return None
+
+
+def _token_starts(array):
+    """
+    各トークンの先頭の位置（空白・タブ・CR はいくつ続いてもよい）
+    """
+    token_start = array > _SPACE
+    token_start[1:] &= array[:-1] <= _SPACE
+    return np.flatnonzero(token_start)
+
+
+def _tokens_per_line(array, token_starts):
+    """
+    行ごとのトークン数を数える
+    """
+    return np.diff(np.searchsorted(token_starts, np.flatnonzero(array == _LF)), prepend=0)
+
+
+def _fast_vertices(text, line_count):
+    """
+    頂点の行（"v" を取り除いたもの）をまとめて解析する（書式がそろっていない場合は None）
+
+    Returns
+    -------
+    tuple or None
+        _parse_numbers と同じ (values, valid, counts)
+    """
+    values = _fromstring(text, np.float64)
+    if values is None:
+        return None
+    array = np.frombuffer(text, dtype=np.uint8)
+    counts = _tokens_per_line(array, _token_starts(array))
+    if counts.sum() != values.size:
+        return None
+    return values, np.isfinite(values), counts
+
+
+def _fast_faces(text, line_count):
+    """
+    面の行（"f" を取り除いたもの）の頂点インデックスをまとめて解析する
+    （すべての頂点が同じ "v/vt/vn" 書式の場合のみ。それ以外は None）
+
+    Returns
+    -------
+    tuple or None
+        _parse_numbers と同じ (values, valid, counts)
+    """
+    array = np.frombuffer(text, dtype=np.uint8)
+    starts = _token_starts(array)
+    counts = _tokens_per_line(array, starts)
+    token_count = len(starts)
+
+    # 最初のトークンの書式（"1"、"1/2"、"1//3"、"1/2/3"）がすべてのトークンで同じかを
+    # トークンごとの "/" と "//" の数で確かめる
+    first = _FIRST_TOKEN.match(text)
+    first = first.group(1) if first else b""
+    slashes = first.count(b"/")
+    double_slashes = first.count(b"//")
+    if text.count(b"/") != slashes * token_count or text.count(b"//") != double_slashes * token_count:
+        return None
+    if slashes:
+        # "/" の数が合計で合っていても、トークンごとに異なる場合は書式が混在している
+        per_token = np.diff(np.searchsorted(np.flatnonzero(array == _SLASH), starts), append=slashes * token_count)
+        if (per_token != slashes).any():
+            return None
+    components = slashes + 1 - double_slashes
+
+    values = _fromstring(text.translate(_SLASH_TO_SPACE) if slashes else text, np.int64)
+    if values is None or values.size != components * token_count:
+        return None
+    indices = values.reshape(-1, components)[:, 0]
+    return indices, np.ones(token_count, dtype=bool), counts
+
+
+def _select_lines(buffer, starts, ends):
+    """
+    指定した行（改行を含む）だけをつなげた配列を返す
+    """
+    marks = np.zeros(len(buffer) + 1, dtype=np.int8)
+    marks[starts] = 1
+    marks[ends + 1] -= 1
+    return buffer[np.cumsum(marks[:-1], dtype=np.int8).astype(bool)]
+
+
+def _gather_lines(data, buffer, starts, ends, selected):
+    """
+    selected の行（改行を含む）だけをつなげたバイト列を返す
+
+    同じ種類の行は通常まとまって並んでいるため、連続する行の塊ごとに切り出してつなげる。
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], selected, [False])).view(np.int8)))
+    first_lines, last_lines = edges[0::2], edges[1::2] - 1
+    if len(first_lines) <= _MAX_LINE_RUNS:
+        return b"".join(data[start:end] for start, end in zip(starts[first_lines].tolist(),
+                                                                (ends[last_lines] + 1).tolist()))
+    lines = np.flatnonzero(selected)
+    return _select_lines(buffer, starts[lines], ends[lines]).tobytes()
+
+
+class _ObjScanner:
+    """
+    OBJファイルのチャンク（改行で終わるバイト列）を順に受け取って集計する
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.bounds_min = np.full(3, np.inf)
+        self.bounds_max = np.full(3, -np.inf)
+
+    def feed(self, data):
+        # 行頭に空白がある行はまれなため、ある場合だけ取り除く
+        if data[:1] in (b" ", b"\t") or b"\n " in data or b"\n\t" in data:
+            data = _LEADING_WHITESPACE.sub(b"", data)
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        ends = np.flatnonzero(buffer == _LF)
+        if not len(ends):
+            return
+        starts = np.empty(len(ends), dtype=np.int64)
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+
+        first = buffer[starts]
+        second = buffer[np.minimum(starts + 1, len(buffer) - 1)]
+        separated = (second == _SPACE) | (second == _TAB)
+        is_vertex = (first == ord("v")) & separated
+        is_face = (first == ord("f")) & separated
+
+        stats = self.stats
+        stats.texcoords += int(np.count_nonzero((first == ord("v")) & (second == ord("t"))))
+        stats.normals += int(np.count_nonzero((first == ord("v")) & (second == ord("n"))))
+        stats.groups += int(np.count_nonzero((first == ord("g")) & separated))
+        stats.objects += int(np.count_nonzero((first == ord("o")) & separated))
+        candidates = starts[first == ord("u")]
+        if len(candidates):
+            prefix = buffer[np.minimum(candidates[:, None] + np.arange(len(_USEMTL)), len(buffer) - 1)]
+            stats.material_switches += int(np.count_nonzero((prefix == _USEMTL).all(axis=1)))
+
+        # 面のインデックスは、その行より前に定義された頂点の数で検証する
+        vertices_before = stats.vertices + np.cumsum(is_vertex) - is_vertex
+
+        vertex_count = int(np.count_nonzero(is_vertex))
+        if vertex_count:
+            text = _gather_lines(data, buffer, starts, ends, is_vertex)
+            parsed = _fast_vertices(text.translate(None, b"v"), vertex_count)
+            if parsed is None:
+                parsed = _parse_numbers(self._blank_keywords(text), vertex_count)
+            self._vertices(*parsed)
+        face_count = int(np.count_nonzero(is_face))
+        if face_count:
+            text = _gather_lines(data, buffer, starts, ends, is_face)
+            parsed = _fast_faces(text.translate(None, b"f"), face_count)
+            if parsed is None:
+                parsed = _parse_numbers(self._blank_keywords(text), face_count, stop_at_slash=True)
+            self._faces(*parsed, vertices_before[is_face])
+
+    @staticmethod
+    def _blank_keywords(text):
+        # 各行の先頭のキーワード（v、f）を空白に置き換える
+        array = np.frombuffer(bytearray(text), dtype=np.uint8)
+        array[0] = _SPACE
+        array[np.flatnonzero(array[:-1] == _LF) + 1] = _SPACE
+        return array
+
+    def _vertices(self, values, valid, counts):
+        line_count = len(counts)
+        if values.size == 3 * line_count and (counts == 3).all():
+            xyz = values.reshape(-1, 3)
+            finite = valid.reshape(-1, 3).all(axis=1)
+        else:
+            # x y z 以降（w や頂点カラー）は使わない
+            offsets = np.cumsum(counts) - counts
+            complete = counts >= 3
+            columns = offsets[complete, None] + np.arange(3)
+            xyz = values[columns]
+            finite = valid[columns].all(axis=1)
+
+        self.stats.vertices += line_count
+        self.stats.invalid_vertices += int(line_count - np.count_nonzero(finite))
+        if finite.any():
+            xyz = xyz[finite] if not finite.all() else xyz
+            np.minimum(self.bounds_min, xyz.min(axis=0), out=self.bounds_min)
+            np.maximum(self.bounds_max, xyz.max(axis=0), out=self.bounds_max)
+
+    def _faces(self, values, valid, counts, vertices_before):
+        face_count = len(counts)
+        token_lines = np.repeat(np.arange(face_count), counts)
+
+        # 負のインデックスはその行から数えた相対位置
+        indices = np.where(valid, values, 0).astype(np.int64)
+        available = vertices_before[token_lines]
+        resolved = np.where(indices > 0, indices, available + indices + 1)
+        valid = valid & (indices != 0) & (resolved >= 1) & (resolved <= available)
+        broken = np.bincount(token_lines[~valid], minlength=face_count) > 0
+
+        # 同じ頂点を2回以上使う面・頂点が3つ未満の面は縮退している
+        degenerate = counts < 3
+        if (counts == 3).all():
+            corners = resolved.reshape(-1, 3)
+            degenerate |= ((corners[:, 0] == corners[:, 1]) | (corners[:, 1] == corners[:, 2])
+                           | (corners[:, 0] == corners[:, 2]))
+        elif len(resolved):
+            order = np.lexsort((resolved, token_lines))
+            sorted_lines, sorted_indices = token_lines[order], resolved[order]
+            repeated = (sorted_lines[1:] == sorted_lines[:-1]) & (sorted_indices[1:] == sorted_indices[:-1])
+            degenerate[sorted_lines[1:][repeated]] = True
+
+        stats = self.stats
+        stats.faces += face_count
+        stats.triangles += int(np.maximum(counts - 2, 0).sum())
+        stats.broken_faces += int(np.count_nonzero(broken))
+        stats.degenerate_faces += int(np.count_nonzero(degenerate & ~broken))
+
+    def finish(self):
+        if self.stats.vertices > self.stats.invalid_vertices:
+            self.stats.bounds_min = tuple(float(value) for value in self.bounds_min)
+            self.stats.bounds_max = tuple(float(value) for value in self.bounds_max)
+        return self.stats
+
+
+def analyze_obj(path, chunk_size=PREFLIGHT_CHUNK_SIZE):
+    """
+    OBJファイルをチャンク単位で解析して集計する
+
+    Parameters
+    ----------
+    path : str
+        OBJファイルのパス
+    chunk_size : int
+        1回で読み込んで解析するバイト数
+
+    Returns
+    -------
+    ObjStats
+        集計結果
+    """
+    started = time.perf_counter()
+    scanner = _ObjScanner(ObjStats(path=path, size=os.path.getsize(path)))
+    tail = b""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            # 行の途中で切れた末尾は次のチャンクと合わせて解析する
+            data = tail + chunk
+            cut = data.rfind(b"\n") + 1
+            if cut:
+                scanner.feed(data[:cut])
+            tail = data[cut:]
+    if tail:
+        scanner.feed(tail + b"\n")
+    stats = scanner.finish()
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def print_stats(stats):
+    """
+    集計結果を表示する
+    """
+    speed = stats.size / stats.seconds / 1024 / 1024 if stats.seconds else 0.0
+    print(f"  事前チェック: {os.path.basename(stats.path)}（頂点 {stats.vertices:,} / 面 {stats.faces:,}"
+          f"（三角形 {stats.triangles:,}）/ グループ {stats.groups + stats.objects:,}、"
+          f"{stats.seconds:.2f} 秒, {speed:.1f} MB/s）")
+    if stats.bounds_min is not None:
+        low = ", ".join(f"{value:.4g}" for value in stats.bounds_min)
+        high = ", ".join(f"{value:.4g}" for value in stats.bounds_max)
+        print(f"    範囲: ({low}) 〜 ({high})")
+    if stats.degenerate_faces:
+        print(f"    警告: 縮退した面が {stats.degenerate_faces:,} 件あります")
+
+
+def preflight_input(input_path, chunk_size=PREFLIGHT_CHUNK_SIZE):
+    """
+    入力ファイルを事前チェックする（OBJファイル以外は何もしない）
+
+    Parameters
+    ----------
+    input_path : str
+        入力ファイルのパス
+    chunk_size : int
+        1回で読み込んで解析するバイト数
+
+    Returns
+    -------
+    ObjStats or None
+        OBJファイルの集計結果。OBJファイル以外の場合は None
+
+    Raises
+    ------
+    PreflightError
+        変換できない入力の場合
+    """
+    if os.path.splitext(input_path)[1].lower() != ".obj":
+        return None
+
+    stats = analyze_obj(input_path, chunk_size=chunk_size)
+    print_stats(stats)
+    problems = stats.problems()
+    if problems:
+        raise PreflightError(f"'{input_path}' は変換できません: {'、'.join(problems)}")
+    return stats
+
+
+def route_transformation(stats, workflow_type, parameters):
+    """
+    事前チェックの集計結果からワークフロータイプと変換パラメータを決める
+
+    - "auto": 三角形数が FREE_TIER_MAX_TRIANGLES 以下で縮退した面の無いモデルは Free ティア、
+      それ以外は Pro/Enterprise ティアで変換する
+    - Pro/Enterprise ティアでは、三角形数が DECIMATION_TARGET_TRIANGLES を超える場合はその数まで削減し、
+      縮退した面があればメッシュのクリーニング、グループが多ければコンポーネントの結合を有効にする
+
+    Parameters
+    ----------
+    stats : ObjStats or None
+        事前チェックの集計結果（OBJファイル以外は None）
+    workflow_type : str
+        指定されたワークフロータイプ（"auto" を含む）
+    parameters : dict
+        基本の変換パラメータ（build_transformation_params の戻り値）
+
+    Returns
+    -------
+    workflow_type : str
+        使用するワークフロータイプ
+    parameters : dict
+        使用する変換パラメータ
+    """
+    parameters = dict(parameters)
+    if workflow_type == WORKFLOW_AUTO:
+        if stats is not None and stats.triangles <= FREE_TIER_MAX_TRIANGLES and not stats.degenerate_faces:
+            return FREE_TIER_WORKFLOW_TYPE, parameters
+        workflow_type = HIGHER_TIER_WORKFLOW_TYPE
+
+    if workflow_type != HIGHER_TIER_WORKFLOW_TYPE or stats is None:
+        return workflow_type, parameters
+
+    if stats.triangles > DECIMATION_TARGET_TRIANGLES:
+        parameters.update(strategy="triangleCount", target=DECIMATION_TARGET_TRIANGLES)
+    if stats.degenerate_faces:
+        parameters["meshCleaning"] = True
+    if stats.groups + stats.objects > MERGE_GROUP_THRESHOLD:
+        parameters["mergeOptimization"] = True
+    return workflow_type, parameters
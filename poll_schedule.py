@@ -0,0 +1,221 @@
+"""
+Unity Asset Manager - 適応的なポーリング間隔と変換所要時間の履歴
+
+過去の変換所要時間をワークフロータイプと入力サイズごとにローカルへ記録し、
+そこから完了予測時刻とタイムアウトを求めます。ポーリングは最初は短い間隔で行い、
+ジッター付きで間隔を広げ、予測完了時刻の付近では再び間隔を詰めます。
+"""
+
+import os
+import json
+import math
+import random
+import threading
+import statistics
+
+# 履歴ファイルの保存先
+HISTORY_FILE_PATH = os.getenv("UNITY_TRANSFORMATION_HISTORY", ".transformation_history.json")
+
+# 1つのキーあたりに保持する所要時間の件数
+MAX_SAMPLES_PER_KEY = 50
+
+# タイムアウトを履歴から求めるのに必要な最小件数
+MIN_SAMPLES_FOR_TIMEOUT = 3
+
+# 履歴が無い場合のタイムアウト（秒）
+DEFAULT_TIMEOUT = 300
+
+# 履歴から求めるタイムアウトの下限（秒）と、95パーセンタイルに掛ける倍率
+MIN_TIMEOUT = 60
+TIMEOUT_FACTOR = 3
+
+# ポーリング間隔（秒）
+INITIAL_POLL_INTERVAL = 1
+MAX_POLL_INTERVAL = 30
+NEAR_ETA_POLL_INTERVAL = 2
+POLL_BACKOFF = 1.6
+POLL_JITTER = 0.2
+
+
+def _size_bucket(input_size):
+    # 入力サイズは2の累乗ごとのバケットにまとめる
+    return int(math.log2(input_size)) if input_size and input_size > 0 else 0
+
+
+class TransformationHistory:
+    """
+    変換所要時間のローカル履歴
+
+    キーは "ワークフロータイプ:サイズバケット"。複数スレッドから共有して使用できる。
+
+    Parameters
+    ----------
+    path : str
+        履歴ファイルのパス（None の場合は保存しない）
+    """
+
+    def __init__(self, path=HISTORY_FILE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._samples = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._samples = json.load(f)
+            except (OSError, ValueError):
+                print(f"  警告: 変換履歴を読み込めませんでした: {path}")
+
+    @staticmethod
+    def _key(workflow_type, bucket):
+        return f"{workflow_type}:{bucket}"
+
+    def record(self, workflow_type, input_size, duration):
+        """
+        変換所要時間を記録する
+
+        Parameters
+        ----------
+        workflow_type : str
+            ワークフロータイプ
+        input_size : int
+            入力ファイルのバイト数
+        duration : float
+            変換開始から完了までの秒数
+        """
+        key = self._key(workflow_type, _size_bucket(input_size))
+        with self._lock:
+            samples = self._samples.setdefault(key, [])
+            samples.append(round(duration, 2))
+            del samples[:-MAX_SAMPLES_PER_KEY]
+            self._save()
+
+    def _samples_for(self, workflow_type, input_size):
+        # 同じサイズバケットが無ければ、近いバケットの履歴を使う
+        bucket = _size_bucket(input_size)
+        with self._lock:
+            for distance in (0, 1, 2):
+                for candidate in {bucket - distance, bucket + distance}:
+                    samples = self._samples.get(self._key(workflow_type, candidate))
+                    if samples:
+                        return list(samples)
+        return []
+
+    def predict(self, workflow_type, input_size):
+        """
+        変換所要時間を予測する
+
+        Returns
+        -------
+        float or None
+            予測所要時間（秒）。履歴が無い場合は None
+        """
+        samples = self._samples_for(workflow_type, input_size)
+        return statistics.median(samples) if samples else None
+
+    def timeout_for(self, workflow_type, input_size):
+        """
+        履歴からタイムアウト秒数を求める
+
+        Returns
+        -------
+        float
+            95パーセンタイルの所要時間に倍率を掛けた秒数（履歴が少なければ DEFAULT_TIMEOUT）
+        """
+        samples = sorted(self._samples_for(workflow_type, input_size))
+        if len(samples) < MIN_SAMPLES_FOR_TIMEOUT:
+            return DEFAULT_TIMEOUT
+        p95 = samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+        return max(MIN_TIMEOUT, p95 * TIMEOUT_FACTOR)
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._samples, f)
+        os.replace(tmp_path, self.path)
+
+
+class AdaptivePollSchedule:
+    """
+    変換ステータスのポーリング間隔を決める
+
+    最初は initial 秒間隔で確認し、確認のたびに backoff 倍（ジッター付き）で間隔を広げる。
+    予測所要時間がある場合は予測完了時刻を飛び越えて待たないようにし、
+    予測完了時刻から予測所要時間の半分が経過するまでは near_eta 秒間隔で確認する。
+
+    Parameters
+    ----------
+    expected_duration : float
+        予測所要時間（秒）。None の場合は単純なバックオフのみ
+    initial : float
+        最初のポーリング間隔（秒）
+    maximum : float
+        ポーリング間隔の上限（秒）
+    near_eta : float
+        予測完了時刻付近のポーリング間隔（秒）
+    backoff : float
+        間隔を広げる倍率
+    jitter : float
+        間隔に加えるランダムな揺らぎの割合
+    """
+
+    def __init__(self, expected_duration=None, initial=INITIAL_POLL_INTERVAL, maximum=MAX_POLL_INTERVAL,
+                 near_eta=NEAR_ETA_POLL_INTERVAL, backoff=POLL_BACKOFF, jitter=POLL_JITTER):
+        self.expected_duration = expected_duration
+        self.initial = initial
+        self.maximum = maximum
+        self.near_eta = near_eta
+        self.backoff = backoff
+        self.jitter = jitter
+        self._current = initial
+
+    def next_delay(self, elapsed):
+        """
+        次のポーリングまでの待ち時間を求める
+
+        Parameters
+        ----------
+        elapsed : float
+            変換開始からの経過秒数
+
+        Returns
+        -------
+        float
+            待ち時間（秒）
+        """
+        delay = self._current
+        self._current = min(self._current * self.backoff, self.maximum)
+
+        if self.expected_duration:
+            remaining = self.expected_duration - elapsed
+            if remaining > 0:
+                # 予測完了時刻を飛び越えて待たない
+                delay = min(delay, max(remaining, self.initial))
+            elif -remaining < self.expected_duration / 2:
+                # 予測完了時刻の直後は間隔を詰める
+                delay = min(delay, self.near_eta)
+
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(delay, 0.1)
+
+
+_default_history = None
+_default_history_lock = threading.Lock()
+
+
+def get_transformation_history():
+    """
+    プロセス共有の変換履歴を取得する
+
+    Returns
+    -------
+    TransformationHistory
+        共有の変換履歴
+    """
+    global _default_history
+    if _default_history is None:
+        with _default_history_lock:
+            if _default_history is None:
+                _default_history = TransformationHistory()
+    return _default_history
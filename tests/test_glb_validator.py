@@ -0,0 +1,108 @@
+"""
+glb_validator のテスト（手で組み立てたGLBファイルを検証する）
+"""
+
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from glb_validator import (
+    GLB_CHUNK_BIN,
+    GLB_CHUNK_JSON,
+    GlbValidationError,
+    inspect_glb,
+    results_to_json,
+    validate_output,
+)
+
+# 四角形（2つの三角形）
+POSITIONS = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], dtype=np.float32)
+INDICES = np.array([0, 1, 2, 0, 2, 3], dtype=np.uint16)
+
+
+def build_glb(positions=POSITIONS, indices=INDICES, mode=None):
+    """位置とインデックスのアクセサを1つずつ持つGLBファイルのバイト列を作る"""
+    position_bytes = positions.tobytes()
+    index_bytes = indices.tobytes()
+    binary = position_bytes + index_bytes
+    binary += b"\0" * (-len(binary) % 4)
+
+    primitive = {"attributes": {"POSITION": 0}, "indices": 1}
+    if mode is not None:
+        primitive["mode"] = mode
+    document = {
+        "asset": {"version": "2.0"},
+        "buffers": [{"byteLength": len(binary)}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": 0, "byteLength": len(position_bytes)},
+            {"buffer": 0, "byteOffset": len(position_bytes), "byteLength": len(index_bytes)},
+        ],
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": len(positions), "type": "VEC3"},
+            {"bufferView": 1, "componentType": 5123, "count": len(indices), "type": "SCALAR"},
+        ],
+        "meshes": [{"primitives": [primitive]}],
+    }
+    json_bytes = json.dumps(document).encode()
+    json_bytes += b" " * (-len(json_bytes) % 4)
+
+    chunks = (struct.pack("<II", len(json_bytes), GLB_CHUNK_JSON) + json_bytes
+              + struct.pack("<II", len(binary), GLB_CHUNK_BIN) + binary)
+    return struct.pack("<4sII", b"glTF", 2, 12 + len(chunks)) + chunks
+
+
+def write(tmp_path, data, name="model.glb"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_valid_glb(tmp_path):
+    stats = inspect_glb(write(tmp_path, build_glb()))
+    assert stats.valid, stats.problems
+    assert (stats.meshes, stats.primitives, stats.triangles, stats.vertices) == (1, 1, 2, 4)
+    assert (stats.accessors, stats.buffer_views) == (2, 2)
+    assert stats.bin_bytes == POSITIONS.nbytes + INDICES.nbytes
+
+
+def test_triangle_strip_counts_triangles(tmp_path):
+    stats = inspect_glb(write(tmp_path, build_glb(indices=np.array([0, 1, 3, 2], dtype=np.uint16), mode=5)))
+    assert stats.valid, stats.problems
+    assert stats.triangles == 2
+
+
+@pytest.mark.parametrize("cut", [0, 8, 12, 20, 100, -1, -4])
+def test_truncated_glb(tmp_path, cut):
+    data = build_glb()
+    stats = inspect_glb(write(tmp_path, data[:cut]))
+    assert not stats.valid
+
+
+def test_out_of_range_index(tmp_path):
+    stats = inspect_glb(write(tmp_path, build_glb(indices=np.array([0, 1, 2, 0, 2, 4], dtype=np.uint16))))
+    assert not stats.valid
+    assert any("indices" in problem and "4" in problem for problem in stats.problems)
+
+
+def test_bad_magic(tmp_path):
+    data = bytearray(build_glb())
+    data[:4] = b"GLTF"
+    assert not inspect_glb(write(tmp_path, bytes(data))).valid
+
+
+def test_validate_output_removes_invalid_files(tmp_path):
+    output_dir = tmp_path / "model"
+    output_dir.mkdir()
+    good = write(output_dir, build_glb(), "good.glb")
+    write(output_dir, build_glb()[:-4], "bad.glb")
+    write(output_dir, b"not a glb", "model.gltf")
+
+    with pytest.raises(GlbValidationError):
+        validate_output(str(output_dir))
+    assert (output_dir / "good.glb").exists()
+    assert not (output_dir / "bad.glb").exists()
+
+    results = validate_output(good)
+    assert [record["triangles"] for record in json.loads(results_to_json(results))] == [2]
@@ -0,0 +1,159 @@
+"""
+http_retry.RetryPolicy のテスト（バックオフの待ち時間と再試行の可否）
+"""
+
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_retry
+from http_client import UnityHttpClient
+from http_retry import MAX_RETRY_AFTER, CircuitOpenError, RetryPolicy, body_position, parse_retry_after
+
+
+@pytest.fixture
+def upper_bound(monkeypatch):
+    """ジッターを無くし、常に待ち時間の上限を返すようにする"""
+    monkeypatch.setattr(http_retry.random, "uniform", lambda low, high: high)
+
+
+def test_backoff_schedule_doubles_until_cap(upper_bound):
+    policy = RetryPolicy(max_retries=8, backoff_base=0.5, backoff_max=10)
+    assert [policy.backoff(attempt) for attempt in range(8)] == [0.5, 1, 2, 4, 8, 10, 10, 10]
+
+
+@pytest.mark.parametrize("attempt", range(6))
+def test_backoff_jitter_within_bounds(attempt):
+    policy = RetryPolicy(backoff_base=0.5, backoff_max=4)
+    limit = min(4, 0.5 * 2 ** attempt)
+    random.seed(attempt)
+    delays = [policy.backoff(attempt) for _ in range(200)]
+    assert all(0 <= delay <= limit for delay in delays)
+    # ジッターにより待ち時間がばらつく（同時に失敗したワーカーが一斉に再送しない）
+    assert len(set(delays)) > 1
+    assert max(delays) > limit / 2
+
+
+def test_backoff_prefers_retry_after(upper_bound):
+    policy = RetryPolicy(backoff_base=0.5, backoff_max=10)
+    assert policy.backoff(0, {"Retry-After": "7"}) == 7
+    # Retry-After は backoff_max ではなく MAX_RETRY_AFTER で制限する
+    assert policy.backoff(0, {"Retry-After": "120"}) == 120
+    assert policy.backoff(3, {"Retry-After": "invalid"}) == 4
+
+
+@pytest.mark.parametrize("headers, expected", [
+    (None, None),
+    ({}, None),
+    ({"Retry-After": ""}, None),
+    ({"Retry-After": "3"}, 3),
+    ({"Retry-After": "1.5"}, 1.5),
+    ({"Retry-After": "-5"}, 0),
+    ({"Retry-After": "100000"}, MAX_RETRY_AFTER),
+    ({"Retry-After": "soon"}, None),
+])
+def test_parse_retry_after_seconds(headers, expected):
+    assert parse_retry_after(headers) == expected
+
+
+def test_parse_retry_after_http_date():
+    delay = parse_retry_after({"Retry-After": formatdate(time.time() + 60, usegmt=True)})
+    assert 55 <= delay <= 60
+    assert parse_retry_after({"Retry-After": formatdate(time.time() - 60, usegmt=True)}) == 0
+
+
+@pytest.mark.parametrize("status, idempotent, expected", [
+    (429, False, True),
+    (429, True, True),
+    (503, True, True),
+    (503, False, False),
+    (500, True, True),
+    (400, True, False),
+    (404, True, False),
+])
+def test_should_retry_status(status, idempotent, expected):
+    assert RetryPolicy(max_retries=3).should_retry_status(status, 0, idempotent) is expected
+
+
+def test_should_retry_status_stops_at_max_retries():
+    policy = RetryPolicy(max_retries=3)
+    assert [policy.should_retry_status(429, attempt, True) for attempt in range(5)] == [True, True, True, False, False]
+
+
+@pytest.mark.parametrize("error, idempotent, expected", [
+    (requests.exceptions.ConnectTimeout(), False, True),
+    (requests.exceptions.ReadTimeout(), False, False),
+    (requests.exceptions.ReadTimeout(), True, True),
+    (requests.exceptions.ConnectionError(), True, True),
+    (requests.exceptions.ChunkedEncodingError(), True, True),
+    (CircuitOpenError(), True, False),
+    (requests.exceptions.InvalidURL(), True, False),
+])
+def test_should_retry_error(error, idempotent, expected):
+    assert RetryPolicy(max_retries=3).should_retry_error(error, 0, idempotent) is expected
+
+
+@pytest.mark.parametrize("method, idempotent, expected", [
+    ("GET", None, True),
+    ("put", None, True),
+    ("POST", None, False),
+    ("PATCH", None, False),
+    ("POST", True, True),
+    ("GET", False, False),
+])
+def test_is_idempotent(method, idempotent, expected):
+    assert RetryPolicy.is_idempotent(method, idempotent) is expected
+
+
+@pytest.mark.parametrize("data", [None, b"block", bytearray(b"block"), memoryview(b"block"), "text", {"key": "value"}])
+def test_body_position_resendable(data):
+    assert body_position(data) is None
+
+
+def test_body_position_file(tmp_path):
+    path = tmp_path / "block.bin"
+    path.write_bytes(b"0123456789")
+    with open(path, "rb") as f:
+        f.seek(4)
+        assert body_position(f) == 4
+    assert body_position(iter([b"block"])) == -1
+
+
+@pytest.fixture
+def flaky_server():
+    """最初の1回だけ 503 を返し、以降は 201 を返すサーバー"""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_PUT(self):
+            received.append(self.rfile.read(int(self.headers["Content-Length"])))
+            status = 503 if len(received) == 1 else 201
+            self.send_response(status)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/container/blob?comp=block", received
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("make_body", [bytes, memoryview])
+def test_put_block_retried_after_503(flaky_server, make_body):
+    url, received = flaky_server
+    block = b"x" * 1024
+    # ブロック単位のアップロードは mmap の memoryview をそのまま本文として送る
+    response = UnityHttpClient().request("PUT", url, data=make_body(block))
+    assert response.status_code == 201
+    assert received == [block, block]
@@ -0,0 +1,111 @@
+"""
+job_store.JobStore の状態遷移のテスト
+"""
+
+import pytest
+
+from job_store import (
+    JOB_CREATED,
+    JOB_UPLOADED,
+    JOB_TRANSFORMING,
+    JOB_SUCCEEDED,
+    JOB_DOWNLOADED,
+    JOB_FINALIZED,
+    JOB_STATES,
+    RESUME_STEPS,
+    JobStore,
+    job_key,
+)
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_advance_creates_job_and_keeps_fields(jobs):
+    jobs.advance("k", JOB_CREATED, input_path="in.obj", asset_id="a1", version_id="1")
+    jobs.advance("k", JOB_CREATED, dataset_id="d1")
+
+    job = jobs.get("k")
+    assert job["state"] == JOB_CREATED
+    assert (job["input_path"], job["asset_id"], job["version_id"], job["dataset_id"]) == ("in.obj", "a1", "1", "d1")
+
+
+def test_advance_through_all_states(jobs):
+    for state in JOB_STATES:
+        jobs.advance("k", state)
+        assert jobs.get("k")["state"] == state
+
+
+def test_advance_backward_raises(jobs):
+    jobs.advance("k", JOB_TRANSFORMING, transformation_id="t1")
+    with pytest.raises(ValueError):
+        jobs.advance("k", JOB_UPLOADED)
+    assert jobs.get("k")["state"] == JOB_TRANSFORMING
+
+
+def test_downloaded_after_finalized_stays_finalized(jobs):
+    # ファイナライズ済みのジョブを再ダウンロードしても、ファイナライズをやり直さない
+    jobs.advance("k", JOB_FINALIZED, bulk_id="b1")
+    jobs.advance("k", JOB_DOWNLOADED, validation="[]")
+
+    job = jobs.get("k")
+    assert job["state"] == JOB_FINALIZED
+    assert job["validation"] == "[]"
+
+
+@pytest.mark.parametrize("state, fields", [
+    ("unknown", {}),
+    (JOB_CREATED, {"unknown_field": 1}),
+])
+def test_advance_rejects_unknown_state_and_fields(jobs, state, fields):
+    with pytest.raises(ValueError):
+        jobs.advance("k", state, **fields)
+    assert jobs.get("k") is None
+
+
+def test_rewind_to_uploaded_clears_transformation(jobs):
+    jobs.advance("k", JOB_UPLOADED, dataset_id="d1")
+    jobs.advance("k", JOB_TRANSFORMING, transformation_id="t1", transformation_started_at=1.0)
+    jobs.rewind("k", JOB_UPLOADED, error="変換に失敗")
+
+    job = jobs.get("k")
+    assert job["state"] == JOB_UPLOADED
+    assert job["transformation_id"] is None
+    assert job["transformation_started_at"] is None
+    assert job["dataset_id"] == "d1"
+    assert job["error"] == "変換に失敗"
+
+    # 巻き戻したジョブは再び変換から進められる
+    jobs.advance("k", JOB_TRANSFORMING, transformation_id="t2")
+    assert jobs.get("k")["transformation_id"] == "t2"
+
+
+def test_rewind_to_succeeded_keeps_transformation(jobs):
+    jobs.advance("k", JOB_TRANSFORMING, transformation_id="t1")
+    jobs.advance("k", JOB_DOWNLOADED)
+    jobs.rewind("k", JOB_SUCCEEDED, error="ファイナライズに失敗")
+
+    job = jobs.get("k")
+    assert job["state"] == JOB_SUCCEEDED
+    assert job["transformation_id"] == "t1"
+
+
+def test_unfinished_excludes_downloaded_and_finalized(jobs):
+    for state in JOB_STATES:
+        jobs.advance(state, state)
+    assert {job["key"] for job in jobs.unfinished()} == {JOB_CREATED, JOB_UPLOADED, JOB_TRANSFORMING, JOB_SUCCEEDED}
+
+
+def test_resume_steps_cover_all_states():
+    assert set(RESUME_STEPS) == set(JOB_STATES)
+    assert RESUME_STEPS[JOB_TRANSFORMING] == "poll"
+    assert {RESUME_STEPS[state] for state in (JOB_SUCCEEDED, JOB_DOWNLOADED, JOB_FINALIZED)} == {"download"}
+
+
+def test_job_key_depends_on_output_path():
+    assert job_key("c", "out/a.glb") == job_key("c", "out/a.glb")
+    assert job_key("c", "out/a.glb") != job_key("c", "out/b.glb")
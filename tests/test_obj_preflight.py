@@ -0,0 +1,147 @@
+"""
+obj_preflight.analyze_obj のテスト
+
+NumPy でまとめて解析した集計結果を、1行ずつ解析する素朴な実装の結果と比べる。
+"""
+
+import math
+import random
+
+import pytest
+
+from obj_preflight import PreflightError, analyze_obj, preflight_input
+
+
+def naive_stats(text):
+    """1行ずつ split して集計する（analyze_obj と同じ規則の参照実装）"""
+    stats = dict(vertices=0, texcoords=0, normals=0, faces=0, triangles=0, groups=0, objects=0,
+                 material_switches=0, degenerate_faces=0, broken_faces=0, invalid_vertices=0)
+    low = [math.inf] * 3
+    high = [-math.inf] * 3
+    for line in text.splitlines():
+        tokens = line.split()
+        if not tokens:
+            continue
+        keyword, args = tokens[0], tokens[1:]
+        if keyword == "v":
+            stats["vertices"] += 1
+            try:
+                xyz = [float(token) for token in args[:3]]
+            except ValueError:
+                xyz = []
+            if len(xyz) < 3 or not all(math.isfinite(value) for value in xyz):
+                stats["invalid_vertices"] += 1
+                continue
+            low = [min(a, b) for a, b in zip(low, xyz)]
+            high = [max(a, b) for a, b in zip(high, xyz)]
+        elif keyword.startswith("vt"):
+            stats["texcoords"] += 1
+        elif keyword.startswith("vn"):
+            stats["normals"] += 1
+        elif keyword == "g":
+            stats["groups"] += 1
+        elif keyword == "o":
+            stats["objects"] += 1
+        elif keyword.startswith("usemtl"):
+            stats["material_switches"] += 1
+        elif keyword == "f":
+            available = stats["vertices"]
+            resolved = []
+            broken = False
+            for token in args:
+                try:
+                    index = int(token.split("/")[0])
+                except ValueError:
+                    broken = True
+                    continue
+                index = index if index > 0 else available + index + 1
+                if token.split("/")[0] == "0" or not 1 <= index <= available:
+                    broken = True
+                resolved.append(index)
+            stats["faces"] += 1
+            stats["triangles"] += max(len(args) - 2, 0)
+            if broken:
+                stats["broken_faces"] += 1
+            elif len(args) < 3 or len(set(resolved)) < len(resolved):
+                stats["degenerate_faces"] += 1
+    bounds = (tuple(low), tuple(high)) if stats["vertices"] > stats["invalid_vertices"] else (None, None)
+    return stats, bounds
+
+
+def random_obj(seed, lines=400):
+    """いろいろな書式・壊れた行を含むOBJファイルの内容を作る"""
+    rng = random.Random(seed)
+    face_format = rng.choice(["{v}", "{v}/{v}", "{v}//{v}", "{v}/{v}/{v}", None])
+    out = []
+    vertices = 0
+    for _ in range(lines):
+        kind = rng.random()
+        if kind < 0.35 or vertices < 3:
+            coords = [rng.choice([f"{rng.uniform(-100, 100):.6f}", f"{rng.uniform(-1, 1):.3e}", str(rng.randint(-9, 9))])
+                      for _ in range(rng.choice([3, 3, 3, 4, 6]))]
+            if rng.random() < 0.05:
+                coords[rng.randrange(len(coords))] = rng.choice(["nan", "inf", "abc"])
+            if rng.random() < 0.03:
+                coords = coords[:2]
+            out.append("v " + " ".join(coords))
+            vertices += 1
+        elif kind < 0.45:
+            out.append(rng.choice(["vt 0.5 0.5", "vn 0 1 0", "g part", "o obj", "usemtl mat", "# comment", ""]))
+        else:
+            corners = []
+            for _ in range(rng.choice([3, 3, 3, 4, 5, 2])):
+                index = rng.randint(1, vertices)
+                if rng.random() < 0.1:
+                    index = -rng.randint(1, vertices)
+                if rng.random() < 0.02:
+                    index = rng.choice([0, vertices + rng.randint(1, 5), -(vertices + 1)])
+                if rng.random() < 0.05 and corners:
+                    index = int(corners[-1].split("/")[0])
+                fmt = face_format or rng.choice(["{v}", "{v}/{v}", "{v}//{v}", "{v}/{v}/{v}"])
+                corners.append(fmt.format(v=index))
+            out.append("f " + " ".join(corners))
+        if rng.random() < 0.05:
+            out[-1] = rng.choice([" ", "\t"]) + out[-1]
+    return "\n".join(out) + "\n"
+
+
+def assert_matches_naive(stats, text):
+    expected, (low, high) = naive_stats(text)
+    for name, value in expected.items():
+        assert getattr(stats, name) == value, name
+    if low is None:
+        assert stats.bounds_min is None
+    else:
+        assert stats.bounds_min == pytest.approx(low, rel=1e-9)
+        assert stats.bounds_max == pytest.approx(high, rel=1e-9)
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("chunk_size", [97, 4096, 4 * 1024 * 1024])
+def test_matches_naive_parser(tmp_path, seed, chunk_size):
+    text = random_obj(seed)
+    path = tmp_path / "model.obj"
+    path.write_text(text)
+    assert_matches_naive(analyze_obj(str(path), chunk_size=chunk_size), text)
+
+
+def test_crlf_and_missing_final_newline(tmp_path):
+    text = "v 0 0 0\r\nv 1 0 0\r\nv 0 1 0\r\nf 1 2 3\r\nf 1 1 2"
+    path = tmp_path / "model.obj"
+    path.write_bytes(text.encode())
+    stats = analyze_obj(str(path), chunk_size=16)
+    assert_matches_naive(stats, text)
+    assert (stats.faces, stats.degenerate_faces) == (2, 1)
+
+
+def test_preflight_rejects_broken_faces(tmp_path):
+    path = tmp_path / "broken.obj"
+    path.write_text("v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 4\n")
+    with pytest.raises(PreflightError):
+        preflight_input(str(path))
+
+
+def test_preflight_skips_non_obj(tmp_path):
+    path = tmp_path / "model.fbx"
+    path.write_bytes(b"\0")
+    assert preflight_input(str(path)) is None
@@ -0,0 +1,535 @@
+"""
+Unity Asset Manager - 処理時間のトレース
+
+各 *_via_api 関数・パイプラインの各ステップ・HTTPリクエストの開始/終了時刻、転送バイト数、
+HTTPステータス、再試行回数をスパンとして記録し、JSON Lines ファイルに出力します。
+
+各行は OpenTelemetry の OTLP/JSON 形式（resourceSpans → scopeSpans → spans）のため、
+OpenTelemetry Collector の otlpjsonfile レシーバーなどでそのまま読み込めます。
+
+環境変数 `UNITY_TRACE_FILE`（または configure_tracing）で出力先を指定した場合のみ記録し、
+指定しない場合は各関数の呼び出しに条件分岐1回分のコストしかかかりません。
+"""
+
+import os
+import json
+import time
+import atexit
+import inspect
+import secrets
+import functools
+import threading
+import contextvars
+from urllib.parse import urlsplit
+
+# スパンの出力先（None の場合は記録しない）
+TRACE_FILE = os.getenv("UNITY_TRACE_FILE")
+
+# リソース属性の service.name
+SERVICE_NAME = os.getenv("UNITY_TRACE_SERVICE_NAME", "unity-asset-gltf-converter")
+
+# スパンの種類（OTLP/JSON の SpanKind）
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+# OTLP/JSON の StatusCode
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+# HTTPリクエストのスパンから親スパンへ集計する属性
+_HTTP_ROLLUP = {
+    "http.retry_count": "http.retry_count",
+    "http.request.body.size": "unity.bytes_sent",
+    "http.response.body.size": "unity.bytes_received",
+}
+
+# 変換がキューで待っている間のステータス
+_QUEUED_STATUSES = {"PENDING", "QUEUED"}
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class Span:
+    """
+    記録中のスパン
+
+    Parameters
+    ----------
+    name : str
+        スパン名
+    parent : Span
+        親スパン（None の場合は新しいトレースを開始する）
+    kind : int
+        スパンの種類（SPAN_KIND_INTERNAL または SPAN_KIND_CLIENT）
+    attributes : dict
+        属性
+    """
+
+    def __init__(self, name, parent=None, kind=SPAN_KIND_INTERNAL, attributes=None):
+        self.name = name
+        self.parent = parent
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._lock = threading.Lock()
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, key, amount):
+        """数値属性に加算する（転送バイト数・再試行回数の集計など）"""
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def add_event(self, name, **attributes):
+        """時刻付きのイベントを記録する"""
+        self.events.append((time.time_ns(), name, attributes))
+
+    def end(self, error=None):
+        """
+        スパンを終了して出力する（2回目以降の呼び出しは無視する）
+
+        Parameters
+        ----------
+        error : BaseException
+            スパン内で発生した例外（成功した場合は None）
+        """
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.error = error
+        if self.kind == SPAN_KIND_CLIENT and self.parent is not None:
+            # HTTPリクエストの転送量・再試行回数は呼び出し元の *_via_api のスパンにも集計する
+            self.parent.add("http.request_count", 1)
+            for key, total_key in _HTTP_ROLLUP.items():
+                if key in self.attributes:
+                    self.parent.add(total_key, self.attributes[key])
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(self)
+
+    def to_otlp(self):
+        """OTLP/JSON の Span オブジェクトに変換する"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": _STATUS_OK}
+        }
+        if self.parent is not None:
+            span["parentSpanId"] = self.parent.span_id
+        if self.events:
+            span["events"] = [
+                {"timeUnixNano": str(ts), "name": name, "attributes": _otlp_attributes(attrs)}
+                for ts, name, attrs in self.events
+            ]
+        if self.error is not None:
+            span["status"] = {"code": _STATUS_ERROR, "message": str(self.error)}
+            span.setdefault("events", []).append({
+                "timeUnixNano": str(self.end_ns),
+                "name": "exception",
+                "attributes": _otlp_attributes({
+                    "exception.type": type(self.error).__name__,
+                    "exception.message": str(self.error)
+                })
+            })
+        return span
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(exc)
+        return False
+
+
+class _NoopSpan:
+    """トレースが無効な場合に返す何もしないスパン"""
+
+    trace_id = span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def add(self, key, amount):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JsonLinesExporter:
+    """
+    スパンを1行1件の OTLP/JSON（resourceSpans）としてファイルに追記する
+
+    複数スレッドから共有して使用できる。
+
+    Parameters
+    ----------
+    path : str
+        出力先のパス
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._resource = {"attributes": _otlp_attributes({"service.name": SERVICE_NAME, "process.pid": os.getpid()})}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span):
+        line = json.dumps({
+            "resourceSpans": [{
+                "resource": self._resource,
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp()]}]
+            }]
+        }, ensure_ascii=False)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+_exporter = None
+_current_span = contextvars.ContextVar("unity_trace_span", default=None)
+
+
+def configure_tracing(path=TRACE_FILE):
+    """
+    スパンの出力先を設定する
+
+    Parameters
+    ----------
+    path : str
+        出力先のパス（None の場合は記録を止める）
+    """
+    global _exporter
+    previous, _exporter = _exporter, (JsonLinesExporter(path) if path else None)
+    if previous is not None:
+        previous.close()
+
+
+def tracing_enabled():
+    """スパンを記録しているかどうか"""
+    return _exporter is not None
+
+
+def current_span():
+    """
+    実行中のスパンを取得する（無い場合やトレースが無効な場合は何もしないスパン）
+    """
+    if _exporter is None:
+        return NOOP_SPAN
+    return _current_span.get() or NOOP_SPAN
+
+
+def start_span(name, parent=None, kind=SPAN_KIND_INTERNAL, **attributes):
+    """
+    スパンを開始する
+
+    with 文で使うと、ブロック内で開始したスパンの親になり、ブロックを抜けると終了する。
+    with 文を使わない場合は end() を呼ぶまで記録中になる（Future の完了で終わるステージなど）。
+
+    Parameters
+    ----------
+    name : str
+        スパン名
+    parent : Span
+        親スパン（None の場合は実行中のスパン）
+    kind : int
+        スパンの種類
+    **attributes
+        属性
+
+    Returns
+    -------
+    Span
+        開始したスパン（トレースが無効な場合は何もしないスパン）
+    """
+    if _exporter is None:
+        return NOOP_SPAN
+    if parent is None or parent is NOOP_SPAN:
+        parent = _current_span.get()
+    return Span(name, parent=parent, kind=kind, attributes=attributes)
+
+
+def use_span(span):
+    """
+    既存のスパンを実行中のスパンにする（with 文を抜けても終了しない）
+    """
+    if span is NOOP_SPAN or _exporter is None:
+        return NOOP_SPAN
+    return _SpanScope(span)
+
+
+class _SpanScope:
+    def __init__(self, span):
+        self.span = span
+
+    def __enter__(self):
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+
+def bind_context(func):
+    """
+    呼び出し元のスパンとジョブの期限（job_deadline.py）を引き継いで別スレッドで実行する関数を返す
+    （ThreadPoolExecutor 用）
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # 1つの Context は同時に1スレッドでしか実行できないため、呼び出しごとに複製する
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+def http_span(method, url, data=None):
+    """
+    HTTPリクエストのスパンを開始する（URLのクエリ（署名など）は記録しない）
+
+    Parameters
+    ----------
+    method : str
+        HTTPメソッド
+    url : str
+        リクエスト先のURL
+    data : bytes
+        リクエスト本文（長さが分かる場合は送信バイト数として記録する）
+
+    Returns
+    -------
+    Span
+        開始したスパン（トレースが無効な場合は何もしないスパン）
+    """
+    if _exporter is None:
+        return NOOP_SPAN
+    parts = urlsplit(url)
+    span = start_span(f"HTTP {method}", kind=SPAN_KIND_CLIENT, **{
+        "http.request.method": method,
+        "server.address": parts.hostname,
+        "url.path": parts.path
+    })
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        span.set_attribute("http.request.body.size", len(data))
+    return span
+
+
+def record_http_response(span, status_code, headers, retry_count):
+    """
+    HTTPレスポンスの結果をスパンに記録する
+
+    Parameters
+    ----------
+    span : Span
+        http_span で開始したスパン
+    status_code : int
+        ステータスコード
+    headers : Mapping
+        レスポンスヘッダー
+    retry_count : int
+        再試行した回数
+    """
+    if span is NOOP_SPAN:
+        return
+    span.set_attribute("http.response.status_code", status_code)
+    span.set_attribute("http.retry_count", retry_count)
+    content_length = headers.get("Content-Length") if headers else None
+    if content_length and content_length.isdigit():
+        span.set_attribute("http.response.body.size", int(content_length))
+
+
+def traced(name=None):
+    """
+    関数の呼び出しをスパンとして記録するデコレーター
+
+    通常の関数・コルーチン関数・ジェネレーター関数・非同期ジェネレーター関数に使用できる
+    （ジェネレーターは send() を使わない反復専用のものに限る）。
+
+    Parameters
+    ----------
+    name : str
+        スパン名（省略時は関数名）
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def asyncgen_wrapper(*args, **kwargs):
+                if _exporter is None:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                    return
+                # 呼び出し元が途中で読むのをやめても親子関係が崩れないよう、再開するたびにスパンを有効にする
+                span = start_span(span_name)
+                generator = func(*args, **kwargs)
+                error = None
+                try:
+                    while True:
+                        with use_span(span):
+                            try:
+                                item = await generator.__anext__()
+                            except StopAsyncIteration:
+                                return
+                        yield item
+                except GeneratorExit:
+                    await generator.aclose()
+                    raise
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    span.end(error)
+            return asyncgen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def coroutine_wrapper(*args, **kwargs):
+                if _exporter is None:
+                    return await func(*args, **kwargs)
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+            return coroutine_wrapper
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if _exporter is None:
+                    return (yield from func(*args, **kwargs))
+                span = start_span(span_name)
+                generator = func(*args, **kwargs)
+                error = None
+                try:
+                    while True:
+                        with use_span(span):
+                            try:
+                                item = next(generator)
+                            except StopIteration as stop:
+                                return stop.value
+                        yield item
+                except GeneratorExit:
+                    generator.close()
+                    raise
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    span.end(error)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+            with start_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TransformationTrace:
+    """
+    変換ステータスの変化をスパンのイベントとして記録し、
+    キュー待ち時間（transformation.queue_seconds）と実行時間（transformation.run_seconds）を求める
+
+    Parameters
+    ----------
+    span : Span
+        記録先のスパン
+    started_at : float
+        変換を開始した時刻（time.time()）
+    """
+
+    def __init__(self, span, started_at=None):
+        self.span = span
+        self.started_at = started_at or time.time()
+        self.running_at = None
+        self.status = None
+
+    def observe(self, status):
+        """
+        ポーリングで取得したステータスを記録する
+
+        Parameters
+        ----------
+        status : str
+            変換ステータス
+        """
+        if not status or status == self.status:
+            return
+        self.status = status
+        self.span.add_event("transformation.status", status=status)
+
+        now = time.time()
+        normalized = status.upper()
+        if self.running_at is None and normalized not in _QUEUED_STATUSES:
+            # キューを抜けた（または実行中を観測せずに完了した）時点までをキュー待ちとみなす
+            self.running_at = now
+            self.span.set_attribute("transformation.queue_seconds", now - self.started_at)
+        if normalized not in _QUEUED_STATUSES and normalized != "RUNNING":
+            self.span.set_attribute("transformation.run_seconds", now - self.running_at)
+            self.span.set_attribute("transformation.status", status)
+
+
+@atexit.register
+def _flush_at_exit():
+    if _exporter is not None:
+        _exporter.flush()
+
+
+configure_tracing(TRACE_FILE)
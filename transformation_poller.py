@@ -0,0 +1,333 @@
+"""
+Unity Asset Manager - プロジェクト単位の変換ステータスポーラー
+
+変換処理ごとにステータスAPIを呼ぶ代わりに、
+GET /assets/v1/projects/{projectId}/transformations でプロジェクト内の変換を
+1ティックにつき1回（ページ数分）まとめて取得し、待機中の各ジョブへ結果を配信します。
+API呼び出し回数は待機中のジョブ数ではなくティック数に比例します。
+
+ティックの間隔は各ジョブの AdaptivePollSchedule から決まり、
+いずれかのジョブの確認予定時刻が来たときだけ一覧を取得します。
+"""
+
+import time
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import Future
+
+import requests
+
+from main_webapi import (
+    WORKFLOW_TYPE,
+    TRANSFORMATION_SUCCEEDED_STATUS,
+    TRANSFORMATION_FAILED_STATUSES,
+    list_transformations_via_api,
+    get_transformation_status_via_api,
+)
+from poll_schedule import AdaptivePollSchedule, get_transformation_history, INITIAL_POLL_INTERVAL, MAX_POLL_INTERVAL
+
+# ティックの最小間隔（秒）。確認予定時刻がこの範囲内に収まるジョブは同じティックでまとめて確認する
+DEFAULT_MIN_TICK_INTERVAL = INITIAL_POLL_INTERVAL
+
+# 1ページあたりの取得件数と、1ティックで読む最大ページ数
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_MAX_PAGES = 5
+
+# 一覧に現れないまま何ティック経過したら個別のステータスAPIで確認するか
+DEFAULT_FALLBACK_AFTER_TICKS = 3
+
+
+class TransformationFailedError(RuntimeError):
+    """変換処理が失敗ステータスで終了した"""
+
+    def __init__(self, transformation_id, status, error_message):
+        super().__init__(f"変換が失敗しました ({status}): {error_message}")
+        self.transformation_id = transformation_id
+        self.status = status
+        self.error_message = error_message
+
+
+@dataclass
+class _Watch:
+    transformation_id: str
+    asset_id: str
+    version_id: str
+    dataset_id: str
+    future: Future
+    schedule: AdaptivePollSchedule
+    workflow_type: str
+    input_size: int
+    started_at: float
+    next_due: float
+    deadline: float
+    status: str = None
+    missed_ticks: int = 0
+    callbacks: list = field(default_factory=list)
+
+
+class TransformationPoller:
+    """
+    プロジェクト内の変換ステータスをまとめてポーリングし、待機中のジョブへ配信する
+
+    watch() で登録した変換が成功すると Future に最終ステータスが設定され、
+    失敗・タイムアウトすると例外が設定される。ステータスが変化するたびに
+    登録されたコールバック（transformation_id, status_dict）が呼ばれる。
+
+    Parameters
+    ----------
+    auth_credentials : str or AuthProvider
+        Base64エンコードされた認証情報、または認証プロバイダー
+    project_id : str
+        プロジェクトID
+    min_tick_interval : float
+        ティックの最小間隔（秒）
+    page_size : int
+        一覧APIの1ページあたりの取得件数
+    max_pages : int
+        1ティックで読む最大ページ数
+    fallback_after_ticks : int
+        一覧に現れないまま何ティック経過したら個別のステータスAPIで確認するか
+    """
+
+    def __init__(self, auth_credentials, project_id, min_tick_interval=DEFAULT_MIN_TICK_INTERVAL,
+                 page_size=DEFAULT_PAGE_SIZE, max_pages=DEFAULT_MAX_PAGES,
+                 fallback_after_ticks=DEFAULT_FALLBACK_AFTER_TICKS):
+        self.auth_credentials = auth_credentials
+        self.project_id = project_id
+        self.min_tick_interval = min_tick_interval
+        self.history = get_transformation_history()
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.fallback_after_ticks = fallback_after_ticks
+        self.tick_count = 0
+        self.api_calls = 0
+        self._watches = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """ポーリングスレッドを開始する"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="transformation-poller", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """ポーリングスレッドを停止する（待機中のジョブはキャンセルされる）"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        with self._lock:
+            watches = list(self._watches.values())
+            self._watches.clear()
+        for watch in watches:
+            watch.future.cancel()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def watch(self, transformation_id, asset_id, version_id, dataset_id, workflow_type=WORKFLOW_TYPE,
+              input_size=None, timeout=None, started_at=None, deadline=None, callback=None):
+        """
+        変換処理を待機対象に登録する
+
+        Parameters
+        ----------
+        transformation_id : str
+            変換ID
+        asset_id : str
+            アセットID
+        version_id : str
+            バージョンID
+        dataset_id : str
+            データセットID
+        workflow_type : str
+            ワークフロータイプ（所要時間の予測と記録に使用）
+        input_size : int
+            入力ファイルのバイト数（所要時間の予測と記録に使用）
+        timeout : float
+            タイムアウト秒数（None の場合は過去の変換所要時間から求める）
+        started_at : float
+            変換を開始した時刻（time.time()、None の場合は登録時刻）
+        deadline : Deadline
+            ジョブ全体の期限（タイムアウトをこの期限より後にしない）
+        callback : callable
+            ステータスが変化するたびに (transformation_id, status_dict) で呼ばれる関数
+
+        Returns
+        -------
+        concurrent.futures.Future
+            成功時は最終ステータス情報、失敗時は TransformationFailedError、
+            タイムアウト時は TimeoutError が設定される
+        """
+        if timeout is None:
+            timeout = self.history.timeout_for(workflow_type, input_size)
+        started_at = started_at or time.time()
+        expires_at = started_at + timeout
+        if deadline is not None and deadline.expires_at is not None:
+            expires_at = min(expires_at, deadline.expires_at)
+        schedule = AdaptivePollSchedule(self.history.predict(workflow_type, input_size))
+
+        future = Future()
+        watch = _Watch(
+            transformation_id=transformation_id,
+            asset_id=asset_id,
+            version_id=version_id,
+            dataset_id=dataset_id,
+            future=future,
+            schedule=schedule,
+            workflow_type=workflow_type,
+            input_size=input_size,
+            started_at=started_at,
+            next_due=time.time() + schedule.next_delay(time.time() - started_at),
+            deadline=expires_at
+        )
+        if callback:
+            watch.callbacks.append(callback)
+
+        with self._lock:
+            self._watches[transformation_id] = watch
+        # 確認予定時刻が今の待ち時間より早い可能性があるので待機をやり直させる
+        self._wakeup.set()
+        return future
+
+    def unwatch(self, transformation_id):
+        """変換処理を待機対象から外す"""
+        with self._lock:
+            watch = self._watches.pop(transformation_id, None)
+        if watch is not None:
+            watch.future.cancel()
+
+    @property
+    def pending_count(self):
+        with self._lock:
+            return len(self._watches)
+
+    def _seconds_until_next_tick(self):
+        with self._lock:
+            if not self._watches:
+                return MAX_POLL_INTERVAL
+            # タイムアウトの時刻にも確認し、期限を過ぎたジョブを待たせない
+            next_due = min(min(watch.next_due, watch.deadline) for watch in self._watches.values())
+        return max(next_due - time.time(), 0)
+
+    def _run(self):
+        last_tick = 0
+        while not self._stopped.is_set():
+            wait = max(self._seconds_until_next_tick(), last_tick + self.min_tick_interval - time.time())
+            if self._wakeup.wait(wait):
+                self._wakeup.clear()
+                continue
+            if self._stopped.is_set():
+                break
+            if not self.pending_count:
+                continue
+
+            last_tick = time.time()
+            try:
+                self.tick()
+            except requests.exceptions.RequestException as e:
+                # 一時的なエラーは次のティックで再試行する
+                print(f"  警告: 変換一覧のポーリングに失敗しました: {e}")
+                self._reschedule_due()
+
+    def tick(self):
+        """
+        1ティック分のポーリングを行い、ステータスの変化を配信する
+        """
+        with self._lock:
+            pending = dict(self._watches)
+        if not pending:
+            return
+
+        self.tick_count += 1
+        seen = {}
+        for page in range(self.max_pages):
+            transformations = list_transformations_via_api(
+                auth_credentials=self.auth_credentials,
+                project_id=self.project_id,
+                offset=page * self.page_size,
+                limit=self.page_size
+            )
+            self.api_calls += 1
+
+            for transformation in transformations:
+                transformation_id = transformation.get("id")
+                if transformation_id in pending:
+                    seen[transformation_id] = transformation
+
+            if len(transformations) < self.page_size or len(seen) == len(pending):
+                break
+
+        self._reschedule_due()
+
+        for transformation_id, watch in pending.items():
+            transformation = seen.get(transformation_id)
+            if transformation is None:
+                watch.missed_ticks += 1
+                if watch.missed_ticks < self.fallback_after_ticks:
+                    self._check_deadline(watch)
+                    continue
+                # 一覧の取得範囲外にある変換だけは個別に確認する
+                transformation = get_transformation_status_via_api(
+                    auth_credentials=self.auth_credentials,
+                    project_id=self.project_id,
+                    asset_id=watch.asset_id,
+                    version_id=watch.version_id,
+                    dataset_id=watch.dataset_id,
+                    transformation_id=transformation_id
+                )
+                self.api_calls += 1
+            watch.missed_ticks = 0
+            self._dispatch(watch, transformation)
+
+    def _reschedule_due(self):
+        # 確認予定時刻が次の最小間隔内に来るジョブは、今回のティックで確認済みとみなして次の予定を決める
+        now = time.time()
+        with self._lock:
+            watches = list(self._watches.values())
+        for watch in watches:
+            if watch.next_due <= now + self.min_tick_interval:
+                watch.next_due = now + watch.schedule.next_delay(now - watch.started_at)
+
+    def _dispatch(self, watch, transformation):
+        status = transformation.get("status")
+        if status != watch.status:
+            watch.status = status
+            for callback in watch.callbacks:
+                callback(watch.transformation_id, transformation)
+
+        normalized = (status or "").upper()
+        if normalized == TRANSFORMATION_SUCCEEDED_STATUS:
+            self.history.record(watch.workflow_type, watch.input_size, time.time() - watch.started_at)
+            self._resolve(watch, result=transformation)
+        elif normalized in TRANSFORMATION_FAILED_STATUSES:
+            error_message = transformation.get("errorMessage") or "不明なエラー"
+            self._resolve(watch, error=TransformationFailedError(watch.transformation_id, status, error_message))
+        else:
+            self._check_deadline(watch)
+
+    def _check_deadline(self, watch):
+        if time.time() >= watch.deadline:
+            self._resolve(watch, error=TimeoutError(f"変換がタイムアウトしました: {watch.transformation_id}"))
+
+    def _resolve(self, watch, result=None, error=None):
+        with self._lock:
+            if self._watches.get(watch.transformation_id) is not watch:
+                return
+            del self._watches[watch.transformation_id]
+
+        if not watch.future.set_running_or_notify_cancel():
+            return
+        if error is not None:
+            watch.future.set_exception(error)
+        else:
+            watch.future.set_result(result)
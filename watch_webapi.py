@@ -0,0 +1,203 @@
+"""
+Unity Asset Manager - 監視モード
+
+入力ディレクトリを監視し、保存されたOBJファイル（または参照しているMTL・テクスチャ）の
+内容が前回の変換から変わっていれば、その入力ファイルだけを変換し直します。
+
+以前に変換したファイルは新しいアセットを作らず、同じアセットの新しいバージョン
+（POST /assets/{assetId}/versions）として変換するため、編集のたびにアセットが増えることはありません。
+入力ファイルと変換先のアセットの対応は JobStore に保存し、次回の起動時にも引き継ぎます。
+"""
+
+import os
+import sys
+import argparse
+
+from http_client import configure_http_client
+from auth_provider import TOKEN_CACHE_PATH, get_auth_provider
+from main_webapi import (
+    ORG_ID,
+    PROJECT_ID,
+    KEY_ID,
+    SECRET_KEY,
+    OUTPUT_FOLDER,
+    WORKFLOW_TYPE,
+    UNITY_API_BASE,
+    EXPORT_FORMATS,
+    parse_export_formats,
+)
+from bulk_finalizer import SUBMIT_ON_COMPLETION
+from batch_webapi import BatchConverter, BatchSummary, collect_input_paths, parse_annotation
+from obj_dependencies import find_source_files, hash_source_files
+from dir_watcher import DirectoryWatcher, DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL
+
+# 監視対象のデフォルトのディレクトリ
+DEFAULT_INPUT_DIR = "assets_input"
+
+
+def find_changed_inputs(input_paths, jobs):
+    """
+    前回の変換から内容が変わった入力ファイルを探す
+
+    Parameters
+    ----------
+    input_paths : list of str
+        入力ファイルのパス
+    jobs : JobStore
+        前回変換した内容のハッシュを記録したジョブストア
+
+    Returns
+    -------
+    dict
+        入力ファイルのパス → 現在の内容のハッシュ（MTL・テクスチャを含む）
+    """
+    changed = {}
+    for input_path in input_paths:
+        if not os.path.exists(input_path):
+            continue
+        try:
+            content_hash = hash_source_files(find_source_files(input_path))
+        except OSError as e:
+            # 保存中で読めないファイルは次の変更の通知で確認する
+            print(f"  警告: {input_path} を読み込めませんでした: {e}")
+            continue
+        previous = jobs.get_asset(input_path)
+        if previous is None or previous["content_hash"] != content_hash:
+            changed[input_path] = content_hash
+    return changed
+
+
+def convert_changed(converter, input_paths):
+    """
+    内容が変わった入力ファイルだけを変換し、成功したファイルの内容のハッシュを記録する
+
+    Parameters
+    ----------
+    converter : BatchConverter
+        new_versions=True で作成したコンバーター
+    input_paths : list of str
+        変更を確認する入力ファイルのパス
+
+    Returns
+    -------
+    BatchSummary or None
+        変換の集計（変換するファイルが無い場合は None）
+    """
+    changed = find_changed_inputs(input_paths, converter.jobs)
+    if not changed:
+        return None
+
+    print(f"\n変更を検出しました: {', '.join(os.path.basename(path) for path in changed)}")
+    summary = BatchSummary()
+    for job in converter.run(list(changed)):
+        summary.add(job)
+        if not job.succeeded:
+            print(f"  ✗ {job.input_path} ({job.failed_stage}): {job.error}")
+            continue
+
+        # 次の変更の通知では、この内容と比べて変わったかどうかを判断する
+        converter.jobs.record_asset(job.input_path, content_hash=changed[job.input_path])
+        if job.cache_hit:
+            print(f"  ✓ {job.input_path} → {job.output_path} (キャッシュ)")
+        elif job.reused_asset:
+            print(f"  ✓ {job.input_path} → {job.output_path} (変換済みアセット {job.asset_id})")
+        else:
+            print(f"  ✓ {job.input_path} → {job.output_path} "
+                  f"(アセット {job.asset_id} バージョン {job.version_id}, {job.elapsed:.1f} 秒)")
+    summary.finish()
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Unity Asset Manager 監視モード")
+    parser.add_argument("input_dir", nargs="?", default=DEFAULT_INPUT_DIR, help="監視するディレクトリ")
+    parser.add_argument("--output", default=OUTPUT_FOLDER, help="出力フォルダ")
+    parser.add_argument("--workflow-type", default=WORKFLOW_TYPE,
+                        help="ワークフロータイプ（auto: OBJファイルの事前チェックの結果から Free / Pro ティアを選ぶ）")
+    parser.add_argument("--export-formats", type=parse_export_formats, default=EXPORT_FORMATS,
+                        help="1回の変換で出力する形式（カンマ区切り、例: glb,gltf,fbx）")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help="最後の変更からこの秒数だけ変更が無ければ変換を始める")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="inotify が使えない場合にディレクトリを走査する間隔（秒）")
+    parser.add_argument("--polling", action="store_true",
+                        help="inotify を使わず、常にディレクトリの走査で監視する（ネットワークドライブなど）")
+    parser.add_argument("--token-cache", default=TOKEN_CACHE_PATH,
+                        help="アクセストークンの保存先（次回の起動時にトークン交換を省略する）")
+    parser.add_argument("--label", action="append", dest="labels",
+                        help="変換後のアセットバージョンに付与するラベル（複数回指定可、省略時は UNITY_FINALIZE_LABELS）")
+    parser.add_argument("--annotate", action="append", type=parse_annotation, metavar="FIELD=VALUE",
+                        help="変換後のアセットバージョンに付与するメタデータ（複数回指定可、省略時は UNITY_FINALIZE_METADATA）")
+    parser.add_argument("--no-submit", action="store_false", dest="submit", default=SUBMIT_ON_COMPLETION,
+                        help="変換後のアセットバージョンを Submit しない")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    監視モード：入力ディレクトリの変更を監視し、変わったファイルだけを変換し直す
+    """
+    args = parse_args(argv)
+
+    print("\n" + "="*60)
+    print("Unity Asset Manager - 監視モード")
+    print("="*60)
+
+    required_configs = [ORG_ID, PROJECT_ID, KEY_ID, SECRET_KEY]
+    if not all(required_configs):
+        print("\nエラー: .envファイルに必要な設定が不足しています。")
+        print("UNITY_CLOUD_ORGANIZATION_ID, UNITY_CLOUD_PROJECT_ID, UNITY_CLOUD_KEY_ID, UNITY_CLOUD_SECRET_KEY")
+        sys.exit(1)
+
+    if not os.path.isdir(args.input_dir):
+        print(f"\nエラー: 監視するディレクトリが見つかりません: {args.input_dir}")
+        sys.exit(1)
+
+    converter = BatchConverter(
+        auth_credentials=get_auth_provider(KEY_ID, SECRET_KEY, PROJECT_ID, api_base=UNITY_API_BASE,
+                                           token_cache_path=args.token_cache),
+        org_id=ORG_ID,
+        project_id=PROJECT_ID,
+        output_folder=args.output,
+        workflow_type=args.workflow_type,
+        export_formats=args.export_formats,
+        labels=args.labels,
+        metadata=dict(args.annotate) if args.annotate else None,
+        submit=args.submit,
+        new_versions=True
+    )
+    configure_http_client(pool_maxsize=sum(converter.stage_concurrency.values()))
+
+    watcher = DirectoryWatcher(args.input_dir, debounce=args.debounce, poll_interval=args.poll_interval,
+                               use_inotify=not args.polling)
+    print(f"\n  監視するディレクトリ: {args.input_dir}（{watcher.backend}）")
+    print(f"  出力フォルダ: {args.output}")
+    print(f"  出力形式: {', '.join(args.export_formats)}")
+
+    try:
+        with watcher:
+            # 前回の起動から変わったファイルを先に変換する
+            convert_changed(converter, collect_input_paths(directory=args.input_dir))
+            print("\n変更を待機しています（Ctrl+C で終了）...")
+
+            for paths in watcher.changes():
+                input_paths = collect_input_paths(directory=args.input_dir)
+                if any(os.path.splitext(path)[1].lower() != ".obj" for path in paths):
+                    # MTL・テクスチャの変更は、参照しているOBJファイルを内容のハッシュで判断する
+                    candidates = input_paths
+                else:
+                    candidates = [path for path in input_paths if os.path.abspath(path) in paths]
+                summary = convert_changed(converter, candidates)
+                if summary is not None:
+                    print(f"  {len(summary.succeeded)} 件成功 / {len(summary.failed)} 件失敗 "
+                          f"({summary.elapsed:.1f} 秒)")
+                    print("\n変更を待機しています（Ctrl+C で終了）...")
+    except KeyboardInterrupt:
+        print("\n監視を終了します")
+    finally:
+        converter.cache.close()
+        converter.jobs.close()
+
+
+if __name__ == "__main__":
+    main()